@@ -9,8 +9,31 @@ https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 
 import os
 
+from asgiref.sync import SyncToAsync, ThreadSensitiveContext
 from django.core.asgi import get_asgi_application
+from django.urls import reverse
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'StockMaster.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+# Paths of the long-poll requests. Django runs the sync code of each request, e.g. its sessions and authentication
+# middlewares, in a thread of its own kept until the request returns: these requests share a single thread instead,
+# so that thousands of them waiting for movements do not hold as many threads and database connections
+SHARED_THREAD_PATHS = frozenset([reverse('stocks:poll-movements-api')])
+# Thread sensitive context of the long-poll requests, see `asgiref.sync.ThreadSensitiveContext`
+LONG_POLL_CONTEXT = ThreadSensitiveContext()
+
+
+async def application(scope, receive, send):
+    """
+    Serve a request with Django, in the shared thread sensitive context if it is a long-poll request.
+    """
+    if scope['type'] != 'http' or scope['path'] not in SHARED_THREAD_PATHS:
+        return await django_application(scope, receive, send)
+    # Set rather than entered: the context is shared, leaving it must not stop its thread
+    token = SyncToAsync.thread_sensitive_context.set(LONG_POLL_CONTEXT)
+    try:
+        return await django_application(scope, receive, send)
+    finally:
+        SyncToAsync.thread_sensitive_context.reset(token)
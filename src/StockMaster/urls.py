@@ -16,10 +16,13 @@ Including another URLconf
 """
 from django.contrib import admin
 from django.urls import path, include
+from stocks.views import metrics_view
 from users.views import welcome_view
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('users/', include('users.urls')),
+    path('stocks/', include('stocks.urls')),
+    path('metrics', metrics_view, name='metrics'),
     path('', welcome_view, name='welcome-page'),
 ]
@@ -0,0 +1,63 @@
+"""
+Benchmark of the stock alert evaluation over a large inventory.
+
+Run it explicitly, the benchmark files are not collected by the test suite:
+    BENCH_ALERT_STOCKS=100000 pytest -s benchmarks/bench_alerts.py
+"""
+import datetime
+import random
+
+import pytest
+
+from stocks.models import Product, Stock, StockAlert, Warehouse
+from stocks.services.alerts import evaluate_alerts
+from benchmarks.conftest import bench_size
+
+STOCKS = bench_size("BENCH_ALERT_STOCKS", 100000)
+
+
+@pytest.fixture
+def inventory():
+    """
+    Fixture creating `BENCH_ALERT_STOCKS` stocks spread over ten stores, a tenth of them below their threshold.
+
+    Returns:
+        list[Warehouse]: The stores of the inventory.
+    """
+    rng = random.Random(0)
+    stores = [Warehouse.objects.create(building=f"B{index}", room="1") for index in range(10)]
+    products = Product.objects.bulk_create([
+        Product(sku=f"A{index:07d}", name="Item", supplier="S", supplier_ref="S", manufacturer="M",
+                manufacturer_ref="M", critical=index % 50 == 0)
+        for index in range(STOCKS // len(stores))
+    ], batch_size=5000)
+    Stock.objects.bulk_create([
+        Stock(unit_quantity=1, pack_quantity=rng.randint(0, 20), threshold=2, shelving="A1", batch="B",
+              reception_date=datetime.date.today(), product=product, warehouse=store)
+        for product in products for store in stores
+    ], batch_size=5000)
+    return stores
+
+
+@pytest.mark.django_db
+def test_full_and_incremental_evaluation(inventory, timer):
+    """
+    Measure a full evaluation of the alerts, then an incremental one for a batch of touched pairs.
+
+    Asserts:
+        - The first evaluation raises alerts, a second one does not raise them again.
+        - Once the alerts are open, a full evaluation runs in under a second.
+    """
+    with timer(f"full evaluation, {STOCKS} stocks"):
+        raised, _ = evaluate_alerts()
+
+    with timer("full evaluation, alerts already open") as steady:
+        assert evaluate_alerts() == (0, 0)
+
+    pairs = set(Stock.objects.values_list("product_id", "warehouse_id")[:500])
+    with timer(f"incremental evaluation, {len(pairs)} pairs"):
+        evaluate_alerts(pairs)
+
+    print(f"{raised} alerts raised, {StockAlert.objects.count()} stored")
+    assert raised > 0
+    assert steady() < 1
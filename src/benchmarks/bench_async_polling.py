@@ -0,0 +1,122 @@
+"""
+Benchmark of the long polling of the new movements by many idle clients, served by a single event loop.
+
+Run it explicitly, the benchmark files are not collected by the test suite:
+    BENCH_POLLERS=1000 pytest -s benchmarks/bench_async_polling.py
+`BENCH_POLLERS` operators poll the movements of their warehouse at once through the ASGI application, then a
+movement is recorded. The plain Django handler, which gives the sync code of each request a thread of its own, is
+compared with the application of `StockMaster.asgi`, whose long-poll requests share one.
+"""
+import asyncio
+import datetime
+import json
+import statistics
+import threading
+import time
+from urllib.parse import urlencode
+
+import pytest
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.test import Client
+from django.urls import reverse
+
+from StockMaster.asgi import application, django_application
+from stocks.models import Product, Stock, StockMovement, Warehouse
+from stocks.services import feed
+from stocks.services.feed import FEED, movements_after
+from stocks.services.movements import record_movement
+from users.models import UserProfile
+from benchmarks.conftest import bench_size
+
+POLLERS = bench_size("BENCH_POLLERS", 1000)
+# Seconds the pollers stay idle before the movement is recorded
+IDLE = 3.0
+
+
+async def _get(app, path, query, cookie):
+    """
+    Serve a GET request with an ASGI application, returning the time its body was sent and its decoded body.
+    """
+    disconnected = asyncio.get_running_loop().create_future()
+    messages = iter([{"type": "http.request", "body": b"", "more_body": False}])
+    sent = {}
+
+    async def receive():
+        message = next(messages, None)
+        if message is None:
+            # The client stays connected, Django listening for its disconnection until the response is sent
+            return await disconnected
+        return message
+
+    async def send(message):
+        if message["type"] == "http.response.body":
+            sent["at"], sent["body"] = time.perf_counter(), sent.get("body", b"") + message.get("body", b"")
+
+    scope = {"type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET", "scheme": "http",
+             "path": path, "raw_path": path.encode(), "query_string": urlencode(query).encode(), "root_path": "",
+             "headers": [(b"host", b"testserver"), (b"cookie", cookie.encode())],
+             "client": ("127.0.0.1", 50000), "server": ("testserver", 80)}
+    await app(scope, receive, send)
+    return sent["at"], json.loads(sent["body"])
+
+
+@pytest.mark.django_db(transaction=True)
+def test_async_polling(monkeypatch):
+    """
+    Measure the threads and the reads of the movements held by idle pollers, and the delivery of a movement.
+
+    Asserts:
+        - Every poller gets the recorded movement.
+        - The feed reads of the idle pollers do not grow with their number.
+        - The long-poll requests of `StockMaster.asgi` do not hold a thread each.
+    """
+    warehouse = Warehouse.objects.create(building="A1", room="100", warehouse_type=Warehouse.Types.STORE)
+    product = Product.objects.create(sku="P0000001", name="Product", supplier="S", supplier_ref="S",
+                                     manufacturer="M", manufacturer_ref="M")
+    stock = Stock.objects.create(unit_quantity=1, pack_quantity=0, shelving="A", batch="B", threshold=1,
+                                 reception_date=datetime.date.today(), product=product, warehouse=warehouse)
+    operator = get_user_model().objects.create_user(username="operator", password="operatorpassword")
+    profile = UserProfile.objects.create(user=operator, profile=UserProfile.Profiles.OPERATOR)
+    profile.warehouses.add(warehouse)
+    client = Client()
+    client.force_login(operator)
+    cookie = f"sessionid={client.cookies['sessionid'].value}"
+    path = reverse("stocks:poll-movements-api")
+    feed_reads = []
+
+    async def counted(after, warehouses=None, *args, **kwargs):
+        # The feed reads the movements of every warehouse, a request catching up only its own
+        if warehouses is None:
+            feed_reads.append(after)
+        return await movements_after(after, warehouses, *args, **kwargs)
+
+    monkeypatch.setattr(feed, "movements_after", counted)
+
+    for label, app in (("Django handler", django_application), ("StockMaster.asgi", application)):
+        last = record_movement(stock, StockMovement.Types.IN, 1).pk
+        threads = threading.active_count()
+
+        async def scenario():
+            query = {"after": last, "warehouse": warehouse.pk}
+            polls = [asyncio.create_task(_get(app, path, query, cookie)) for _ in range(POLLERS)]
+            while FEED.waiters < POLLERS:
+                assert not any(poll.done() for poll in polls), "A poller returned before any movement"
+                await asyncio.sleep(0.01)
+            feed_reads.clear()
+            await asyncio.sleep(IDLE)
+            idle = threading.active_count() - threads, len(feed_reads)
+            recorded = time.perf_counter()
+            movement = await sync_to_async(record_movement)(stock, StockMovement.Types.IN, 1)
+            return idle, recorded, movement, await asyncio.gather(*polls)
+
+        start = time.perf_counter()
+        # A loop of its own, as in an ASGI server: run by `async_to_sync`, the sync code would go to this thread
+        (idle_threads, idle_reads), recorded, movement, responses = asyncio.run(scenario())
+        latencies = sorted(sent - recorded for sent, _ in responses)
+        print(f"\n{label}, {POLLERS} pollers connected in {recorded - start - IDLE:.2f}s: {idle_threads} more "
+              f"threads and {idle_reads} feed reads while idle for {IDLE:.0f}s, movement delivered in "
+              f"{statistics.median(latencies) * 1000:.0f}ms median, {latencies[-1] * 1000:.0f}ms max")
+        assert all([row["id"] for row in body["results"]] == [movement.pk] for _, body in responses)
+        assert idle_reads <= IDLE / FEED.interval + 1
+    assert idle_threads < 10
@@ -0,0 +1,44 @@
+"""
+Benchmark of the core flows of StockMaster on a seeded inventory: login, dashboard, stock list, exports and
+movement recording.
+
+Run it explicitly, the benchmark files are not collected by the test suite:
+    BENCH_MOVEMENTS=1000000 BENCH_RESULTS=results.json pytest -s benchmarks/bench_core_flows.py
+The inventory is seeded once by the `seeded_inventory` fixture, its size being set by `BENCH_PRODUCTS`,
+`BENCH_WAREHOUSES`, `BENCH_STOCKS` and `BENCH_MOVEMENTS`. With `BENCH_RESULTS`, the report is written as JSON and
+compared with the one already in that file; the `run_benchmarks` management command runs the same scenarios from a
+shell.
+"""
+import os
+from pathlib import Path
+
+import pytest
+
+from stocks.services.benchmarking import build_report, compare_reports, read_report, run_scenarios, save_report
+from benchmarks.conftest import bench_size
+
+ITERATIONS = bench_size("BENCH_ITERATIONS", 20)
+
+
+@pytest.mark.django_db
+def test_core_flows(seeded_inventory):
+    """
+    Measure the latency and throughput of the core flows.
+
+    Args:
+        seeded_inventory (dict[str, int]): The counts of the seeded inventory.
+
+    Asserts:
+        - Every scenario succeeds on the seeded inventory.
+    """
+    report = build_report(run_scenarios(iterations=ITERATIONS), seeded_inventory)
+    for name, result in report["results"].items():
+        print(f"{name:<18} median {result['median_ms']:9.2f}ms  p95 {result['p95_ms']:9.2f}ms  "
+              f"{result['throughput_per_s']:8.1f}/s  {result['queries']:5.0f} queries")
+
+    if os.environ.get("BENCH_RESULTS"):
+        path = Path(os.environ["BENCH_RESULTS"])
+        if path.is_file():
+            for row in compare_reports(read_report(path), report):
+                print(f"{row['scenario']:<18} {row['change']:+7.1%}{'  REGRESSION' if row['regression'] else ''}")
+        save_report(report, path)
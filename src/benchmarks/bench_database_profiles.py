@@ -0,0 +1,137 @@
+"""
+Benchmark of the database profiles under concurrent writers and readers.
+
+Run it explicitly, the benchmark files are not collected by the test suite:
+    BENCH_WRITERS=4 BENCH_READERS=4 BENCH_REQUESTS=300 pytest -s benchmarks/bench_database_profiles.py
+For each profile, `BENCH_WRITERS` processes record movements on random stocks while `BENCH_READERS` processes
+read pages of stocks, each serving `BENCH_REQUESTS` requests. The workers are spawned with the
+DATABASE_PROFILE of the profile, so that they load the settings of the profile as a production server would.
+"""
+import datetime
+import multiprocessing
+import os
+import random
+import statistics
+import time
+
+import pytest
+from django.db import OperationalError, connection, connections
+
+from benchmarks.conftest import bench_size
+
+WRITERS = bench_size("BENCH_WRITERS", 4)
+READERS = bench_size("BENCH_READERS", 4)
+REQUESTS = bench_size("BENCH_REQUESTS", 300)
+STOCKS = 1000
+
+
+def start_worker(profile, database):
+    """
+    Load the settings of a profile in a spawned worker, connected to the benchmark database.
+
+    The models are imported once the settings are loaded, hence by the worker functions rather than above.
+    """
+    import django
+
+    os.environ.update(DATABASE_PROFILE=profile, DATABASE_URL=f"sqlite:///{database}")
+    django.setup()
+
+
+def run_worker(writer, seed):
+    """
+    Serve `BENCH_REQUESTS` requests, each recording a movement or reading a page of stocks.
+
+    The request signals are sent around each request, so that the connection is closed or kept as by the
+    request handler.
+
+    Args:
+        writer (bool): Whether the worker records movements rather than reading stocks.
+        seed (int): The seed of the random stocks of the worker.
+    Returns:
+        tuple[list[float], int, float]: The latency of each successful request, the number of requests which
+        failed because the database was locked, and the time spent serving the requests.
+    """
+    from django.core.signals import request_finished, request_started
+
+    from stocks.models import Stock, StockMovement
+    from stocks.services.movements import record_movement
+
+    generator = random.Random(seed)
+    ids = list(Stock.objects.order_by("id").values_list("id", flat=True))
+    connections.close_all()
+    latencies = []
+    locked = 0
+    started = time.perf_counter()
+    for _ in range(REQUESTS):
+        request_started.send(sender=None)
+        start = time.perf_counter()
+        try:
+            if writer:
+                stock = Stock.objects.get(pk=generator.choice(ids))
+                record_movement(stock, generator.choice(StockMovement.Types.values), generator.randint(1, 3))
+            else:
+                offset = generator.randrange(STOCKS - 50)
+                list(Stock.objects.select_related("product").order_by("id")[offset:offset + 50])
+            latencies.append(time.perf_counter() - start)
+        except OperationalError:
+            locked += 1
+        finally:
+            request_finished.send(sender=None)
+    elapsed = time.perf_counter() - started
+    connections.close_all()
+    return latencies, locked, elapsed
+
+
+def _report(profile, role, results):
+    """
+    Print the throughput and the latencies of the writers or the readers of a profile.
+
+    Returns:
+        int: The number of requests which failed because the database was locked.
+    """
+    latencies = [latency for worker_latencies, _, _ in results for latency in worker_latencies]
+    locked = sum(worker_locked for _, worker_locked, _ in results)
+    elapsed = max(worker_elapsed for _, _, worker_elapsed in results)
+    cuts = statistics.quantiles(latencies, n=20)
+    print(f"{profile} {role}: {len(latencies) / elapsed:.0f} requests/s, p50 {cuts[9] * 1000:.2f}ms, "
+          f"p95 {cuts[18] * 1000:.2f}ms, {locked} locked")
+    return locked
+
+
+@pytest.mark.django_db(transaction=True)
+def test_database_profiles():
+    """
+    Run the same concurrent writers and readers with the development and the production profiles.
+
+    Asserts:
+        - With the production profile, no request fails because the database is locked.
+    """
+    from stocks.models import Product, Stock, Warehouse
+
+    warehouse = Warehouse.objects.create(building="P1", room="1", warehouse_type=Warehouse.Types.STORE)
+    products = Product.objects.bulk_create([
+        Product(sku=f"P{index:05d}", name=f"Product {index}", supplier="S", supplier_ref="S", manufacturer="M",
+                manufacturer_ref="M")
+        for index in range(STOCKS)
+    ])
+    Stock.objects.bulk_create([
+        Stock(unit_quantity=1, pack_quantity=10000, shelving="A", batch=f"B{index}",
+              reception_date=datetime.date.today(), threshold=0, product=product, warehouse=warehouse)
+        for index, product in enumerate(products)
+    ])
+    database = connection.settings_dict["NAME"]
+
+    context = multiprocessing.get_context("spawn")
+    locked = {}
+    for profile in ("development", "production"):
+        # The journal mode is stored in the database file: the development profile starts from the default one
+        with connection.cursor() as cursor:
+            cursor.execute("PRAGMA journal_mode = DELETE")
+        connections.close_all()
+        workers = [(True, seed) for seed in range(WRITERS)] + [(False, seed) for seed in range(READERS)]
+        with context.Pool(len(workers), initializer=start_worker, initargs=(profile, database)) as pool:
+            results = pool.starmap(run_worker, workers)
+        print()
+        locked[profile] = _report(profile, "writers", results[:WRITERS])
+        _report(profile, "readers", results[WRITERS:])
+    assert locked["production"] == 0
@@ -0,0 +1,74 @@
+"""
+Benchmark of the consumption forecasts of every (product, warehouse) series.
+
+Run it explicitly, the benchmark files are not collected by the test suite:
+    BENCH_SERIES=100000 BENCH_MOVEMENTS_PER_SERIES=5 pytest -s benchmarks/bench_forecasting.py
+The series spread over 100 warehouses, each with OUT movements on distinct days of the last 90 days.
+"""
+import datetime
+from unittest import mock
+
+import pytest
+from django.utils import timezone
+
+from stocks.models import ConsumptionForecast, Product, Stock, StockMovement, Warehouse
+from stocks.services.forecasting import update_forecasts
+from benchmarks.conftest import bench_size
+
+SERIES = bench_size("BENCH_SERIES", 100000)
+MOVEMENTS_PER_SERIES = bench_size("BENCH_MOVEMENTS_PER_SERIES", 5)
+WAREHOUSES = 100
+BATCH = 10000
+
+
+@pytest.fixture
+def stocks():
+    """
+    Fixture creating `BENCH_SERIES` stocks, one per series, with `BENCH_MOVEMENTS_PER_SERIES` OUT movements each.
+
+    Returns:
+        list[Stock]: The stocks.
+    """
+    warehouses = [Warehouse.objects.create(building="F1", room=str(index), warehouse_type=Warehouse.Types.KANBAN)
+                  for index in range(WAREHOUSES)]
+    products = Product.objects.bulk_create([
+        Product(sku=f"F{index:06d}", name=f"Product {index}", supplier="S", supplier_ref="S", manufacturer="M",
+                manufacturer_ref="M")
+        for index in range(SERIES // WAREHOUSES)
+    ], batch_size=BATCH)
+    stocks = Stock.objects.bulk_create([
+        Stock(unit_quantity=1, pack_quantity=100, shelving="S1", batch="B1", reception_date=datetime.date.today(),
+              product=product, warehouse=warehouse)
+        for product in products for warehouse in warehouses
+    ], batch_size=BATCH)
+
+    now = timezone.now()
+    with mock.patch.object(StockMovement._meta.get_field("timestamp"), "auto_now_add", False):
+        for offset in range(0, len(stocks), BATCH):
+            StockMovement.objects.bulk_create([
+                StockMovement(stock=stock, movement_type=StockMovement.Types.OUT, quantity=1 + (stock.pk + day) % 4,
+                              timestamp=now - datetime.timedelta(days=(stock.pk * 7 + day * 13) % 90))
+                for stock in stocks[offset:offset + BATCH] for day in range(MOVEMENTS_PER_SERIES)
+            ], batch_size=BATCH)
+    return stocks
+
+
+@pytest.mark.django_db
+def test_forecast_every_series(stocks, timer):
+    """
+    Forecast every series, then only the few series with new movements.
+
+    Asserts:
+        - Every series is forecast and its stocks take its reorder point as threshold.
+        - The incremental run only recomputes the changed series.
+    """
+    with timer(f"full forecast of {len(stocks)} series") as full:
+        assert update_forecasts() == len(stocks)
+    assert not Stock.objects.exclude(threshold__in=ConsumptionForecast.objects.values("reorder_point")).exists()
+
+    StockMovement.objects.bulk_create([StockMovement(stock=stock, movement_type=StockMovement.Types.OUT, quantity=1)
+                                       for stock in stocks[:100]])
+    with timer("incremental forecast of 100 series") as incremental:
+        assert update_forecasts() == 100
+
+    print(f"full {full():.2f}s, incremental {incremental():.2f}s")
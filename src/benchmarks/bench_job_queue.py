@@ -0,0 +1,69 @@
+"""
+Benchmark of the request latency of recording movements, synchronously and through the job queue.
+
+Run it explicitly, the benchmark files are not collected by the test suite:
+    BENCH_REQUESTS=500 BENCH_WORKERS=4 pytest -s benchmarks/bench_job_queue.py
+"""
+import datetime
+import io
+import json
+import time
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import Client
+from django.urls import reverse
+
+from stocks.models import Job, Product, Stock, StockMovement, Warehouse
+from users.models import UserProfile
+from benchmarks.conftest import bench_size
+
+REQUESTS = bench_size("BENCH_REQUESTS", 200)
+WORKERS = bench_size("BENCH_WORKERS", 4)
+
+
+def median_latency(client, url, batches):
+    """
+    Post each batch and return the median latency of the requests, in milliseconds.
+    """
+    durations = []
+    for batch in batches:
+        start = time.perf_counter()
+        response = client.post(url, json.dumps(batch), content_type="application/json")
+        durations.append(time.perf_counter() - start)
+        assert response.status_code in (200, 202)
+    return sorted(durations)[len(durations) // 2] * 1000
+
+
+@pytest.mark.django_db(transaction=True)
+def test_queued_recording_latency(timer):
+    """
+    Compare the latency of the synchronous and the queued recording of single movements, then drain the queue.
+
+    Asserts:
+        - The queued request is faster than the synchronous one.
+        - The worker pool records every queued movement.
+    """
+    warehouse = Warehouse.objects.create(building="Q1", room="1", warehouse_type=Warehouse.Types.STORE)
+    product = Product.objects.create(sku="QUEUE", name="Item", supplier="S", supplier_ref="S", manufacturer="M",
+                                     manufacturer_ref="M", critical=True)
+    stock = Stock.objects.create(unit_quantity=1, pack_quantity=0, shelving="A", batch="B",
+                                 reception_date=datetime.date.today(), product=product, warehouse=warehouse)
+    user = get_user_model().objects.create_user(username="bench", password="bench")
+    UserProfile.objects.create(user=user, profile=UserProfile.Profiles.ADMIN)
+    client = Client()
+    client.force_login(user)
+    batches = [{"movements": [{"stock": stock.pk, "movement_type": "IN", "quantity": 1}]}] * REQUESTS
+
+    sync_ms = median_latency(client, reverse("stocks:bulk-movements"), batches)
+    queued_ms = median_latency(client, reverse("stocks:queue-movements"), batches)
+    print(f"\nrecording a movement: synchronous {sync_ms:.2f} ms, queued {queued_ms:.2f} ms")
+
+    with timer(f"{REQUESTS} jobs on {WORKERS} worker threads") as elapsed:
+        call_command("run_worker", "--once", "--concurrency", str(WORKERS), stdout=io.StringIO())
+    print(f"{REQUESTS / elapsed():.0f} jobs/s")
+
+    assert queued_ms < sync_ms
+    assert set(Job.objects.values_list("status", flat=True)) == {Job.Statuses.DONE}
+    assert StockMovement.objects.count() == 2 * REQUESTS
@@ -0,0 +1,74 @@
+"""
+Benchmark of the overhead of the request metrics middleware.
+
+Run it explicitly, the benchmark files are not collected by the test suite:
+    BENCH_REQUESTS=2000 pytest -s benchmarks/bench_metrics_overhead.py
+The welcome page of a logged in user and the login page are each served `BENCH_REQUESTS` times. The time the
+middleware spends around the request is measured apart from the time spent serving it: comparing two clients
+with and without the middleware, the noise of the machine is larger than the overhead being measured.
+"""
+import time
+
+import pytest
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.test import Client, override_settings
+from django.urls import reverse
+
+from benchmarks.conftest import bench_size
+from stocks.middleware import RequestMetricsMiddleware
+
+REQUESTS = bench_size("BENCH_REQUESTS", 2000)
+# Time spent in the middleware, and in the rest of the handler, by the requests served since the last reset
+TIMINGS = {"outer": 0.0, "inner": 0.0}
+
+
+class TimedMetricsMiddleware(RequestMetricsMiddleware):
+    """
+    Metrics middleware also measuring the time spent in itself and in the rest of the handler, see TIMINGS.
+    """
+
+    def __init__(self, get_response):
+        def timed(request):
+            start = time.perf_counter()
+            try:
+                return get_response(request)
+            finally:
+                TIMINGS["inner"] += time.perf_counter() - start
+
+        super().__init__(timed)
+
+    def __call__(self, request):
+        start = time.perf_counter()
+        response = super().__call__(request)
+        TIMINGS["outer"] += time.perf_counter() - start
+        return response
+
+
+@pytest.mark.django_db
+def test_metrics_middleware_overhead():
+    """
+    Measure the overhead of the metrics middleware on the welcome and login views.
+
+    Asserts:
+        - The middleware adds less than 1% to the time spent serving each view.
+    """
+    assert settings.MIDDLEWARE[0] == "stocks.middleware.RequestMetricsMiddleware"
+    user = get_user_model().objects.create_user(username="bench", password="benchpassword")
+    with override_settings(MIDDLEWARE=["benchmarks.bench_metrics_overhead.TimedMetricsMiddleware",
+                                       *settings.MIDDLEWARE[1:]]):
+        client = Client()
+        client.force_login(user)
+        for name in ("welcome-page", "users:login-page"):
+            url = reverse(name)
+            for _ in range(REQUESTS // 10):
+                client.get(url)
+            TIMINGS.update(outer=0.0, inner=0.0)
+            for _ in range(REQUESTS):
+                response = client.get(url)
+            assert response.status_code == 200
+            overhead = (TIMINGS["outer"] - TIMINGS["inner"]) / TIMINGS["inner"]
+            print(f"\n{name}: {TIMINGS['inner'] / REQUESTS * 1e6:.0f}us per request, "
+                  f"{(TIMINGS['outer'] - TIMINGS['inner']) / REQUESTS * 1e6:.1f}us in the middleware, "
+                  f"overhead {overhead:.2%}")
+            assert overhead < 0.01
@@ -0,0 +1,104 @@
+"""
+Benchmark of the stock movement table before and after archiving the old movements.
+
+Run it explicitly, the benchmark files are not collected by the test suite:
+    BENCH_MOVEMENTS=2000000 pytest -s benchmarks/bench_movement_archiving.py
+The movements are spread over two years, the ones older than 90 days are archived.
+"""
+import datetime
+import time
+from unittest import mock
+
+import pytest
+from django.db.models import Sum
+from django.utils import timezone
+
+from stocks.models import Product, Stock, StockMovement, Warehouse
+from stocks.pagination import cursor_page
+from stocks.services.archiving import archive_cutoff, archive_movements
+from stocks.services.movements import record_movement
+from benchmarks.conftest import bench_size
+
+MOVEMENTS = bench_size("BENCH_MOVEMENTS", 200000)
+STOCKS = 100
+HISTORY_DAYS = 730
+REPEAT = 20
+
+
+@pytest.fixture
+def history():
+    """
+    Fixture inserting `BENCH_MOVEMENTS` movements over `STOCKS` stocks, evenly spread over two years.
+    """
+    product = Product.objects.create(sku="ARCH", name="Item", supplier="S", supplier_ref="S", manufacturer="M",
+                                     manufacturer_ref="M")
+    warehouse = Warehouse.objects.create(building="H1", room="1")
+    stocks = Stock.objects.bulk_create([
+        Stock(unit_quantity=1, pack_quantity=0, shelving="A", batch=f"B{index}",
+              reception_date=datetime.date.today(), product=product, warehouse=warehouse)
+        for index in range(STOCKS)
+    ])
+    now = timezone.now()
+    step = datetime.timedelta(days=HISTORY_DAYS) / MOVEMENTS
+    batch = 10000
+    # auto_now_add would stamp every movement with the current time
+    with mock.patch.object(StockMovement._meta.get_field("timestamp"), "auto_now_add", False):
+        for offset in range(0, MOVEMENTS, batch):
+            StockMovement.objects.bulk_create([
+                StockMovement(stock=stocks[index % STOCKS], movement_type=StockMovement.Types.IN, quantity=1,
+                              timestamp=now - (MOVEMENTS - index) * step)
+                for index in range(offset, min(offset + batch, MOVEMENTS))
+            ])
+    return stocks
+
+
+def median_latency(run):
+    """
+    Return the median wall time of `REPEAT` runs of a callable, in milliseconds.
+    """
+    durations = []
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        run()
+        durations.append(time.perf_counter() - start)
+    return sorted(durations)[REPEAT // 2] * 1000
+
+
+def measure(stocks):
+    """
+    Measure the latency of the queries of the hot table, in milliseconds.
+
+    Returns:
+        dict[str, float]: The median latency of each query.
+    """
+    month_ago = timezone.now() - datetime.timedelta(days=30)
+    recent = StockMovement.objects.filter(timestamp__gte=month_ago)
+    return {
+        "recent page": median_latency(lambda: cursor_page(StockMovement.objects.all(), None)),
+        "last 30 days per stock": median_latency(
+            lambda: list(recent.values("stock_id").annotate(total=Sum("quantity")).order_by())),
+        "movement count": median_latency(lambda: StockMovement.objects.count()),
+        "record movement": median_latency(
+            lambda: record_movement(stocks[0], StockMovement.Types.IN, 1, reason="bench")),
+    }
+
+
+@pytest.mark.django_db
+def test_hot_table_latency(history, tmp_path, timer):
+    """
+    Compare the latency of the hot table queries before and after archiving.
+
+    Asserts:
+        - The movements older than 90 days leave the table.
+        - Counting the movements is faster once the table is small.
+    """
+    before = measure(history)
+    with timer("archiving"):
+        archived = archive_movements(archive_cutoff(90), tmp_path)
+    after = measure(history)
+
+    print(f"\n{archived} of {MOVEMENTS} movements archived")
+    for name in before:
+        print(f"{name}: {before[name]:.2f} ms -> {after[name]:.2f} ms")
+    assert archived > MOVEMENTS * 0.8
+    assert after["movement count"] < before["movement count"]
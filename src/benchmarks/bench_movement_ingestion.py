@@ -0,0 +1,60 @@
+"""
+Benchmark of the stock movement recording paths.
+
+Run it explicitly, the benchmark files are not collected by the test suite:
+    BENCH_ROWS=20000 pytest -s benchmarks/bench_movement_ingestion.py
+"""
+import datetime
+
+import pytest
+
+from stocks.models import Product, Stock, StockMovement, Warehouse
+from stocks.services.movements import ingest_movements, record_movement
+from benchmarks.conftest import bench_size
+
+ROWS = bench_size("BENCH_ROWS", 2000)
+STOCKS = bench_size("BENCH_STOCKS", 50)
+
+
+@pytest.fixture
+def stocks():
+    """
+    Fixture creating the stocks moved by the benchmark.
+
+    Returns:
+        list[Stock]: `BENCH_STOCKS` stocks spread over one warehouse.
+    """
+    warehouse = Warehouse.objects.create(building="B1", room="1")
+    products = Product.objects.bulk_create([
+        Product(sku=f"B{index:06d}", name=f"Product {index}", supplier="S", supplier_ref="S",
+                manufacturer="M", manufacturer_ref="M")
+        for index in range(STOCKS)
+    ])
+    return Stock.objects.bulk_create([
+        Stock(unit_quantity=1, pack_quantity=0, shelving="A1", batch="B", reception_date=datetime.date.today(),
+              product=product, warehouse=warehouse)
+        for product in products
+    ])
+
+
+@pytest.mark.django_db(transaction=True)
+def test_bulk_ingestion_versus_per_object_path(stocks, timer):
+    """
+    Compare the throughput of the per-object path and the bulk ingestion of movements.
+
+    Asserts:
+        - Both paths record every movement.
+        - The bulk ingestion is faster than the per-object path.
+    """
+    rows = [{"stock": stocks[index % len(stocks)].pk, "movement_type": "IN", "quantity": 1} for index in range(ROWS)]
+
+    with timer(f"per-object path, {ROWS} rows") as per_object:
+        for index in range(ROWS):
+            record_movement(stocks[index % len(stocks)], StockMovement.Types.IN, 1)
+
+    with timer(f"bulk ingestion, {ROWS} rows") as bulk:
+        ingest_movements(rows)
+
+    print(f"per-object: {ROWS / per_object():.0f} rows/s, bulk: {ROWS / bulk():.0f} rows/s")
+    assert StockMovement.objects.count() == 2 * ROWS
+    assert bulk() < per_object()
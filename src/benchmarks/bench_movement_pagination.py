@@ -0,0 +1,73 @@
+"""
+Benchmark of deep pages of the movement history: cursor pagination against OFFSET pagination.
+
+Run it explicitly, the benchmark files are not collected by the test suite:
+    BENCH_MOVEMENTS=10000000 BENCH_PAGE=1000 pytest -s benchmarks/bench_movement_pagination.py
+The table needs at least BENCH_PAGE * PAGE_SIZE movements.
+"""
+import datetime
+import time
+
+import pytest
+
+from stocks.models import Product, Stock, StockMovement, Warehouse
+from stocks.pagination import PAGE_SIZE, cursor_page, encode_cursor
+from benchmarks.conftest import bench_size
+
+MOVEMENTS = bench_size("BENCH_MOVEMENTS", 200000)
+PAGE = bench_size("BENCH_PAGE", 1000)
+REPEAT = 20
+
+
+@pytest.fixture
+def history():
+    """
+    Fixture inserting `BENCH_MOVEMENTS` movements of a stock in batches.
+    """
+    product = Product.objects.create(sku="PAGE", name="Item", supplier="S", supplier_ref="S", manufacturer="M",
+                                     manufacturer_ref="M")
+    warehouse = Warehouse.objects.create(building="H1", room="1")
+    stock = Stock.objects.create(unit_quantity=1, pack_quantity=0, shelving="A", batch="B",
+                                 reception_date=datetime.date.today(), product=product, warehouse=warehouse)
+    batch = 10000
+    for offset in range(0, MOVEMENTS, batch):
+        movements = [StockMovement(stock=stock, movement_type=StockMovement.Types.IN, quantity=1)
+                     for _ in range(offset, min(offset + batch, MOVEMENTS))]
+        StockMovement.objects.bulk_create(movements)
+    return stock
+
+
+def median_latency(run):
+    """
+    Return the median wall time of `REPEAT` runs of a callable, in milliseconds.
+    """
+    durations = []
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        run()
+        durations.append(time.perf_counter() - start)
+    return sorted(durations)[REPEAT // 2] * 1000
+
+
+@pytest.mark.django_db
+def test_deep_page_latency(history):
+    """
+    Compare the latency of page `BENCH_PAGE` with a cursor and with OFFSET.
+
+    Asserts:
+        - Both pages hold the same movements.
+        - The cursor page is faster than the OFFSET page.
+    """
+    ordered = StockMovement.objects.order_by("-timestamp", "-pk")
+    offset = (PAGE - 1) * PAGE_SIZE
+    before = ordered[offset - 1]
+    cursor = encode_cursor(before.timestamp, before.pk)
+
+    offset_page = list(ordered[offset:offset + PAGE_SIZE])
+    keyset_page, _ = cursor_page(StockMovement.objects.all(), cursor)
+    assert [movement.pk for movement in keyset_page] == [movement.pk for movement in offset_page]
+
+    offset_ms = median_latency(lambda: list(ordered[offset:offset + PAGE_SIZE]))
+    cursor_ms = median_latency(lambda: cursor_page(StockMovement.objects.all(), cursor))
+    print(f"\npage {PAGE} of {MOVEMENTS} movements: OFFSET {offset_ms:.2f} ms, cursor {cursor_ms:.2f} ms")
+    assert cursor_ms < offset_ms
@@ -0,0 +1,68 @@
+"""
+Concurrency benchmark of the first expired first out picking.
+
+Run it explicitly, the benchmark files are not collected by the test suite:
+    BENCH_PICKS=500 BENCH_PICK_THREADS=16 pytest -s benchmarks/bench_picking.py
+"""
+import datetime
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from django.db import OperationalError, connection
+
+from stocks.models import Product, Stock, StockMovement, Warehouse
+from stocks.services.movements import InsufficientStock
+from stocks.services.picking import pick
+from benchmarks.conftest import bench_size
+
+PICKS = bench_size("BENCH_PICKS", 300)
+THREADS = bench_size("BENCH_PICK_THREADS", 8)
+
+
+def pick_with_retry(product_id, warehouse_id):
+    """
+    Pick one package, retrying while the database is locked by a concurrent pick.
+
+    Returns:
+        bool: True if the package was picked, False if the warehouse was empty.
+    """
+    try:
+        while True:
+            try:
+                pick(product_id, warehouse_id, 1)
+                return True
+            except InsufficientStock:
+                return False
+            except OperationalError:
+                time.sleep(0.001)
+    finally:
+        connection.close()
+
+
+@pytest.mark.django_db(transaction=True)
+def test_concurrent_picks_never_double_allocate(timer):
+    """
+    Run more concurrent single-package picks than there are packages in stock.
+
+    Asserts:
+        - Exactly as many picks succeed as there were packages.
+        - The stocks end empty, never negative, and the movements account for every package.
+    """
+    product = Product.objects.create(sku="PICK", name="Item", supplier="S", supplier_ref="S", manufacturer="M",
+                                     manufacturer_ref="M")
+    warehouse = Warehouse.objects.create(building="P1", room="1", warehouse_type=Warehouse.Types.KANBAN)
+    packages = PICKS // 2
+    for index in range(10):
+        Stock.objects.create(unit_quantity=1, pack_quantity=packages // 10, shelving="A", batch=f"B{index}",
+                             expiration_date=datetime.date(2030, 1, 1 + index), reception_date=datetime.date.today(),
+                             threshold=0, product=product, warehouse=warehouse)
+
+    with timer(f"{PICKS} picks on {THREADS} threads") as elapsed:
+        with ThreadPoolExecutor(THREADS) as executor:
+            picked = sum(executor.map(pick_with_retry, [product.pk] * PICKS, [warehouse.pk] * PICKS))
+
+    print(f"{PICKS / elapsed():.0f} picks/s")
+    assert picked == packages // 10 * 10
+    assert set(Stock.objects.values_list("pack_quantity", flat=True)) == {0}
+    assert StockMovement.objects.filter(movement_type=StockMovement.Types.OUT).count() == picked
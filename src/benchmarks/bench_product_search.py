@@ -0,0 +1,79 @@
+"""
+Benchmark of the catalogue search latency.
+
+Run it explicitly, the benchmark files are not collected by the test suite:
+    BENCH_PRODUCTS=1000000 BENCH_QUERIES=500 pytest -s benchmarks/bench_product_search.py
+The products are created in bulk then indexed by `rebuild_index`, with names made of common words.
+"""
+import random
+import statistics
+import time
+
+import pytest
+
+from stocks.models import Product
+from stocks.services.search import fts_enabled, rebuild_index, search_products
+from benchmarks.conftest import bench_size
+
+PRODUCTS = bench_size("BENCH_PRODUCTS", 1000000)
+QUERIES = bench_size("BENCH_QUERIES", 500)
+BATCH = 10000
+WORDS = ["nitrile", "gloves", "pipette", "tips", "ethanol", "absolute", "beaker", "glass", "flask", "conical",
+         "screwdriver", "flat", "cross", "filter", "paper", "syringe", "sterile", "tube", "falcon", "rack"]
+
+
+@pytest.fixture
+def catalogue(timer):
+    """
+    Fixture creating and indexing `BENCH_PRODUCTS` products.
+
+    Returns:
+        int: The number of products.
+    """
+    generator = random.Random(0)
+    for offset in range(0, PRODUCTS, BATCH):
+        Product.objects.bulk_create([
+            Product(sku=f"P{index:07d}", name=" ".join(generator.sample(WORDS, 3)), supplier="S",
+                    supplier_ref=f"SUP-{index * 7919 % 10 ** 6:06d}", manufacturer="M",
+                    manufacturer_ref=f"MAN-{index % 50000:05d}")
+            for index in range(offset, min(offset + BATCH, PRODUCTS))
+        ])
+    with timer(f"index of {PRODUCTS} products ({'FTS5' if fts_enabled() else 'trigram table'})"):
+        assert rebuild_index() == PRODUCTS
+    return PRODUCTS
+
+
+def _percentiles(latencies):
+    """
+    Return the median and the 95th percentile of latencies in milliseconds.
+    """
+    cuts = statistics.quantiles(latencies, n=20)
+    return cuts[9] * 1000, cuts[18] * 1000
+
+
+@pytest.mark.django_db
+def test_search_latency(catalogue):
+    """
+    Measure the latency of the first page of partial sku, reference and name searches, then of fuzzy ones.
+
+    Asserts:
+        - Every partial sku and supplier reference search finds its product.
+    """
+    generator = random.Random(1)
+    kinds = {
+        "partial sku": lambda: f"{generator.randrange(catalogue):07d}"[:5],
+        "supplier reference": lambda: f"SUP-{generator.randrange(catalogue) * 7919 % 10 ** 6:06d}",
+        "two name words": lambda: " ".join(word[:5] for word in generator.sample(WORDS, 2)),
+        "misspelt name": lambda: generator.choice(WORDS)[:-1] + "x" + generator.choice(WORDS)[1:4],
+    }
+    for kind, make_query in kinds.items():
+        latencies = []
+        for _ in range(QUERIES):
+            query = make_query()
+            start = time.perf_counter()
+            page = search_products(query)
+            latencies.append(time.perf_counter() - start)
+            if kind in ("partial sku", "supplier reference"):
+                assert page.products
+        median, p95 = _percentiles(latencies)
+        print(f"{kind}: p50 {median:.1f}ms, p95 {p95:.1f}ms")
@@ -0,0 +1,78 @@
+"""
+Benchmark of the replenishment of every kanban of a building.
+
+Run it explicitly, the benchmark files are not collected by the test suite:
+    BENCH_KANBANS=500 BENCH_PRODUCTS=5000 pytest -s benchmarks/bench_replenishment.py
+Every kanban holds every product, half of them at or below their threshold, with recent consumption.
+"""
+import datetime
+from unittest import mock
+
+import pytest
+from django.utils import timezone
+
+from stocks.models import Product, Stock, StockMovement, Warehouse
+from stocks.services.replenishment import plan_replenishment, replenish
+from benchmarks.conftest import bench_size
+
+KANBANS = bench_size("BENCH_KANBANS", 100)
+PRODUCTS = bench_size("BENCH_PRODUCTS", 1000)
+BATCH = 10000
+
+
+@pytest.fixture
+def building():
+    """
+    Fixture creating a main store, a store and `BENCH_KANBANS` kanbans holding `BENCH_PRODUCTS` products.
+
+    Returns:
+        str: The building of the kanbans.
+    """
+    main = Warehouse.objects.create(building="M0", room="1", warehouse_type=Warehouse.Types.MAIN)
+    store = Warehouse.objects.create(building="R1", room="0", warehouse_type=Warehouse.Types.STORE)
+    kanbans = [Warehouse.objects.create(building="R1", room=str(index + 1), warehouse_type=Warehouse.Types.KANBAN)
+               for index in range(KANBANS)]
+    products = Product.objects.bulk_create([
+        Product(sku=f"R{index:06d}", name=f"Product {index}", supplier="S", supplier_ref="S", manufacturer="M",
+                manufacturer_ref="M")
+        for index in range(PRODUCTS)
+    ], batch_size=BATCH)
+
+    def stock(product, warehouse, quantity, threshold):
+        return Stock(unit_quantity=1, pack_quantity=quantity, shelving="S1", batch=f"B{warehouse.pk}",
+                     reception_date=datetime.date.today(), threshold=threshold, product=product, warehouse=warehouse)
+
+    Stock.objects.bulk_create([stock(product, main, 10 * KANBANS, 0) for product in products], batch_size=BATCH)
+    Stock.objects.bulk_create([stock(product, store, 2 * KANBANS, 10) for product in products], batch_size=BATCH)
+    for kanban in kanbans:
+        stocks = Stock.objects.bulk_create([stock(product, kanban, index % 6, 2)
+                                            for index, product in enumerate(products)], batch_size=BATCH)
+        # One consumption per kanban stock over the last days
+        yesterday = timezone.now() - datetime.timedelta(days=1)
+        with mock.patch.object(StockMovement._meta.get_field("timestamp"), "auto_now_add", False):
+            StockMovement.objects.bulk_create([
+                StockMovement(stock=kanban_stock, movement_type=StockMovement.Types.OUT, quantity=7,
+                              timestamp=yesterday)
+                for kanban_stock in stocks
+            ], batch_size=BATCH)
+    return "R1"
+
+
+@pytest.mark.django_db
+def test_replenishment_of_a_building(building, timer):
+    """
+    Plan then record the replenishment of every kanban of the building.
+
+    Asserts:
+        - Every product at or below its threshold in a kanban is served.
+        - A second plan finds nothing left to do.
+    """
+    with timer(f"plan of {KANBANS} kanbans x {PRODUCTS} products") as planning:
+        transfers, needs = plan_replenishment(building)
+    with timer(f"replenishment, {len(transfers)} transfers") as recording:
+        movements = replenish(building)
+
+    print(f"{len(needs)} needs, plan {planning():.2f}s, recording {recording():.2f}s")
+    assert len(movements) == 2 * len(transfers)
+    assert {transfer.kanban_id for transfer in transfers} == {need.kanban_id for need in needs}
+    assert plan_replenishment(building) == ([], [])
@@ -0,0 +1,90 @@
+"""
+Benchmark of the scan endpoint on warm caches.
+
+Run it explicitly, the benchmark files are not collected by the test suite:
+    BENCH_STOCKS=10000 BENCH_SCANS=2000 pytest -s benchmarks/bench_scan.py
+An operator scans random SKUs of a kanban holding `BENCH_STOCKS` stocks, each OUT scan being
+recorded as a pick before the response.
+"""
+import datetime
+import json
+import random
+import statistics
+import time
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.db import connection, reset_queries
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from stocks.models import Product, Stock, Warehouse
+from users.models import UserProfile
+from benchmarks.conftest import bench_size
+
+STOCKS = bench_size("BENCH_STOCKS", 10000)
+SCANS = bench_size("BENCH_SCANS", 2000)
+BATCH = 10000
+
+
+@pytest.fixture
+def scanner(client):
+    """
+    Fixture creating a kanban of `BENCH_STOCKS` stocks and logging an operator of the kanban in.
+
+    Returns:
+        tuple[Client, list[str]]: The logged in client and the SKUs of the kanban.
+    """
+    kanban = Warehouse.objects.create(building="S1", room="1", warehouse_type=Warehouse.Types.KANBAN)
+    products = Product.objects.bulk_create([
+        Product(sku=f"S{index:07d}", name=f"Product {index}", supplier="S", supplier_ref="S", manufacturer="M",
+                manufacturer_ref="M")
+        for index in range(STOCKS)
+    ], batch_size=BATCH)
+    Stock.objects.bulk_create([
+        Stock(unit_quantity=1, pack_quantity=100, shelving="S1", batch=f"B{index}", reception_date=datetime.date.today(),
+              product=product, warehouse=kanban)
+        for index, product in enumerate(products)
+    ], batch_size=BATCH)
+    user = get_user_model().objects.create_user(username="scanner", password="scannerpassword")
+    profile = UserProfile.objects.create(user=user, profile=UserProfile.Profiles.OPERATOR)
+    profile.warehouses.add(kanban)
+    client.force_login(user)
+    return client, [product.sku for product in products]
+
+
+@pytest.mark.django_db
+def test_scan_latency(scanner):
+    """
+    Measure the latency of warm scans, and the queries of the stock tables they cost.
+
+    Asserts:
+        - A warm lookup reads the generation of the cached stocks and the quantities, and nothing else.
+    """
+    client, skus = scanner
+    generator = random.Random(0)
+    codes = [generator.choice(skus) for _ in range(SCANS)]
+    for code in set(codes):
+        client.get(reverse("stocks:scan"), {"code": code})
+
+    for method in ("GET", "POST"):
+        latencies = []
+        queries = 0
+        for code in codes:
+            # The query log is bounded, an emptied log keeps each capture exact
+            reset_queries()
+            with CaptureQueriesContext(connection) as context:
+                start = time.perf_counter()
+                if method == "GET":
+                    response = client.get(reverse("stocks:scan"), {"code": code})
+                else:
+                    response = client.post(reverse("stocks:scan"), json.dumps({"code": code}),
+                                           content_type="application/json")
+                latencies.append(time.perf_counter() - start)
+            assert response.status_code in (200, 201)
+            queries += sum('"stocks_' in query["sql"] for query in context.captured_queries)
+        cuts = statistics.quantiles(latencies, n=20)
+        print(f"warm {method} scan: p50 {cuts[9] * 1000:.2f}ms, p95 {cuts[18] * 1000:.2f}ms, "
+              f"{queries / SCANS:.1f} stock table queries per scan")
+        if method == "GET":
+            assert queries == 2 * SCANS
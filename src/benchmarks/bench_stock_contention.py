@@ -0,0 +1,101 @@
+"""
+Multi-process stress test of the stock mutations: concurrent movements, ingestions and picks on a few hot stocks.
+
+Run it explicitly, the benchmark files are not collected by the test suite:
+    BENCH_WORKERS=8 BENCH_OPERATIONS=500 pytest -s benchmarks/bench_stock_contention.py
+"""
+import datetime
+import multiprocessing
+import random
+import time
+
+import pytest
+from django.db import connections
+
+from stocks.models import Product, Stock, StockMovement, Warehouse
+from stocks.services.levels import verify_levels
+from stocks.services.movements import InsufficientStock, ingest_movements, record_movement
+from stocks.services.picking import pick
+from benchmarks.conftest import bench_size
+
+WORKERS = bench_size("BENCH_WORKERS", 4)
+OPERATIONS = bench_size("BENCH_OPERATIONS", 200)
+HOT_STOCKS = 3
+
+
+def run_worker(seed, stock_ids):
+    """
+    Run `OPERATIONS` random operations on the hot stocks, as one worker process.
+
+    Args:
+        seed (int): The seed of the random operations of the worker.
+        stock_ids (list[int]): The hot stocks, all of the same product and warehouse.
+    Returns:
+        tuple[dict[int, int], int]: The net quantity moved by the worker per stock, and its number of operations
+        which succeeded.
+    """
+    generator = random.Random(seed)
+    stocks = {stock.pk: stock for stock in Stock.objects.filter(pk__in=stock_ids)}
+    moved = dict.fromkeys(stock_ids, 0)
+    succeeded = 0
+    for _ in range(OPERATIONS):
+        operation = generator.choice(["record", "ingest", "pick"])
+        try:
+            if operation == "record":
+                # The in-memory stock of the worker goes stale: the update must not rely on it
+                stock = stocks[generator.choice(stock_ids)]
+                movement_type = generator.choice(StockMovement.Types.values)
+                quantity = generator.randint(1, 3)
+                record_movement(stock, movement_type, quantity)
+                moved[stock.pk] += quantity if movement_type == StockMovement.Types.IN else -quantity
+            elif operation == "ingest":
+                rows = [{"stock": generator.choice(stock_ids), "movement_type": generator.choice(["IN", "OUT"]),
+                         "quantity": generator.randint(1, 3)} for _ in range(5)]
+                for row, result in zip(rows, ingest_movements(rows)):
+                    if result["status"] == "created":
+                        moved[row["stock"]] += row["quantity"] if row["movement_type"] == "IN" else -row["quantity"]
+            else:
+                stock = stocks[stock_ids[0]]
+                for movement in pick(stock.product_id, stock.warehouse_id, generator.randint(1, 4)):
+                    moved[movement.stock_id] -= movement.quantity
+            succeeded += 1
+        except InsufficientStock:
+            pass
+    connections.close_all()
+    return moved, succeeded
+
+
+@pytest.mark.django_db(transaction=True)
+def test_no_lost_updates_under_contention(timer):
+    """
+    Run `BENCH_WORKERS` processes moving the same few stocks at the same time.
+
+    Asserts:
+        - The quantity of every stock is its initial quantity plus what the workers moved: no update is lost.
+        - No stock goes below 0, and the quantities and the ledger match the movement history.
+    """
+    product = Product.objects.create(sku="HOT", name="Item", supplier="S", supplier_ref="S", manufacturer="M",
+                                     manufacturer_ref="M")
+    warehouse = Warehouse.objects.create(building="C1", room="1", warehouse_type=Warehouse.Types.KANBAN)
+    stocks = [Stock.objects.create(unit_quantity=1, pack_quantity=20, shelving="A", batch=f"B{index}",
+                                   reception_date=datetime.date.today(), threshold=0, product=product,
+                                   warehouse=warehouse)
+              for index in range(HOT_STOCKS)]
+    stock_ids = [stock.pk for stock in stocks]
+    # The workers are forked: they must open their own connection
+    connections.close_all()
+
+    context = multiprocessing.get_context("fork")
+    with timer(f"{WORKERS} workers x {OPERATIONS} operations") as elapsed:
+        with context.Pool(WORKERS) as pool:
+            results = pool.starmap(run_worker, [(seed, stock_ids) for seed in range(WORKERS)])
+
+    succeeded = sum(count for _, count in results)
+    print(f"{WORKERS * OPERATIONS / elapsed():.0f} operations/s, {succeeded} succeeded")
+    for stock in Stock.objects.filter(pk__in=stock_ids):
+        moved = sum(worker_moved[stock.pk] for worker_moved, _ in results)
+        history = sum(movement.signed_quantity for movement in StockMovement.objects.filter(stock=stock))
+        assert stock.pack_quantity == 20 + moved
+        assert stock.pack_quantity >= 0
+        assert history == stock.pack_quantity - 20
+    assert verify_levels() == []
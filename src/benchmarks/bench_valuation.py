@@ -0,0 +1,66 @@
+"""
+Benchmark of the stock valuation.
+
+Run it explicitly, the benchmark files are not collected by the test suite:
+    BENCH_STOCKS=1000000 pytest -s benchmarks/bench_valuation.py
+The stocks spread over 50 warehouses of 10 buildings and the three product types, a third of them with a cost.
+"""
+import datetime
+from decimal import Decimal
+
+import pytest
+from django.core.cache import cache
+
+from stocks.models import Product, Stock, StockMovement, Warehouse
+from stocks.services.valuation import compute_valuation, get_valuation
+from benchmarks.conftest import bench_size
+
+STOCKS = bench_size("BENCH_STOCKS", 200000)
+PRODUCTS = 1000
+BATCH = 10000
+
+
+@pytest.fixture
+def stocks():
+    """
+    Fixture creating `BENCH_STOCKS` stocks with one movement, so that the valuation cache has a key.
+    """
+    warehouses = [Warehouse.objects.create(building=f"V{index % 10}", room=str(index)) for index in range(50)]
+    types = list(Product.Types)
+    products = Product.objects.bulk_create([
+        Product(sku=f"V{index:06d}", name=f"Product {index}", product_type=types[index % 3],
+                price=Decimal(index % 1000 + 1) / 100, supplier="S", supplier_ref="S", manufacturer="M",
+                manufacturer_ref="M")
+        for index in range(PRODUCTS)
+    ])
+    for offset in range(0, STOCKS, BATCH):
+        Stock.objects.bulk_create([
+            Stock(unit_quantity=1, pack_quantity=index % 20 + 1, shelving="S1", batch=f"B{index}",
+                  reception_date=datetime.date.today(), unit_cost=Decimal(index % 7 + 1) / 10 if index % 3 else None,
+                  product=products[index % PRODUCTS], warehouse=warehouses[index % 50])
+            for index in range(offset, min(offset + BATCH, STOCKS))
+        ])
+    StockMovement.objects.create(stock=Stock.objects.first(), movement_type=StockMovement.Types.IN, quantity=1)
+
+
+@pytest.mark.django_db
+def test_valuation(stocks, timer):
+    """
+    Compare the valuation by iterating the stocks in Python with the grouped query and the cached valuation.
+
+    Asserts:
+        - The three give the same total.
+    """
+    with timer(f"Python iteration over {STOCKS} stocks"):
+        iterated = sum(stock.pack_quantity * stock.product.price
+                       for stock in Stock.objects.select_related("product").iterator(chunk_size=BATCH))
+    for method in ("price", "fifo"):
+        with timer(f"grouped query, {method}"):
+            rows = compute_valuation(method)
+        if method == "price":
+            assert sum(row["value"] for row in rows) == iterated
+    cache.clear()
+    get_valuation()
+    with timer("cached valuation"):
+        cached = get_valuation()
+    assert sum(row["value"] for row in cached) == iterated
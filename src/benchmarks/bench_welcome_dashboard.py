@@ -0,0 +1,71 @@
+"""
+Benchmark of the welcome dashboard, rendered cold then from its cached fragment.
+
+Run it explicitly, the benchmark files are not collected by the test suite:
+    BENCH_WAREHOUSES=200 BENCH_STOCKS=200000 pytest -s benchmarks/bench_welcome_dashboard.py
+An administrator, who sees every warehouse, visits the welcome page of `BENCH_WAREHOUSES` warehouses holding
+`BENCH_STOCKS` stocks in total.
+"""
+import datetime
+import statistics
+import time
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection, reset_queries
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from stocks.models import Product, Stock, Warehouse
+from benchmarks.conftest import bench_size
+
+WAREHOUSES = bench_size("BENCH_WAREHOUSES", 200)
+STOCKS = bench_size("BENCH_STOCKS", 200000)
+VISITS = 50
+BATCH = 10000
+
+
+@pytest.mark.django_db
+def test_welcome_dashboard(client):
+    """
+    Measure the cold and the warm latency of the welcome page.
+
+    Asserts:
+        - A warm visit does not query the stocks nor the alerts, only the indexed lookups of its key.
+    """
+    warehouses = Warehouse.objects.bulk_create([Warehouse(building=f"B{index % 10}", room=str(index),
+                                                          name=f"Warehouse {index}")
+                                                for index in range(WAREHOUSES)])
+    products = Product.objects.bulk_create([
+        Product(sku=f"D{index:07d}", name=f"Product {index}", supplier="S", supplier_ref="S", manufacturer="M",
+                manufacturer_ref="M")
+        for index in range(STOCKS // WAREHOUSES)
+    ], batch_size=BATCH)
+    Stock.objects.bulk_create([
+        Stock(unit_quantity=1, pack_quantity=index % 7, shelving="A", batch="B", threshold=2,
+              reception_date=datetime.date.today(), product=products[index % len(products)],
+              warehouse=warehouses[index % WAREHOUSES])
+        for index in range(STOCKS)
+    ], batch_size=BATCH)
+    admin = get_user_model().objects.create_superuser(username="admin", password="adminpassword")
+    client.force_login(admin)
+    url = reverse("welcome-page")
+
+    for label in ("cold", "warm"):
+        latencies = []
+        stock_queries = 0
+        for _ in range(VISITS):
+            if label == "cold":
+                cache.clear()
+            reset_queries()
+            with CaptureQueriesContext(connection) as context:
+                start = time.perf_counter()
+                response = client.get(url)
+                latencies.append(time.perf_counter() - start)
+            assert response.status_code == 200
+            stock_queries += sum('"stocks_stock"' in query["sql"] or '"stocks_stockalert"' in query["sql"]
+                                 for query in context.captured_queries)
+        print(f"\n{label} welcome page: median {statistics.median(latencies) * 1000:.2f}ms, "
+              f"{stock_queries / VISITS:.1f} stock table queries per visit")
+    assert stock_queries == 0
@@ -0,0 +1,80 @@
+import os
+import time
+from contextlib import contextmanager
+
+import pytest
+
+
+def bench_size(name, default):
+    """
+    Read the size of a benchmark dataset from the environment.
+
+    Args:
+        name (str): Name of the environment variable, e.g. `BENCH_ROWS`.
+        default (int): Size used when the variable is not set.
+    Returns:
+        int: The dataset size.
+    """
+    return int(os.environ.get(name, default))
+
+
+@pytest.fixture
+def timer():
+    """
+    Fixture returning a context manager that measures the wall time of a block.
+
+    Usage:
+        with timer("label") as elapsed:
+            ...
+        elapsed()  # seconds spent in the block
+
+    Returns:
+        Callable: The context manager factory, printing the measured time when the block exits.
+    """
+    @contextmanager
+    def measure(label):
+        result = {}
+        start = time.perf_counter()
+        yield lambda: result["elapsed"]
+        result["elapsed"] = time.perf_counter() - start
+        print(f"\n{label}: {result['elapsed']:.3f}s")
+
+    return measure
+
+
+@pytest.fixture(scope="session")
+def django_db_modify_db_settings(django_db_modify_db_settings_parallel_suffix, tmp_path_factory):
+    """
+    Fixture putting the benchmark database in a file, so that several processes can share it as in production.
+
+    The transactions take the write lock when they begin: SQLite would otherwise fail a transaction which reads
+    before writing while another one writes, instead of making it wait.
+    """
+    from django.conf import settings
+
+    database = settings.DATABASES["default"]
+    database.setdefault("TEST", {})["NAME"] = str(tmp_path_factory.mktemp("benchmarks") / "db.sqlite3")
+    database.setdefault("OPTIONS", {}).update({"transaction_mode": "IMMEDIATE", "timeout": 30})
+
+
+@pytest.fixture(scope="session")
+def seeded_inventory(django_db_setup, django_db_blocker):
+    """
+    Fixture seeding the benchmark database once per session with a synthetic inventory, see `seed_inventory`.
+
+    The inventory holds `BENCH_PRODUCTS` products, `BENCH_WAREHOUSES` warehouses, `BENCH_STOCKS` stocks and
+    `BENCH_MOVEMENTS` movements. It is seeded out of the transactions of the tests, which roll their own changes
+    back; a transactional test empties the database, so it must not run between the benchmarks using it.
+
+    Returns:
+        dict[str, int]: The number of generated products, warehouses, stocks and movements.
+    """
+    from stocks.services.seeding import seed_inventory
+
+    movements = bench_size("BENCH_MOVEMENTS", 500000)
+    with django_db_blocker.unblock():
+        start = time.perf_counter()
+        dataset = seed_inventory(bench_size("BENCH_PRODUCTS", 5000), bench_size("BENCH_WAREHOUSES", 51),
+                                 bench_size("BENCH_STOCKS", 50000), movements)
+        print(f"\nseed {movements} movements: {time.perf_counter() - start:.3f}s")
+    return dataset
@@ -0,0 +1,44 @@
+import pytest
+
+
+def pytest_configure(config):
+    config.addinivalue_line(
+        "markers",
+        "query_budget(max_queries): fail the test if its body executes more than `max_queries` database queries",
+    )
+
+
+@pytest.fixture(autouse=True)
+def clear_caches():
+    """
+    Empty the caches before each test, the ids of the rows they reference being reused from one test to another.
+    """
+    from django.core.cache import caches
+
+    for cache in caches.all():
+        cache.clear()
+
+
+@pytest.hookimpl(wrapper=True)
+def pytest_runtest_call(item):
+    """
+    Count the database queries executed by the body of the tests marked with `query_budget`.
+
+    Only the test function itself is measured: the queries of its fixtures, e.g. creating test data or
+    logging a user in, are not part of the budget.
+    """
+    marker = item.get_closest_marker("query_budget")
+    if marker is None:
+        return (yield)
+
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    with CaptureQueriesContext(connection) as context:
+        result = yield
+    executed = len(context.captured_queries)
+    if executed > marker.args[0]:
+        queries = "\n".join(query["sql"] for query in context.captured_queries)
+        pytest.fail(f"Query budget exceeded: {executed} queries executed, {marker.args[0]} allowed.\n{queries}",
+                    pytrace=False)
+    return result
@@ -1,8 +1,76 @@
-from django.contrib import admin
+from django.contrib import admin, messages
+from django.shortcuts import redirect
+from django.template.response import TemplateResponse
+from django.urls import path, reverse
+
+from stocks.forms import ImportFileForm
+from stocks.models import Warehouse, Product, Stock, StockMovement, StockLevel, StockAlert, StockCheckpoint, \
+    StockOpeningBalance, MovementArchive, Job, ConsumptionForecast
+from stocks.services.importers import IMPORTERS, guess_format, read_rows
+from stocks.services.movements import StockConflict
+
+
+class ImportFileAdminMixin:
+    """
+    Add an "Import" page to a model admin, streaming the uploaded file through the importer of the model.
+    """
+    change_list_template = "admin/stocks/change_list_import.html"
+
+    def get_urls(self):
+        info = self.opts.app_label, self.opts.model_name
+        return [
+            path("import/", self.admin_site.admin_view(self.import_view), name="%s_%s_import" % info),
+        ] + super().get_urls()
+
+    def import_view(self, request):
+        """
+        Display the upload form, then import the uploaded file and report the result as admin messages.
+        """
+        if not self.has_add_permission(request) or not self.has_change_permission(request):
+            return redirect("admin:index")
+
+        form = ImportFileForm(request.POST or None, request.FILES or None)
+        if request.method == "POST" and form.is_valid():
+            upload = form.cleaned_data["file"]
+            try:
+                report = IMPORTERS[self.opts.model_name](read_rows(upload, guess_format(upload.name)))
+            except ValueError as exc:
+                form.add_error("file", str(exc))
+            except StockConflict as exc:
+                form.add_error("file", f"The stocks were moved during the import ({exc}), the previous batches "
+                                       f"were imported: upload the file again.")
+            else:
+                self.message_user(request, f"Import done: {report.created} created, {report.updated} updated, "
+                                           f"{report.failed} rejected.")
+                for error in report.errors:
+                    self.message_user(request, error, level=messages.WARNING)
+                return redirect(reverse("admin:%s_%s_changelist" % (self.opts.app_label, self.opts.model_name)))
+
+        context = {
+            **self.admin_site.each_context(request),
+            "opts": self.opts,
+            "title": f"Import {self.opts.verbose_name_plural}",
+            "form": form,
+        }
+        return TemplateResponse(request, "admin/stocks/import_file.html", context)
+
+
+@admin.register(Product)
+class ProductAdmin(ImportFileAdminMixin, admin.ModelAdmin):
+    pass
+
+
+@admin.register(Stock)
+class StockAdmin(ImportFileAdminMixin, admin.ModelAdmin):
+    pass
 
-from stocks.models import Warehouse, Product, Stock, StockMovement
 
 admin.site.register(Warehouse)
-admin.site.register(Product)
-admin.site.register(Stock)
 admin.site.register(StockMovement)
+admin.site.register(StockLevel)
+admin.site.register(StockAlert)
+admin.site.register(StockCheckpoint)
+admin.site.register(StockOpeningBalance)
+admin.site.register(MovementArchive)
+admin.site.register(Job)
+admin.site.register(ConsumptionForecast)
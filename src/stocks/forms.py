@@ -0,0 +1,27 @@
+from django import forms
+
+from stocks.models import StockMovement
+
+
+class StockMovementRowForm(forms.Form):
+    """
+    Validate one row of a stock movement batch before it is recorded.
+    """
+    # Identifier of the moved stock
+    stock = forms.IntegerField(min_value=1)
+    # Direction of the movement
+    movement_type = forms.ChoiceField(choices=StockMovement.Types.choices)
+    # Number of packaging units moved
+    quantity = forms.IntegerField(min_value=1)
+    # Optional reason of the movement
+    reason = forms.CharField(max_length=250, required=False)
+    # Optional idempotency key: a movement sent again with the same key is not recorded twice
+    key = forms.CharField(max_length=64, required=False)
+
+
+class ImportFileForm(forms.Form):
+    """
+    Upload a CSV or XLSX file to import from the admin.
+    """
+    # The file to import
+    file = forms.FileField(help_text="CSV or XLSX file, with a header line naming the columns.")
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from stocks.services.archiving import archive_cutoff, archive_movements
+
+
+class Command(BaseCommand):
+    help = ("Move the old stock movements to compressed monthly files, folding them into the opening balance "
+            "of each stock, to keep the stock movement table small.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--days", type=int,
+                            help="Archive the movements older than this number of days, "
+                                 "the STOCK_ARCHIVE_AFTER_DAYS setting by default.")
+        parser.add_argument("--directory", help="Archive directory, the STOCK_ARCHIVE_DIR setting by default.")
+
+    def handle(self, *args, **options):
+        cutoff = archive_cutoff(options["days"])
+        count = archive_movements(cutoff, options["directory"])
+        self.stdout.write(self.style.SUCCESS(f"{count} movements recorded before {cutoff:%Y-%m-%d} archived."))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from stocks.services.alerts import evaluate_alerts
+
+
+class Command(BaseCommand):
+    help = "Evaluate the low stock and missing critical product alerts over the whole inventory."
+
+    def handle(self, *args, **options):
+        raised, resolved = evaluate_alerts()
+        self.stdout.write(self.style.SUCCESS(f"{raised} alerts raised, {resolved} alerts resolved."))
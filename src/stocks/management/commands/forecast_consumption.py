@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from stocks.services.forecasting import HISTORY_DAYS, update_forecasts
+
+
+class Command(BaseCommand):
+    help = ("Forecast the daily consumption of every product in every warehouse from the OUT movements, and set "
+            "the threshold of their stocks to the suggested reorder point. Only the series with new movements "
+            "since the previous run are recomputed, unless --full is given.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--full", action="store_true", help="Recompute every series, not only the changed ones.")
+        parser.add_argument("--days", type=int, default=HISTORY_DAYS,
+                            help="Number of days of movements making up the consumption series.")
+        parser.add_argument("--no-thresholds", action="store_true",
+                            help="Only save the forecasts, without changing the thresholds of the stocks.")
+
+    def handle(self, *args, **options):
+        count = update_forecasts(full=options["full"], apply=not options["no_thresholds"], days=options["days"])
+        self.stdout.write(self.style.SUCCESS(f"{count} consumption series forecast."))
@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from stocks.services.importers import IMPORTERS, guess_format, read_rows
+from stocks.services.movements import StockConflict
+
+
+class Command(BaseCommand):
+    help = "Import products or stocks from a CSV or XLSX file, streaming it batch by batch."
+
+    def add_arguments(self, parser):
+        parser.add_argument("model", choices=sorted(IMPORTERS), help="The kind of rows held by the file.")
+        parser.add_argument("path", help="Path of the CSV or XLSX file to import.")
+        parser.add_argument("--format", choices=["csv", "xlsx"],
+                            help="Format of the file, guessed from its extension by default.")
+        parser.add_argument("--batch-size", type=int, default=1000,
+                            help="Number of rows upserted per transaction.")
+
+    def handle(self, *args, **options):
+        try:
+            file_format = options["format"] or guess_format(options["path"])
+        except ValueError as exc:
+            raise CommandError(exc)
+
+        def progress(report):
+            self.stdout.write(f"{report.rows} rows read: {report.created} created, "
+                              f"{report.updated} updated, {report.failed} rejected")
+
+        try:
+            with open(options["path"], "rb") as file:
+                report = IMPORTERS[options["model"]](read_rows(file, file_format),
+                                                     batch_size=options["batch_size"],
+                                                     progress=progress)
+        except (OSError, StockConflict) as exc:
+            raise CommandError(exc)
+
+        for error in report.errors:
+            self.stderr.write(error)
+        self.stdout.write(self.style.SUCCESS(f"Import done: {report.created} created, {report.updated} updated, "
+                                             f"{report.failed} rejected."))
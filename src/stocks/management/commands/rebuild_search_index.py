@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from stocks.services.search import fts_enabled, rebuild_index
+
+
+class Command(BaseCommand):
+    help = ("Index every product again for the catalogue search, e.g. after products were loaded from fixtures "
+            "or after migrating a database without SQLite FTS5.")
+
+    def handle(self, *args, **options):
+        count = rebuild_index()
+        index = "FTS5 index" if fts_enabled() else "trigram table"
+        self.stdout.write(self.style.SUCCESS(f"{count} products indexed in the {index}."))
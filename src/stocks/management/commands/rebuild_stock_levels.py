@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from stocks.services.levels import rebuild_levels, verify_levels
+
+
+class Command(BaseCommand):
+    help = "Rebuild the stock level ledger from the stock movement history, or verify it against a full replay."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--verify", action="store_true",
+                            help="Only compare the ledger with a full replay, without writing anything.")
+        parser.add_argument("--batch-size", type=int, default=1000,
+                            help="Number of stock levels inserted per query.")
+
+    def handle(self, *args, **options):
+        if not options["verify"]:
+            count = rebuild_levels(batch_size=options["batch_size"])
+            self.stdout.write(self.style.SUCCESS(f"{count} stock levels rebuilt."))
+            return
+
+        mismatches = verify_levels()
+        for product_id, warehouse_id, stored, replayed in mismatches:
+            self.stderr.write(f"product {product_id} / warehouse {warehouse_id}: "
+                              f"ledger={stored} replay={replayed}")
+        if mismatches:
+            raise CommandError(f"{len(mismatches)} stock levels differ from the movement history.")
+        self.stdout.write(self.style.SUCCESS("Stock level ledger matches the movement history."))
@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand
+
+from stocks.models import Warehouse
+from stocks.services.replenishment import CONSUMPTION_DAYS, COVER_DAYS, plan_replenishment, replenish
+
+
+class Command(BaseCommand):
+    help = ("Replenish the kanbans of each building from the store of the building, then from the main store, "
+            "based on their thresholds and recent consumption.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--building", action="append",
+                            help="Only replenish the kanbans of this building, may be repeated.")
+        parser.add_argument("--days", type=int, default=CONSUMPTION_DAYS,
+                            help="Number of days of consumption averaged into the daily consumption.")
+        parser.add_argument("--cover-days", type=int, default=COVER_DAYS,
+                            help="Number of days of consumption covered by a replenishment.")
+        parser.add_argument("--dry-run", action="store_true", help="Only print the planned transfers.")
+
+    def handle(self, *args, **options):
+        buildings = options["building"] or sorted(set(
+            Warehouse.objects.filter(warehouse_type=Warehouse.Types.KANBAN).values_list("building", flat=True)))
+        for building in buildings:
+            if options["dry_run"]:
+                transfers, needs = plan_replenishment(building, options["days"], options["cover_days"])
+                for transfer in transfers:
+                    self.stdout.write(f"{transfer.quantity} x stock {transfer.source.pk} "
+                                      f"(product {transfer.source.product_id}) -> kanban {transfer.kanban_id}")
+                served = sum(transfer.quantity for transfer in transfers)
+                self.stdout.write(self.style.SUCCESS(
+                    f"{building}: {len(transfers)} transfers planned, {served} of "
+                    f"{sum(need.quantity for need in needs)} missing packages served."))
+            else:
+                movements = replenish(building, options["days"], options["cover_days"])
+                self.stdout.write(self.style.SUCCESS(f"{building}: {len(movements) // 2} transfers recorded."))
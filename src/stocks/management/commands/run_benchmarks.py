@@ -0,0 +1,91 @@
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import setup_databases, setup_test_environment, teardown_databases, teardown_test_environment
+
+from stocks.services.benchmarking import (BENCHMARK_RESULTS_DIR, REGRESSION_TOLERANCE, SCENARIOS, build_report,
+                                          compare_reports, latest_report, read_report, run_scenarios,
+                                          save_report)
+from stocks.services.seeding import seed_inventory
+
+
+class Command(BaseCommand):
+    help = ("Seed a synthetic inventory in a throwaway test database, measure the latency and throughput of the "
+            "core flows, and store the results as JSON, compared with the previous run to show the regressions.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--products", type=int, default=1000, help="Number of generated products.")
+        parser.add_argument("--warehouses", type=int, default=25, help="Number of generated warehouses.")
+        parser.add_argument("--stocks", type=int, default=10000, help="Number of generated stocks.")
+        parser.add_argument("--movements", type=int, default=100000, help="Number of generated movements.")
+        parser.add_argument("--seed", type=int, default=0, help="Seed of the data and of the scenarios.")
+        parser.add_argument("--scenario", choices=list(SCENARIOS), action="append",
+                            help="Only run this scenario, may be repeated.")
+        parser.add_argument("--iterations", type=int, default=20, help="Measured runs of each scenario.")
+        parser.add_argument("--warmup", type=int, default=2, help="Unmeasured runs of each scenario.")
+        parser.add_argument("--output", type=Path,
+                            help=f"File of the results, a new file in {BENCHMARK_RESULTS_DIR} by default.")
+        parser.add_argument("--compare", type=Path,
+                            help="Results to compare with, the latest ones of the results directory by default.")
+        parser.add_argument("--max-regression", type=float,
+                            help="Fail if a median latency grows by more than this percentage, "
+                                 f"{REGRESSION_TOLERANCE:.0%} being reported by default.")
+        parser.add_argument("--in-place", action="store_true",
+                            help="Seed and benchmark the configured database instead of a test database, "
+                                 "e.g. a staging copy.")
+
+    def handle(self, *args, **options):
+        if options["compare"] is None:
+            previous = latest_report()
+        elif options["compare"].is_file():
+            previous = read_report(options["compare"])
+        else:
+            raise CommandError(f"No results to compare with: {options['compare']}")
+
+        verbosity = options["verbosity"]
+        try:
+            # Lets the test client in whatever the ALLOWED_HOSTS
+            setup_test_environment()
+            environment = True
+        except RuntimeError:
+            # Already set up, e.g. by the tests
+            environment = False
+        databases = None if options["in_place"] else setup_databases(verbosity, interactive=False)
+        try:
+            dataset = seed_inventory(options["products"], options["warehouses"], options["stocks"],
+                                     options["movements"], seed=options["seed"])
+            self.stdout.write(f"Seeded {', '.join(f'{count} {name}' for name, count in dataset.items())}.")
+            results = run_scenarios(options["scenario"], options["iterations"], options["warmup"],
+                                    seed=options["seed"])
+        except (ValueError, RuntimeError) as exc:
+            raise CommandError(str(exc))
+        finally:
+            if databases is not None:
+                teardown_databases(databases, verbosity)
+            if environment:
+                teardown_test_environment()
+
+        report = build_report(results, dataset, options["seed"])
+        for name, result in results.items():
+            self.stdout.write(f"{name:<18} median {result['median_ms']:9.2f}ms  p95 {result['p95_ms']:9.2f}ms  "
+                              f"{result['throughput_per_s']:8.1f}/s  {result['queries']:5.0f} queries")
+        path = save_report(report, options["output"])
+        self.stdout.write(self.style.SUCCESS(f"Results written to {path}."))
+        if previous is not None:
+            self._compare(previous, report, options["max_regression"])
+
+    def _compare(self, previous, report, max_regression):
+        """
+        Print the changes of the median latencies since the previous results, failing past `max_regression`.
+        """
+        tolerance = REGRESSION_TOLERANCE if max_regression is None else max_regression / 100
+        if previous["dataset"] != report["dataset"]:
+            self.stdout.write(self.style.WARNING("The previous results were measured on another dataset."))
+        rows = compare_reports(previous, report, tolerance)
+        self.stdout.write(f"Compared with {previous['commit'] or 'an unknown commit'} of {previous['created_at']}:")
+        for row in rows:
+            line = f"{row['scenario']:<18} {row['before']:9.2f}ms -> {row['after']:9.2f}ms  {row['change']:+7.1%}"
+            self.stdout.write(self.style.ERROR(line) if row["regression"] else line)
+        regressions = [row["scenario"] for row in rows if row["regression"]]
+        if regressions and max_regression is not None:
+            raise CommandError(f"Regression over {max_regression}%: {', '.join(regressions)}.")
@@ -0,0 +1,110 @@
+import multiprocessing
+import signal
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from stocks.services.jobs import CLAIM_BATCH_SIZE, work
+
+
+def drain(batch_size, poll_interval, once, stop):
+    """
+    Run the queued jobs batch by batch, waiting for new jobs when the queue is empty.
+
+    Each batch first gives back the jobs of the workers which stopped, see `work`.
+
+    Args:
+        batch_size (int): The number of jobs claimed at once.
+        poll_interval (float): Seconds to wait before polling an empty queue again.
+        once (bool): Return as soon as the queue is empty instead of waiting for new jobs.
+        stop (Event): Set to stop after the current batch.
+    Returns:
+        int: The number of jobs run.
+    """
+    count = 0
+    while not stop.is_set():
+        run = work(batch_size)
+        count += run
+        if not run:
+            if once:
+                break
+            stop.wait(poll_interval)
+    return count
+
+
+def drain_thread(*args):
+    """
+    Run `drain` in a thread of the pool, closing the connection of the thread afterwards.
+    """
+    try:
+        return drain(*args)
+    finally:
+        connections.close_all()
+
+
+def drain_process(total, *args):
+    """
+    Run `drain` in a child process, adding its number of jobs run to a shared counter.
+    """
+    # Interruptions are handled by the parent, which lets the children finish their batch
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    try:
+        count = drain(*args)
+    finally:
+        connections.close_all()
+    with total.get_lock():
+        total.value += count
+
+
+class Command(BaseCommand):
+    help = "Run the jobs of the database job queue, e.g. the queued stock movements, with a pool of workers."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--concurrency", type=int, default=1, help="Number of workers.")
+        parser.add_argument("--pool", choices=["thread", "process"], default="thread",
+                            help="Run the workers as threads of this process or as child processes.")
+        parser.add_argument("--batch-size", type=int, default=CLAIM_BATCH_SIZE,
+                            help="Number of jobs claimed by a worker at once.")
+        parser.add_argument("--poll-interval", type=float, default=1.0,
+                            help="Seconds to wait before polling an empty queue again.")
+        parser.add_argument("--once", action="store_true", help="Stop when the queue is empty.")
+
+    def handle(self, *args, **options):
+        arguments = (options["batch_size"], options["poll_interval"], options["once"])
+        concurrency = options["concurrency"]
+
+        start = time.perf_counter()
+        if concurrency == 1:
+            count = drain(*arguments, threading.Event())
+        elif options["pool"] == "process":
+            # The children open their own connection instead of sharing the one of the parent
+            connections.close_all()
+            context = multiprocessing.get_context("fork")
+            stop = context.Event()
+            total = context.Value("i", 0)
+            processes = [context.Process(target=drain_process, args=(total, *arguments, stop))
+                         for _ in range(concurrency)]
+            for process in processes:
+                process.start()
+            try:
+                for process in processes:
+                    process.join()
+            except KeyboardInterrupt:
+                stop.set()
+                for process in processes:
+                    process.join()
+            count = total.value
+        else:
+            stop = threading.Event()
+            with ThreadPoolExecutor(concurrency) as executor:
+                futures = [executor.submit(drain_thread, *arguments, stop) for _ in range(concurrency)]
+                try:
+                    while not all(future.done() for future in futures):
+                        time.sleep(0.1)
+                except KeyboardInterrupt:
+                    stop.set()
+                count = sum(future.result() for future in futures)
+        self.stdout.write(self.style.SUCCESS(f"{count} jobs run in {time.perf_counter() - start:.1f}s."))
@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from stocks.services.seeding import SEED_BATCH_SIZE, seed_inventory
+
+
+class Command(BaseCommand):
+    help = ("Generate a deterministic synthetic inventory in the configured database: a catalogue, a warehouse "
+            "hierarchy, stocks with their batches and expiration dates, and their movement history.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--products", type=int, default=1000, help="Number of generated products.")
+        parser.add_argument("--warehouses", type=int, default=25, help="Number of generated warehouses.")
+        parser.add_argument("--stocks", type=int, default=10000, help="Number of generated stocks.")
+        parser.add_argument("--movements", type=int, default=100000, help="Number of generated movements.")
+        parser.add_argument("--seed", type=int, default=0, help="Seed of the generated data.")
+        parser.add_argument("--batch-size", type=int, default=SEED_BATCH_SIZE,
+                            help="Number of rows inserted per transaction.")
+
+    def handle(self, *args, **options):
+        movements = options["movements"]
+
+        def progress(inserted):
+            self.stdout.write(f"{inserted}/{movements} movements inserted")
+
+        try:
+            dataset = seed_inventory(options["products"], options["warehouses"], options["stocks"], movements,
+                                     seed=options["seed"], batch_size=options["batch_size"],
+                                     progress=progress if options["verbosity"] > 1 else None)
+        except ValueError as exc:
+            raise CommandError(exc)
+        self.stdout.write(self.style.SUCCESS(
+            f"Seeded {', '.join(f'{count} {name}' for name, count in dataset.items())}."))
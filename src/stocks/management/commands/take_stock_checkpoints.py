@@ -0,0 +1,47 @@
+import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from stocks.models import Warehouse
+from stocks.services.snapshots import CHECKPOINT_INTERVALS, take_checkpoint
+
+
+class Command(BaseCommand):
+    help = ("Save a checkpoint of the stock quantities of every warehouse, to be run daily or weekly. "
+            "With --since, the missing checkpoints since that date are also taken, one per interval.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--every", choices=sorted(CHECKPOINT_INTERVALS), default="day",
+                            help="Interval between two checkpoints, aligned on midnight.")
+        parser.add_argument("--since", help="Date of the first checkpoint to backfill, e.g. 2025-01-01.")
+        parser.add_argument("--warehouse", type=int, action="append",
+                            help="Only checkpoint this warehouse, may be repeated.")
+
+    def handle(self, *args, **options):
+        interval = CHECKPOINT_INTERVALS[options["every"]]
+        # Checkpoints are aligned on midnight, the last one being the latest midnight elapsed
+        last = timezone.localtime().replace(hour=0, minute=0, second=0, microsecond=0)
+        if options["every"] == "week":
+            last -= datetime.timedelta(days=last.weekday())
+        first = last
+        if options["since"]:
+            since = parse_date(options["since"])
+            if since is None:
+                raise CommandError(f"Invalid date: {options['since']}")
+            first = timezone.make_aware(datetime.datetime.combine(since, datetime.time()))
+
+        warehouses = Warehouse.objects.all()
+        if options["warehouse"]:
+            warehouses = warehouses.filter(pk__in=options["warehouse"])
+        warehouse_ids = list(warehouses.values_list("pk", flat=True))
+
+        taken = 0
+        at = first
+        while at <= last:
+            # Each checkpoint is built from the previous one, so they are taken in chronological order
+            for warehouse_id in warehouse_ids:
+                taken += take_checkpoint(warehouse_id, at) is not None
+            at += interval
+        self.stdout.write(self.style.SUCCESS(f"{taken} checkpoints taken."))
@@ -0,0 +1,97 @@
+import logging
+import time
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from stocks.services.metrics import REGISTRY, UNRESOLVED_VIEW, QueryRecorder
+
+logger = logging.getLogger(__name__)
+
+
+# Recorder of the queries of the current async request, see `_record_query`
+_RECORDER = ContextVar("query_recorder", default=None)
+
+
+def _record_query(execute, sql, params, many, context):
+    """
+    Database execute wrapper passing the queries to the recorder of the async request executing them, if any.
+    """
+    recorder = _RECORDER.get()
+    if recorder is None:
+        return execute(sql, params, many, context)
+    return recorder(execute, sql, params, many, context)
+
+
+def _install():
+    """
+    Wrap the queries of the connection of the current thread with `_record_query`, once.
+    """
+    wrappers = connections[DEFAULT_DB_ALIAS].execute_wrappers
+    if _record_query not in wrappers:
+        wrappers.append(_record_query)
+
+
+class RequestMetricsMiddleware:
+    """
+    Record the latency, the SQL queries and the SQL time of each request, per view, see `REGISTRY`.
+
+    The queries are counted by an execute wrapper of the connection, see `connection.execute_wrapper`, which also
+    works with DEBUG off. A request repeating a SQL template N_PLUS_ONE_THRESHOLD times or more is logged as a
+    warning and counted as an N+1 pattern. The aggregates are served to Prometheus by the `metrics_view`. Placed
+    first, so that the latency includes the other middlewares; the rows a streaming response reads once returned
+    are not counted.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        recorder = QueryRecorder(time.perf_counter)
+        # The connection of the thread is looked up once: each access to the `connection` proxy costs a lookup,
+        # which the context manager of `execute_wrapper` repeats
+        wrappers = connections[DEFAULT_DB_ALIAS].execute_wrappers
+        start = time.perf_counter()
+        wrappers.append(recorder)
+        try:
+            response = self.get_response(request)
+        finally:
+            wrappers.pop()
+        self.record(request, response, recorder, time.perf_counter() - start)
+        return response
+
+    async def __acall__(self, request):
+        recorder = QueryRecorder(time.perf_counter)
+        # The connections belong to threads, which the async requests may share, e.g. the long-poll requests: the
+        # wrapper of the thread running the request's queries finds its recorder in the context, which
+        # `sync_to_async` and the async ORM carry into the thread
+        token = _RECORDER.set(recorder)
+        await sync_to_async(_install)()
+        start = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _RECORDER.reset(token)
+        self.record(request, response, recorder, time.perf_counter() - start)
+        return response
+
+    @staticmethod
+    def record(request, response, recorder, duration):
+        """
+        Record a served request in the REGISTRY, logging its N+1 pattern if any.
+        """
+        match = request.resolver_match
+        view = match.view_name if match is not None else UNRESOLVED_VIEW
+        repeated = recorder.repeated()
+        if repeated:
+            sql, count = repeated[0]
+            logger.warning("Possible N+1 queries in %s %s (%s): %s executions of %s", request.method,
+                           request.path, view, count, sql)
+        REGISTRY.record(view, response.status_code, duration, recorder.count, recorder.time, bool(repeated))
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.4 on 2026-10-18 17:33
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stocks', '0004_remove_warehouse_location_warehouse_building_and_more'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='warehouse',
+            name='name',
+            field=models.CharField(default='*', max_length=50, verbose_name='name'),
+        ),
+        migrations.AlterField(
+            model_name='warehouse',
+            name='room',
+            field=models.CharField(default='*', max_length=10, verbose_name='room'),
+        ),
+        migrations.CreateModel(
+            name='StockLevel',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quantity', models.BigIntegerField(default=0, verbose_name='current quantity')),
+                ('last_movement_id', models.BigIntegerField(default=0, verbose_name='last movement id')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='levels', to='stocks.product', verbose_name='product')),
+                ('warehouse', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='levels', to='stocks.warehouse', verbose_name='warehouse')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('product', 'warehouse'), name='unique_stock_level')],
+            },
+        ),
+    ]
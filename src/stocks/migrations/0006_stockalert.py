@@ -0,0 +1,31 @@
+# Generated by Django 5.2.4 on 2026-10-18 17:38
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stocks', '0005_stocklevel'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StockAlert',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('LOW', 'Low stock'), ('CRIT', 'Critical product missing')], max_length=4, verbose_name='kind')),
+                ('quantity', models.IntegerField(verbose_name='quantity')),
+                ('threshold', models.IntegerField(default=0, verbose_name='threshold')),
+                ('raised_at', models.DateTimeField(auto_now_add=True, verbose_name='raised at')),
+                ('resolved_at', models.DateTimeField(blank=True, null=True, verbose_name='resolved at')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='alerts', to='stocks.product', verbose_name='product')),
+                ('stock', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='alerts', to='stocks.stock', verbose_name='stock')),
+                ('warehouse', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='alerts', to='stocks.warehouse', verbose_name='warehouse')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(condition=models.Q(('kind', 'LOW'), ('resolved_at__isnull', True)), fields=('stock',), name='unique_open_low_stock_alert'), models.UniqueConstraint(condition=models.Q(('kind', 'CRIT'), ('resolved_at__isnull', True)), fields=('product', 'warehouse'), name='unique_open_critical_alert')],
+            },
+        ),
+    ]
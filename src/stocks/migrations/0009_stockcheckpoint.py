@@ -0,0 +1,40 @@
+# Generated by Django 5.2.4 on 2026-10-18 17:50
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stocks', '0008_movement_timestamp_id_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StockCheckpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('taken_at', models.DateTimeField(verbose_name='taken at')),
+                ('warehouse', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='checkpoints', to='stocks.warehouse', verbose_name='warehouse')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='StockCheckpointLine',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quantity', models.BigIntegerField(verbose_name='quantity')),
+                ('checkpoint', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='lines', to='stocks.stockcheckpoint', verbose_name='checkpoint')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='checkpoint_lines', to='stocks.product', verbose_name='product')),
+                ('stock', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='checkpoint_lines', to='stocks.stock', verbose_name='stock')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='stockcheckpoint',
+            constraint=models.UniqueConstraint(fields=('warehouse', 'taken_at'), name='unique_stock_checkpoint'),
+        ),
+        migrations.AddConstraint(
+            model_name='stockcheckpointline',
+            constraint=models.UniqueConstraint(fields=('checkpoint', 'stock'), name='unique_stock_checkpoint_line'),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.4 on 2026-10-18 17:53
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stocks', '0009_stockcheckpoint'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MovementArchive',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField(verbose_name='month')),
+                ('path', models.CharField(max_length=255, unique=True, verbose_name='path')),
+                ('cutoff', models.DateTimeField(verbose_name='cutoff')),
+                ('movements', models.PositiveIntegerField(verbose_name='movements')),
+                ('archived_at', models.DateTimeField(auto_now_add=True, verbose_name='archived at')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['month'], name='movement_archive_month_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='StockOpeningBalance',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quantity', models.BigIntegerField(default=0, verbose_name='quantity')),
+                ('as_of', models.DateTimeField(verbose_name='as of')),
+                ('last_movement_id', models.BigIntegerField(default=0, verbose_name='last movement')),
+                ('stock', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='opening_balance', to='stocks.stock', verbose_name='stock')),
+            ],
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.4 on 2026-10-18 18:19
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stocks', '0012_job_queue'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ConsumptionForecast',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('moving_average', models.FloatField(default=0, verbose_name='moving average')),
+                ('smoothed', models.FloatField(default=0, verbose_name='exponential smoothing')),
+                ('deviation', models.FloatField(default=0, verbose_name='standard deviation')),
+                ('reorder_point', models.IntegerField(default=0, verbose_name='reorder point')),
+                ('last_movement_id', models.BigIntegerField(default=0, verbose_name='last movement id')),
+                ('computed_at', models.DateTimeField(auto_now=True, verbose_name='computed at')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='forecasts', to='stocks.product', verbose_name='product')),
+                ('warehouse', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='forecasts', to='stocks.warehouse', verbose_name='warehouse')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('product', 'warehouse'), name='unique_consumption_forecast')],
+            },
+        ),
+    ]
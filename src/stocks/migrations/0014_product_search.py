@@ -0,0 +1,51 @@
+# Generated by Django 5.2.4 on 2026-10-18 18:24
+
+import django.db.models.deletion
+from django.db import OperationalError, migrations, models
+
+# Table of the SQLite FTS5 index, see stocks.services.search
+FTS_TABLE = "stocks_product_fts"
+
+
+def create_fts_index(apps, schema_editor):
+    """
+    Create and fill the FTS5 index of the products on SQLite builds shipping FTS5 with its trigram tokenizer.
+
+    The other databases use the ProductTrigram table, filled by the `rebuild_search_index` command.
+    """
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    try:
+        schema_editor.execute(f"CREATE VIRTUAL TABLE {FTS_TABLE} "
+                              f"USING fts5(sku, name, supplier_ref, manufacturer_ref, tokenize='trigram')")
+    except OperationalError:
+        return
+    schema_editor.execute(f"INSERT INTO {FTS_TABLE} (rowid, sku, name, supplier_ref, manufacturer_ref) "
+                          f"SELECT id, sku, name, supplier_ref, manufacturer_ref FROM stocks_product")
+
+
+def drop_fts_index(apps, schema_editor):
+    if schema_editor.connection.vendor == "sqlite":
+        schema_editor.execute(f"DROP TABLE IF EXISTS {FTS_TABLE}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stocks', '0013_consumption_forecast'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductTrigram',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('trigram', models.CharField(max_length=3, verbose_name='trigram')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='trigrams', to='stocks.product', verbose_name='product')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('trigram', 'product'), name='unique_product_trigram')],
+            },
+        ),
+        migrations.RunPython(create_fts_index, drop_fts_index),
+    ]
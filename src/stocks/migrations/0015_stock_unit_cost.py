@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-18 18:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stocks', '0014_product_search'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='stock',
+            name='unit_cost',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True, verbose_name='unit cost'),
+        ),
+    ]
@@ -1,3 +1,4 @@
+from django.conf import settings
 from django.db import models
 
 
@@ -30,6 +31,12 @@ class Product(models.Model):
     # If the product is critical, there must always be at least one in stock in the building store
     critical = models.BooleanField(default=False, verbose_name="is critical product ?")
 
+    class Meta:
+        indexes = [
+            # Only the few critical products are indexed, for the critical stock alerts
+            models.Index(fields=["critical"], condition=models.Q(critical=True), name="product_critical_idx"),
+        ]
+
     def __str__(self):
         return f"{self.name} - {self.sku}"
 
@@ -60,6 +67,12 @@ class Warehouse(models.Model):
     #                                   related_name="products",
     #                                   verbose_name="products in the store")
 
+    class Meta:
+        indexes = [
+            # Warehouses of a given type in a building, e.g. the store of a building
+            models.Index(fields=["building", "warehouse_type"], name="warehouse_building_type_idx"),
+        ]
+
     def save(self, *args, **kwargs):
         # Combine building and room to create the name
         self.name = f"{self.warehouse_type} ({self.building}_{self.room})"
@@ -107,6 +120,10 @@ class Stock(models.Model):
     reception_date = models.DateField(blank=True, verbose_name="reception date")
     # The alert threshold when the minimum stock is reached
     threshold = models.IntegerField(default=1, verbose_name="alert threshold")
+    # Purchase cost of one package of the batch, valued at the product price when empty
+    unit_cost = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True, verbose_name="unit cost")
+    # Incremented by every change of the packaging quantity, to detect concurrent writers
+    version = models.PositiveIntegerField(default=0, editable=False, verbose_name="version")
     # Link to the Product model: product to which the stock is attached
     product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name="product", verbose_name="product")
     # Link to the Warehouse model: warehouse where the stock is stored
@@ -115,15 +132,32 @@ class Stock(models.Model):
                                   related_name="warehouse",
                                   verbose_name="warehouse")
 
+    class Meta:
+        indexes = [
+            # Stocks of a product in a warehouse
+            models.Index(fields=["product", "warehouse"], name="stock_product_warehouse_idx"),
+            # Stocks expiring soon, the stocks without expiration date are left out of the index
+            models.Index(fields=["expiration_date"],
+                         condition=models.Q(expiration_date__isnull=False),
+                         name="stock_expiration_idx"),
+            # Stocks of a batch, e.g. for a recall or a scan
+            models.Index(fields=["batch"], name="stock_batch_idx"),
+        ]
+
     def __str__(self):
-        return f"stock of {Stock.product.__str__()}"
+        return f"stock of {self.product}"
 
 
 # Stock movement model
 class StockMovement(models.Model):
+    # Enum type choices for the direction of the movement
+    class Types(models.TextChoices):
+        IN = "IN", "In"
+        OUT = "OUT", "Out"
+
     # Movement type: if the product go in or go out
-    movement_type = models.CharField(max_length=10, choices=[('IN', 'In'), ('OUT', 'Out')]) # Pourquoi pas un TextChoices ?
-    # The quantity of product that is moved
+    movement_type = models.CharField(max_length=10, choices=Types)
+    # The quantity of product that is moved, counted in packaging units of the stock
     quantity = models.IntegerField(default=1, verbose_name="quantity")
     # The timestamp when the stock movement is recorded
     timestamp = models.DateTimeField(auto_now_add=True, verbose_name="timestamp")
@@ -131,11 +165,307 @@ class StockMovement(models.Model):
     reason = models.CharField(max_length=250, blank=True, verbose_name="reason")
     # Link to the Stock model: which stock is moved
     stock = models.ForeignKey(Stock, on_delete=models.CASCADE, verbose_name="stock")
+    # Key given by the client, so that a movement sent twice, e.g. on a retry, is only recorded once
+    idempotency_key = models.CharField(max_length=64, null=True, blank=True, verbose_name="idempotency key")
     # Think about if it's nécessary to add theses attributes:
     # The location from where the stock has moved
     # old_location = models.OneToOneField(Warehouse, on_delete=models.CASCADE, related_name="old", verbose_name="from warehouse")
     # The location to where the stock is moving
     # new_location = models.OneToOneField(Warehouse, on_delete=models.CASCADE, related_name="new", verbose_name="to warehouse")
 
+    class Meta:
+        indexes = [
+            # Most recent movements of a stock
+            models.Index(fields=["stock", "-timestamp"], name="movement_stock_recent_idx"),
+            # Movements recorded in a date range, e.g. for the exports, and the history paginated by (timestamp, id)
+            models.Index(fields=["timestamp", "id"], name="movement_timestamp_id_idx"),
+        ]
+        constraints = [
+            # The movements without key are left out of the index
+            models.UniqueConstraint(fields=["idempotency_key"],
+                                    condition=models.Q(idempotency_key__isnull=False),
+                                    name="unique_movement_idempotency_key"),
+        ]
+
+    @property
+    def signed_quantity(self):
+        # Positive for an incoming movement, negative for an outgoing one
+        return self.quantity if self.movement_type == self.Types.IN else -self.quantity
+
     def __str__(self):
         return f"stock movement of {self.timestamp}"
+
+
+# Stock level model: current quantity of a product in a warehouse, maintained from the stock movements
+class StockLevel(models.Model):
+    # Link to the Product model: product whose quantity is tracked
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name="levels", verbose_name="product")
+    # Link to the Warehouse model: warehouse where the quantity is held
+    warehouse = models.ForeignKey(Warehouse, on_delete=models.CASCADE, related_name="levels", verbose_name="warehouse")
+    # Net quantity of all the movements recorded for the product in the warehouse
+    quantity = models.BigIntegerField(default=0, verbose_name="current quantity")
+    # Identifier of the most recent movement folded into the quantity
+    last_movement_id = models.BigIntegerField(default=0, verbose_name="last movement id")
+
+    class Meta:
+        indexes = [
+            # Latest movement of a warehouse, read for the keys of the cached dashboards
+            models.Index(fields=["warehouse", "last_movement_id"], name="level_warehouse_last_idx"),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=["product", "warehouse"], name="unique_stock_level"),
+        ]
+
+    def __str__(self):
+        return f"{self.product_id}@{self.warehouse_id}: {self.quantity}"
+
+
+# Stock alert model: a stock at or below its threshold, or a critical product missing from a store
+class StockAlert(models.Model):
+    # Enum type choices for the different kinds of alert
+    class Kinds(models.TextChoices):
+        # The packaging quantity of a stock reached its alert threshold
+        LOW_STOCK = "LOW", "Low stock"
+        # A critical product has no stock left in a building store
+        CRITICAL_MISSING = "CRIT", "Critical product missing"
+
+    # The kind of alert among the choices available in the enum type "Kinds"
+    kind = models.CharField(max_length=4, choices=Kinds, verbose_name="kind")
+    # Link to the Product model: product concerned by the alert
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name="alerts", verbose_name="product")
+    # Link to the Warehouse model: warehouse concerned by the alert
+    warehouse = models.ForeignKey(Warehouse, on_delete=models.CASCADE, related_name="alerts", verbose_name="warehouse")
+    # Link to the Stock model: the low stock, empty for a missing critical product
+    stock = models.ForeignKey(Stock,
+                              on_delete=models.CASCADE,
+                              null=True,
+                              blank=True,
+                              related_name="alerts",
+                              verbose_name="stock")
+    # Quantity left when the alert was raised
+    quantity = models.IntegerField(verbose_name="quantity")
+    # Threshold reached when the alert was raised
+    threshold = models.IntegerField(default=0, verbose_name="threshold")
+    # Date when the alert was raised
+    raised_at = models.DateTimeField(auto_now_add=True, verbose_name="raised at")
+    # Date when the condition of the alert disappeared, empty while the alert is open
+    resolved_at = models.DateTimeField(null=True, blank=True, verbose_name="resolved at")
+
+    class Meta:
+        constraints = [
+            # A condition is only raised once while its alert is open
+            models.UniqueConstraint(fields=["stock"],
+                                    condition=models.Q(kind="LOW", resolved_at__isnull=True),
+                                    name="unique_open_low_stock_alert"),
+            models.UniqueConstraint(fields=["product", "warehouse"],
+                                    condition=models.Q(kind="CRIT", resolved_at__isnull=True),
+                                    name="unique_open_critical_alert"),
+        ]
+
+    def __str__(self):
+        return f"{self.get_kind_display()}: {self.product_id}@{self.warehouse_id}"
+
+
+# Stock checkpoint model: snapshot of the quantities of a warehouse at a given time
+class StockCheckpoint(models.Model):
+    # Link to the Warehouse model: warehouse whose quantities are saved
+    warehouse = models.ForeignKey(Warehouse,
+                                  on_delete=models.CASCADE,
+                                  related_name="checkpoints",
+                                  verbose_name="warehouse")
+    # Time of the snapshot: the movements recorded up to this time are included
+    taken_at = models.DateTimeField(verbose_name="taken at")
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["warehouse", "taken_at"], name="unique_stock_checkpoint"),
+        ]
+
+    def __str__(self):
+        return f"checkpoint of {self.warehouse_id} at {self.taken_at}"
+
+
+# Stock checkpoint line model: quantity of one stock in a checkpoint
+class StockCheckpointLine(models.Model):
+    # Link to the StockCheckpoint model: snapshot the line belongs to
+    checkpoint = models.ForeignKey(StockCheckpoint,
+                                   on_delete=models.CASCADE,
+                                   related_name="lines",
+                                   verbose_name="checkpoint")
+    # Link to the Stock model: stock whose quantity is saved
+    stock = models.ForeignKey(Stock, on_delete=models.CASCADE, related_name="checkpoint_lines", verbose_name="stock")
+    # Link to the Product model: product of the stock, kept to sum the quantities per product
+    product = models.ForeignKey(Product,
+                                on_delete=models.CASCADE,
+                                related_name="checkpoint_lines",
+                                verbose_name="product")
+    # Net quantity of the movements of the stock up to the checkpoint
+    quantity = models.BigIntegerField(verbose_name="quantity")
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["checkpoint", "stock"], name="unique_stock_checkpoint_line"),
+        ]
+
+    def __str__(self):
+        return f"{self.stock_id}: {self.quantity}"
+
+
+# Stock opening balance model: net quantity of the archived movements of a stock
+class StockOpeningBalance(models.Model):
+    # Link to the Stock model: stock whose archived movements are folded
+    stock = models.OneToOneField(Stock,
+                                 on_delete=models.CASCADE,
+                                 related_name="opening_balance",
+                                 verbose_name="stock")
+    # Net quantity of the movements of the stock recorded before `as_of`
+    quantity = models.BigIntegerField(default=0, verbose_name="quantity")
+    # Cutoff of the last archiving which folded movements of the stock
+    as_of = models.DateTimeField(verbose_name="as of")
+    # Identifier of the most recent movement folded into the balance
+    last_movement_id = models.BigIntegerField(default=0, verbose_name="last movement")
+
+    def __str__(self):
+        return f"{self.stock_id}: {self.quantity} as of {self.as_of}"
+
+
+# Movement archive model: compressed file holding archived movements of one month
+class MovementArchive(models.Model):
+    # First day of the month of the archived movements
+    month = models.DateField(verbose_name="month")
+    # Path of the compressed JSON Lines file, relative to the STOCK_ARCHIVE_DIR setting, or absolute when the file
+    # was written to another directory
+    path = models.CharField(max_length=255, unique=True, verbose_name="path")
+    # Movements are archived when they were recorded before this time
+    cutoff = models.DateTimeField(verbose_name="cutoff")
+    # Number of movements in the file
+    movements = models.PositiveIntegerField(verbose_name="movements")
+    # Time of the archiving
+    archived_at = models.DateTimeField(auto_now_add=True, verbose_name="archived at")
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["month"], name="movement_archive_month_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.month:%Y-%m}: {self.movements} movements"
+
+
+# Job model: unit of background work of the job queue, run by the `run_worker` command
+class Job(models.Model):
+    # Different states of a job
+    class Statuses(models.TextChoices):
+        PENDING = "PENDING", "Pending"
+        RUNNING = "RUNNING", "Running"
+        DONE = "DONE", "Done"
+        FAILED = "FAILED", "Failed"
+
+    # Name of the handler running the job, see JOB_HANDLERS in stocks.services.jobs
+    kind = models.CharField(max_length=50, verbose_name="kind")
+    # Arguments of the handler
+    payload = models.JSONField(default=dict, verbose_name="payload")
+    # Current state of the job
+    status = models.CharField(max_length=10, choices=Statuses, default=Statuses.PENDING, verbose_name="status")
+    # Key given by the client, so that a job submitted twice is only queued once
+    idempotency_key = models.CharField(max_length=64, null=True, blank=True, verbose_name="idempotency key")
+    # Link to the User model: user who submitted the job, if any
+    user = models.ForeignKey(settings.AUTH_USER_MODEL,
+                             on_delete=models.SET_NULL,
+                             null=True,
+                             blank=True,
+                             related_name="jobs",
+                             verbose_name="user")
+    # Number of runs started, the failed runs being retried up to the `max_attempts`
+    attempts = models.PositiveSmallIntegerField(default=0, verbose_name="attempts")
+    max_attempts = models.PositiveSmallIntegerField(default=5, verbose_name="maximum attempts")
+    # The job is not claimed before this time, which delays the retries
+    available_at = models.DateTimeField(verbose_name="available at")
+    # Token of the worker batch which claimed the job, and time of the claim
+    claimed_by = models.CharField(max_length=64, blank=True, verbose_name="claimed by")
+    claimed_at = models.DateTimeField(null=True, blank=True, verbose_name="claimed at")
+    # Value returned by the handler, or error of the last failed run
+    result = models.JSONField(null=True, blank=True, verbose_name="result")
+    error = models.TextField(blank=True, verbose_name="error")
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="created at")
+    finished_at = models.DateTimeField(null=True, blank=True, verbose_name="finished at")
+
+    class Meta:
+        indexes = [
+            # Jobs waiting for a worker, the finished jobs are left out of the index
+            models.Index(fields=["available_at", "id"],
+                         condition=models.Q(status="PENDING"),
+                         name="job_pending_idx"),
+            # Jobs claimed by a worker batch
+            models.Index(fields=["claimed_by"], name="job_claimed_by_idx"),
+        ]
+        constraints = [
+            # The key is scoped to the submitter, the jobs submitted without a user sharing one scope
+            models.UniqueConstraint(fields=["user", "idempotency_key"],
+                                    condition=models.Q(idempotency_key__isnull=False),
+                                    name="unique_job_idempotency_key"),
+            models.UniqueConstraint(fields=["idempotency_key"],
+                                    condition=models.Q(idempotency_key__isnull=False, user__isnull=True),
+                                    name="unique_job_idempotency_key_no_user"),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} job {self.pk}: {self.get_status_display()}"
+
+
+# Consumption forecast model: daily consumption of a product in a warehouse and its suggested reorder point
+class ConsumptionForecast(models.Model):
+    # Link to the Product model: product whose consumption is forecast
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name="forecasts", verbose_name="product")
+    # Link to the Warehouse model: warehouse where the product is consumed
+    warehouse = models.ForeignKey(Warehouse,
+                                  on_delete=models.CASCADE,
+                                  related_name="forecasts",
+                                  verbose_name="warehouse")
+    # Mean daily consumption over the moving average window, in packaging units
+    moving_average = models.FloatField(default=0, verbose_name="moving average")
+    # Daily consumption smoothed exponentially over the history, in packaging units
+    smoothed = models.FloatField(default=0, verbose_name="exponential smoothing")
+    # Standard deviation of the daily consumption over the history
+    deviation = models.FloatField(default=0, verbose_name="standard deviation")
+    # Suggested alert threshold: consumption during the lead time plus a safety stock
+    reorder_point = models.IntegerField(default=0, verbose_name="reorder point")
+    # Identifier of the most recent movement taken into account, to only recompute the series which changed
+    last_movement_id = models.BigIntegerField(default=0, verbose_name="last movement id")
+    computed_at = models.DateTimeField(auto_now=True, verbose_name="computed at")
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["product", "warehouse"], name="unique_consumption_forecast"),
+        ]
+
+    def __str__(self):
+        return f"{self.product_id}@{self.warehouse_id}: {self.smoothed:.2f}/day, reorder at {self.reorder_point}"
+
+
+# Product trigram model: inverted index of the searched product fields, used when SQLite FTS5 is not available
+class ProductTrigram(models.Model):
+    # Three consecutive characters of a word of a searched field, in lower case
+    trigram = models.CharField(max_length=3, verbose_name="trigram")
+    # Link to the Product model: product holding the trigram
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name="trigrams", verbose_name="product")
+
+    class Meta:
+        constraints = [
+            # Also the index of the lookups, the products of a trigram being read from the index only
+            models.UniqueConstraint(fields=["trigram", "product"], name="unique_product_trigram"),
+        ]
+
+    def __str__(self):
+        return f"{self.trigram!r}: {self.product_id}"
+
+
+# Cache generation model: counter bumped when cached data changes without any movement, shared by every process
+class CacheGeneration(models.Model):
+    # Name of the cached data, e.g. "dashboard"
+    name = models.CharField(max_length=50, unique=True, verbose_name="name")
+    # Number of changes, part of the cache keys of the data
+    value = models.BigIntegerField(default=0, verbose_name="value")
+
+    def __str__(self):
+        return f"{self.name}: {self.value}"
@@ -0,0 +1,123 @@
+import base64
+import binascii
+import json
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+# Number of rows displayed per page in the listings
+PAGE_SIZE = 50
+
+
+def keyset_page(queryset, after=None, size=PAGE_SIZE, descending=False):
+    """
+    Return a page of a queryset ordered by primary key, starting after a given key.
+
+    Unlike OFFSET pagination, the database seeks directly to the first row of the page through the primary key
+    index, so every page costs the same whatever its depth.
+
+    Args:
+        queryset (QuerySet): The rows to paginate.
+        after (int | None): The key of the last row of the previous page, None for the first page.
+        size (int): The number of rows per page.
+        descending (bool): Whether the rows go from the highest key to the lowest.
+    Returns:
+        tuple[list, int | None]: The rows of the page and the key to request the next page with,
+        None on the last page.
+    """
+    if after is not None:
+        queryset = queryset.filter(pk__lt=after) if descending else queryset.filter(pk__gt=after)
+    # One extra row tells whether there is a next page
+    rows = list(queryset.order_by("-pk" if descending else "pk")[:size + 1])
+    next_after = rows[size - 1].pk if len(rows) > size else None
+    return rows[:size], next_after
+
+
+class InvalidCursor(ValueError):
+    """
+    Raised when a pagination cursor cannot be decoded.
+    """
+
+
+def encode_cursor(moment, pk):
+    """
+    Build the opaque cursor pointing at a row.
+
+    Args:
+        moment (datetime): The value of the ordering date of the row.
+        pk (int): The primary key of the row, which breaks the ties between equal dates.
+    Returns:
+        str: The URL-safe cursor.
+    """
+    payload = json.dumps([moment.isoformat(), pk], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(payload).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    """
+    Read the position of a row from its opaque cursor.
+
+    Args:
+        cursor (str): A cursor built by `encode_cursor`.
+    Returns:
+        tuple[datetime, int]: The ordering date and the primary key of the row.
+    Raises:
+        InvalidCursor: If the cursor is malformed.
+    """
+    try:
+        payload = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        moment, pk = json.loads(payload)
+        moment = parse_datetime(moment)
+    except (binascii.Error, ValueError, TypeError):
+        raise InvalidCursor("Invalid cursor.")
+    if moment is None or not isinstance(pk, int):
+        raise InvalidCursor("Invalid cursor.")
+    return moment, pk
+
+
+def seek(queryset, cursor=None, field="timestamp"):
+    """
+    Order a queryset by a date then by primary key, the most recent first, starting after the row of a cursor.
+
+    The query is not evaluated: slicing it gives the rows of the page.
+
+    Args:
+        queryset (QuerySet): The rows to paginate.
+        cursor (str | None): The cursor of the last row of the previous page, None for the first page.
+        field (str): The date field ordering the rows.
+    Returns:
+        QuerySet: The rows following the cursor.
+    Raises:
+        InvalidCursor: If the cursor is malformed.
+    """
+    if cursor:
+        moment, pk = decode_cursor(cursor)
+        # The leading range condition lets the database seek in the index, the second one breaks the ties
+        queryset = queryset.filter(Q(**{f"{field}__lte": moment}),
+                                   Q(**{f"{field}__lt": moment}) | Q(pk__lt=pk))
+    return queryset.order_by(f"-{field}", "-pk")
+
+
+def cursor_page(queryset, cursor=None, size=PAGE_SIZE, field="timestamp"):
+    """
+    Return a page of a queryset ordered by a date then by primary key, the most recent first.
+
+    The rows are ordered by (`field`, primary key) so that rows sharing the same date keep a stable order, and
+    the page starts strictly after the row of the cursor: the database seeks to it through the (date, id)
+    index instead of counting the rows of the previous pages as OFFSET does.
+
+    Args:
+        queryset (QuerySet): The rows to paginate.
+        cursor (str | None): The cursor of the next page returned with the previous page, None for the first page.
+        size (int): The number of rows per page.
+        field (str): The date field ordering the rows.
+    Returns:
+        tuple[list, str | None]: The rows of the page and the cursor of the next page, None on the last page.
+    Raises:
+        InvalidCursor: If the cursor is malformed.
+    """
+    rows = list(seek(queryset, cursor, field)[:size + 1])
+    if len(rows) <= size:
+        return rows, None
+    last = rows[size - 1]
+    return rows[:size], encode_cursor(getattr(last, field), last.pk)
@@ -0,0 +1,133 @@
+from django.db import transaction
+from django.db.models import F, Sum
+from django.utils import timezone
+
+from stocks.models import Product, Stock, StockAlert, Warehouse
+
+
+def _restrict(queryset, pairs, product_field="product_id", warehouse_field="warehouse_id"):
+    """
+    Restrict a query to the products and warehouses of a set of (product, warehouse) pairs.
+
+    The query keeps the cross product of the products and warehouses of the pairs: the rows out of the pairs
+    are filtered out afterwards with `_in_pairs`.
+
+    Args:
+        queryset (QuerySet): The query to restrict.
+        pairs (set[tuple[int, int]] | None): The pairs to evaluate, None for all of them.
+        product_field (str): Lookup of the product id in the query.
+        warehouse_field (str): Lookup of the warehouse id in the query.
+    Returns:
+        QuerySet: The restricted query.
+    """
+    if pairs is None:
+        return queryset
+    return queryset.filter(**{f"{product_field}__in": {product for product, _ in pairs},
+                              f"{warehouse_field}__in": {warehouse for _, warehouse in pairs}})
+
+
+def _in_pairs(pairs, product_id, warehouse_id):
+    """
+    Tell whether a (product, warehouse) pair is evaluated.
+    """
+    return pairs is None or (product_id, warehouse_id) in pairs
+
+
+def find_low_stocks(pairs=None):
+    """
+    Find the stocks whose packaging quantity is at or below their alert threshold, in a single query.
+
+    Args:
+        pairs (set[tuple[int, int]] | None): Only evaluate these (product, warehouse) pairs, None for all.
+    Returns:
+        dict: The field values of the alerts to raise, keyed by `(StockAlert.Kinds.LOW_STOCK, stock_id)`.
+    """
+    rows = _restrict(Stock.objects.filter(pack_quantity__lte=F("threshold")), pairs).values_list(
+        "id", "product_id", "warehouse_id", "pack_quantity", "threshold")
+    return {
+        (StockAlert.Kinds.LOW_STOCK, stock_id): {"stock_id": stock_id,
+                                                 "product_id": product_id,
+                                                 "warehouse_id": warehouse_id,
+                                                 "quantity": quantity,
+                                                 "threshold": threshold}
+        for stock_id, product_id, warehouse_id, quantity, threshold in rows
+        if _in_pairs(pairs, product_id, warehouse_id)
+    }
+
+
+def find_missing_critical_products(pairs=None):
+    """
+    Find the critical products without any stock left in a building store, in three queries.
+
+    Args:
+        pairs (set[tuple[int, int]] | None): Only evaluate these (product, warehouse) pairs, None for all.
+    Returns:
+        dict: The field values of the alerts to raise,
+        keyed by `(StockAlert.Kinds.CRITICAL_MISSING, product_id, warehouse_id)`.
+    """
+    stores = Warehouse.objects.filter(warehouse_type=Warehouse.Types.STORE)
+    critical = Product.objects.filter(critical=True)
+    if pairs is not None:
+        stores = stores.filter(id__in={warehouse for _, warehouse in pairs})
+        critical = critical.filter(id__in={product for product, _ in pairs})
+    stores = set(stores.values_list("id", flat=True))
+    critical = set(critical.values_list("id", flat=True)) if stores else set()
+    if not critical:
+        return {}
+    stocked = set(Stock.objects
+                  .filter(warehouse_id__in=stores, product_id__in=critical)
+                  .values("product_id", "warehouse_id")
+                  .annotate(total=Sum("pack_quantity"))
+                  .filter(total__gt=0)
+                  .values_list("product_id", "warehouse_id"))
+    return {
+        (StockAlert.Kinds.CRITICAL_MISSING, product_id, warehouse_id): {"product_id": product_id,
+                                                                        "warehouse_id": warehouse_id,
+                                                                        "quantity": 0}
+        for product_id in critical
+        for warehouse_id in stores
+        if (product_id, warehouse_id) not in stocked and _in_pairs(pairs, product_id, warehouse_id)
+    }
+
+
+def _alert_key(kind, stock_id, product_id, warehouse_id):
+    """
+    Build the key identifying the condition of an alert: its stock for a low stock, its pair otherwise.
+    """
+    if kind == StockAlert.Kinds.LOW_STOCK:
+        return kind, stock_id
+    return kind, product_id, warehouse_id
+
+
+@transaction.atomic
+def evaluate_alerts(pairs=None):
+    """
+    Raise the alerts whose condition appeared and resolve the open alerts whose condition disappeared.
+
+    Every condition is evaluated with set-based queries, and an alert which is already open is not raised
+    again. Without pairs, the whole inventory is evaluated; with pairs, e.g. the ones touched by a batch of
+    movements, only their stocks and alerts are.
+
+    Args:
+        pairs (Iterable[tuple[int, int]] | None): The (product, warehouse) pairs to evaluate, None for all.
+    Returns:
+        tuple[int, int]: The number of raised and resolved alerts.
+    """
+    pairs = None if pairs is None else set(pairs)
+    if pairs is not None and not pairs:
+        return 0, 0
+
+    conditions = find_low_stocks(pairs) | find_missing_critical_products(pairs)
+    open_alerts = {_alert_key(kind, stock_id, product_id, warehouse_id): pk
+                   for pk, kind, stock_id, product_id, warehouse_id
+                   in _restrict(StockAlert.objects.filter(resolved_at__isnull=True), pairs).values_list(
+                       "id", "kind", "stock_id", "product_id", "warehouse_id")
+                   if _in_pairs(pairs, product_id, warehouse_id)}
+
+    # Only the new conditions are turned into model instances
+    raised = [StockAlert(kind=key[0], **values) for key, values in conditions.items() if key not in open_alerts]
+    resolved = [pk for key, pk in open_alerts.items() if key not in conditions]
+    # A concurrent evaluation may have raised the same alert, the unique constraints skip it
+    StockAlert.objects.bulk_create(raised, ignore_conflicts=True)
+    StockAlert.objects.filter(pk__in=resolved).update(resolved_at=timezone.now())
+    return len(raised), len(resolved)
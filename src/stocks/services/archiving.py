@@ -0,0 +1,246 @@
+import datetime
+import gzip
+import json
+from pathlib import Path
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models import F, Max, Sum
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from stocks.models import MovementArchive, StockMovement, StockOpeningBalance
+from stocks.services.levels import SIGNED_QUANTITY
+
+# Number of movements fetched from the database per round trip while archiving
+CHUNK_SIZE = 5000
+
+# Fields of an archived movement
+ARCHIVE_FIELDS = ("id", "timestamp", "movement_type", "quantity", "reason", "stock_id")
+# Fields of the stock of an archived movement, kept to filter the archives without joining the stocks
+ARCHIVE_STOCK_FIELDS = {"product_id": F("stock__product_id"), "warehouse_id": F("stock__warehouse_id")}
+
+
+def archive_cutoff(days=None, now=None):
+    """
+    Compute the time before which the movements are archived.
+
+    Args:
+        days (int | None): Age in days of the archived movements, the STOCK_ARCHIVE_AFTER_DAYS setting if None.
+        now (datetime | None): The current time, `timezone.now()` if None.
+    Returns:
+        datetime: Midnight of the day `days` days ago, so that the cutoff does not move within a day.
+    """
+    days = settings.STOCK_ARCHIVE_AFTER_DAYS if days is None else days
+    moment = timezone.localtime(now or timezone.now()) - datetime.timedelta(days=days)
+    return moment.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def archived_until():
+    """
+    Return the cutoff of the last archiving: the movements recorded before it are only kept in the archives.
+
+    Returns:
+        datetime | None: The cutoff, None if nothing was ever archived.
+    """
+    return MovementArchive.objects.aggregate(cutoff=Max("cutoff"))["cutoff"]
+
+
+def _month_start(moment):
+    """
+    Return the first day of the month of a time.
+    """
+    return timezone.localtime(moment).date().replace(day=1)
+
+
+def _write_month(directory, month, movements):
+    """
+    Write the movements of one month to a new compressed JSON Lines file.
+
+    Args:
+        directory (Path): The archive directory.
+        month (date): The first day of the month.
+        movements (QuerySet): The movements of the month, as dicts of the archived fields.
+    Returns:
+        tuple[str, int]: The path of the file relative to the directory, and the number of movements written.
+    """
+    encoder = DjangoJSONEncoder()
+    count = 0
+    path = None
+    handle = None
+    try:
+        for row in movements.iterator(chunk_size=CHUNK_SIZE):
+            if handle is None:
+                # Named after the first movement, so that archiving the same month twice adds a file
+                path = f"{month:%Y}/movements-{month:%Y-%m}-{row['id']}.jsonl.gz"
+                (directory / path).parent.mkdir(parents=True, exist_ok=True)
+                handle = gzip.open(directory / path, "wt", encoding="utf-8")
+            handle.write(encoder.encode(row) + "\n")
+            count += 1
+    finally:
+        if handle is not None:
+            handle.close()
+    return path, count
+
+
+def _registered_path(directory, path):
+    """
+    Return the path under which an archive file is registered, see `MovementArchive.path`.
+
+    A file of the STOCK_ARCHIVE_DIR directory is registered relative to it, so that the archives can be moved
+    along with the setting. A file written elsewhere, e.g. with the `--directory` option of the
+    `archive_stock_movements` command, is registered with its absolute path, so that it is read back from there.
+    """
+    full = (Path(directory) / path).resolve()
+    root = Path(settings.STOCK_ARCHIVE_DIR).resolve()
+    return str(full.relative_to(root)) if full.is_relative_to(root) else str(full)
+
+
+def _fold_balances(movements, cutoff):
+    """
+    Add the net quantity of the archived movements of each stock to its opening balance.
+
+    Args:
+        movements (QuerySet): The archived movements.
+        cutoff (datetime): The cutoff of the archiving.
+    Returns:
+        int: The number of opening balances written.
+    """
+    deltas = {row[0]: row[1:]
+              for row in movements.values_list("stock_id").annotate(quantity=Sum(SIGNED_QUANTITY),
+                                                                    last_id=Max("id")).order_by()}
+    balances = StockOpeningBalance.objects.in_bulk(deltas, field_name="stock_id")
+    updated = []
+    created = []
+    for stock_id, (quantity, last_id) in deltas.items():
+        balance = balances.get(stock_id)
+        if balance is None:
+            created.append(StockOpeningBalance(stock_id=stock_id, quantity=quantity, as_of=cutoff,
+                                               last_movement_id=last_id))
+            continue
+        balance.quantity += quantity
+        balance.as_of = cutoff
+        balance.last_movement_id = max(balance.last_movement_id, last_id)
+        updated.append(balance)
+    StockOpeningBalance.objects.bulk_update(updated, ["quantity", "as_of", "last_movement_id"], batch_size=1000)
+    StockOpeningBalance.objects.bulk_create(created, batch_size=1000)
+    return len(deltas)
+
+
+def archive_movements(cutoff=None, directory=None):
+    """
+    Move the movements recorded before a cutoff out of the stock movement table.
+
+    The movements are written month by month to compressed JSON Lines files, streamed from the database so that
+    the memory does not depend on their number. Then, in a single transaction, their net quantity is folded into
+    the opening balance of each stock, the files are registered and the movements are deleted. A failure before
+    the commit leaves files which are not registered: they are never read and the next archiving writes new ones.
+
+    Args:
+        cutoff (datetime | None): Archive the movements recorded before this time, see `archive_cutoff` if None.
+        directory (Path | str | None): The archive directory, the STOCK_ARCHIVE_DIR setting if None.
+    Returns:
+        int: The number of archived movements.
+    """
+    cutoff = archive_cutoff() if cutoff is None else cutoff
+    directory = Path(settings.STOCK_ARCHIVE_DIR if directory is None else directory)
+    # Bounded by the last id so that the files, the balances and the deletion cover the same movements
+    last_id = StockMovement.objects.filter(timestamp__lt=cutoff).aggregate(last_id=Max("id"))["last_id"]
+    if last_id is None:
+        return 0
+    archived = StockMovement.objects.filter(timestamp__lt=cutoff, id__lte=last_id)
+    first = archived.order_by("timestamp").values_list("timestamp", flat=True).first()
+
+    archives = []
+    month = _month_start(first)
+    while timezone.make_aware(datetime.datetime.combine(month, datetime.time())) < cutoff:
+        following = (month + datetime.timedelta(days=32)).replace(day=1)
+        start = timezone.make_aware(datetime.datetime.combine(month, datetime.time()))
+        end = min(cutoff, timezone.make_aware(datetime.datetime.combine(following, datetime.time())))
+        rows = (archived
+                .filter(timestamp__gte=start, timestamp__lt=end)
+                .order_by("id")
+                .values(*ARCHIVE_FIELDS, **ARCHIVE_STOCK_FIELDS))
+        path, count = _write_month(directory, month, rows)
+        if count:
+            archives.append(MovementArchive(month=month, path=_registered_path(directory, path), cutoff=cutoff,
+                                            movements=count))
+        month = following
+
+    with transaction.atomic():
+        _fold_balances(archived, cutoff)
+        MovementArchive.objects.bulk_create(archives)
+        archived.delete()
+    return sum(archive.movements for archive in archives)
+
+
+def _read_archive(directory, path):
+    """
+    Read the movements of an archive file, its path being relative to the directory unless it is absolute.
+
+    Yields:
+        dict: The archived movements, with their timestamp parsed.
+    """
+    with gzip.open(Path(directory) / path, "rt", encoding="utf-8") as handle:
+        for line in handle:
+            row = json.loads(line)
+            row["timestamp"] = parse_datetime(row["timestamp"])
+            yield row
+
+
+def iter_archived_movements(stocks=None, warehouse=None, start=None, end=None, directory=None):
+    """
+    Read the archived movements, only opening the files of the months overlapping the time range.
+
+    Args:
+        stocks (Iterable[int] | None): Only read the movements of these stocks, None for all of them.
+        warehouse (Warehouse | int | None): Only read the movements of the stocks of this warehouse.
+        start (datetime | None): Only read the movements recorded at or after this time.
+        end (datetime | None): Only read the movements recorded before this time.
+        directory (Path | str | None): The directory of the archives registered with a relative path, the
+            STOCK_ARCHIVE_DIR setting if None.
+    Yields:
+        dict: The movements with the keys of ARCHIVE_FIELDS and ARCHIVE_STOCK_FIELDS, month by month.
+    """
+    directory = settings.STOCK_ARCHIVE_DIR if directory is None else directory
+    stocks = None if stocks is None else set(stocks)
+    warehouse_id = getattr(warehouse, "pk", warehouse)
+
+    archives = MovementArchive.objects.order_by("month", "id")
+    if start is not None:
+        archives = archives.filter(month__gte=_month_start(start))
+    if end is not None:
+        archives = archives.filter(month__lte=_month_start(end))
+    for path in archives.values_list("path", flat=True):
+        for row in _read_archive(directory, path):
+            if ((stocks is None or row["stock_id"] in stocks)
+                    and (warehouse_id is None or row["warehouse_id"] == warehouse_id)
+                    and (start is None or row["timestamp"] >= start)
+                    and (end is None or row["timestamp"] < end)):
+                yield row
+
+
+def iter_movements(stocks=None, warehouse=None, start=None, end=None, directory=None):
+    """
+    Read the movements from the archives and from the stock movement table, as one history.
+
+    The archived movements come first, see `iter_archived_movements`, then the movements of the table in id
+    order. The arguments are the ones of `iter_archived_movements`.
+
+    Yields:
+        dict: The movements with the keys of ARCHIVE_FIELDS and ARCHIVE_STOCK_FIELDS.
+    """
+    yield from iter_archived_movements(stocks, warehouse, start, end, directory)
+
+    movements = StockMovement.objects.all()
+    if stocks is not None:
+        movements = movements.filter(stock_id__in=set(stocks))
+    if warehouse is not None:
+        movements = movements.filter(stock__warehouse=warehouse)
+    if start is not None:
+        movements = movements.filter(timestamp__gte=start)
+    if end is not None:
+        movements = movements.filter(timestamp__lt=end)
+    rows = movements.order_by("id").values(*ARCHIVE_FIELDS, **ARCHIVE_STOCK_FIELDS)
+    yield from rows.iterator(chunk_size=CHUNK_SIZE)
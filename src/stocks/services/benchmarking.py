@@ -0,0 +1,239 @@
+import datetime
+import json
+import platform
+import random
+import statistics
+import subprocess
+import time
+
+import django
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from stocks.models import Stock
+
+# Credentials of the administrator running the scenarios, created by `run_scenarios`
+BENCHMARK_USERNAME = "benchmark"
+BENCHMARK_PASSWORD = "benchmark-password"
+# Directory of the stored benchmark results, one JSON file per run
+BENCHMARK_RESULTS_DIR = settings.BASE_DIR / "benchmarks" / "results"
+# A median latency this much higher than in the previous results is reported as a regression, above the noise of
+# two runs on the same machine
+REGRESSION_TOLERANCE = 0.20
+
+
+def _login(client, stocks, rng):
+    """
+    Log in through the login page, hashing the password as a real user would.
+    """
+    return Client().post(reverse("users:login-page"), {"username": BENCHMARK_USERNAME, "password": BENCHMARK_PASSWORD})
+
+
+def _dashboard(client, stocks, rng):
+    """
+    Render the welcome page and its warehouse dashboard.
+    """
+    return client.get(reverse("welcome-page"))
+
+
+def _stock_list(client, stocks, rng):
+    """
+    Render a page of the stock list, starting at a random stock.
+    """
+    return client.get(reverse("stocks:stock-list"), {"after": rng.choice(stocks)})
+
+
+def _record_movement(client, stocks, rng):
+    """
+    Record an incoming movement of a random stock through the bulk movements API.
+    """
+    body = {"movements": [{"stock": rng.choice(stocks), "movement_type": "IN", "quantity": 1,
+                           "reason": "benchmark"}]}
+    return client.post(reverse("stocks:bulk-movements"), json.dumps(body), content_type="application/json")
+
+
+def _export_stocks(client, stocks, rng):
+    """
+    Download the CSV export of every stock.
+    """
+    response = client.get(reverse("stocks:export", args=["stocks", "csv"]))
+    b"".join(response.streaming_content)
+    return response
+
+
+def _export_movements(client, stocks, rng):
+    """
+    Download the JSON Lines export of the movements of the last day.
+    """
+    start = timezone.localdate() - datetime.timedelta(days=1)
+    response = client.get(reverse("stocks:export", args=["movements", "jsonl"]), {"start": start.isoformat()})
+    b"".join(response.streaming_content)
+    return response
+
+
+# Benchmarked flows, each called with the logged in client, the stock identifiers and the random generator, in
+# the order they run: the movements being recorded last, the cached pages are measured warm
+SCENARIOS = {
+    "login": _login,
+    "dashboard": _dashboard,
+    "stock_list": _stock_list,
+    "export_stocks": _export_stocks,
+    "export_movements": _export_movements,
+    "record_movement": _record_movement,
+}
+
+
+def _summarize(durations, queries):
+    """
+    Summarize the durations in seconds and the query counts of the iterations of a scenario.
+    """
+    durations = sorted(durations)
+    p95 = statistics.quantiles(durations, n=20, method="inclusive")[18] if len(durations) > 1 else durations[0]
+    return {"iterations": len(durations),
+            "median_ms": statistics.median(durations) * 1000,
+            "p95_ms": p95 * 1000,
+            "mean_ms": statistics.fmean(durations) * 1000,
+            "min_ms": durations[0] * 1000,
+            "max_ms": durations[-1] * 1000,
+            "throughput_per_s": len(durations) / sum(durations),
+            "queries": statistics.median(queries)}
+
+
+def run_scenarios(names=None, iterations=20, warmup=2, seed=0):
+    """
+    Run the benchmark scenarios through the test client against the current database, e.g. a seeded one.
+
+    Each scenario runs `warmup` times unmeasured, filling the caches, then `iterations` times. The latency
+    covers the whole request including its middlewares, but no network nor server.
+
+    Args:
+        names (Iterable[str] | None): Keys of SCENARIOS to run, None for all of them.
+        iterations (int): Number of measured runs of each scenario.
+        warmup (int): Number of unmeasured runs of each scenario.
+        seed (int): Seed of the random choices of the scenarios.
+    Returns:
+        dict[str, dict]: The latency statistics in milliseconds, the throughput and the median number of
+        queries, keyed by scenario.
+    Raises:
+        ValueError: If there is no stock to run the scenarios on.
+        RuntimeError: If a request of a scenario fails.
+    """
+    stocks = list(Stock.objects.values_list("pk", flat=True))
+    if not stocks:
+        raise ValueError("The benchmark needs stocks, see `seed_inventory`.")
+    User = get_user_model()
+    if not User.objects.filter(username=BENCHMARK_USERNAME).exists():
+        User.objects.create_superuser(username=BENCHMARK_USERNAME, password=BENCHMARK_PASSWORD)
+    client = Client()
+    client.login(username=BENCHMARK_USERNAME, password=BENCHMARK_PASSWORD)
+    rng = random.Random(seed)
+
+    results = {}
+    for name in names or SCENARIOS:
+        scenario = SCENARIOS[name]
+        durations = []
+        queries = []
+        for iteration in range(warmup + iterations):
+            with CaptureQueriesContext(connection) as context:
+                start = time.perf_counter()
+                response = scenario(client, stocks, rng)
+                duration = time.perf_counter() - start
+            if response.status_code >= 400:
+                raise RuntimeError(f"The {name} scenario failed with the status {response.status_code}.")
+            if iteration >= warmup:
+                durations.append(duration)
+                queries.append(len(context.captured_queries))
+        results[name] = _summarize(durations, queries)
+    return results
+
+
+def _commit():
+    """
+    Return the abbreviated hash of the checked out commit, None outside of a git checkout.
+    """
+    try:
+        process = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=settings.BASE_DIR,
+                                 capture_output=True, text=True, check=False)
+    except OSError:
+        return None
+    return process.stdout.strip() or None
+
+
+def build_report(results, dataset, seed=0):
+    """
+    Wrap benchmark results with what they depend on, so that runs on different commits can be compared.
+
+    Args:
+        results (dict[str, dict]): The results of `run_scenarios`.
+        dataset (dict[str, int]): The number of rows of the benchmarked data, e.g. from `seed_inventory`.
+        seed (int): The seed of the data and of the scenarios.
+    Returns:
+        dict: The JSON-serializable report.
+    """
+    return {"created_at": timezone.now().isoformat(), "commit": _commit(), "python": platform.python_version(),
+            "django": django.get_version(), "database": connection.vendor, "dataset": dataset, "seed": seed,
+            "results": results}
+
+
+def save_report(report, path=None):
+    """
+    Write a benchmark report as JSON, by default in BENCHMARK_RESULTS_DIR under its date and commit.
+
+    Args:
+        report (dict): The report of `build_report`.
+        path (Path | None): The file to write.
+    Returns:
+        Path: The written file.
+    """
+    if path is None:
+        created_at = datetime.datetime.fromisoformat(report["created_at"])
+        path = BENCHMARK_RESULTS_DIR / f"{created_at:%Y%m%d-%H%M%S}-{report['commit'] or 'nocommit'}.json"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(report, indent=2) + "\n")
+    return path
+
+
+def read_report(path):
+    """
+    Read a benchmark report written by `save_report`.
+    """
+    return json.loads(path.read_text())
+
+
+def latest_report(directory=BENCHMARK_RESULTS_DIR):
+    """
+    Read the most recent report stored in a directory, the file names starting with their date.
+
+    Returns:
+        dict | None: The report, None if none was stored yet.
+    """
+    paths = sorted(directory.glob("*.json")) if directory.is_dir() else []
+    return read_report(paths[-1]) if paths else None
+
+
+def compare_reports(previous, current, tolerance=REGRESSION_TOLERANCE):
+    """
+    Compare the median latency of the scenarios of two reports.
+
+    Args:
+        previous (dict): The reference report.
+        current (dict): The new report.
+        tolerance (float): The relative slowdown above which a scenario is a regression, e.g. 0.10 for 10%.
+    Returns:
+        list[dict]: One row per scenario of both reports, with its "scenario", "before" and "after" medians in
+        milliseconds, their relative "change" and whether it is a "regression".
+    """
+    rows = []
+    for name, result in current["results"].items():
+        before = previous["results"].get(name)
+        if before is None:
+            continue
+        change = result["median_ms"] / before["median_ms"] - 1
+        rows.append({"scenario": name, "before": before["median_ms"], "after": result["median_ms"],
+                     "change": change, "regression": change > tolerance})
+    return rows
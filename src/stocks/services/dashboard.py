@@ -0,0 +1,97 @@
+from django.db.models import Count, F, Max, OuterRef, Q, Subquery, Sum
+
+from stocks.models import Stock, StockAlert, StockLevel, StockMovement, Warehouse
+from stocks.services.generations import bump_generation, get_generation
+
+# Name of the generation of the cached dashboards, bumped when stocks or warehouses change without any movement
+GENERATION = "dashboard"
+# Lifetime of a cached dashboard fragment in seconds, the keys make it stale as soon as a movement is recorded
+DASHBOARD_TIMEOUT = 10 * 60
+# Key of the latest movement of any warehouse, for the users allowed to see every warehouse
+ALL_WAREHOUSES = "all"
+
+
+def invalidate_dashboards():
+    """
+    Make every cached dashboard stale, e.g. when a stock is created or its threshold changes.
+    """
+    bump_generation(GENERATION)
+
+
+def last_movements(warehouses):
+    """
+    Return the latest movement of warehouses, read from the database.
+
+    The latest movement of a warehouse is read from the stock level ledger, which holds the latest movement of
+    each (product, warehouse) pair and is written in the transaction of the movements: the movements recorded by
+    any process, e.g. by the workers, are seen at once. Each warehouse costs one lookup of the
+    `level_warehouse_last_idx` index, and ALL_WAREHOUSES one lookup of the primary key of the movements.
+
+    Args:
+        warehouses (Iterable[int] | None): The identifiers of the warehouses, None for ALL_WAREHOUSES.
+    Returns:
+        dict[int | str, int]: The identifier of the latest movement, 0 for none, keyed by warehouse id.
+    """
+    if warehouses is None:
+        return {ALL_WAREHOUSES: StockMovement.objects.aggregate(last_id=Max("id"))["last_id"] or 0}
+    warehouses = sorted(warehouses)
+    latest = (StockLevel.objects
+              .filter(warehouse=OuterRef("pk"))
+              .order_by("-last_movement_id")
+              .values("last_movement_id")[:1])
+    found = dict(Warehouse.objects
+                 .filter(id__in=warehouses)
+                 .annotate(last_id=Subquery(latest))
+                 .values_list("id", "last_id"))
+    return {warehouse: found.get(warehouse) or 0 for warehouse in warehouses}
+
+
+def dashboard_key(warehouses):
+    """
+    Build the key of the dashboard of a warehouse scope, changing with every movement of its warehouses.
+
+    The key is built from the database rather than from markers kept in the cache, which is not shared by the
+    processes serving the site: a movement or a change recorded by any process changes it.
+
+    Args:
+        warehouses (Iterable[int] | None): The warehouses shown, None for all of them.
+    Returns:
+        str: The key, shared by the users of the same scope.
+    """
+    marks = last_movements(warehouses)
+    generation = get_generation(GENERATION)
+    return f"{generation}:" + ",".join(f"{warehouse}={movement_id}" for warehouse, movement_id in marks.items())
+
+
+def warehouse_summaries(warehouses):
+    """
+    Summarize the stocks of warehouses: their number, their packages, and their low stocks and open alerts.
+
+    Args:
+        warehouses (Iterable[int] | None): The identifiers of the warehouses, None for all of them.
+    Returns:
+        list[dict]: One row per warehouse, by building and name, with the keys "id", "name", "building",
+        "stocks", "packages", "low_stocks" and "alerts".
+    """
+    rows = Warehouse.objects.order_by("building", "name", "id")
+    stocks = Stock.objects.all()
+    alerts = StockAlert.objects.filter(resolved_at__isnull=True)
+    if warehouses is not None:
+        rows = rows.filter(id__in=warehouses)
+        stocks = stocks.filter(warehouse_id__in=warehouses)
+        alerts = alerts.filter(warehouse_id__in=warehouses)
+
+    totals = (stocks
+              .values("warehouse_id")
+              .annotate(stocks=Count("id"), packages=Sum("pack_quantity"),
+                        low_stocks=Count("id", filter=Q(pack_quantity__lte=F("threshold"))))
+              .order_by())
+    totals = {row["warehouse_id"]: row for row in totals}
+    open_alerts = dict(alerts.values_list("warehouse_id").annotate(count=Count("id")).order_by())
+    summaries = []
+    for pk, name, building in rows.values_list("id", "name", "building"):
+        total = totals.get(pk, {})
+        summaries.append({"id": pk, "name": name, "building": building, "stocks": total.get("stocks", 0),
+                          "packages": total.get("packages") or 0, "low_stocks": total.get("low_stocks", 0),
+                          "alerts": open_alerts.get(pk, 0)})
+    return summaries
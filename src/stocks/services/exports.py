@@ -0,0 +1,140 @@
+import csv
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import F
+
+from stocks.models import Product, Stock, StockMovement
+
+# Number of rows fetched from the database per round trip while streaming
+CHUNK_SIZE = 2000
+
+# Columns of each exportable dataset, as `values()` lookups: related names are joined in the same query
+EXPORT_COLUMNS = {
+    "products": {
+        "id": F("id"),
+        "sku": F("sku"),
+        "name": F("name"),
+        "description": F("description"),
+        "product_type": F("product_type"),
+        "price": F("price"),
+        "supplier": F("supplier"),
+        "supplier_ref": F("supplier_ref"),
+        "manufacturer": F("manufacturer"),
+        "manufacturer_ref": F("manufacturer_ref"),
+        "critical": F("critical"),
+    },
+    "stocks": {
+        "id": F("id"),
+        "sku": F("product__sku"),
+        "product": F("product__name"),
+        "warehouse": F("warehouse__name"),
+        "unit_quantity": F("unit_quantity"),
+        "stock_unit": F("stock_unit"),
+        "pack_quantity": F("pack_quantity"),
+        "stock_packaging": F("stock_packaging"),
+        "shelving": F("shelving"),
+        "batch": F("batch"),
+        "expiration_date": F("expiration_date"),
+        "reception_date": F("reception_date"),
+        "threshold": F("threshold"),
+        "unit_cost": F("unit_cost"),
+        "last_updated": F("last_updated"),
+    },
+    "movements": {
+        "id": F("id"),
+        "timestamp": F("timestamp"),
+        "movement_type": F("movement_type"),
+        "quantity": F("quantity"),
+        "reason": F("reason"),
+        "stock_id": F("stock_id"),
+        "sku": F("stock__product__sku"),
+        "batch": F("stock__batch"),
+        "warehouse": F("stock__warehouse__name"),
+    },
+}
+
+
+def export_rows(dataset, warehouse=None, start=None, end=None, warehouses=None):
+    """
+    Build the query of an export, without evaluating it.
+
+    Args:
+        dataset (str): "products", "stocks" or "movements".
+        warehouse (int | None): Only export the stocks or movements of this warehouse.
+        warehouses (Iterable[int] | None): Only export the stocks or movements of these warehouses, e.g. the ones
+            the user may see, None for all of them.
+        start (datetime | None): Only export the movements recorded at or after this time.
+        end (datetime | None): Only export the movements recorded before this time.
+    Returns:
+        QuerySet: The rows of the export as dicts, ordered by id.
+    """
+    if dataset == "products":
+        queryset = Product.objects.all()
+    elif dataset == "stocks":
+        queryset = Stock.objects.all()
+        if warehouse is not None:
+            queryset = queryset.filter(warehouse_id=warehouse)
+        if warehouses is not None:
+            queryset = queryset.filter(warehouse_id__in=warehouses)
+    else:
+        queryset = StockMovement.objects.all()
+        if warehouse is not None:
+            queryset = queryset.filter(stock__warehouse_id=warehouse)
+        if warehouses is not None:
+            queryset = queryset.filter(stock__warehouse_id__in=warehouses)
+        if start is not None:
+            queryset = queryset.filter(timestamp__gte=start)
+        if end is not None:
+            queryset = queryset.filter(timestamp__lt=end)
+    # Prefixed aliases cannot clash with the model field names
+    columns = {f"_{name}": expression for name, expression in EXPORT_COLUMNS[dataset].items()}
+    return queryset.order_by("id").values(**columns)
+
+
+class _Echo:
+    """
+    File-like object handing back what is written to it, so that csv.writer can produce lines one by one.
+    """
+
+    def write(self, value):
+        return value
+
+
+def stream_csv(dataset, rows):
+    """
+    Encode the rows of an export as CSV lines, fetching them from the database chunk by chunk.
+
+    Args:
+        dataset (str): The exported dataset, which gives the header.
+        rows (QuerySet): The rows returned by `export_rows`.
+    Yields:
+        str: The header line, then one line per row.
+    """
+    names = list(EXPORT_COLUMNS[dataset])
+    writer = csv.writer(_Echo())
+    yield writer.writerow(names)
+    for row in rows.iterator(chunk_size=CHUNK_SIZE):
+        yield writer.writerow([row[f"_{name}"] for name in names])
+
+
+def stream_jsonl(dataset, rows):
+    """
+    Encode the rows of an export as JSON Lines, fetching them from the database chunk by chunk.
+
+    Args:
+        dataset (str): The exported dataset.
+        rows (QuerySet): The rows returned by `export_rows`.
+    Yields:
+        str: One JSON object per row, followed by a newline.
+    """
+    names = list(EXPORT_COLUMNS[dataset])
+    encoder = DjangoJSONEncoder()
+    for row in rows.iterator(chunk_size=CHUNK_SIZE):
+        yield encoder.encode({name: row[f"_{name}"] for name in names}) + "\n"
+
+
+# Streaming encoder and content type of each export format
+EXPORT_FORMATS = {
+    "csv": (stream_csv, "text/csv"),
+    "jsonl": (stream_jsonl, "application/jsonl"),
+}
@@ -0,0 +1,204 @@
+import asyncio
+import contextvars
+from collections import deque
+
+from django.db.models import Max
+
+from stocks.models import StockMovement
+
+# Seconds between two reads of the new movements by the feed of a process
+POLL_INTERVAL = 1.0
+# Seconds a long-poll request waits for a movement before returning an empty page
+LONG_POLL_TIMEOUT = 25.0
+# Number of most recent movements kept by the feed, from which the waiting requests pick theirs
+FEED_SIZE = 10000
+# Maximum number of movements returned by a read
+READ_LIMIT = 200
+# Fields of the movements read for the API, in the order of `_movement`. The rows are read as named tuples: the
+# plain tuples of `values_list` run their query when `aiterator` is called, out of a thread
+MOVEMENT_FIELDS = ("id", "timestamp", "movement_type", "quantity", "reason", "stock_id", "stock__product_id",
+                   "stock__warehouse_id")
+
+
+def _movement(row):
+    """
+    Build the JSON-serializable movement of a row of MOVEMENT_FIELDS.
+    """
+    pk, timestamp, movement_type, quantity, reason, stock, product, warehouse = row
+    return {"id": pk, "timestamp": timestamp, "movement_type": movement_type, "quantity": quantity,
+            "reason": reason, "stock": stock, "product": product, "warehouse": warehouse}
+
+
+def _movements(warehouses):
+    """
+    Build the query of the movements of warehouses, None for all of them.
+    """
+    rows = StockMovement.objects.all()
+    if warehouses is not None:
+        rows = rows.filter(stock__warehouse_id__in=warehouses)
+    return rows
+
+
+async def movements_after(after, warehouses=None, limit=READ_LIMIT):
+    """
+    Read the movements recorded after a given one, oldest first, with the async ORM.
+
+    Args:
+        after (int): The identifier of the last movement already read.
+        warehouses (Iterable[int] | None): Only read the movements of these warehouses, None for all of them.
+        limit (int): The maximum number of movements read.
+    Returns:
+        list[dict]: The movements, see `_movement`.
+    """
+    rows = (_movements(warehouses)
+            .filter(id__gt=after)
+            .order_by("id")
+            .values_list(*MOVEMENT_FIELDS, named=True)[:limit])
+    return [_movement(row) async for row in rows.aiterator()]
+
+
+async def recent_movements(warehouses=None, limit=READ_LIMIT):
+    """
+    Read the most recent movements, oldest first, with the async ORM.
+
+    Args:
+        warehouses (Iterable[int] | None): Only read the movements of these warehouses, None for all of them.
+        limit (int): The maximum number of movements read.
+    Returns:
+        list[dict]: The movements, see `_movement`.
+    """
+    rows = _movements(warehouses).order_by("-id").values_list(*MOVEMENT_FIELDS, named=True)[:limit]
+    return [_movement(row) async for row in rows.aiterator()][::-1]
+
+
+async def last_movement_id():
+    """
+    Return the identifier of the latest movement, 0 if none was recorded.
+    """
+    return (await StockMovement.objects.aaggregate(last_id=Max("id")))["last_id"] or 0
+
+
+class MovementFeed:
+    """
+    Movements recorded while requests wait for them, read by a single task per process.
+
+    However many requests wait, the feed reads the new movements once every POLL_INTERVAL, then wakes the
+    requests up to pick the movements of their warehouses in memory: an idle request holds neither a thread
+    nor a query. The task only runs while requests wait. The movements are read in the order of their
+    identifiers: on PostgreSQL, a movement committed after one with a higher identifier was read is skipped.
+    """
+
+    def __init__(self, interval=POLL_INTERVAL, size=FEED_SIZE):
+        self.interval = interval
+        # Most recent movements read, oldest first
+        self.movements = deque(maxlen=size)
+        # Identifier of the latest movement read
+        self.last_id = None
+        self.waiters = 0
+        self._loop = None
+        self._condition = None
+        self._start_lock = None
+        self._task = None
+
+    def _bind(self):
+        """
+        Create the synchronization primitives of the running event loop, the first time it uses the feed.
+        """
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            # A feed used by another event loop before, e.g. in the tests, starts over
+            self._loop = loop
+            self._condition = asyncio.Condition()
+            self._start_lock = asyncio.Lock()
+            self._task = None
+            self.movements.clear()
+            self.last_id = None
+
+    async def _start(self):
+        """
+        Start the task reading the movements, unless it runs already.
+        """
+        async with self._start_lock:
+            if self._task is None:
+                self.last_id = await last_movement_id()
+                # Started out of the context of the request starting it: the task outlives the request, whose
+                # query recorder and sync thread must not be used by its reads
+                self._task = contextvars.Context().run(asyncio.create_task, self._run())
+
+    async def _run(self):
+        """
+        Read the new movements every `interval` seconds and wake the waiting requests up.
+        """
+        while True:
+            await asyncio.sleep(self.interval)
+            rows = await movements_after(self.last_id, limit=self.movements.maxlen)
+            if rows:
+                self.movements.extend(rows)
+                self.last_id = rows[-1]["id"]
+                async with self._condition:
+                    self._condition.notify_all()
+
+    def _stop(self):
+        """
+        Stop the task reading the movements, once the last waiting request returned.
+        """
+        self._task.cancel()
+        self._task = None
+        self.last_id = None
+        self.movements.clear()
+
+    def _pick(self, after, warehouses, limit):
+        """
+        Pick from the feed the movements of warehouses recorded after a given one, oldest first.
+        """
+        picked = []
+        for movement in reversed(self.movements):
+            if movement["id"] <= after:
+                break
+            if warehouses is None or movement["warehouse"] in warehouses:
+                picked.append(movement)
+        return picked[::-1][:limit]
+
+    async def wait(self, after, warehouses=None, timeout=LONG_POLL_TIMEOUT, limit=READ_LIMIT):
+        """
+        Return the movements of warehouses recorded after a given one, waiting for some if there are none yet.
+
+        The movements already recorded are read from the database, so a client catching up gets them at once.
+        The feed is started before, so that a movement recorded after that read is read by the feed.
+
+        Args:
+            after (int): The identifier of the last movement the client read.
+            warehouses (Iterable[int] | None): Only return the movements of these warehouses, None for all.
+            timeout (float): The maximum number of seconds to wait.
+            limit (int): The maximum number of movements returned.
+        Returns:
+            list[dict]: The movements oldest first, see `movements_after`, empty if none was recorded in time.
+        """
+        self._bind()
+        warehouses = None if warehouses is None else set(warehouses)
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        self.waiters += 1
+        try:
+            await self._start()
+            rows = await movements_after(after, warehouses, limit)
+            if rows:
+                return rows
+            async with self._condition:
+                while True:
+                    rows = self._pick(after, warehouses, limit)
+                    remaining = deadline - loop.time()
+                    if rows or remaining <= 0:
+                        return rows
+                    try:
+                        await asyncio.wait_for(self._condition.wait(), remaining)
+                    except asyncio.TimeoutError:
+                        return self._pick(after, warehouses, limit)
+        finally:
+            self.waiters -= 1
+            if not self.waiters and self._task is not None:
+                self._stop()
+
+
+# Feed of the movements of this process, shared by its long-poll requests
+FEED = MovementFeed()
@@ -0,0 +1,266 @@
+import datetime
+import math
+
+import numpy as np
+from django.db import transaction
+from django.db.models import Case, Exists, F, IntegerField, Max, OuterRef, Q, Subquery, Sum, Value, When
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from stocks.models import ConsumptionForecast, Stock, StockMovement
+from stocks.services.alerts import evaluate_alerts
+from stocks.services.dashboard import invalidate_dashboards
+
+# Number of days of OUT movements making up the consumption series
+HISTORY_DAYS = 90
+# Number of most recent days averaged into the moving average
+WINDOW_DAYS = 28
+# Weight of the latest day in the exponential smoothing, between 0 and 1
+SMOOTHING = 0.3
+# Number of days between the alert and the arrival of the replenishment, consumed from the reorder point
+LEAD_DAYS = 7
+# Number of standard deviations of the consumption kept as safety stock, 1.65 covering 95% of the days
+SERVICE_FACTOR = 1.65
+# Number of (product, warehouse) pairs whose alerts are evaluated together once their threshold changed
+ALERT_BATCH_SIZE = 500
+# Order of the stocks of a pair picked last first: the non-empty stocks, then the reverse of FEFO_ORDER
+LAST_PICKED_ORDER = [Case(When(pack_quantity__gt=0, then=Value(0)), default=Value(1), output_field=IntegerField()),
+                     F("expiration_date").desc(nulls_first=True), "-reception_date", "-id"]
+
+
+def _day_start(day):
+    """
+    Return the aware time of the start of a day.
+    """
+    return timezone.make_aware(datetime.datetime.combine(day, datetime.time()))
+
+
+def _changed_pairs(after_id, last_id, dropped):
+    """
+    Build the condition selecting the rows of the (product, warehouse) pairs whose consumption changed, e.g. of
+    stocks or of forecasts.
+
+    Args:
+        after_id (int): The last movement of the previous run: the pairs with an OUT movement after it changed.
+        last_id (int): The last movement of this run.
+        dropped (Q): The times of the OUT movements which left the history or the moving average window since
+            the previous run: the pairs with such a movement changed.
+    Returns:
+        Q: The condition, on the `product_id` and `warehouse_id` of the outer query.
+    """
+    movements = StockMovement.objects.filter(movement_type=StockMovement.Types.OUT,
+                                             stock__product_id=OuterRef("product_id"),
+                                             stock__warehouse_id=OuterRef("warehouse_id"))
+    return Q(Exists(movements.filter(id__gt=after_id, id__lte=last_id))) | Q(Exists(movements.filter(dropped)))
+
+
+def _daily_consumption(since, last_id, changed=None):
+    """
+    Sum the OUT movements per (product, warehouse) and per day, in a single grouped query.
+
+    Args:
+        since (datetime): Only sum the movements recorded at or after this time.
+        last_id (int): Only sum the movements up to this identifier, included.
+        changed (Q | None): Only sum the series of the pairs of the stocks matching this condition, see
+            `_changed_pairs`, all if None.
+    Returns:
+        QuerySet: Tuples of (product id, warehouse id, day, quantity).
+    """
+    movements = StockMovement.objects.filter(movement_type=StockMovement.Types.OUT, timestamp__gte=since,
+                                             id__lte=last_id)
+    if changed is not None:
+        movements = movements.filter(stock__in=Stock.objects.filter(changed))
+    return (movements
+            .values_list("stock__product_id", "stock__warehouse_id", TruncDate("timestamp"))
+            .annotate(quantity=Sum("quantity"))
+            .order_by())
+
+
+def forecast_series(rows, start, days=HISTORY_DAYS, window=WINDOW_DAYS, smoothing=SMOOTHING, lead_days=LEAD_DAYS,
+                    service_factor=SERVICE_FACTOR):
+    """
+    Bucket daily consumptions into one series per (product, warehouse) and forecast them all at once.
+
+    The series are the rows of a matrix with one column per day, the days without movement counting as 0, so
+    every statistic is computed for all the series by a few NumPy operations instead of a loop over the series.
+    The reorder point covers the consumption during the lead time, at the highest of the moving average and the
+    smoothed consumption, plus a safety stock proportional to the deviation of the consumption.
+
+    Args:
+        rows (Iterable[tuple[int, int, date, int]]): The product id, warehouse id, day and consumed quantity.
+        start (date): The first day of the series.
+        days (int): The number of days of the series.
+        window (int): Number of most recent days averaged into the moving average.
+        smoothing (float): Weight of the latest day in the exponential smoothing.
+        lead_days (int): Number of days consumed before a replenishment arrives.
+        service_factor (float): Number of standard deviations kept as safety stock.
+    Returns:
+        dict[str, ndarray]: Arrays of the same length, one value per series: "product_id", "warehouse_id",
+        "moving_average", "smoothed", "deviation" and "reorder_point".
+    """
+    products, warehouses, ordinals, quantities = [], [], [], []
+    for product_id, warehouse_id, day, quantity in rows:
+        products.append(product_id)
+        warehouses.append(warehouse_id)
+        ordinals.append(day.toordinal())
+        quantities.append(quantity)
+    # Each pair is encoded as a single integer so that the series are numbered by one `np.unique`
+    keys = (np.array(products, dtype=np.int64) << 32) | np.array(warehouses, dtype=np.int64)
+    series, index = np.unique(keys, return_inverse=True)
+    columns = np.array(ordinals, dtype=np.int64) - start.toordinal()
+    inside = (columns >= 0) & (columns < days)
+
+    consumption = np.zeros((len(series), days))
+    np.add.at(consumption, (index[inside], columns[inside]), np.array(quantities, dtype=np.float64)[inside])
+
+    moving_average = consumption[:, -window:].mean(axis=1)
+    smoothed = consumption.mean(axis=1)
+    for column in consumption.T:
+        smoothed *= 1 - smoothing
+        smoothed += smoothing * column
+    deviation = consumption.std(axis=1)
+    reorder_point = np.ceil(np.maximum(moving_average, smoothed) * lead_days
+                            + service_factor * deviation * math.sqrt(lead_days))
+    return {
+        "product_id": series >> 32,
+        "warehouse_id": series & 0xFFFFFFFF,
+        "moving_average": moving_average,
+        "smoothed": smoothed,
+        "deviation": deviation,
+        "reorder_point": reorder_point.astype(np.int64),
+    }
+
+
+def _save_forecasts(forecasts, last_id):
+    """
+    Insert or update the forecasts of the series, in batches.
+
+    Returns:
+        int: The number of forecasts written.
+    """
+    rows = zip(*(forecasts[field].tolist() for field in ("product_id", "warehouse_id", "moving_average",
+                                                        "smoothed", "deviation", "reorder_point")))
+    ConsumptionForecast.objects.bulk_create(
+        [ConsumptionForecast(product_id=product_id, warehouse_id=warehouse_id, moving_average=moving_average,
+                             smoothed=smoothed, deviation=deviation, reorder_point=reorder_point,
+                             last_movement_id=last_id)
+         for product_id, warehouse_id, moving_average, smoothed, deviation, reorder_point in rows],
+        batch_size=1000,
+        update_conflicts=True,
+        unique_fields=["product", "warehouse"],
+        update_fields=["moving_average", "smoothed", "deviation", "reorder_point", "last_movement_id",
+                       "computed_at"],
+    )
+    return len(forecasts["product_id"])
+
+
+def _clear_forecasts(forecasts, recomputed, last_id):
+    """
+    Reset to no consumption the forecasts of the pairs without any consumption left in the history.
+
+    Args:
+        forecasts (QuerySet): The forecasts of the pairs which were to be recomputed.
+        recomputed (dict[str, ndarray]): The forecasts of the series with consumption, see `forecast_series`.
+        last_id (int): The last movement of the run.
+    Returns:
+        int: The number of forecasts reset.
+    """
+    kept = set(zip(recomputed["product_id"].tolist(), recomputed["warehouse_id"].tolist()))
+    cleared = [pk for pk, product_id, warehouse_id in forecasts.values_list("id", "product_id", "warehouse_id")
+               if (product_id, warehouse_id) not in kept]
+    for offset in range(0, len(cleared), ALERT_BATCH_SIZE):
+        (ConsumptionForecast.objects
+         .filter(pk__in=cleared[offset:offset + ALERT_BATCH_SIZE])
+         .update(moving_average=0, smoothed=0, deviation=0, reorder_point=0, last_movement_id=last_id,
+                 computed_at=timezone.now()))
+    return len(cleared)
+
+
+def apply_thresholds(last_id):
+    """
+    Write the reorder point of the forecasts computed up to a movement as the threshold of their stocks.
+
+    The alerts are raised per stock while the reorder point covers the whole (product, warehouse) pair: it is
+    written to the stock of the pair picked last, see LAST_PICKED_ORDER, and the other stocks of the pair take a
+    threshold of 0, in a single UPDATE. As the batches are picked first expired first out, the stock picked last
+    reaches the reorder point once the pair does. The alerts of the pairs are then evaluated against their new
+    thresholds.
+
+    Args:
+        last_id (int): The last movement of the forecasts to apply, see `update_forecasts`.
+    Returns:
+        int: The number of stocks updated.
+    """
+    forecasts = ConsumptionForecast.objects.filter(last_movement_id=last_id, product_id=OuterRef("product_id"),
+                                                   warehouse_id=OuterRef("warehouse_id"))
+    last_picked = (Stock.objects
+                   .filter(product_id=OuterRef("product_id"), warehouse_id=OuterRef("warehouse_id"))
+                   .order_by(*LAST_PICKED_ORDER)
+                   .values("id")[:1])
+    updated = (Stock.objects
+               .filter(Exists(forecasts))
+               .update(threshold=Case(When(id=Subquery(last_picked),
+                                           then=Subquery(forecasts.values("reorder_point")[:1])),
+                                      default=Value(0))))
+    # The update sends no signal
+    invalidate_dashboards()
+    pairs = list(ConsumptionForecast.objects.filter(last_movement_id=last_id).values_list("product_id",
+                                                                                         "warehouse_id"))
+    for offset in range(0, len(pairs), ALERT_BATCH_SIZE):
+        evaluate_alerts(set(pairs[offset:offset + ALERT_BATCH_SIZE]))
+    return updated
+
+
+@transaction.atomic
+def update_forecasts(full=False, apply=True, days=HISTORY_DAYS, now=None):
+    """
+    Forecast the consumption of the (product, warehouse) pairs and suggest their thresholds.
+
+    Only the series whose consumption changed since the previous run are recomputed, unless `full` is set: the
+    series with an OUT movement recorded since, and the series with an OUT movement which left the history or
+    the moving average window since, as the days went by. A series without any consumption left in the history
+    is reset to no consumption, see `_clear_forecasts`. The consumption is read in one grouped query, see
+    `_daily_consumption`, and forecast by `forecast_series`. The archived movements are not read: the history is
+    much shorter than the archiving age.
+
+    Args:
+        full (bool): Recompute every series, not only the changed ones.
+        apply (bool): Write the reorder points as the thresholds of the stocks, see `apply_thresholds`.
+        days (int): Number of days of history, ending today.
+        now (datetime | None): The current time, `timezone.now()` if None.
+    Returns:
+        int: The number of series recomputed.
+    """
+    # Bounded by the last id so that the next run starts exactly where this one stopped
+    last_id = (StockMovement.objects
+               .filter(movement_type=StockMovement.Types.OUT)
+               .aggregate(last_id=Max("id"))["last_id"])
+    if last_id is None:
+        return 0
+    previous = ConsumptionForecast.objects.aggregate(after_id=Max("last_movement_id"), at=Max("computed_at"))
+
+    today = timezone.localdate(now or timezone.now())
+    window = min(WINDOW_DAYS, days)
+    start = today - datetime.timedelta(days=days - 1)
+    since = _day_start(start)
+    if full or previous["after_id"] is None:
+        rows = _daily_consumption(since, last_id)
+        stale = ConsumptionForecast.objects.all()
+    else:
+        previous_day = timezone.localdate(previous["at"])
+        if previous["after_id"] >= last_id and previous_day >= today:
+            return 0
+        # The movements of the days which left the history, then the moving average window, since the previous run
+        dropped = (Q(timestamp__gte=_day_start(previous_day - datetime.timedelta(days=days - 1)),
+                     timestamp__lt=since)
+                   | Q(timestamp__gte=_day_start(previous_day - datetime.timedelta(days=window - 1)),
+                       timestamp__lt=_day_start(today - datetime.timedelta(days=window - 1))))
+        changed = _changed_pairs(previous["after_id"], last_id, dropped)
+        rows = _daily_consumption(since, last_id, changed)
+        stale = ConsumptionForecast.objects.filter(changed)
+    forecasts = forecast_series(rows, start, days, window)
+    count = _save_forecasts(forecasts, last_id) if len(forecasts["product_id"]) else 0
+    count += _clear_forecasts(stale, forecasts, last_id)
+    if count and apply:
+        apply_thresholds(last_id)
+    return count
@@ -0,0 +1,36 @@
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+from stocks.models import CacheGeneration
+
+
+def get_generation(name):
+    """
+    Return the generation of cached data, 0 if it never changed.
+
+    The generation is read from the database, so that a change made by any process makes the cached data of
+    every process stale.
+
+    Args:
+        name (str): The name of the cached data.
+    Returns:
+        int: The generation, to build the cache keys of the data with.
+    """
+    return CacheGeneration.objects.filter(name=name).values_list("value", flat=True).first() or 0
+
+
+def bump_generation(name):
+    """
+    Make cached data stale in every process, once the current transaction is committed.
+
+    Args:
+        name (str): The name of the cached data.
+    """
+    if CacheGeneration.objects.filter(name=name).update(value=F("value") + 1):
+        return
+    try:
+        with transaction.atomic():
+            CacheGeneration.objects.create(name=name, value=1)
+    except IntegrityError:
+        # Another writer created the generation in the meantime: it exists now, so increment it
+        CacheGeneration.objects.filter(name=name).update(value=F("value") + 1)
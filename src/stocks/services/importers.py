@@ -0,0 +1,327 @@
+import csv
+import io
+from dataclasses import dataclass, field
+from itertools import islice
+from pathlib import Path
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+
+from stocks.models import Product, Stock, StockMovement, Warehouse
+from stocks.services.alerts import evaluate_alerts
+from stocks.services.dashboard import invalidate_dashboards
+from stocks.services.levels import apply_movements
+from stocks.services.movements import retry_on_conflict, set_quantities
+from stocks.services.scanning import PRODUCT_IDS, invalidate_warehouses
+from stocks.services.search import SEARCH_FIELDS, index_products
+from stocks.services.valuation import invalidate_valuations
+
+# Maximum number of row errors kept in an import report, the others are only counted
+MAX_REPORTED_ERRORS = 100
+
+# Columns read for each product, `sku` being the key of the upsert
+PRODUCT_FIELDS = ["sku", "name", "description", "product_type", "price", "supplier", "supplier_ref",
+                  "manufacturer", "manufacturer_ref", "critical"]
+# Columns read for each stock, besides the `sku` of its product and its `warehouse`, see `_warehouse_lookup`
+STOCK_FIELDS = ["unit_quantity", "stock_unit", "pack_quantity", "stock_packaging", "shelving", "batch",
+                "expiration_date", "reception_date", "threshold", "unit_cost"]
+
+
+@dataclass
+class ImportReport:
+    """
+    Counters of an import, updated after each batch.
+    """
+    rows: int = 0
+    created: int = 0
+    updated: int = 0
+    failed: int = 0
+    errors: list = field(default_factory=list)
+
+    def add_error(self, line, message):
+        """
+        Count a rejected row and keep its message while the report is not full.
+
+        Args:
+            line (int): The 1-based line of the row in the file, the header being line 1.
+            message (str): Why the row was rejected.
+        """
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append(f"line {line}: {message}")
+
+
+def read_rows(file, file_format):
+    """
+    Iterate over the rows of a CSV or XLSX file without loading the file in memory.
+
+    Args:
+        file (file-like): The file opened in binary mode.
+        file_format (str): "csv" or "xlsx".
+    Yields:
+        dict: One row per line, keyed by the header of the file.
+    Raises:
+        ValueError: If the format is not supported.
+    """
+    if file_format == "csv":
+        yield from csv.DictReader(io.TextIOWrapper(file, encoding="utf-8-sig", newline=""))
+    elif file_format == "xlsx":
+        # openpyxl is only needed for XLSX files
+        from openpyxl import load_workbook
+
+        workbook = load_workbook(file, read_only=True, data_only=True)
+        try:
+            lines = workbook.active.iter_rows(values_only=True)
+            header = [str(cell).strip() for cell in next(lines, ())]
+            for line in lines:
+                yield {key: ("" if value is None else value) for key, value in zip(header, line)}
+        finally:
+            workbook.close()
+    else:
+        raise ValueError(f"Unsupported file format: {file_format}")
+
+
+def guess_format(filename):
+    """
+    Guess the format of an import file from its extension.
+
+    Args:
+        filename (str): Name or path of the file.
+    Returns:
+        str: "csv" or "xlsx".
+    Raises:
+        ValueError: If the extension is not supported.
+    """
+    extension = Path(filename).suffix.lower().lstrip(".")
+    if extension not in ("csv", "xlsx"):
+        raise ValueError(f"Unsupported file extension: {filename}")
+    return extension
+
+
+def _clean(model, row, names):
+    """
+    Convert the raw values of a row to the Python values of the model fields.
+
+    Empty cells of optional fields are left out so that the field defaults apply.
+
+    Args:
+        model (type[Model]): The imported model.
+        row (dict): The raw row.
+        names (list[str]): The fields to read from the row.
+    Returns:
+        dict: The cleaned values, keyed by field name.
+    Raises:
+        ValidationError: If a value is missing or invalid.
+    """
+    values = {}
+    for name in names:
+        model_field = model._meta.get_field(name)
+        raw = row.get(name, "")
+        raw = raw.strip() if isinstance(raw, str) else raw
+        if raw in ("", None):
+            if model_field.has_default() or model_field.null or (model_field.blank
+                                                                  and model_field.empty_strings_allowed):
+                continue
+            raise ValidationError(f"{name} is required")
+        if model_field.get_internal_type() == "BooleanField" and isinstance(raw, str):
+            raw = raw.lower() in ("1", "true", "yes", "y")
+        try:
+            values[name] = model_field.clean(raw, None)
+        except ValidationError as exc:
+            raise ValidationError(f"{name}: {'; '.join(exc.messages)}")
+    return values
+
+
+def _chunks(rows, size):
+    """
+    Split an iterable of rows in lists of at most `size` rows, numbered by their line in the file.
+
+    Args:
+        rows (Iterable[dict]): The rows of the file.
+        size (int): The maximum number of rows per chunk.
+    Yields:
+        list[tuple[int, dict]]: The next chunk of (line, row).
+    """
+    numbered = enumerate(rows, start=2)
+    while chunk := list(islice(numbered, size)):
+        yield chunk
+
+
+def import_products(rows, batch_size=1000, progress=None):
+    """
+    Create or update products, keyed on their SKU, batch by batch.
+
+    Only one batch of rows is held in memory at a time, whatever the size of the file.
+
+    Args:
+        rows (Iterable[dict]): The rows to import, e.g. from `read_rows`.
+        batch_size (int): Number of rows upserted per transaction.
+        progress (Callable[[ImportReport], None] | None): Called after each batch.
+    Returns:
+        ImportReport: The counters of the import.
+    """
+    report = ImportReport()
+    update_fields = [name for name in PRODUCT_FIELDS if name != "sku"]
+    for chunk in _chunks(rows, batch_size):
+        products = {}
+        for line, row in chunk:
+            try:
+                values = _clean(Product, row, PRODUCT_FIELDS)
+                # The last occurrence of a SKU in a batch wins
+                products[values["sku"]] = Product(**values)
+            except ValidationError as exc:
+                report.add_error(line, "; ".join(exc.messages))
+
+        with transaction.atomic():
+            existing = set(Product.objects.filter(sku__in=products).values_list("sku", flat=True))
+            Product.objects.bulk_create(products.values(),
+                                        update_conflicts=True,
+                                        unique_fields=["sku"],
+                                        update_fields=update_fields)
+            # The bulk upsert sends no signal
+            index_products(Product.objects.filter(sku__in=products).only("id", *SEARCH_FIELDS))
+            for sku in products:
+                PRODUCT_IDS.pop(sku)
+            invalidate_valuations()
+
+        report.rows += len(chunk)
+        report.updated += len(existing)
+        report.created += len(products) - len(existing)
+        if progress:
+            progress(report)
+    return report
+
+
+def _upsert_stocks(stocks, products):
+    """
+    Create or update the stocks of an import batch and record their quantity changes, see `import_stocks`.
+
+    Args:
+        stocks (dict[tuple, Stock]): The imported stocks, keyed by (product id, warehouse id, batch, shelving).
+        products (dict[str, int]): The identifiers of the products of the batch, keyed by sku.
+    Returns:
+        tuple[list[Stock], list[Stock]]: The created and the updated stocks.
+    Raises:
+        StockConflict: If a stock was changed by a concurrent writer since it was read.
+    """
+    existing = {(stock.product_id, stock.warehouse_id, stock.batch, stock.shelving): stock
+                for stock in Stock.objects.filter(product_id__in=products.values()).only(
+                    "id", "product_id", "warehouse_id", "batch", "shelving", "pack_quantity", "version")}
+    to_update = []
+    to_create = []
+    deltas = []
+    for key, stock in stocks.items():
+        current = existing.get(key)
+        if current is None:
+            to_create.append(stock)
+            deltas.append((stock, stock.pack_quantity))
+        else:
+            stock.pk = current.pk
+            stock.version = current.version
+            to_update.append(stock)
+            deltas.append((stock, stock.pack_quantity - current.pack_quantity))
+    Stock.objects.bulk_create(to_create)
+    # The quantities are written only if unchanged since read, so that the recorded deltas stay exact
+    set_quantities(to_update)
+    Stock.objects.bulk_update(to_update, [field for field in STOCK_FIELDS if field != "pack_quantity"])
+    # The bulk writes send no signal
+    invalidate_warehouses({stock.warehouse_id for stock in [*to_create, *to_update]})
+    invalidate_valuations()
+    invalidate_dashboards()
+
+    movements = StockMovement.objects.bulk_create([
+        StockMovement(stock=stock,
+                      movement_type=StockMovement.Types.IN if delta > 0 else StockMovement.Types.OUT,
+                      quantity=abs(delta),
+                      reason="import")
+        for stock, delta in deltas if delta
+    ])
+    apply_movements(movements)
+    evaluate_alerts({(stock.product_id, stock.warehouse_id) for stock in stocks.values()})
+    return to_create, to_update
+
+
+def _warehouse_lookup():
+    """
+    Build the function resolving the `warehouse` column of an imported stock to the identifier of its warehouse.
+
+    The column holds the identifier of the warehouse, or its name when no other warehouse has the same name:
+    the names are built from the type, the building and the room, which nothing keeps unique.
+
+    Returns:
+        Callable[[object], int]: The function, raising ValidationError for an unknown or ambiguous warehouse.
+    """
+    ids = set()
+    names = {}
+    for pk, name in Warehouse.objects.values_list("id", "name"):
+        ids.add(pk)
+        # None marks a name shared by several warehouses
+        names[name] = None if name in names else pk
+
+    def lookup(value):
+        value = str(value if value is not None else "").strip()
+        if value.isdigit() and int(value) in ids:
+            return int(value)
+        if value not in names:
+            raise ValidationError(f"unknown warehouse {value!r}")
+        if names[value] is None:
+            raise ValidationError(f"several warehouses are named {value!r}, use the id of the warehouse")
+        return names[value]
+
+    return lookup
+
+
+def import_stocks(rows, batch_size=1000, progress=None):
+    """
+    Create or update stocks batch by batch.
+
+    A stock is identified by its product `sku`, its `warehouse` id or name, its `batch` and its `shelving`.
+    The imported packaging quantity is recorded as an IN or OUT movement of the difference with the current
+    quantity, so that the stock level ledger stays consistent with the movement history. A batch whose stocks
+    are moved concurrently is imported again from their fresh quantities.
+    Only one batch of rows is held in memory at a time, whatever the size of the file.
+
+    Args:
+        rows (Iterable[dict]): The rows to import, e.g. from `read_rows`.
+        batch_size (int): Number of rows upserted per transaction.
+        progress (Callable[[ImportReport], None] | None): Called after each batch.
+    Returns:
+        ImportReport: The counters of the import.
+    Raises:
+        StockConflict: If the stocks of a batch kept being moved concurrently, the previous batches being
+            imported.
+    """
+    report = ImportReport()
+    warehouse_id_of = _warehouse_lookup()
+    for chunk in _chunks(rows, batch_size):
+        skus = {str(row.get("sku", "")).strip() for _, row in chunk}
+        products = dict(Product.objects.filter(sku__in=skus).values_list("sku", "id"))
+
+        stocks = {}
+        for line, row in chunk:
+            try:
+                product_id = products.get(str(row.get("sku", "")).strip())
+                if product_id is None:
+                    raise ValidationError(f"unknown sku {row.get('sku')!r}")
+                warehouse_id = warehouse_id_of(row.get("warehouse"))
+                values = _clean(Stock, row, STOCK_FIELDS)
+                key = (product_id, warehouse_id, values["batch"], values["shelving"])
+                stocks[key] = Stock(product_id=product_id, warehouse_id=warehouse_id, **values)
+            except ValidationError as exc:
+                report.add_error(line, "; ".join(exc.messages))
+
+        to_create, to_update = retry_on_conflict(_upsert_stocks, stocks, products)
+
+        report.rows += len(chunk)
+        report.created += len(to_create)
+        report.updated += len(to_update)
+        if progress:
+            progress(report)
+    return report
+
+
+# Importer of each model accepted by the import command and the admin
+IMPORTERS = {
+    "product": import_products,
+    "stock": import_stocks,
+}
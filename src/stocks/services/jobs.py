@@ -0,0 +1,235 @@
+import datetime
+import logging
+import traceback
+import uuid
+
+from django.db import IntegrityError, connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from stocks.models import Job
+from stocks.services.forecasting import update_forecasts
+from stocks.services.movements import InsufficientStock, ingest_movements
+from stocks.services.picking import pick
+from stocks.services.replenishment import replenish
+
+logger = logging.getLogger(__name__)
+
+# Number of jobs claimed by a worker at once
+CLAIM_BATCH_SIZE = 20
+# A running job whose worker did not finish it within this delay is given to another worker
+CLAIM_TIMEOUT = datetime.timedelta(minutes=10)
+# Delay before the first retry of a failed job, doubled at each attempt
+RETRY_DELAY = datetime.timedelta(seconds=5)
+
+
+def _ingest_movements(payload):
+    """
+    Record a batch of stock movements queued by the API, see `ingest_movements`.
+    """
+    results = ingest_movements(payload["movements"], warehouses=payload.get("warehouses"))
+    created = sum(result["status"] == "created" for result in results)
+    return {"created": created, "failed": len(results) - created, "results": results}
+
+
+def _pick(payload):
+    """
+    Take a quantity of a product from a warehouse, first expired first out, see `pick`.
+
+    A pick exceeding the stock is not retried: the quantities it failed on are reported in the result.
+    """
+    try:
+        movements = pick(payload["product"], payload["warehouse"], payload["quantity"],
+                         payload.get("reason", "picking"))
+    except InsufficientStock as exc:
+        return {"picked": 0, "error": str(exc)}
+    return {"picked": sum(movement.quantity for movement in movements),
+            "movements": [movement.pk for movement in movements]}
+
+
+def _replenish(payload):
+    """
+    Replenish the kanbans of a building, see `replenish`.
+    """
+    return {"transfers": len(replenish(payload["building"])) // 2}
+
+
+def _forecast(payload):
+    """
+    Forecast the consumption series which changed since the previous run, see `update_forecasts`.
+    """
+    return {"series": update_forecasts(full=payload.get("full", False))}
+
+
+# Handler of each kind of job: called with the payload, it returns the JSON-serializable result of the job
+JOB_HANDLERS = {
+    "ingest_movements": _ingest_movements,
+    "pick": _pick,
+    "replenish": _replenish,
+    "forecast": _forecast,
+}
+
+
+class ClaimLost(Exception):
+    """
+    Raised when a running job was given to another worker, after CLAIM_TIMEOUT, before it finished.
+    """
+
+
+def _insert(kind, payload, idempotency_key, user, **fields):
+    """
+    Insert a job, or return the job the user already submitted with the key, see `enqueue`.
+    """
+    if kind not in JOB_HANDLERS:
+        raise ValueError(f"Unknown job kind: {kind}")
+    try:
+        with transaction.atomic():
+            job = Job.objects.create(kind=kind, payload=payload, idempotency_key=idempotency_key, user=user,
+                                     available_at=timezone.now(), **fields)
+    except IntegrityError:
+        if idempotency_key is None:
+            raise
+        return Job.objects.get(user=user, idempotency_key=idempotency_key), False
+    return job, True
+
+
+def enqueue(kind, payload, idempotency_key=None, user=None):
+    """
+    Queue a job with a single insert.
+
+    Args:
+        kind (str): The kind of job, a key of JOB_HANDLERS.
+        payload (dict): The JSON-serializable arguments of the handler.
+        idempotency_key (str | None): Key of the submission: a job submitted again by the same user with the
+            same key is not queued twice.
+        user (User | None): The user submitting the job.
+    Returns:
+        tuple[Job, bool]: The job, and whether it was created (False when the key was already submitted).
+    Raises:
+        ValueError: If the kind of job is unknown.
+    """
+    return _insert(kind, payload, idempotency_key, user)
+
+
+def run_now(kind, payload, idempotency_key=None, user=None):
+    """
+    Run a job in the current process, recorded like a queued job.
+
+    The job is inserted already claimed, so that no worker takes it, and run at once, see `run_job`: its
+    result is known on return. A job submitted again with the same key is returned without running twice. A
+    failed job is left to the workers, which retry it after a delay.
+
+    Args:
+        kind (str): The kind of job, a key of JOB_HANDLERS.
+        payload (dict): The JSON-serializable arguments of the handler.
+        idempotency_key (str | None): Key of the submission: a job submitted again by the same user with the
+            same key is not run twice.
+        user (User | None): The user submitting the job.
+    Returns:
+        tuple[Job, bool]: The job, with its status and result, and whether it was created by this call.
+    Raises:
+        ValueError: If the kind of job is unknown.
+    """
+    job, created = _insert(kind, payload, idempotency_key, user, status=Job.Statuses.RUNNING,
+                           claimed_by=uuid.uuid4().hex, claimed_at=timezone.now(), attempts=1)
+    if created and not run_job(job):
+        job.refresh_from_db(fields=["status", "result", "error"])
+    return job, created
+
+
+def release_expired_claims(now=None):
+    """
+    Give back to the queue the running jobs whose worker did not finish them within CLAIM_TIMEOUT.
+
+    Returns:
+        int: The number of released jobs.
+    """
+    now = now or timezone.now()
+    return (Job.objects
+            .filter(status=Job.Statuses.RUNNING, claimed_at__lt=now - CLAIM_TIMEOUT)
+            .update(status=Job.Statuses.PENDING, claimed_by="", claimed_at=None))
+
+
+def claim_jobs(limit=CLAIM_BATCH_SIZE):
+    """
+    Claim a batch of pending jobs for the current worker, oldest first.
+
+    On databases supporting it, the pending jobs are selected with `SELECT ... FOR UPDATE SKIP LOCKED`, so that
+    concurrent workers claim different jobs without waiting for each other. Elsewhere, e.g. on SQLite, the jobs
+    are claimed by a single UPDATE which only takes the jobs still pending: two workers never claim the same job.
+
+    Args:
+        limit (int): The maximum number of claimed jobs.
+    Returns:
+        list[Job]: The claimed jobs, marked as running.
+    """
+    token = uuid.uuid4().hex
+    now = timezone.now()
+    pending = Job.objects.filter(status=Job.Statuses.PENDING, available_at__lte=now).order_by("available_at", "id")
+    with transaction.atomic():
+        if connection.features.has_select_for_update_skip_locked:
+            ids = list(pending.select_for_update(skip_locked=True).values_list("id", flat=True)[:limit])
+        else:
+            ids = pending.values("id")[:limit]
+        (Job.objects
+         .filter(pk__in=ids, status=Job.Statuses.PENDING)
+         .update(status=Job.Statuses.RUNNING, claimed_by=token, claimed_at=now, attempts=F("attempts") + 1))
+    return list(Job.objects.filter(claimed_by=token, status=Job.Statuses.RUNNING).order_by("id"))
+
+
+def run_job(job):
+    """
+    Run a claimed job and record its outcome.
+
+    The handler runs in the transaction which marks the job as done, so that its changes and the outcome are
+    committed together: a worker stopped in between leaves neither of them, and the job runs again from the
+    start once its claim expires. A job given to another worker while it ran, after CLAIM_TIMEOUT, is not
+    overwritten and its changes are rolled back. A failed job is queued again after a delay growing with its
+    attempts, until it reaches its `max_attempts`.
+
+    Args:
+        job (Job): The job, as returned by `claim_jobs`. Once it succeeded, its status and result are set.
+    Returns:
+        bool: True if the job succeeded.
+    """
+    claimed = Job.objects.filter(pk=job.pk, claimed_by=job.claimed_by, status=Job.Statuses.RUNNING)
+    try:
+        with transaction.atomic():
+            result = JOB_HANDLERS[job.kind](job.payload)
+            if not claimed.update(status=Job.Statuses.DONE, result=result, error="", finished_at=timezone.now()):
+                raise ClaimLost(f"job {job.pk} was given to another worker")
+    except ClaimLost:
+        logger.warning("Job %s was given to another worker before it finished, its changes are rolled back", job.pk)
+        return False
+    except Exception:
+        logger.exception("Job %s failed (attempt %s of %s)", job.pk, job.attempts, job.max_attempts)
+        now = timezone.now()
+        if job.attempts >= job.max_attempts:
+            claimed.update(status=Job.Statuses.FAILED, error=traceback.format_exc(), finished_at=now)
+        else:
+            claimed.update(status=Job.Statuses.PENDING, error=traceback.format_exc(), claimed_by="", claimed_at=None,
+                           available_at=now + RETRY_DELAY * 2 ** (job.attempts - 1))
+        return False
+    job.status, job.result = Job.Statuses.DONE, result
+    return True
+
+
+def work(limit=CLAIM_BATCH_SIZE):
+    """
+    Give back the jobs of stopped workers, then claim a batch of jobs and run them one after the other.
+
+    The expired claims are released on every batch, so that a long-running worker takes over the jobs of a
+    worker which stopped in the meantime.
+
+    Args:
+        limit (int): The maximum number of jobs run.
+    Returns:
+        int: The number of jobs run, 0 when the queue is empty.
+    """
+    released = release_expired_claims()
+    if released:
+        logger.warning("%s jobs of stopped workers queued again", released)
+    jobs = claim_jobs(limit)
+    for job in jobs:
+        run_job(job)
+    return len(jobs)
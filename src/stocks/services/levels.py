@@ -0,0 +1,207 @@
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Case, F, Max, Sum, Value, When
+from django.db.models.functions import Greatest
+
+from stocks.models import StockLevel, StockMovement, StockOpeningBalance
+
+# Number of (product, warehouse) pairs folded per upsert
+UPSERT_BATCH_SIZE = 500
+
+# SQL expression of the signed quantity of a movement: positive for IN, negative for OUT
+SIGNED_QUANTITY = Case(
+    When(movement_type=StockMovement.Types.IN, then=F("quantity")),
+    default=-F("quantity"),
+)
+
+
+def _increment(product_id, warehouse_id, delta, movement_id):
+    """
+    Add a delta to an existing stock level row.
+
+    Args:
+        product_id (int): Identifier of the product.
+        warehouse_id (int): Identifier of the warehouse.
+        delta (int): Signed quantity to add to the level.
+        movement_id (int): Identifier of the most recent movement folded into the delta.
+    Returns:
+        int: The number of updated rows (0 when the level does not exist yet).
+    """
+    return StockLevel.objects.filter(product_id=product_id, warehouse_id=warehouse_id).update(
+        quantity=F("quantity") + delta,
+        last_movement_id=Greatest(F("last_movement_id"), Value(movement_id)),
+    )
+
+
+def _apply_delta(product_id, warehouse_id, delta, movement_id):
+    """
+    Fold a signed quantity into the stock level of a (product, warehouse) pair, creating the level if needed.
+
+    Args:
+        product_id (int): Identifier of the product.
+        warehouse_id (int): Identifier of the warehouse.
+        delta (int): Signed quantity to add to the level.
+        movement_id (int): Identifier of the most recent movement folded into the delta.
+    """
+    if _increment(product_id, warehouse_id, delta, movement_id):
+        return
+    try:
+        with transaction.atomic():
+            StockLevel.objects.create(product_id=product_id,
+                                      warehouse_id=warehouse_id,
+                                      quantity=delta,
+                                      last_movement_id=movement_id)
+    except IntegrityError:
+        # Another writer created the level in the meantime: it exists now, so increment it
+        _increment(product_id, warehouse_id, delta, movement_id)
+
+
+@transaction.atomic
+def apply_movement(movement):
+    """
+    Update the stock level ledger with a newly recorded stock movement.
+
+    Args:
+        movement (StockMovement): The saved movement, its stock is loaded if not already cached.
+    """
+    stock = movement.stock
+    _apply_delta(stock.product_id, stock.warehouse_id, movement.signed_quantity, movement.pk)
+
+
+def _upsert_deltas(deltas):
+    """
+    Fold the signed quantities of many (product, warehouse) pairs into the ledger, with one
+    `INSERT ... ON CONFLICT DO UPDATE` per batch of pairs: the levels are created or incremented by the database,
+    so concurrent writers never overwrite each other's changes.
+
+    Args:
+        deltas (dict[tuple[int, int], tuple[int, int]]): The signed quantity and the most recent movement id,
+            keyed by (product id, warehouse id).
+    """
+    table = connection.ops.quote_name(StockLevel._meta.db_table)
+    greatest = "MAX" if connection.vendor == "sqlite" else "GREATEST"
+    items = list(deltas.items())
+    with connection.cursor() as cursor:
+        for offset in range(0, len(items), UPSERT_BATCH_SIZE):
+            chunk = items[offset:offset + UPSERT_BATCH_SIZE]
+            values = ", ".join(["(%s, %s, %s, %s)"] * len(chunk))
+            cursor.execute(
+                f"INSERT INTO {table} (product_id, warehouse_id, quantity, last_movement_id) VALUES {values} "
+                f"ON CONFLICT (product_id, warehouse_id) DO UPDATE SET "
+                f"quantity = {table}.quantity + excluded.quantity, "
+                f"last_movement_id = {greatest}({table}.last_movement_id, excluded.last_movement_id)",
+                [value for (product_id, warehouse_id), (delta, last_id) in chunk
+                 for value in (product_id, warehouse_id, delta, last_id)],
+            )
+
+
+@transaction.atomic
+def apply_movements(movements):
+    """
+    Update the stock level ledger with a batch of saved stock movements.
+
+    The movements are first summed per (product, warehouse) pair so that each pair is written only once,
+    whatever the number of movements in the batch. On databases supporting upserts, the pairs are written
+    together, see `_upsert_deltas`, so that the cost does not grow with one round trip per pair.
+
+    Args:
+        movements (Iterable[StockMovement]): Saved movements whose stock is already cached.
+    """
+    deltas = {}
+    for movement in movements:
+        key = (movement.stock.product_id, movement.stock.warehouse_id)
+        delta, last_id = deltas.get(key, (0, 0))
+        deltas[key] = (delta + movement.signed_quantity, max(last_id, movement.pk))
+
+    if connection.features.supports_update_conflicts_with_target:
+        _upsert_deltas(deltas)
+        return
+    for (product_id, warehouse_id), (delta, last_id) in deltas.items():
+        _apply_delta(product_id, warehouse_id, delta, last_id)
+
+
+def get_level(product, warehouse):
+    """
+    Return the current quantity of a product in a warehouse.
+
+    Args:
+        product (Product | int): The product or its identifier.
+        warehouse (Warehouse | int): The warehouse or its identifier.
+    Returns:
+        int: The current quantity, 0 if nothing was ever recorded for the pair.
+    """
+    product_id = getattr(product, "pk", product)
+    warehouse_id = getattr(warehouse, "pk", warehouse)
+    quantity = (StockLevel.objects
+                .filter(product_id=product_id, warehouse_id=warehouse_id)
+                .values_list("quantity", flat=True)
+                .first())
+    return quantity or 0
+
+
+def replay_movements():
+    """
+    Compute the stock levels from the full stock movement history: the opening balances of the archived
+    movements plus the movements of the stock movement table.
+
+    Returns:
+        list[dict]: Rows with the keys `product_id`, `warehouse_id`, `quantity` and `last_movement_id`.
+    """
+    pair = {"product_id": F("stock__product_id"), "warehouse_id": F("stock__warehouse_id")}
+    levels = {}
+    for model, quantity in ((StockOpeningBalance, F("quantity")), (StockMovement, SIGNED_QUANTITY)):
+        last_id = "last_movement_id" if model is StockOpeningBalance else "id"
+        rows = (model.objects
+                .values(**pair)
+                .annotate(_quantity=Sum(quantity), _last_movement_id=Max(last_id))
+                .order_by())
+        for row in rows.iterator():
+            level = levels.setdefault((row["product_id"], row["warehouse_id"]),
+                                      {"product_id": row["product_id"], "warehouse_id": row["warehouse_id"],
+                                       "quantity": 0, "last_movement_id": 0})
+            level["quantity"] += row["_quantity"]
+            level["last_movement_id"] = max(level["last_movement_id"], row["_last_movement_id"])
+    return list(levels.values())
+
+
+@transaction.atomic
+def rebuild_levels(batch_size=1000):
+    """
+    Replace the whole stock level ledger by a full replay of the stock movements.
+
+    Args:
+        batch_size (int): Number of levels inserted per query.
+    Returns:
+        int: The number of levels written.
+    """
+    StockLevel.objects.all().delete()
+    batch = []
+    count = 0
+    for row in replay_movements():
+        batch.append(StockLevel(**row))
+        if len(batch) >= batch_size:
+            StockLevel.objects.bulk_create(batch)
+            count += len(batch)
+            batch = []
+    StockLevel.objects.bulk_create(batch)
+    return count + len(batch)
+
+
+def verify_levels():
+    """
+    Compare the stock level ledger with a full replay of the stock movements.
+
+    Returns:
+        list[tuple]: The mismatching pairs as `(product_id, warehouse_id, ledger_quantity, replayed_quantity)`,
+        a missing side being reported as None.
+    """
+    ledger = {(level["product_id"], level["warehouse_id"]): level["quantity"]
+              for level in StockLevel.objects.values("product_id", "warehouse_id", "quantity")}
+    mismatches = []
+    for row in replay_movements():
+        key = (row["product_id"], row["warehouse_id"])
+        stored = ledger.pop(key, None)
+        if stored != row["quantity"]:
+            mismatches.append((*key, stored, row["quantity"]))
+    # Levels left in the ledger have no movement at all
+    mismatches.extend((*key, stored, None) for key, stored in ledger.items() if stored)
+    return mismatches
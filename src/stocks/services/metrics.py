@@ -0,0 +1,223 @@
+import bisect
+import math
+import threading
+from collections import defaultdict, deque
+
+# Upper bounds in seconds of the buckets of the request latency histograms
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Upper bounds of the buckets of the query count histograms
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500)
+# A request executing the same SQL template this number of times or more is flagged as an N+1 pattern
+N_PLUS_ONE_THRESHOLD = 10
+# Label of the requests which did not resolve to a view, so that unknown URLs do not create series
+UNRESOLVED_VIEW = "<unresolved>"
+# Number of recorded requests buffered before they are added to the aggregates
+FLUSH_SIZE = 1000
+
+
+class Histogram:
+    """
+    Cumulative histogram of observed values, in the Prometheus layout: a count per upper bound, a sum and a count.
+    """
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        # Count of the values of each bucket, the last one holding the values above every bound
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        """
+        Count a value in its bucket.
+        """
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self):
+        """
+        Return the number of values lower or equal to each bound, then the total as the "+Inf" bucket.
+
+        Returns:
+            list[tuple[float, int]]: The bounds and their cumulative counts.
+        """
+        total = 0
+        rows = []
+        for bound, count in zip((*self.buckets, math.inf), self.counts):
+            total += count
+            rows.append((bound, total))
+        return rows
+
+
+class ViewMetrics:
+    """
+    Aggregates of the requests served by a view.
+    """
+
+    def __init__(self):
+        self.latency = Histogram(LATENCY_BUCKETS)
+        self.queries = Histogram(QUERY_BUCKETS)
+        # Total time spent executing SQL, in seconds
+        self.sql_time = 0.0
+        # Number of requests flagged as N+1 patterns
+        self.n_plus_one = 0
+        # Number of requests by status code
+        self.statuses = defaultdict(int)
+
+
+class MetricsRegistry:
+    """
+    Metrics of the requests served by the current process, keyed by view and shared by its threads.
+
+    Each process serving the site holds its own registry, as Prometheus expects from the targets it scrapes.
+    The requests are buffered then aggregated by batches of FLUSH_SIZE or when the metrics are read, so that
+    recording a request is a single append rather than a lock and a few histogram updates.
+    """
+
+    def __init__(self):
+        self._views = {}
+        self._lock = threading.Lock()
+        # Requests recorded since the last flush, appending to and popping from a deque being thread-safe
+        self._pending = deque()
+
+    def record(self, view, status, duration, queries, sql_time, n_plus_one):
+        """
+        Record a served request, aggregated on the next flush.
+
+        Args:
+            view (str): The name of the view, see UNRESOLVED_VIEW.
+            status (int): The status code of the response.
+            duration (float): The time spent serving the request, in seconds.
+            queries (int): The number of SQL queries executed.
+            sql_time (float): The time spent executing them, in seconds.
+            n_plus_one (bool): Whether the request was flagged as an N+1 pattern.
+        """
+        self._pending.append((view, status, duration, queries, sql_time, n_plus_one))
+        if len(self._pending) >= FLUSH_SIZE:
+            self.flush()
+
+    def flush(self):
+        """
+        Add the buffered requests to the aggregates of their views.
+        """
+        with self._lock:
+            pending = self._pending
+            for _ in range(len(pending)):
+                view, status, duration, queries, sql_time, n_plus_one = pending.popleft()
+                metrics = self._views.get(view)
+                if metrics is None:
+                    metrics = self._views[view] = ViewMetrics()
+                metrics.latency.observe(duration)
+                metrics.queries.observe(queries)
+                metrics.sql_time += sql_time
+                metrics.n_plus_one += n_plus_one
+                metrics.statuses[status] += 1
+
+    def clear(self):
+        """
+        Forget every recorded request.
+        """
+        with self._lock:
+            self._pending.clear()
+            self._views.clear()
+
+    def __getitem__(self, view):
+        self.flush()
+        return self._views[view]
+
+    def __contains__(self, view):
+        self.flush()
+        return view in self._views
+
+    def render(self):
+        """
+        Render the metrics in the Prometheus text exposition format.
+
+        Returns:
+            str: The metrics, one family after the other.
+        """
+        self.flush()
+        with self._lock:
+            views = sorted(self._views.items())
+            lines = []
+            _render_histogram(lines, "stockmaster_request_duration_seconds", "Time spent serving the requests.",
+                              [(view, metrics.latency) for view, metrics in views])
+            _render_histogram(lines, "stockmaster_request_queries", "SQL queries executed per request.",
+                              [(view, metrics.queries) for view, metrics in views])
+            lines += ["# HELP stockmaster_request_sql_seconds_total Time spent executing SQL queries.",
+                      "# TYPE stockmaster_request_sql_seconds_total counter"]
+            lines += [f'stockmaster_request_sql_seconds_total{{view="{_escape(view)}"}} {metrics.sql_time!r}'
+                      for view, metrics in views]
+            lines += ["# HELP stockmaster_request_n_plus_one_total Requests repeating a SQL query "
+                      f"{N_PLUS_ONE_THRESHOLD} times or more.",
+                      "# TYPE stockmaster_request_n_plus_one_total counter"]
+            lines += [f'stockmaster_request_n_plus_one_total{{view="{_escape(view)}"}} {metrics.n_plus_one}'
+                      for view, metrics in views]
+            lines += ["# HELP stockmaster_requests_total Requests served, by status code.",
+                      "# TYPE stockmaster_requests_total counter"]
+            lines += [f'stockmaster_requests_total{{view="{_escape(view)}",status="{status}"}} {count}'
+                      for view, metrics in views for status, count in sorted(metrics.statuses.items())]
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value):
+    """
+    Escape a label value of the Prometheus text format.
+    """
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _render_histogram(lines, name, description, histograms):
+    """
+    Append the lines of a histogram family, one histogram per view, to the rendered metrics.
+    """
+    lines += [f"# HELP {name} {description}", f"# TYPE {name} histogram"]
+    for view, histogram in histograms:
+        label = f'view="{_escape(view)}"'
+        for bound, count in histogram.cumulative():
+            lines.append(f'{name}_bucket{{{label},le="{"+Inf" if bound == math.inf else bound}"}} {count}')
+        lines.append(f"{name}_sum{{{label}}} {histogram.sum!r}")
+        lines.append(f"{name}_count{{{label}}} {histogram.count}")
+
+
+# Metrics of the requests served by this process, recorded by the RequestMetricsMiddleware
+REGISTRY = MetricsRegistry()
+
+
+class QueryRecorder:
+    """
+    Database execute wrapper counting the queries of a request and timing them, see `connection.execute_wrapper`.
+
+    The queries are grouped by SQL template: Django keeps the parameters out of the SQL, so a query repeated
+    with other values, e.g. in a loop over the rows of a previous query, has the same text.
+    """
+
+    __slots__ = ("clock", "count", "time", "templates")
+
+    def __init__(self, clock):
+        self.clock = clock
+        self.count = 0
+        self.time = 0.0
+        self.templates = {}
+
+    def __call__(self, execute, sql, params, many, context):
+        start = self.clock()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.time += self.clock() - start
+            self.count += 1
+            self.templates[sql] = self.templates.get(sql, 0) + 1
+
+    def repeated(self, threshold=N_PLUS_ONE_THRESHOLD):
+        """
+        Return the SQL templates executed at least `threshold` times, the most repeated first.
+
+        Returns:
+            list[tuple[str, int]]: The templates and their number of executions.
+        """
+        if self.count < threshold:
+            return []
+        return sorted(((sql, count) for sql, count in self.templates.items() if count >= threshold),
+                      key=lambda item: -item[1])
@@ -0,0 +1,287 @@
+from functools import reduce
+from operator import or_
+
+from django.db import IntegrityError, transaction
+from django.db.models import Case, F, IntegerField, Q, Value, When
+from django.db.models.lookups import GreaterThanOrEqual
+from django.utils import timezone
+
+from stocks.forms import StockMovementRowForm
+from stocks.models import Stock, StockMovement
+from stocks.services.alerts import evaluate_alerts
+from stocks.services.levels import apply_movements
+
+# Maximum number of rows accepted in a single ingestion batch
+MAX_BATCH_SIZE = 5000
+# Number of times a batch of stock changes is attempted when concurrent writers keep changing its stocks
+MAX_ATTEMPTS = 5
+# Number of stocks changed per UPDATE, each stock adding parameters to the query
+UPDATE_BATCH_SIZE = 250
+
+
+class InsufficientStock(Exception):
+    """
+    Raised when an outgoing movement would take more than what is left in a stock.
+    """
+
+
+class StockConflict(Exception):
+    """
+    Raised when stocks were changed by a concurrent writer since they were read.
+    """
+
+
+def change_quantities(deltas):
+    """
+    Add signed quantities to the packaging quantity of stocks, as long as no stock goes below 0.
+
+    The quantities are added by the database with F-expressions, so concurrent writers never overwrite each
+    other's changes and no row is locked before being written. The stocks which would go below 0 are left
+    untouched: the caller rolls its transaction back when fewer stocks than requested were changed.
+    The version of every changed stock is incremented.
+
+    Args:
+        deltas (dict[int, int]): The signed quantity to add, keyed by stock id.
+    Returns:
+        int: The number of changed stocks.
+    """
+    now = timezone.now()
+    items = list(deltas.items())
+    changed = 0
+    for offset in range(0, len(items), UPDATE_BATCH_SIZE):
+        chunk = dict(items[offset:offset + UPDATE_BATCH_SIZE])
+        delta = Case(*[When(pk=pk, then=Value(value)) for pk, value in chunk.items()], output_field=IntegerField())
+        changed += (Stock.objects
+                    .filter(GreaterThanOrEqual(F("pack_quantity") + delta, 0), pk__in=chunk)
+                    .update(pack_quantity=F("pack_quantity") + delta, version=F("version") + 1, last_updated=now))
+    return changed
+
+
+def set_quantities(stocks):
+    """
+    Write the packaging quantity of stocks, as long as they were not changed since they were read.
+
+    Each stock is only written if its version is still the one read with it, so that a quantity computed from
+    a stale read never overwrites a concurrent change. The version of the instances is incremented when all of
+    them are written.
+
+    Args:
+        stocks (list[Stock]): The stocks with their new packaging quantity and the version they were read at.
+    Raises:
+        StockConflict: If a stock was changed since it was read, the caller rolls its transaction back then.
+    """
+    now = timezone.now()
+    changed = 0
+    for offset in range(0, len(stocks), UPDATE_BATCH_SIZE):
+        chunk = stocks[offset:offset + UPDATE_BATCH_SIZE]
+        quantity = Case(*[When(pk=stock.pk, then=Value(stock.pack_quantity)) for stock in chunk],
+                        output_field=IntegerField())
+        changed += (Stock.objects
+                    .filter(reduce(or_, [Q(pk=stock.pk, version=stock.version) for stock in chunk]))
+                    .update(pack_quantity=quantity, version=F("version") + 1, last_updated=now))
+    if changed != len(stocks):
+        raise StockConflict(f"{len(stocks) - changed} stocks changed since they were read")
+    for stock in stocks:
+        stock.version += 1
+        stock.last_updated = now
+
+
+def retry_on_conflict(function, *args, attempts=MAX_ATTEMPTS, **kwargs):
+    """
+    Run a function in a transaction, from the start again when it raises StockConflict.
+
+    The function reads the stocks it changes within the transaction, so that each attempt works on fresh data.
+
+    Args:
+        function (Callable): The function to run.
+        *args: The positional arguments of the function.
+        attempts (int): The number of attempts before giving up.
+        **kwargs: The keyword arguments of the function.
+    Returns:
+        The value returned by the function.
+    Raises:
+        StockConflict: If every attempt conflicted with a concurrent writer.
+    """
+    for attempt in range(attempts):
+        try:
+            with transaction.atomic():
+                return function(*args, **kwargs)
+        except StockConflict:
+            if attempt == attempts - 1:
+                raise
+
+
+def _apply_to_stock(stock, movement_type, quantity):
+    """
+    Apply a movement to the in-memory quantity of a stock.
+
+    Args:
+        stock (Stock): The stock to update.
+        movement_type (str): `StockMovement.Types.IN` or `StockMovement.Types.OUT`.
+        quantity (int): The number of packaging units moved.
+    Raises:
+        InsufficientStock: If an outgoing movement exceeds the packaging quantity left.
+    """
+    if movement_type == StockMovement.Types.OUT:
+        if quantity > stock.pack_quantity:
+            raise InsufficientStock(f"only {stock.pack_quantity} left in stock {stock.pk}")
+        quantity = -quantity
+    stock.pack_quantity += quantity
+
+
+@transaction.atomic
+def record_movement(stock, movement_type, quantity, reason="", key=None):
+    """
+    Record a single stock movement and update the quantity of its stock.
+
+    The quantity is changed with a single guarded UPDATE, see `change_quantities`, so that concurrent movements
+    of the same stock are all counted. The in-memory quantity of the stock is moved by the same amount. Two
+    concurrent calls with the same idempotency key may both find it unrecorded: the unique constraint on the key
+    rejects the second insert, and the second call returns the movement of the first one.
+
+    Args:
+        stock (Stock): The moved stock.
+        movement_type (str): `StockMovement.Types.IN` or `StockMovement.Types.OUT`.
+        quantity (int): The number of packaging units moved.
+        reason (str): Optional reason of the movement.
+        key (str | None): Optional idempotency key: if a movement was already recorded with it, that movement
+            is returned and nothing is recorded.
+    Returns:
+        StockMovement: The recorded movement.
+    Raises:
+        InsufficientStock: If an outgoing movement exceeds the packaging quantity left.
+    """
+    if key is not None:
+        recorded = StockMovement.objects.filter(idempotency_key=key).first()
+        if recorded is not None:
+            return recorded
+    delta = quantity if movement_type == StockMovement.Types.IN else -quantity
+    try:
+        # A savepoint, so that the quantity change is undone when the key turns out to be recorded
+        with transaction.atomic():
+            if not change_quantities({stock.pk: delta}):
+                stock.refresh_from_db(fields=["pack_quantity", "version"])
+                raise InsufficientStock(f"only {stock.pack_quantity} left in stock {stock.pk}")
+            movement = StockMovement.objects.create(stock=stock, movement_type=movement_type, quantity=quantity,
+                                                    reason=reason, idempotency_key=key)
+    except IntegrityError:
+        if key is None:
+            raise
+        # A concurrent retry recorded the key since it was checked: its movement is the recorded one
+        return StockMovement.objects.get(idempotency_key=key)
+    stock.pack_quantity += delta
+    return movement
+
+
+def _record_rows(valid, batch_size, warehouses):
+    """
+    Record the validated rows of an ingestion batch, see `ingest_movements`.
+
+    Args:
+        valid (list[tuple[int, dict]]): The index and cleaned data of the valid rows.
+        batch_size (int): Number of rows written per query.
+        warehouses (Iterable[int] | None): The warehouses whose stocks may be moved, None for all of them.
+    Returns:
+        dict[int, dict]: The result of each valid row, keyed by its index.
+    Raises:
+        StockConflict: If a stock was emptied by a concurrent writer since it was read.
+    """
+    stock_ids = {data["stock"] for _, data in valid}
+    stocks = Stock.objects.all()
+    if warehouses is not None:
+        stocks = stocks.filter(warehouse_id__in=warehouses)
+    stocks = stocks.in_bulk(stock_ids)
+
+    keys = {data["key"] for _, data in valid if data["key"]}
+    recorded = dict(StockMovement.objects.filter(idempotency_key__in=keys).values_list("idempotency_key", "id"))
+
+    results = {}
+    movements = []
+    indexes = []
+    duplicates = []
+    deltas = {}
+    for index, data in valid:
+        key = data["key"] or None
+        if key in recorded:
+            # Sent again, e.g. by a client retrying: the movement is already recorded
+            duplicates.append((index, key))
+            continue
+        stock = stocks.get(data["stock"])
+        if stock is None:
+            results[index] = {"index": index, "status": "error",
+                              "errors": {"stock": [{"message": "Unknown stock.", "code": "invalid"}]}}
+            continue
+        try:
+            _apply_to_stock(stock, data["movement_type"], data["quantity"])
+        except InsufficientStock as exc:
+            results[index] = {"index": index, "status": "error",
+                              "errors": {"quantity": [{"message": str(exc), "code": "insufficient"}]}}
+            continue
+        signed = data["quantity"] if data["movement_type"] == StockMovement.Types.IN else -data["quantity"]
+        deltas[stock.pk] = deltas.get(stock.pk, 0) + signed
+        movements.append(StockMovement(stock=stock,
+                                       movement_type=data["movement_type"],
+                                       quantity=data["quantity"],
+                                       reason=data["reason"],
+                                       idempotency_key=key))
+        indexes.append(index)
+        if key is not None:
+            # A key repeated within the batch is recorded once
+            recorded[key] = movements[-1]
+
+    if movements:
+        if change_quantities(deltas) != len(deltas):
+            raise StockConflict("stocks of the batch were emptied concurrently")
+        try:
+            with transaction.atomic():
+                StockMovement.objects.bulk_create(movements, batch_size=batch_size)
+        except IntegrityError:
+            # A concurrent batch recorded one of the keys: the next attempt sees it as a duplicate
+            raise StockConflict("idempotency keys of the batch were recorded concurrently")
+        apply_movements(movements)
+        evaluate_alerts({(movement.stock.product_id, movement.stock.warehouse_id) for movement in movements})
+
+    for index, movement in zip(indexes, movements):
+        results[index] = {"index": index, "status": "created", "id": movement.pk}
+    for index, key in duplicates:
+        movement = recorded[key]
+        results[index] = {"index": index, "status": "created", "id": getattr(movement, "pk", movement),
+                          "duplicate": True}
+    return results
+
+
+def ingest_movements(rows, batch_size=1000, warehouses=None):
+    """
+    Validate and record a batch of stock movements in a single transaction.
+
+    The stocks of the batch are loaded in one query, the valid movements are inserted with `bulk_create` and
+    the net change of each stock is written with a single guarded UPDATE, so the cost of a batch does not grow
+    with one round trip per row and no stock is locked while the batch is validated. When a concurrent writer
+    emptied a stock in the meantime, the batch is validated again against fresh quantities, see
+    `retry_on_conflict`. Invalid rows are reported and skipped, the other rows are recorded.
+
+    Args:
+        rows (list[dict]): Movements with the keys `stock`, `movement_type`, `quantity`, optional `reason` and
+            optional `key`. A row whose key was already recorded is not recorded again.
+        batch_size (int): Number of rows written per query.
+        warehouses (Iterable[int] | None): The warehouses whose stocks may be moved, e.g. the ones the user may
+            see, None for all of them. The stocks of the other warehouses are reported as unknown.
+    Returns:
+        list[dict]: One result per input row, in the input order, with a `status` of "created" and the
+        movement `id` (and `duplicate` set for a key already recorded), or a `status` of "error" and the
+        `errors` found.
+    Raises:
+        StockConflict: If the stocks kept being emptied concurrently, nothing is recorded then.
+    """
+    results = [None] * len(rows)
+    valid = []
+    for index, row in enumerate(rows):
+        form = StockMovementRowForm(row if isinstance(row, dict) else {})
+        if form.is_valid():
+            valid.append((index, form.cleaned_data))
+        else:
+            results[index] = {"index": index, "status": "error", "errors": form.errors.get_json_data()}
+
+    for index, result in retry_on_conflict(_record_rows, valid, batch_size, warehouses).items():
+        results[index] = result
+    return results
@@ -0,0 +1,113 @@
+from django.db.models import F
+
+from stocks.models import Stock, StockMovement
+from stocks.services.alerts import evaluate_alerts
+from stocks.services.levels import apply_movements
+from stocks.services.movements import InsufficientStock, StockConflict, change_quantities, retry_on_conflict
+
+# First expired, first out: the stocks without expiration date go last, then the oldest receptions go first
+FEFO_ORDER = [F("expiration_date").asc(nulls_last=True), "reception_date", "id"]
+
+
+def pickable_stocks(product, warehouse):
+    """
+    Return the non-empty stocks of a product in a warehouse, in picking order.
+
+    Args:
+        product (Product | int): The picked product or its identifier.
+        warehouse (Warehouse | int): The warehouse where the product is picked or its identifier.
+    Returns:
+        QuerySet: The stocks in first expired, first out order.
+    """
+    return (Stock.objects
+            .filter(product=product, warehouse=warehouse, pack_quantity__gt=0)
+            .order_by(*FEFO_ORDER))
+
+
+def allocate(stocks, quantity):
+    """
+    Split a requested quantity over stocks, taking each stock in turn until the request is fulfilled.
+
+    Args:
+        stocks (Iterable[Stock]): The stocks in picking order.
+        quantity (int): The number of packaging units requested.
+    Returns:
+        list[tuple[Stock, int]]: The stocks to take from with the quantity taken from each.
+    Raises:
+        InsufficientStock: If the stocks do not hold the requested quantity.
+    """
+    allocations = []
+    remaining = quantity
+    for stock in stocks:
+        if remaining == 0:
+            break
+        taken = min(stock.pack_quantity, remaining)
+        allocations.append((stock, taken))
+        remaining -= taken
+    if remaining:
+        raise InsufficientStock(f"{quantity - remaining} available out of {quantity} requested")
+    return allocations
+
+
+def plan_pick(product, warehouse, quantity):
+    """
+    Preview the allocation of a pick without locking nor changing anything.
+
+    Args:
+        product (Product | int): The picked product or its identifier.
+        warehouse (Warehouse | int): The warehouse where the product is picked or its identifier.
+        quantity (int): The number of packaging units requested.
+    Returns:
+        list[tuple[Stock, int]]: The stocks to take from, in picking order, with the quantity taken from each.
+    Raises:
+        InsufficientStock: If the warehouse does not hold the requested quantity.
+    """
+    return allocate(pickable_stocks(product, warehouse), quantity)
+
+
+def _take(product, warehouse, quantity, reason):
+    """
+    Allocate a pick and record its OUT movements, see `pick`.
+
+    Raises:
+        StockConflict: If an allocated stock was emptied by a concurrent writer since it was read.
+    """
+    allocations = allocate(pickable_stocks(product, warehouse), quantity)
+    if change_quantities({stock.pk: -taken for stock, taken in allocations}) != len(allocations):
+        raise StockConflict("allocated stocks were emptied concurrently")
+
+    movements = []
+    for stock, taken in allocations:
+        stock.pack_quantity -= taken
+        movements.append(StockMovement(stock=stock, movement_type=StockMovement.Types.OUT, quantity=taken,
+                                       reason=reason))
+    StockMovement.objects.bulk_create(movements)
+    apply_movements(movements)
+    evaluate_alerts({(stock.product_id, stock.warehouse_id) for stock, _ in allocations})
+    return movements
+
+
+def pick(product, warehouse, quantity, reason="picking"):
+    """
+    Take a quantity of a product from a warehouse, first expired first out, and record the OUT movements.
+
+    The allocated stocks are taken from with a single guarded UPDATE instead of being locked while the pick is
+    planned: when a concurrent pick emptied one of them in the meantime, the pick is planned again from fresh
+    quantities, see `retry_on_conflict`. The number of queries does not depend on the number of stocks the pick
+    is spread over.
+
+    Args:
+        product (Product | int): The picked product or its identifier.
+        warehouse (Warehouse | int): The warehouse where the product is picked or its identifier.
+        quantity (int): The number of packaging units requested, greater than 0.
+        reason (str): The reason recorded on the movements.
+    Returns:
+        list[StockMovement]: The OUT movements recorded, in picking order.
+    Raises:
+        InsufficientStock: If the warehouse does not hold the requested quantity, nothing is recorded then.
+        StockConflict: If the stocks kept being emptied concurrently, nothing is recorded then.
+        ValueError: If the quantity is not greater than 0.
+    """
+    if quantity <= 0:
+        raise ValueError("The picked quantity must be greater than 0.")
+    return retry_on_conflict(_take, product, warehouse, quantity, reason)
@@ -0,0 +1,251 @@
+import datetime
+import math
+from collections import defaultdict
+from dataclasses import dataclass
+
+from django.db.models import Case, F, IntegerField, Max, Min, Q, Sum, Value, When
+from django.utils import timezone
+
+from stocks.models import Stock, StockMovement, Warehouse
+from stocks.services.alerts import evaluate_alerts
+from stocks.services.levels import apply_movements
+from stocks.services.movements import StockConflict, change_quantities, retry_on_conflict
+from stocks.services.picking import FEFO_ORDER
+from stocks.services.scanning import invalidate_warehouses
+
+# Number of days of OUT movements giving the recent consumption of a kanban
+CONSUMPTION_DAYS = 14
+# Number of days of recent consumption a replenishment covers, on top of the threshold
+COVER_DAYS = 7
+# Fields of the supply stocks read by the transfers, copied to the kanban stocks they create
+SUPPLY_FIELDS = ["product_id", "warehouse_id", "pack_quantity", "threshold", "batch", "unit_quantity", "stock_unit",
+                 "stock_packaging", "expiration_date", "reception_date", "unit_cost"]
+
+
+@dataclass(frozen=True)
+class KanbanNeed:
+    """
+    Quantity of a product missing in a kanban.
+    """
+    product_id: int
+    kanban_id: int
+    # Packaging units held by the kanban, and its alert threshold
+    on_hand: int
+    threshold: int
+    # Packaging units to bring to reach the threshold plus the coverage of the recent consumption
+    quantity: int
+    # Shelving of the product in the kanban, given to the stocks created by the transfers
+    shelving: str
+
+
+@dataclass(frozen=True)
+class Transfer:
+    """
+    Packaging units to move from a supply stock of the store or the main store to a kanban.
+    """
+    source: Stock
+    kanban_id: int
+    quantity: int
+
+
+def kanban_needs(building, days=CONSUMPTION_DAYS, cover_days=COVER_DAYS, now=None):
+    """
+    Compute the quantities missing in every kanban of a building, in two grouped queries.
+
+    A product of a kanban needs replenishing when its packaging quantity is at or below its threshold, the
+    highest threshold of its stocks. It is then replenished up to the threshold plus `cover_days` of its
+    consumption over the last `days` days. Only the products at or below their threshold leave the database.
+
+    Args:
+        building (str): The building of the kanbans.
+        days (int): Number of days of OUT movements averaged into the daily consumption.
+        cover_days (int): Number of days of consumption covered by a replenishment.
+        now (datetime | None): The end of the consumption period, `timezone.now()` if None.
+    Returns:
+        list[KanbanNeed]: The products to replenish, most urgent first: furthest below their threshold.
+    """
+    kanbans = Warehouse.objects.filter(building=building, warehouse_type=Warehouse.Types.KANBAN)
+    low = (Stock.objects
+           .filter(warehouse__in=kanbans)
+           .values("product_id", "warehouse_id")
+           .annotate(on_hand=Sum("pack_quantity"), threshold=Max("threshold"), shelving=Min("shelving"))
+           .filter(on_hand__lte=F("threshold"))
+           .order_by()
+           .values_list("product_id", "warehouse_id", "on_hand", "threshold", "shelving"))
+    low = {(product_id, kanban_id): row for product_id, kanban_id, *row in low}
+    if not low:
+        return []
+
+    since = (now or timezone.now()) - datetime.timedelta(days=days)
+    consumption = dict.fromkeys(low, 0)
+    rows = (StockMovement.objects
+            .filter(stock__warehouse__in=kanbans, movement_type=StockMovement.Types.OUT, timestamp__gte=since)
+            .values_list("stock__product_id", "stock__warehouse_id")
+            .annotate(quantity=Sum("quantity"))
+            .order_by())
+    for product_id, kanban_id, quantity in rows:
+        if (product_id, kanban_id) in consumption:
+            consumption[product_id, kanban_id] = quantity
+
+    needs = []
+    for (product_id, kanban_id), (on_hand, threshold, shelving) in low.items():
+        target = threshold + math.ceil(consumption[product_id, kanban_id] * cover_days / days)
+        if target > on_hand:
+            needs.append(KanbanNeed(product_id, kanban_id, on_hand, threshold, target - on_hand, shelving))
+    needs.sort(key=lambda need: (need.on_hand - need.threshold, need.kanban_id, need.product_id))
+    return needs
+
+
+def supply_stocks(building, product_ids):
+    """
+    Return the stocks the kanbans of a building are replenished from, in allocation order, in one query.
+
+    The store of the building comes first, then the main store, each in first expired first out order.
+    A store stock only gives what exceeds its threshold, so that the store keeps its own safety stock. Only the
+    stocks of the needed products are read, with the fields the transfers use.
+
+    Args:
+        building (str): The building of the kanbans.
+        product_ids (Iterable[int]): The identifiers of the products the kanbans need.
+    Returns:
+        dict[int, list[tuple[Stock, int]]]: The stocks of each product with the quantity they can give.
+    """
+    is_store = Q(warehouse__building=building, warehouse__warehouse_type=Warehouse.Types.STORE)
+    stocks = (Stock.objects
+              .filter(is_store | Q(warehouse__warehouse_type=Warehouse.Types.MAIN), pack_quantity__gt=0,
+                      product_id__in=set(product_ids))
+              .annotate(level=Case(When(is_store, then=Value(0)), default=Value(1), output_field=IntegerField()))
+              .only(*SUPPLY_FIELDS)
+              .order_by("product_id", "level", *FEFO_ORDER))
+    supply = defaultdict(list)
+    for stock in stocks:
+        available = stock.pack_quantity - stock.threshold if stock.level == 0 else stock.pack_quantity
+        if available > 0:
+            supply[stock.product_id].append((stock, available))
+    return supply
+
+
+def plan_replenishment(building, days=CONSUMPTION_DAYS, cover_days=COVER_DAYS, now=None):
+    """
+    Plan the transfers replenishing every kanban of a building, without changing anything.
+
+    The needs, see `kanban_needs`, are served most urgent first from the supply stocks, see `supply_stocks`.
+    When the supply runs out, the remaining needs of the product are left unserved.
+
+    Args:
+        building (str): The building of the kanbans.
+        days (int): Number of days of OUT movements averaged into the daily consumption.
+        cover_days (int): Number of days of consumption covered by a replenishment.
+        now (datetime | None): The end of the consumption period, `timezone.now()` if None.
+    Returns:
+        tuple[list[Transfer], list[KanbanNeed]]: The transfers, and the needs they serve.
+    """
+    needs = kanban_needs(building, days, cover_days, now)
+    if not needs:
+        return [], []
+    supply = supply_stocks(building, {need.product_id for need in needs})
+    # Position in the supply list of each product, and quantity still available in the stock at that position
+    cursor = {product_id: [0, stocks[0][1]] for product_id, stocks in supply.items()}
+
+    transfers = []
+    for need in needs:
+        stocks = supply.get(need.product_id)
+        if not stocks:
+            continue
+        position = cursor[need.product_id]
+        missing = need.quantity
+        while missing and position[0] < len(stocks):
+            taken = min(missing, position[1])
+            transfers.append(Transfer(stocks[position[0]][0], need.kanban_id, taken))
+            missing -= taken
+            position[1] -= taken
+            if not position[1]:
+                position[0] += 1
+                position[1] = stocks[position[0]][1] if position[0] < len(stocks) else 0
+    return transfers, needs
+
+
+def _destination_stocks(transfers, needs):
+    """
+    Find or create the kanban stock receiving each transfer: the stock of the same product and batch.
+
+    Returns:
+        dict[tuple[int, int, str], Stock]: The stocks keyed by (product id, kanban id, batch).
+    """
+    keys = {(transfer.source.product_id, transfer.kanban_id, transfer.source.batch) for transfer in transfers}
+    existing = (Stock.objects
+                .filter(warehouse_id__in={kanban_id for _, kanban_id, _ in keys},
+                        product_id__in={product_id for product_id, _, _ in keys},
+                        batch__in={batch for _, _, batch in keys})
+                .only("id", "product_id", "warehouse_id", "batch"))
+    stocks = {}
+    for stock in existing:
+        stocks.setdefault((stock.product_id, stock.warehouse_id, stock.batch), stock)
+
+    shelvings = {(need.product_id, need.kanban_id): need.shelving for need in needs}
+    created = {}
+    for transfer in transfers:
+        source = transfer.source
+        key = (source.product_id, transfer.kanban_id, source.batch)
+        if key not in stocks and key not in created:
+            created[key] = Stock(product_id=source.product_id, warehouse_id=transfer.kanban_id, batch=source.batch,
+                                 shelving=shelvings[source.product_id, transfer.kanban_id], pack_quantity=0,
+                                 unit_quantity=source.unit_quantity, stock_unit=source.stock_unit,
+                                 stock_packaging=source.stock_packaging, expiration_date=source.expiration_date,
+                                 reception_date=source.reception_date, threshold=0,
+                                 unit_cost=source.unit_cost)
+    Stock.objects.bulk_create(created.values())
+    invalidate_warehouses({stock.warehouse_id for stock in created.values()})
+    return stocks | created
+
+
+def _replenish(building, days, cover_days, reason):
+    """
+    Plan and record the transfers of a building, see `replenish`.
+
+    Raises:
+        StockConflict: If a supply stock was emptied by a concurrent writer since it was read.
+    """
+    transfers, needs = plan_replenishment(building, days, cover_days)
+    if not transfers:
+        return []
+    destinations = _destination_stocks(transfers, needs)
+
+    deltas = defaultdict(int)
+    movements = []
+    for transfer in transfers:
+        source = transfer.source
+        destination = destinations[source.product_id, transfer.kanban_id, source.batch]
+        deltas[source.pk] -= transfer.quantity
+        deltas[destination.pk] += transfer.quantity
+        movements.append(StockMovement(stock=source, movement_type=StockMovement.Types.OUT,
+                                       quantity=transfer.quantity, reason=reason))
+        movements.append(StockMovement(stock=destination, movement_type=StockMovement.Types.IN,
+                                       quantity=transfer.quantity, reason=reason))
+    if change_quantities(deltas) != len(deltas):
+        raise StockConflict("supply stocks were emptied concurrently")
+    StockMovement.objects.bulk_create(movements, batch_size=1000)
+    apply_movements(movements)
+    evaluate_alerts({(movement.stock.product_id, movement.stock.warehouse_id) for movement in movements})
+    return movements
+
+
+def replenish(building, days=CONSUMPTION_DAYS, cover_days=COVER_DAYS, reason="replenishment"):
+    """
+    Replenish every kanban of a building from the store of the building, then from the main store.
+
+    Each transfer is recorded as an OUT movement of the supply stock and an IN movement of the kanban stock of
+    the same product and batch, created if needed, all in one transaction. When a concurrent writer empties a
+    supply stock meanwhile, the plan is computed again, see `retry_on_conflict`.
+
+    Args:
+        building (str): The building of the kanbans.
+        days (int): Number of days of OUT movements averaged into the daily consumption.
+        cover_days (int): Number of days of consumption covered by a replenishment.
+        reason (str): The reason recorded on the movements.
+    Returns:
+        list[StockMovement]: The recorded movements, each OUT movement followed by its IN movement.
+    Raises:
+        StockConflict: If the supply stocks kept being emptied concurrently, nothing is recorded then.
+    """
+    return retry_on_conflict(_replenish, building, days, cover_days, reason)
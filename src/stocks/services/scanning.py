@@ -0,0 +1,203 @@
+import threading
+from collections import OrderedDict, defaultdict
+from dataclasses import dataclass
+
+from stocks.models import Product, Stock
+from stocks.services.generations import bump_generation, get_generation
+from stocks.services.picking import FEFO_ORDER
+
+# Number of SKUs, and of warehouses, kept in the caches of each process
+CACHE_SIZE = 4096
+
+
+class LRUCache:
+    """
+    Mapping of a bounded size, dropping the least recently used entry when full, shared by the threads.
+    """
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        """
+        Return the value of a key, marking it as the most recently used, or `default` if it is not cached.
+        """
+        with self._lock:
+            if key not in self._entries:
+                return default
+            self._entries.move_to_end(key)
+            return self._entries[key]
+
+    def put(self, key, value):
+        """
+        Cache the value of a key, dropping the least recently used entry when the cache is full.
+        """
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            if len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def pop(self, key):
+        """
+        Drop the value of a key, if it is cached.
+        """
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        """
+        Drop every cached value.
+        """
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+# Identifier of each scanned product, keyed by sku, None for the unknown SKUs as batches are scanned too
+PRODUCT_IDS = LRUCache(CACHE_SIZE)
+# Value returned by the caches for the keys they do not hold
+MISSING = object()
+# Stocks of each warehouse with the generation they were read at, see `warehouse_stocks`
+WAREHOUSE_STOCKS = LRUCache(CACHE_SIZE)
+# Name of the generation of the stocks, bumped when stocks are created, changed or deleted by any process
+GENERATION = "scan_stocks"
+
+
+@dataclass(frozen=True)
+class WarehouseStocks:
+    """
+    Identifiers of the stocks of a warehouse, as cached for the scans.
+    """
+    # Stock ids of each product, in first expired first out order
+    products: dict
+    # Stock and product ids of each batch, a batch number being possibly shared by several products
+    batches: dict
+
+
+@dataclass(frozen=True)
+class ScanMatch:
+    """
+    Stocks of a warehouse matching a scanned code.
+    """
+    product_id: int
+    warehouse_id: int
+    # Stock ids in first expired first out order, a single stock when a batch was scanned
+    stocks: tuple
+    # Whether the code is the batch of the stock rather than the sku of the product
+    batch: bool
+
+
+def product_id(sku):
+    """
+    Return the identifier of the product of a sku, read from the database only on a cache miss.
+
+    Returns:
+        int | None: The identifier, None if no product has this sku.
+    """
+    pk = PRODUCT_IDS.get(sku, MISSING)
+    if pk is MISSING:
+        pk = Product.objects.filter(sku=sku).values_list("id", flat=True).first()
+        PRODUCT_IDS.put(sku, pk)
+    return pk
+
+
+def warehouse_stocks(warehouse_id, generation):
+    """
+    Return the stocks of a warehouse by product and by batch, read from the database only on a cache miss.
+
+    The empty stocks are kept: their quantity is not cached, as it changes with every movement. Stocks cached
+    at another generation are read again, as they were created, changed or deleted since.
+
+    Args:
+        warehouse_id (int): The identifier of the warehouse.
+        generation (int): The current generation of the stocks, see `get_generation`.
+    Returns:
+        WarehouseStocks: The stock ids of the warehouse.
+    """
+    cached = WAREHOUSE_STOCKS.get(warehouse_id)
+    if cached is not None and cached[0] == generation:
+        return cached[1]
+    products = defaultdict(list)
+    batches = defaultdict(list)
+    rows = Stock.objects.filter(warehouse_id=warehouse_id).order_by(*FEFO_ORDER).values_list("id", "product_id",
+                                                                                            "batch")
+    for pk, product, batch in rows:
+        products[product].append(pk)
+        batches[batch].append((pk, product))
+    cached = WarehouseStocks({product: tuple(ids) for product, ids in products.items()},
+                             {batch: tuple(stocks) for batch, stocks in batches.items()})
+    WAREHOUSE_STOCKS.put(warehouse_id, (generation, cached))
+    return cached
+
+
+def invalidate_warehouses(warehouse_ids):
+    """
+    Drop the cached stocks of warehouses whose stocks were created, changed or deleted.
+
+    The cache of the current process is dropped at once, the other processes read the stocks again on their
+    next scan, the generation of the stocks having changed once the current transaction is committed.
+
+    Args:
+        warehouse_ids (Iterable[int]): The identifiers of the warehouses.
+    """
+    warehouse_ids = set(warehouse_ids)
+    for warehouse_id in warehouse_ids:
+        WAREHOUSE_STOCKS.pop(warehouse_id)
+    if warehouse_ids:
+        bump_generation(GENERATION)
+
+
+def _match(code, warehouse_ids, generation):
+    """
+    Find the stocks matching a code in the cached stocks of warehouses, see `resolve_code`.
+    """
+    product = product_id(code)
+    matches = []
+    for warehouse_id in sorted(warehouse_ids):
+        stocks = warehouse_stocks(warehouse_id, generation)
+        if product is not None and product in stocks.products:
+            matches.append(ScanMatch(product, warehouse_id, stocks.products[product], False))
+        for pk, batch_product in stocks.batches.get(code, ()):
+            matches.append(ScanMatch(batch_product, warehouse_id, (pk,), True))
+    return matches
+
+
+def resolve_code(code, warehouse_ids):
+    """
+    Find the stocks of warehouses matching a scanned product sku or stock batch.
+
+    The SKUs and the stocks of the warehouses are read from the caches, so a warm scan only reads the
+    generation of the stocks, which makes the stocks written by another process read again. When nothing
+    matches, the code and the stocks of the warehouses are read again once, in case the product of the code was
+    created by another process, or the stocks were written without signal, e.g. by a bulk update.
+
+    Args:
+        code (str): The scanned sku or batch number.
+        warehouse_ids (Iterable[int]): The warehouses to search.
+    Returns:
+        list[ScanMatch]: The matching stocks, by warehouse, the stocks of the sku before the batches.
+    """
+    generation = get_generation(GENERATION)
+    matches = _match(code, warehouse_ids, generation)
+    if not matches:
+        PRODUCT_IDS.pop(code)
+        for warehouse_id in warehouse_ids:
+            WAREHOUSE_STOCKS.pop(warehouse_id)
+        matches = _match(code, warehouse_ids, generation)
+    return matches
+
+
+def stock_quantities(matches):
+    """
+    Read the current packaging quantity of the stocks of scan matches, in a single query.
+
+    Returns:
+        dict[int, int]: The quantities keyed by stock id.
+    """
+    ids = {pk for match in matches for pk in match.stocks}
+    return dict(Stock.objects.filter(pk__in=ids).values_list("id", "pack_quantity"))
@@ -0,0 +1,256 @@
+import math
+import re
+from dataclasses import dataclass
+
+from django.db import connection
+from django.db.models import Count, Q
+
+from stocks.models import Product, ProductTrigram
+
+# Searched product fields, with their weight in the ranking of the FTS5 index
+SEARCH_FIELDS = {"sku": 10.0, "name": 1.0, "supplier_ref": 5.0, "manufacturer_ref": 5.0}
+# Table of the SQLite FTS5 index, created by the migration of the search when SQLite ships FTS5
+FTS_TABLE = "stocks_product_fts"
+# Whether each SQLite database holds the FTS5 index, keyed by name, see `fts_enabled`
+FTS_DATABASES = {}
+# Number of results per page
+PAGE_SIZE = 20
+# Share of the trigrams of the query a product must hold to be a fuzzy match
+FUZZY_MINIMUM = 0.5
+# Number of products indexed per round trip
+INDEX_BATCH_SIZE = 500
+
+
+@dataclass
+class SearchPage:
+    """
+    Page of ranked search results.
+    """
+    # Products of the page, best first, each with its `score` between 0 and 1 for the trigram table
+    products: list
+    # Number of the following page, None on the last page
+    next_page: int | None
+    # Whether the results are fuzzy matches, the query having no exact match
+    fuzzy: bool
+
+
+def fts_enabled():
+    """
+    Tell whether the products are indexed by SQLite FTS5 rather than by the ProductTrigram table.
+
+    The tables of each database are looked up once, see FTS_DATABASES, and again after migrations are
+    applied, see `forget_fts_databases`, so that the index is used as soon as its migration is applied.
+    """
+    if connection.vendor != "sqlite":
+        return False
+    name = connection.settings_dict["NAME"]
+    enabled = FTS_DATABASES.get(name)
+    if enabled is None:
+        enabled = FTS_DATABASES[name] = FTS_TABLE in connection.introspection.table_names()
+    return enabled
+
+
+def forget_fts_databases():
+    """
+    Forget which databases hold the FTS5 index, e.g. once migrations, which may create or drop it, are applied.
+    """
+    FTS_DATABASES.clear()
+
+
+def _words(text):
+    """
+    Split a text into lower case words of letters and digits.
+    """
+    return re.findall(r"\w+", text.casefold())
+
+
+def _index_trigrams(product):
+    """
+    Return the trigrams of the searched fields of a product.
+
+    The words are padded with two spaces in front, so that the first letters of each word also make
+    trigrams and a query of one or two letters matches the words starting with them.
+    """
+    trigrams = set()
+    for name in SEARCH_FIELDS:
+        for word in _words(getattr(product, name) or ""):
+            padded = "  " + word
+            trigrams.update(padded[index:index + 3] for index in range(len(padded) - 2))
+    return trigrams
+
+
+def _query_trigrams(query):
+    """
+    Return the trigrams a product must hold to match a query.
+
+    A word of three letters or more matches anywhere in a field, a shorter word only at the start of a word.
+    """
+    trigrams = set()
+    for word in _words(query):
+        padded = word if len(word) >= 3 else "  " + word
+        trigrams.update(padded[index:index + 3] for index in range(len(padded) - 2))
+    return trigrams
+
+
+def index_products(products):
+    """
+    Add or replace the products in the search index, in batches.
+
+    Args:
+        products (Iterable[Product]): The saved products, with their searched fields.
+    """
+    products = list(products)
+    with connection.cursor() as cursor:
+        for offset in range(0, len(products), INDEX_BATCH_SIZE):
+            chunk = products[offset:offset + INDEX_BATCH_SIZE]
+            if fts_enabled():
+                cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid IN ({', '.join(['%s'] * len(chunk))})",
+                               [product.pk for product in chunk])
+                cursor.executemany(
+                    f"INSERT INTO {FTS_TABLE} (rowid, {', '.join(SEARCH_FIELDS)}) "
+                    f"VALUES (%s{', %s' * len(SEARCH_FIELDS)})",
+                    [[product.pk, *(getattr(product, name) or "" for name in SEARCH_FIELDS)] for product in chunk])
+            else:
+                ProductTrigram.objects.filter(product__in=chunk).delete()
+                ProductTrigram.objects.bulk_create([ProductTrigram(trigram=trigram, product=product)
+                                                    for product in chunk for trigram in _index_trigrams(product)])
+
+
+def unindex_products(ids):
+    """
+    Remove products from the search index.
+
+    Args:
+        ids (Iterable[int]): The identifiers of the products.
+    """
+    ids = list(ids)
+    if not fts_enabled():
+        ProductTrigram.objects.filter(product_id__in=ids).delete()
+        return
+    with connection.cursor() as cursor:
+        for offset in range(0, len(ids), INDEX_BATCH_SIZE):
+            chunk = ids[offset:offset + INDEX_BATCH_SIZE]
+            cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid IN ({', '.join(['%s'] * len(chunk))})", chunk)
+
+
+def rebuild_index():
+    """
+    Index every product again, e.g. after products were written without their signals.
+
+    Returns:
+        int: The number of indexed products.
+    """
+    if fts_enabled():
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {FTS_TABLE}")
+    else:
+        ProductTrigram.objects.all().delete()
+    count = 0
+    batch = []
+    for product in Product.objects.only("id", *SEARCH_FIELDS).iterator(chunk_size=INDEX_BATCH_SIZE):
+        batch.append(product)
+        if len(batch) == INDEX_BATCH_SIZE:
+            index_products(batch)
+            count += len(batch)
+            batch = []
+    index_products(batch)
+    return count + len(batch)
+
+
+def _fts_match(query, fuzzy):
+    """
+    Build the FTS5 match expression of a query, None if the query has no word of three letters or more.
+
+    Each word is a phrase, matched anywhere in a field by the trigram tokenizer. A fuzzy match only needs one
+    trigram of the words, the products holding the most trigrams being ranked first.
+    """
+    words = [word for word in _words(query) if len(word) >= 3]
+    if not words:
+        return None
+    if fuzzy:
+        return " OR ".join(f'"{trigram}"' for trigram in sorted(_query_trigrams(" ".join(words))))
+    return " ".join(f'"{word}"' for word in words)
+
+
+def _search_fts(query, offset, limit, fuzzy):
+    """
+    Rank the products of the FTS5 index matching a query.
+
+    Returns:
+        list[tuple[int, float]]: The identifiers and scores of the products, best first.
+    """
+    match = _fts_match(query, fuzzy)
+    if match is None:
+        # Too short for the trigram tokenizer: the products whose sku or references start with the query
+        text = query.strip()
+        ids = (Product.objects
+               .filter(Q(sku__istartswith=text) | Q(supplier_ref__istartswith=text)
+                       | Q(manufacturer_ref__istartswith=text))
+               .order_by("sku")
+               .values_list("id", flat=True))
+        return [(pk, 1.0) for pk in ids[offset:offset + limit]]
+    weights = ", ".join(str(weight) for weight in SEARCH_FIELDS.values())
+    with connection.cursor() as cursor:
+        cursor.execute(f"SELECT rowid, bm25({FTS_TABLE}, {weights}) AS rank FROM {FTS_TABLE} "
+                       f"WHERE {FTS_TABLE} MATCH %s ORDER BY rank, rowid LIMIT %s OFFSET %s",
+                       [match, limit, offset])
+        # bm25 is negative, the best match having the lowest value
+        return [(pk, -rank) for pk, rank in cursor.fetchall()]
+
+
+def _search_trigrams(query, offset, limit, fuzzy):
+    """
+    Rank the products of the ProductTrigram table holding the trigrams of a query, in one grouped query.
+
+    Returns:
+        list[tuple[int, float]]: The identifiers and scores of the products, best first: the share of the
+        trigrams of the query they hold.
+    """
+    trigrams = _query_trigrams(query)
+    if not trigrams:
+        return []
+    minimum = math.ceil(len(trigrams) * FUZZY_MINIMUM) if fuzzy else len(trigrams)
+    rows = (ProductTrigram.objects
+            .filter(trigram__in=trigrams)
+            .values_list("product_id")
+            .annotate(hits=Count("id"))
+            .filter(hits__gte=minimum)
+            .order_by("-hits", "product_id"))
+    return [(pk, hits / len(trigrams)) for pk, hits in rows[offset:offset + limit]]
+
+
+def search_products(query, page=1, page_size=PAGE_SIZE, fuzzy=None):
+    """
+    Search the products by partial sku, name, supplier reference or manufacturer reference.
+
+    The products are looked up in the FTS5 index on SQLite, in the ProductTrigram table otherwise, so that the
+    cost depends on the number of matches rather than on the size of the catalogue. Every word of the query
+    must appear in a searched field. When nothing matches, the products sharing enough trigrams with the query
+    are returned instead, which forgives a typo.
+
+    Args:
+        query (str): The searched text.
+        page (int): The 1-based number of the page.
+        page_size (int): Number of products per page.
+        fuzzy (bool | None): Whether to search fuzzy matches, None to only do so when nothing matches exactly.
+    Returns:
+        SearchPage: The products of the page.
+    """
+    search = _search_fts if fts_enabled() else _search_trigrams
+    offset = (page - 1) * page_size
+    # One more row tells whether a following page exists
+    rows = search(query, offset, page_size + 1, bool(fuzzy))
+    if fuzzy is None and not rows and page == 1:
+        fuzzy = True
+        rows = search(query, offset, page_size + 1, fuzzy)
+
+    products = Product.objects.in_bulk([pk for pk, _ in rows[:page_size]])
+    results = []
+    for pk, score in rows[:page_size]:
+        # Deleted since the lookup
+        if pk not in products:
+            continue
+        product = products[pk]
+        product.score = score
+        results.append(product)
+    return SearchPage(results, page + 1 if len(rows) > page_size else None, bool(fuzzy))
@@ -0,0 +1,236 @@
+import datetime
+from contextlib import contextmanager
+from decimal import Decimal
+
+import numpy as np
+from django.db import connection, transaction
+from django.db.models import OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from stocks.models import Product, Stock, StockMovement, Warehouse
+from stocks.services.dashboard import invalidate_dashboards
+from stocks.services.levels import SIGNED_QUANTITY, rebuild_levels
+from stocks.services.search import index_products
+from stocks.services.valuation import invalidate_valuations
+
+# Number of rows inserted per transaction
+SEED_BATCH_SIZE = 10000
+# Kanbans served by the store of each building
+KANBANS_PER_STORE = 4
+# Days of movement history generated, the latest movement being recorded now
+HISTORY_DAYS = 365
+# Prefix of the SKUs of the generated products, followed by their number
+SKU_PREFIX = "SEED"
+# Fields of the generated movements, inserted without models, in the order of their values
+MOVEMENT_COLUMNS = ("stock", "movement_type", "quantity", "reason", "timestamp")
+
+
+def seed_products(count, rng, batch_size=SEED_BATCH_SIZE):
+    """
+    Generate a catalogue of products, indexed for the search, batch by batch.
+
+    Args:
+        count (int): Number of products.
+        rng (numpy.random.Generator): The random generator.
+        batch_size (int): Number of products inserted per transaction.
+    Returns:
+        list[int]: The identifiers of the products.
+    """
+    types = Product.Types.values
+    ids = []
+    for offset in range(0, count, batch_size):
+        size = min(batch_size, count - offset)
+        kinds = rng.integers(len(types), size=size).tolist()
+        prices = rng.integers(100, 100000, size=size).tolist()
+        critical = (rng.random(size) < 0.05).tolist()
+        with transaction.atomic():
+            products = Product.objects.bulk_create([
+                Product(sku=f"{SKU_PREFIX}{index:06d}", name=f"Product {index}", product_type=types[kinds[row]],
+                        price=Decimal(prices[row]).scaleb(-2), supplier=f"Supplier {index % 50}",
+                        supplier_ref=f"S{index:08d}", manufacturer=f"Manufacturer {index % 20}",
+                        manufacturer_ref=f"M{index:08d}", critical=critical[row])
+                for row, index in enumerate(range(offset, offset + size))
+            ])
+            # The bulk insert sends no signal
+            index_products(products)
+        ids += [product.pk for product in products]
+    return ids
+
+
+def seed_warehouses(count):
+    """
+    Generate the warehouse hierarchy: a main store, then buildings each holding a store and its kanbans.
+
+    Args:
+        count (int): Number of warehouses, the main store included.
+    Returns:
+        list[int]: The identifiers of the warehouses, the main store first.
+    """
+    warehouses = [Warehouse(building="A0", room="0", warehouse_type=Warehouse.Types.MAIN)]
+    for index in range(count - 1):
+        building, room = divmod(index, KANBANS_PER_STORE + 1)
+        warehouse_type = Warehouse.Types.STORE if room == 0 else Warehouse.Types.KANBAN
+        warehouses.append(Warehouse(building=f"B{building + 1}", room=str(room), warehouse_type=warehouse_type))
+    for warehouse in warehouses:
+        # The bulk insert does not call `Warehouse.save`, which builds the name
+        warehouse.name = f"{warehouse.warehouse_type} ({warehouse.building}_{warehouse.room})"
+    return [warehouse.pk for warehouse in Warehouse.objects.bulk_create(warehouses[:count])]
+
+
+def seed_stocks(count, products, warehouses, rng, batch_size=SEED_BATCH_SIZE):
+    """
+    Generate empty stocks of the products in the warehouses, with their batch, reception and expiration dates.
+
+    Args:
+        count (int): Number of stocks, the products being spread over them in turn.
+        products (list[int]): The identifiers of the products.
+        warehouses (list[int]): The identifiers of the warehouses.
+        rng (numpy.random.Generator): The random generator.
+        batch_size (int): Number of stocks inserted per transaction.
+    Returns:
+        list[int]: The identifiers of the stocks.
+    """
+    today = timezone.localdate()
+    ids = []
+    for offset in range(0, count, batch_size):
+        size = min(batch_size, count - offset)
+        located = rng.integers(len(warehouses), size=size).tolist()
+        received = rng.integers(HISTORY_DAYS, size=size).tolist()
+        expiring = rng.integers(-30, 720, size=size).tolist()
+        units = rng.integers(1, 13, size=size).tolist()
+        thresholds = rng.integers(1, 6, size=size).tolist()
+        shelvings = rng.integers(100, size=size).tolist()
+        with transaction.atomic():
+            ids += [stock.pk for stock in Stock.objects.bulk_create([
+                Stock(unit_quantity=units[row], pack_quantity=0, shelving=f"{shelvings[row]:02d}",
+                      batch=f"L{index:08d}", threshold=thresholds[row],
+                      reception_date=today - datetime.timedelta(days=received[row]),
+                      expiration_date=today + datetime.timedelta(days=expiring[row]),
+                      product_id=products[index % len(products)], warehouse_id=warehouses[located[row]])
+                for row, index in enumerate(range(offset, offset + size))
+            ])]
+    return ids
+
+
+@contextmanager
+def _without_indexes(model):
+    """
+    Drop the indexes of a model while rows are bulk inserted, then build them again at once.
+
+    Updating the indexes row by row costs about as much as inserting the rows. The schema cannot be changed
+    inside a transaction on SQLite, e.g. in a test, where the indexes are kept.
+    """
+    if connection.in_atomic_block:
+        yield
+        return
+    indexes = model._meta.indexes
+    with connection.schema_editor(atomic=False) as editor:
+        for index in indexes:
+            editor.remove_index(model, index)
+    try:
+        yield
+    finally:
+        with connection.schema_editor(atomic=False) as editor:
+            for index in indexes:
+                editor.add_index(model, index)
+
+
+def seed_movements(count, stocks, rng, batch_size=SEED_BATCH_SIZE, progress=None):
+    """
+    Generate the movement history of stocks, spread over the last HISTORY_DAYS days, batch by batch.
+
+    The rows are inserted with `executemany` rather than through models: building and compiling a model per
+    row would cost more than the insert itself. Only one batch is held in memory, plus the running quantity of
+    each stock, so that an outgoing movement never takes a stock below zero. The stock quantities and levels
+    are not updated, see `seed_inventory`.
+
+    Args:
+        count (int): Number of movements.
+        stocks (list[int]): The identifiers of the stocks.
+        rng (numpy.random.Generator): The random generator.
+        batch_size (int): Number of movements inserted per transaction.
+        progress (Callable[[int], None] | None): Called with the number of movements inserted after each batch.
+    """
+    meta = StockMovement._meta
+    quote = connection.ops.quote_name
+    columns = ", ".join(quote(meta.get_field(name).column) for name in MOVEMENT_COLUMNS)
+    sql = (f"INSERT INTO {quote(meta.db_table)} ({columns}) "
+           f"VALUES ({', '.join(['%s'] * len(MOVEMENT_COLUMNS))})")
+    start = timezone.now() - datetime.timedelta(days=HISTORY_DAYS)
+    if not connection.features.supports_timezones:
+        # Stored as naive datetimes in the time zone of the connection, as `adapt_datetimefield_value` would do
+        # at a much higher cost per row
+        start = timezone.make_naive(start, connection.timezone)
+    step = datetime.timedelta(days=HISTORY_DAYS) / max(count, 1)
+    quantities = [0] * len(stocks)
+    for offset in range(0, count, batch_size):
+        size = min(batch_size, count - offset)
+        rows = []
+        for index, stock, quantity, out in zip(range(offset, offset + size),
+                                               rng.integers(len(stocks), size=size).tolist(),
+                                               rng.integers(1, 11, size=size).tolist(),
+                                               (rng.random(size) < 0.5).tolist()):
+            if out and quantities[stock] >= quantity:
+                quantities[stock] -= quantity
+                movement_type = StockMovement.Types.OUT
+            else:
+                quantities[stock] += quantity
+                movement_type = StockMovement.Types.IN
+            rows.append((stocks[stock], movement_type, quantity, "seed", start + index * step))
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.executemany(sql, rows)
+        if progress:
+            progress(offset + size)
+
+
+def seed_inventory(products, warehouses, stocks, movements, seed=0, batch_size=SEED_BATCH_SIZE, progress=None):
+    """
+    Generate a synthetic inventory: a catalogue, a warehouse hierarchy, stocks and their movement history.
+
+    The data only depends on the seed and the counts. The rows are inserted batch by batch without their
+    signals, so the memory use does not grow with the number of movements, and the indexes of the movements are
+    built once they are all inserted, outside of a transaction; the stock quantities, the stock level ledger and
+    the caches are then brought in line with the movements once, in a few queries.
+
+    Args:
+        products (int): Number of products.
+        warehouses (int): Number of warehouses, at least 1 for the main store.
+        stocks (int): Number of stocks, spread over the products and warehouses.
+        movements (int): Number of stock movements.
+        seed (int): Seed of the random generator.
+        batch_size (int): Number of rows inserted per transaction.
+        progress (Callable[[int], None] | None): Called with the number of movements inserted after each batch.
+    Returns:
+        dict[str, int]: The number of rows created, keyed by "products", "warehouses", "stocks" and "movements".
+    Raises:
+        ValueError: If there are stocks without products, or movements without stocks, or if the database was
+            already seeded.
+    """
+    if warehouses < 1 or (stocks and not products) or (movements and not stocks):
+        raise ValueError("Stocks need products and warehouses, and movements need stocks.")
+    # Checked before any write: the SKUs are unique, and a second main store would be generated
+    if Product.objects.filter(sku__startswith=SKU_PREFIX).exists():
+        raise ValueError(f"The database already holds a seeded inventory, products {SKU_PREFIX}* exist.")
+    rng = np.random.default_rng(seed)
+    product_ids = seed_products(products, rng, batch_size)
+    warehouse_ids = seed_warehouses(warehouses)
+    stock_ids = seed_stocks(stocks, product_ids, warehouse_ids, rng, batch_size)
+    with _without_indexes(StockMovement):
+        seed_movements(movements, stock_ids, rng, batch_size, progress)
+
+    with transaction.atomic():
+        if stock_ids:
+            totals = (StockMovement.objects
+                      .filter(stock=OuterRef("pk"))
+                      .values("stock")
+                      .annotate(total=Sum(SIGNED_QUANTITY))
+                      .values("total"))
+            (Stock.objects
+             .filter(pk__gte=stock_ids[0], pk__lte=stock_ids[-1])
+             .update(pack_quantity=Coalesce(Subquery(totals), Value(0))))
+        rebuild_levels()
+        invalidate_valuations()
+        invalidate_dashboards()
+    return {"products": len(product_ids), "warehouses": len(warehouse_ids), "stocks": len(stock_ids),
+            "movements": movements}
@@ -0,0 +1,139 @@
+import datetime
+from collections import defaultdict
+
+from django.db import IntegrityError, transaction
+from django.db.models import F, Sum
+
+from stocks.models import StockCheckpoint, StockCheckpointLine, StockMovement, StockOpeningBalance
+from stocks.services.archiving import archived_until, iter_archived_movements
+from stocks.services.levels import SIGNED_QUANTITY
+
+# Intervals between two checkpoints accepted by the checkpoint command
+CHECKPOINT_INTERVALS = {
+    "day": datetime.timedelta(days=1),
+    "week": datetime.timedelta(weeks=1),
+}
+
+
+def latest_checkpoint(warehouse, at):
+    """
+    Return the most recent checkpoint of a warehouse taken at or before a given time.
+
+    Args:
+        warehouse (Warehouse | int): The warehouse or its identifier.
+        at (datetime): The time of the reconstruction.
+    Returns:
+        StockCheckpoint | None: The checkpoint, None if the warehouse has none before that time.
+    """
+    return (StockCheckpoint.objects
+            .filter(warehouse=warehouse, taken_at__lte=at)
+            .order_by("-taken_at")
+            .first())
+
+
+def _replay(warehouse, after, until):
+    """
+    Sum the movements of the stocks of a warehouse recorded in a time range, per stock, in a single query.
+
+    Args:
+        warehouse (Warehouse | int): The warehouse or its identifier.
+        after (datetime | None): Movements strictly after this time, None from the beginning of the history.
+        until (datetime): Movements up to this time, included.
+    Returns:
+        QuerySet: Tuples of (stock id, product id, net quantity).
+    """
+    movements = StockMovement.objects.filter(stock__warehouse=warehouse, timestamp__lte=until)
+    if after is not None:
+        movements = movements.filter(timestamp__gt=after)
+    return (movements
+            .values_list("stock_id", F("stock__product_id"))
+            .annotate(quantity=Sum(SIGNED_QUANTITY))
+            .order_by())
+
+
+def reconstruct_inventory(warehouse, at):
+    """
+    Compute the quantity of every stock of a warehouse at a given time.
+
+    The nearest checkpoint taken at or before that time is loaded and only the movements recorded since are
+    replayed, so the cost depends on the checkpoint interval rather than on the length of the history. When the
+    movements since the checkpoint were archived, the reconstruction starts from the opening balances instead if
+    the time is after the archiving cutoff, and reads the archives otherwise.
+
+    Args:
+        warehouse (Warehouse | int): The warehouse or its identifier.
+        at (datetime): The time of the reconstruction, the movements recorded at that time being included.
+    Returns:
+        dict[int, tuple[int, int]]: The product id and the quantity of each stock, keyed by stock id.
+        The stocks with a quantity of 0 are left out.
+    """
+    checkpoint = latest_checkpoint(warehouse, at)
+    after = checkpoint and checkpoint.taken_at
+    until = archived_until()
+    inventory = defaultdict(lambda: [None, 0])
+    if until is not None and until <= at and (after is None or after < until):
+        # Every movement before the cutoff is folded into the opening balances
+        balances = (StockOpeningBalance.objects
+                    .filter(stock__warehouse=warehouse)
+                    .values_list("stock_id", "stock__product_id", "quantity"))
+        for stock_id, product_id, quantity in balances:
+            inventory[stock_id] = [product_id, quantity]
+        after = None
+    else:
+        if checkpoint is not None:
+            for stock_id, product_id, quantity in checkpoint.lines.values_list("stock_id", "product_id",
+                                                                               "quantity"):
+                inventory[stock_id] = [product_id, quantity]
+        if until is not None and (after is None or after < until):
+            for row in iter_archived_movements(warehouse=warehouse, start=after, end=until):
+                if (after is None or row["timestamp"] > after) and row["timestamp"] <= at:
+                    signed = row["quantity"] if row["movement_type"] == StockMovement.Types.IN else -row["quantity"]
+                    inventory[row["stock_id"]][0] = row["product_id"]
+                    inventory[row["stock_id"]][1] += signed
+    for stock_id, product_id, quantity in _replay(warehouse, after, at):
+        inventory[stock_id][0] = product_id
+        inventory[stock_id][1] += quantity
+    return {stock_id: (product_id, quantity) for stock_id, (product_id, quantity) in inventory.items() if quantity}
+
+
+def reconstruct_product_inventory(warehouse, at):
+    """
+    Compute the quantity of every product of a warehouse at a given time, see `reconstruct_inventory`.
+
+    Args:
+        warehouse (Warehouse | int): The warehouse or its identifier.
+        at (datetime): The time of the reconstruction.
+    Returns:
+        dict[int, int]: The quantities keyed by product id, the products with a quantity of 0 being left out.
+    """
+    products = defaultdict(int)
+    for product_id, quantity in reconstruct_inventory(warehouse, at).values():
+        products[product_id] += quantity
+    return {product_id: quantity for product_id, quantity in products.items() if quantity}
+
+
+def take_checkpoint(warehouse, at):
+    """
+    Save the quantities of the stocks of a warehouse at a given time.
+
+    The checkpoint is built from the previous one and the movements recorded since, not from the whole history.
+
+    Args:
+        warehouse (Warehouse | int): The warehouse or its identifier.
+        at (datetime): The time of the checkpoint.
+    Returns:
+        StockCheckpoint | None: The checkpoint, None if the warehouse already has one at that time.
+    """
+    inventory = reconstruct_inventory(warehouse, at)
+    try:
+        with transaction.atomic():
+            checkpoint = StockCheckpoint.objects.create(warehouse_id=getattr(warehouse, "pk", warehouse),
+                                                        taken_at=at)
+            StockCheckpointLine.objects.bulk_create([
+                StockCheckpointLine(checkpoint=checkpoint, stock_id=stock_id, product_id=product_id,
+                                    quantity=quantity)
+                for stock_id, (product_id, quantity) in inventory.items()
+            ], batch_size=1000)
+    except IntegrityError:
+        return None
+    return checkpoint
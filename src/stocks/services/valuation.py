@@ -0,0 +1,142 @@
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.db.models import BigIntegerField, Case, F, IntegerField, Max, Q, Sum, Value, When
+from django.db.models.functions import Cast, Coalesce, Round
+
+from stocks.models import Stock, StockMovement
+from stocks.services.generations import bump_generation, get_generation
+
+# Valuation methods: every package at the current price of its product, or at the cost of its batch (FIFO)
+VALUATION_METHODS = {
+    "price": "Current price",
+    "fifo": "FIFO, cost of each batch",
+}
+# Name of the generation of the cached valuations, bumped when prices or costs change without any movement
+GENERATION = "valuation"
+# Lifetime of a cached valuation in seconds, the keys make it stale as soon as a movement is recorded
+VALUATION_TIMEOUT = 24 * 60 * 60
+# Columns of the valuation rows, in the order of the CSV download
+VALUATION_COLUMNS = ["building", "warehouse_id", "warehouse", "product_type", "packages", "value", "unpriced"]
+
+
+def _unit_cents(method):
+    """
+    Build the SQL expression of the value of one package in cents, so that the sums are exact integers.
+
+    The prices are rounded before the cast, as SQLite computes the product with floats.
+    """
+    if method == "price":
+        price, unpriced = F("product__price"), Q(product__price__isnull=True)
+    else:
+        price, unpriced = Coalesce("unit_cost", "product__price"), Q(unit_cost__isnull=True,
+                                                                     product__price__isnull=True)
+    return Cast(Round(price * 100), BigIntegerField()), unpriced
+
+
+def compute_valuation(method="price"):
+    """
+    Compute the value of the stocks per warehouse and product type, in a single grouped query.
+
+    With the "price" method every package is valued at the current price of its product. With the "fifo"
+    method every batch on hand is valued at its own purchase cost, see `Stock.unit_cost`: the batches are the
+    FIFO layers, the oldest ones being consumed first, and a batch without cost falls back on the price.
+    The values are summed in integer cents then converted to Decimal, so no float rounding reaches the totals.
+
+    Args:
+        method (str): A key of VALUATION_METHODS.
+    Returns:
+        list[dict]: One row per warehouse and product type with the keys of VALUATION_COLUMNS, `unpriced`
+        counting the packages without price nor cost, which are left out of the value.
+    """
+    cents, unpriced = _unit_cents(method)
+    rows = (Stock.objects
+            .filter(pack_quantity__gt=0)
+            .values("warehouse_id", warehouse_name=F("warehouse__name"), building=F("warehouse__building"),
+                    product_type=F("product__product_type"))
+            .annotate(packages=Sum("pack_quantity"),
+                      cents=Sum(F("pack_quantity") * cents),
+                      unpriced=Sum(Case(When(unpriced, then="pack_quantity"), default=Value(0),
+                                        output_field=IntegerField())))
+            .values_list("building", "warehouse_id", "warehouse_name", "product_type", "packages", "cents",
+                         "unpriced")
+            .order_by("building", "warehouse_id", "product_type"))
+    return [dict(zip(VALUATION_COLUMNS, (building, warehouse_id, name, product_type or "", packages,
+                                         Decimal(value or 0).scaleb(-2), unpriced)))
+            for building, warehouse_id, name, product_type, packages, value, unpriced in rows]
+
+
+def invalidate_valuations():
+    """
+    Make every cached valuation stale, e.g. when a price or a cost changes.
+    """
+    bump_generation(GENERATION)
+
+
+def get_valuation(method="price"):
+    """
+    Return the valuation of the stocks, from the cache when no movement was recorded since it was computed.
+
+    The cached valuation is keyed on the last movement id, as every change of a quantity records a movement,
+    and on a generation bumped by the changes of prices and costs, see `invalidate_valuations`. Both are read
+    from the database, so a change made by any process is seen by all of them, and a repeated view costs two
+    indexed queries.
+
+    Args:
+        method (str): A key of VALUATION_METHODS.
+    Returns:
+        list[dict]: The rows of `compute_valuation`.
+    """
+    last_id = StockMovement.objects.aggregate(last_id=Max("id"))["last_id"] or 0
+    key = f"valuation:{method}:{get_generation(GENERATION)}:{last_id}"
+    rows = cache.get(key)
+    if rows is None:
+        rows = compute_valuation(method)
+        cache.set(key, rows, VALUATION_TIMEOUT)
+    return rows
+
+
+def rollup(rows, *keys):
+    """
+    Sum the valuation rows sharing the same values of some columns.
+
+    Args:
+        rows (Iterable[dict]): The valuation rows.
+        keys (str): The grouping columns, e.g. "building", none for the grand total.
+    Returns:
+        list[dict]: The grouping columns with the summed `packages`, `value` and `unpriced`, in order.
+    """
+    totals = {}
+    for row in rows:
+        group = tuple(row[key] for key in keys)
+        total = totals.setdefault(group, {**dict(zip(keys, group)), "packages": 0, "value": Decimal("0.00"),
+                                          "unpriced": 0})
+        total["packages"] += row["packages"]
+        total["value"] += row["value"]
+        total["unpriced"] += row["unpriced"]
+    return [totals[group] for group in sorted(totals)]
+
+
+def valuation_report(method="price", warehouses=None):
+    """
+    Build the valuation report: the rows and their rollups per warehouse, building and product type.
+
+    Args:
+        method (str): A key of VALUATION_METHODS.
+        warehouses (Iterable[int] | None): Only value these warehouses, e.g. the ones the user may see, None for
+            all of them.
+    Returns:
+        dict: The "rows", the rollups "warehouses", "buildings" and "product_types", and the "total".
+    """
+    rows = get_valuation(method)
+    if warehouses is not None:
+        allowed = set(warehouses)
+        rows = [row for row in rows if row["warehouse_id"] in allowed]
+    total = rollup(rows)
+    return {
+        "rows": rows,
+        "warehouses": rollup(rows, "building", "warehouse_id", "warehouse"),
+        "buildings": rollup(rows, "building"),
+        "product_types": rollup(rows, "product_type"),
+        "total": total[0] if total else {"packages": 0, "value": Decimal("0.00"), "unpriced": 0},
+    }
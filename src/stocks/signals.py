@@ -0,0 +1,111 @@
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_migrate, post_save
+from django.dispatch import receiver
+
+from stocks.models import Product, Stock, StockMovement, Warehouse
+from stocks.services.alerts import evaluate_alerts
+from stocks.services.dashboard import invalidate_dashboards
+from stocks.services.levels import apply_movement
+from stocks.services.scanning import PRODUCT_IDS, invalidate_warehouses
+from stocks.services.search import forget_fts_databases, index_products, unindex_products
+from stocks.services.valuation import invalidate_valuations
+
+
+@receiver(post_save, sender=StockMovement)
+def update_stock_level(sender, instance, created, raw=False, **kwargs):
+    """
+    Fold every newly created stock movement into the stock level ledger and evaluate the alerts of its stock.
+
+    Movements loaded from fixtures (`raw`) are skipped: the ledger is rebuilt with the
+    `rebuild_stock_levels` command in that case.
+    """
+    if created and not raw:
+        apply_movement(instance)
+        evaluate_alerts({(instance.stock.product_id, instance.stock.warehouse_id)})
+
+
+@receiver(post_save, sender=Product)
+def index_product(sender, instance, raw=False, **kwargs):
+    """
+    Add every created or changed product to the search index.
+
+    Products loaded from fixtures (`raw`) are skipped: the index is rebuilt with the
+    `rebuild_search_index` command in that case.
+    """
+    if not raw:
+        index_products([instance])
+
+
+@receiver(post_delete, sender=Product)
+def unindex_product(sender, instance, **kwargs):
+    """
+    Remove every deleted product from the search index.
+    """
+    unindex_products([instance.pk])
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+def invalidate_scanned_skus(sender, instance, created=False, **kwargs):
+    """
+    Drop the cached product ids of the scans when a product is created, changed or deleted.
+
+    Only the sku of a created product was cached, as unknown. Every sku is dropped otherwise, as the sku of the
+    product may have changed.
+    """
+    if created:
+        PRODUCT_IDS.pop(instance.sku)
+    else:
+        PRODUCT_IDS.clear()
+
+
+@receiver(post_save, sender=Stock)
+@receiver(post_delete, sender=Stock)
+def invalidate_scanned_stocks(sender, instance, **kwargs):
+    """
+    Drop the cached stocks of the warehouse of a created, changed or deleted stock, used by the scans.
+    """
+    invalidate_warehouses([instance.warehouse_id])
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+@receiver(post_save, sender=Stock)
+@receiver(post_delete, sender=Stock)
+def invalidate_cached_valuations(sender, **kwargs):
+    """
+    Make the cached valuations stale when a price or a cost may have changed, which records no movement.
+    """
+    invalidate_valuations()
+
+
+@receiver(post_save, sender=Stock)
+@receiver(post_delete, sender=Stock)
+@receiver(post_save, sender=Warehouse)
+@receiver(post_delete, sender=Warehouse)
+def invalidate_cached_dashboards(sender, **kwargs):
+    """
+    Make the cached dashboards stale when a stock or a warehouse changes without recording a movement.
+    """
+    invalidate_dashboards()
+
+
+@receiver(post_migrate)
+def forget_search_index(sender, **kwargs):
+    """
+    Look the FTS5 index of the products up again once migrations are applied, as they may create or drop it.
+    """
+    forget_fts_databases()
+
+
+@receiver(connection_created)
+def configure_sqlite(sender, connection, **kwargs):
+    """
+    Run the SQLITE_PRAGMAS setting on every new SQLite connection, e.g. the WAL journal of the production profile.
+    """
+    if connection.vendor != "sqlite" or not settings.SQLITE_PRAGMAS:
+        return
+    with connection.cursor() as cursor:
+        for name, value in settings.SQLITE_PRAGMAS.items():
+            cursor.execute(f"PRAGMA {name} = {value}")
@@ -0,0 +1,129 @@
+import datetime
+
+import pytest
+from django.contrib.auth import get_user_model
+
+from stocks.models import Product, Warehouse, Stock
+from stocks.services.scanning import PRODUCT_IDS, WAREHOUSE_STOCKS
+from stocks.services.seeding import seed_inventory
+from users.models import UserProfile
+from users.scope import get_warehouse_scope
+
+User = get_user_model()
+
+
+@pytest.fixture(autouse=True)
+def scan_caches():
+    """
+    Fixture emptying the in-process caches of the scans around each test, the identifiers being reused.
+    """
+    PRODUCT_IDS.clear()
+    WAREHOUSE_STOCKS.clear()
+    yield
+    PRODUCT_IDS.clear()
+    WAREHOUSE_STOCKS.clear()
+
+
+@pytest.fixture
+def operator(warehouse):
+    """
+    Fixture to create and return a user operating the stocks of the warehouse for testing.
+
+    Args:
+        warehouse (Warehouse): The warehouse fixture, the only one the operator may see.
+
+    Returns:
+        User: A user instance with valid credentials and an operator profile.
+    """
+    user = User.objects.create_user(username="operator", password="operatorpassword")
+    profile = UserProfile.objects.create(user=user, profile=UserProfile.Profiles.OPERATOR)
+    profile.warehouses.add(warehouse)
+    return user
+
+
+@pytest.fixture
+def operator_client(client, operator):
+    """
+    Fixture to return a test client logged in as the operator, with the warehouse scope of the operator cached.
+
+    Args:
+        client (Client): Django test client for making requests.
+        operator (User): The operator fixture.
+
+    Returns:
+        Client: The logged in test client.
+    """
+    client.force_login(operator)
+    get_warehouse_scope(operator)
+    return client
+
+
+@pytest.fixture
+def product():
+    """
+    Fixture to create and return a product instance for testing.
+
+    Returns:
+        Product: A consumable product with a unique SKU.
+    """
+    return Product.objects.create(
+        sku="SKU0001",
+        name="Nitrile gloves",
+        product_type=Product.Types.CONSUMABLE,
+        price="12.50",
+        supplier="Supplier",
+        supplier_ref="SUP-0001",
+        manufacturer="Manufacturer",
+        manufacturer_ref="MAN-0001",
+    )
+
+
+@pytest.fixture
+def warehouse():
+    """
+    Fixture to create and return a building store warehouse for testing.
+
+    Returns:
+        Warehouse: A store warehouse located in building A1.
+    """
+    return Warehouse.objects.create(building="A1", room="100", warehouse_type=Warehouse.Types.STORE)
+
+
+@pytest.fixture
+def stock(product, warehouse):
+    """
+    Fixture to create and return a stock of the product in the warehouse for testing.
+
+    The stock is created empty: its quantity is brought by the stock movements of each test.
+
+    Args:
+        product (Product): The product fixture.
+        warehouse (Warehouse): The warehouse fixture.
+
+    Returns:
+        Stock: An empty stock of the product in the warehouse.
+    """
+    return Stock.objects.create(
+        unit_quantity=1,
+        stock_unit=Stock.StockUnits.LITER,
+        pack_quantity=0,
+        stock_packaging=Stock.StockPackaging.BOTTLE,
+        shelving="A01",
+        batch="BATCH-001",
+        expiration_date=datetime.date(2030, 1, 1),
+        reception_date=datetime.date(2025, 1, 1),
+        threshold=2,
+        product=product,
+        warehouse=warehouse,
+    )
+
+
+@pytest.fixture
+def inventory(db):
+    """
+    Fixture to generate a small synthetic inventory for testing, the same in every test.
+
+    Returns:
+        dict[str, int]: The number of generated products, warehouses, stocks and movements, see `seed_inventory`.
+    """
+    return seed_inventory(products=20, warehouses=7, stocks=50, movements=500, seed=0, batch_size=64)
@@ -0,0 +1,127 @@
+import datetime
+
+import pytest
+from django.db import connection
+
+from stocks.models import Product, Stock, StockMovement, Warehouse
+from stocks.pagination import PAGE_SIZE, encode_cursor, seek
+
+
+@pytest.fixture
+def index_scans_preferred():
+    """
+    Fixture making the planner pick the indexes even on the nearly empty tables of the tests.
+
+    PostgreSQL prefers sequential scans on small tables, so they are disabled for the test transaction.
+    SQLite has no statistics on the test tables and already prefers the indexes.
+    """
+    if connection.vendor == "postgresql":
+        with connection.cursor() as cursor:
+            cursor.execute("SET LOCAL enable_seqscan = off")
+
+
+def assert_uses_index(queryset, index_name):
+    """
+    Assert that the query plan of a queryset reads the given index.
+
+    Args:
+        queryset (QuerySet): The query to explain.
+        index_name (str): The name of the index expected in the plan.
+    """
+    plan = queryset.explain()
+    assert index_name in plan, plan
+
+
+@pytest.mark.django_db
+def test_stocks_of_a_product_in_a_warehouse(index_scans_preferred, stock: Stock):
+    """
+    Test that the stocks of a (product, warehouse) pair are looked up through the composite index.
+
+    Asserts:
+        - The plan uses `stock_product_warehouse_idx`.
+    """
+    assert_uses_index(Stock.objects.filter(product=stock.product, warehouse=stock.warehouse),
+                      "stock_product_warehouse_idx")
+
+
+@pytest.mark.django_db
+def test_recent_movements_of_a_stock(index_scans_preferred, stock: Stock):
+    """
+    Test that the most recent movements of a stock are read in order from the index.
+
+    Asserts:
+        - The plan uses `movement_stock_recent_idx`.
+    """
+    assert_uses_index(StockMovement.objects.filter(stock=stock).order_by("-timestamp")[:20],
+                      "movement_stock_recent_idx")
+
+
+@pytest.mark.django_db
+def test_movements_in_a_date_range(index_scans_preferred):
+    """
+    Test that the movements of a date range are found through the (timestamp, id) index.
+
+    Asserts:
+        - The plan uses `movement_timestamp_id_idx`.
+    """
+    start = datetime.datetime(2025, 1, 1, tzinfo=datetime.timezone.utc)
+    assert_uses_index(StockMovement.objects.filter(timestamp__gte=start, timestamp__lt=start + datetime.timedelta(7)),
+                      "movement_timestamp_id_idx")
+
+
+@pytest.mark.django_db
+def test_stocks_expiring_soon(index_scans_preferred):
+    """
+    Test that the stocks expiring before a date are found through the partial expiration index.
+
+    Asserts:
+        - The plan uses `stock_expiration_idx`.
+    """
+    assert_uses_index(Stock.objects.filter(expiration_date__lte=datetime.date(2025, 1, 31)).order_by("expiration_date"),
+                      "stock_expiration_idx")
+
+
+@pytest.mark.django_db
+def test_stocks_of_a_batch(index_scans_preferred):
+    """
+    Test that the stocks of a batch are found through the batch index.
+
+    Asserts:
+        - The plan uses `stock_batch_idx`.
+    """
+    assert_uses_index(Stock.objects.filter(batch="BATCH-001"), "stock_batch_idx")
+
+
+@pytest.mark.django_db
+def test_store_of_a_building(index_scans_preferred):
+    """
+    Test that the warehouses of a type in a building are found through the composite index.
+
+    Asserts:
+        - The plan uses `warehouse_building_type_idx`.
+    """
+    assert_uses_index(Warehouse.objects.filter(building="A1", warehouse_type=Warehouse.Types.STORE),
+                      "warehouse_building_type_idx")
+
+
+@pytest.mark.django_db
+def test_critical_products(index_scans_preferred):
+    """
+    Test that the critical products are found through the partial index.
+
+    Asserts:
+        - The plan uses `product_critical_idx`.
+    """
+    assert_uses_index(Product.objects.filter(critical=True), "product_critical_idx")
+
+
+@pytest.mark.django_db
+def test_movement_history_page(index_scans_preferred):
+    """
+    Test that a page of the movement history seeks its first row through the (timestamp, id) index.
+
+    Asserts:
+        - The plan uses `movement_timestamp_id_idx`.
+    """
+    cursor = encode_cursor(datetime.datetime(2025, 1, 1, tzinfo=datetime.timezone.utc), 100)
+    assert_uses_index(seek(StockMovement.objects.all(), cursor)[:PAGE_SIZE], "movement_timestamp_id_idx")
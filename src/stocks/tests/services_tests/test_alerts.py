@@ -0,0 +1,73 @@
+import pytest
+from django.core.management import call_command
+
+from stocks.models import Product, Stock, StockAlert, StockMovement, Warehouse
+from stocks.services.alerts import evaluate_alerts
+
+
+@pytest.mark.django_db
+def test_low_stock_alert_is_raised_once_then_resolved(stock: Stock):
+    """
+    Test the lifecycle of a low stock alert driven by the stock movements.
+
+    Args:
+        stock (Stock): A fixture providing an empty stock with a threshold of 2.
+
+    Asserts:
+        - An alert is raised while the stock is at or below its threshold, and only once.
+        - The alert is resolved when the stock goes above its threshold.
+    """
+    # The empty stock is below its threshold
+    assert evaluate_alerts() == (1, 0)
+    assert evaluate_alerts() == (0, 0)
+
+    # Refill the stock above its threshold
+    stock.pack_quantity = 5
+    stock.save()
+    StockMovement.objects.create(stock=stock, movement_type=StockMovement.Types.IN, quantity=5)
+
+    alert = StockAlert.objects.get(kind=StockAlert.Kinds.LOW_STOCK, stock=stock)
+    assert alert.resolved_at is not None
+
+
+@pytest.mark.django_db
+def test_missing_critical_product_alert(product: Product, warehouse: Warehouse):
+    """
+    Test that a critical product without stock in a building store raises an alert.
+
+    Args:
+        product (Product): A fixture providing a product, made critical by the test.
+        warehouse (Warehouse): A fixture providing a building store.
+
+    Asserts:
+        - The alert targets the critical product in the store.
+        - Kanbans are not evaluated for critical products.
+    """
+    product.critical = True
+    product.save()
+    Warehouse.objects.create(building="A1", room="101", warehouse_type=Warehouse.Types.KANBAN)
+
+    call_command("evaluate_stock_alerts", stdout=None)
+
+    alert = StockAlert.objects.get()
+    assert (alert.kind, alert.product, alert.warehouse) == (StockAlert.Kinds.CRITICAL_MISSING, product, warehouse)
+
+
+@pytest.mark.django_db
+def test_incremental_evaluation_only_touches_given_pairs(stock: Stock, product: Product):
+    """
+    Test that an evaluation restricted to some pairs leaves the other stocks alone.
+
+    Args:
+        stock (Stock): A fixture providing an empty stock.
+        product (Product): The product of the stock.
+
+    Asserts:
+        - Only the stock of the evaluated pair gets an alert.
+    """
+    other = Warehouse.objects.create(building="B2", room="1")
+    Stock.objects.create(unit_quantity=1, pack_quantity=0, shelving="B", batch="X",
+                         reception_date=stock.reception_date, product=product, warehouse=other)
+
+    assert evaluate_alerts({(product.pk, other.pk)}) == (1, 0)
+    assert StockAlert.objects.get().warehouse == other
@@ -0,0 +1,138 @@
+import datetime
+import io
+
+import pytest
+from django.core.management import call_command
+
+from stocks.models import MovementArchive, Stock, StockMovement, StockOpeningBalance
+from stocks.services.archiving import archive_movements, iter_movements
+from stocks.services.levels import verify_levels
+from stocks.services.snapshots import reconstruct_inventory
+
+START = datetime.datetime(2025, 1, 30, 12, tzinfo=datetime.timezone.utc)
+CUTOFF = datetime.datetime(2025, 3, 1, tzinfo=datetime.timezone.utc)
+
+
+@pytest.fixture
+def archive_dir(settings, tmp_path):
+    """
+    Fixture pointing the STOCK_ARCHIVE_DIR setting to a temporary directory.
+    """
+    settings.STOCK_ARCHIVE_DIR = tmp_path
+    return tmp_path
+
+
+@pytest.fixture
+def history(stock: Stock):
+    """
+    Fixture recording movements of the stock every ten days from 2025-01-30, over three months.
+
+    Args:
+        stock (Stock): The stock fixture.
+
+    Returns:
+        list[datetime]: The times of the movements.
+    """
+    times = []
+    for index, (movement_type, quantity) in enumerate([("IN", 10), ("OUT", 3), ("IN", 5), ("OUT", 4), ("IN", 1)]):
+        movement = StockMovement.objects.create(stock=stock, movement_type=movement_type, quantity=quantity)
+        times.append(START + datetime.timedelta(days=10 * index))
+        # auto_now_add cannot be overridden on creation
+        StockMovement.objects.filter(pk=movement.pk).update(timestamp=times[-1])
+    return times
+
+
+@pytest.mark.django_db
+def test_archive_movements(stock: Stock, history: list, archive_dir):
+    """
+    Test the archiving of the movements recorded before a cutoff.
+
+    Args:
+        stock (Stock): The stock fixture.
+        history (list): The times of the movements.
+        archive_dir (Path): The temporary archive directory.
+
+    Asserts:
+        - The old movements leave the table and are written to one file per month.
+        - Their net quantity is folded into the opening balance of the stock.
+        - The stock level ledger still matches the history.
+        - A second archiving with the same cutoff does nothing.
+    """
+    assert archive_movements(CUTOFF) == 3
+
+    assert StockMovement.objects.filter(timestamp__lt=CUTOFF).count() == 0
+    assert StockMovement.objects.count() == 2
+    assert sorted(archive.month.month for archive in MovementArchive.objects.all()) == [1, 2]
+    assert all((archive_dir / archive.path).exists() for archive in MovementArchive.objects.all())
+    balance = StockOpeningBalance.objects.get(stock=stock)
+    assert (balance.quantity, balance.as_of) == (12, CUTOFF)
+    assert verify_levels() == []
+
+    assert archive_movements(CUTOFF) == 0
+
+
+@pytest.mark.django_db
+def test_history_reads_through_the_archives(stock: Stock, history: list, archive_dir):
+    """
+    Test that the archived movements stay readable.
+
+    Args:
+        stock (Stock): The stock fixture.
+        history (list): The times of the movements.
+        archive_dir (Path): The temporary archive directory.
+
+    Asserts:
+        - The unified history returns the archived and recent movements, filtered by time.
+        - The inventory is reconstructed before the cutoff from the archives, after it from the opening balance.
+    """
+    expected = {at: reconstruct_inventory(stock.warehouse, at) for at in history}
+    archive_movements(CUTOFF)
+
+    assert [row["timestamp"] for row in iter_movements(stocks=[stock.pk])] == history
+    assert [row["quantity"] for row in iter_movements(warehouse=stock.warehouse, start=history[1],
+                                                      end=history[4])] == [3, 5, 4]
+    assert {at: reconstruct_inventory(stock.warehouse, at) for at in history} == expected
+
+
+@pytest.mark.django_db
+def test_archive_stock_movements_command(history: list, archive_dir):
+    """
+    Test the `archive_stock_movements` management command.
+
+    Args:
+        history (list): The times of the movements.
+        archive_dir (Path): The temporary archive directory.
+
+    Asserts:
+        - The movements older than the given number of days are archived, here all of them.
+    """
+    out = io.StringIO()
+
+    call_command("archive_stock_movements", "--days", "0", stdout=out)
+
+    assert "5 movements" in out.getvalue()
+    assert not StockMovement.objects.exists()
+
+
+@pytest.mark.django_db
+def test_archive_to_another_directory(stock: Stock, history: list, archive_dir, tmp_path_factory):
+    """
+    Test that movements archived out of the STOCK_ARCHIVE_DIR directory are read back from where they were written.
+
+    Args:
+        stock (Stock): The stock fixture.
+        history (list): The times of the movements.
+        archive_dir (Path): The temporary archive directory.
+        tmp_path_factory (TempPathFactory): Pytest fixture creating another temporary directory.
+
+    Asserts:
+        - The files are registered with their absolute path.
+        - The history and the reconstructed inventory still include the archived movements.
+    """
+    directory = tmp_path_factory.mktemp("elsewhere")
+    expected = {at: reconstruct_inventory(stock.warehouse, at) for at in history}
+    call_command("archive_stock_movements", "--days", "0", "--directory", str(directory), stdout=io.StringIO())
+
+    assert all(archive.path.startswith(str(directory.resolve())) for archive in MovementArchive.objects.all())
+    assert len(list(iter_movements(stocks=[stock.pk]))) == 5
+    assert {at: reconstruct_inventory(stock.warehouse, at) for at in history} == expected
@@ -0,0 +1,57 @@
+import json
+
+import pytest
+from django.core.management import CommandError, call_command
+
+from stocks.services.benchmarking import SCENARIOS, build_report, compare_reports, run_scenarios, save_report
+
+
+def test_run_scenarios(inventory):
+    """
+    Test that every scenario runs against a seeded inventory, and that a slower run is reported as a regression.
+
+    Args:
+        inventory (dict[str, int]): The inventory fixture.
+
+    Asserts:
+        - Each scenario has its latency statistics, throughput and query count.
+        - A scenario whose median latency grew past the tolerance is a regression.
+    """
+    results = run_scenarios(iterations=2, warmup=1)
+
+    assert list(results) == list(SCENARIOS)
+    for result in results.values():
+        assert result["iterations"] == 2
+        assert 0 < result["min_ms"] <= result["median_ms"] <= result["p95_ms"] <= result["max_ms"]
+        assert result["throughput_per_s"] > 0 and result["queries"] > 0
+    current = build_report(results, inventory)
+    previous = json.loads(json.dumps(current))
+    previous["results"]["dashboard"]["median_ms"] = current["results"]["dashboard"]["median_ms"] / 2
+    rows = {row["scenario"]: row for row in compare_reports(previous, current, tolerance=0.5)}
+    assert rows["dashboard"]["regression"] and not rows["login"]["regression"]
+
+
+@pytest.mark.django_db
+def test_run_benchmarks_command(tmp_path):
+    """
+    Test the `run_benchmarks` management command on the current database.
+
+    Args:
+        tmp_path (Path): A temporary directory for the results.
+
+    Asserts:
+        - The results are written as JSON with the dataset they were measured on.
+        - A regression past `--max-regression` against the compared results fails the command.
+    """
+    arguments = ["--in-place", "--products", "5", "--warehouses", "2", "--stocks", "10", "--movements", "50",
+                 "--scenario", "dashboard", "--iterations", "2", "--warmup", "1"]
+    previous = tmp_path / "previous.json"
+    save_report(build_report({"dashboard": {"median_ms": 1e-6}}, {}), previous)
+
+    with pytest.raises(CommandError, match="dashboard"):
+        call_command("run_benchmarks", *arguments, "--output", str(tmp_path / "current.json"),
+                     "--compare", str(previous), "--max-regression", "50")
+
+    report = json.loads((tmp_path / "current.json").read_text())
+    assert report["dataset"]["movements"] == 50
+    assert set(report["results"]) == {"dashboard"}
@@ -0,0 +1,57 @@
+import pytest
+
+from stocks.models import Stock, StockMovement
+from stocks.services.dashboard import dashboard_key, warehouse_summaries
+from stocks.services.movements import record_movement
+
+
+@pytest.mark.django_db
+def test_warehouse_summaries(stock: Stock):
+    """
+    Test the summary of the stocks of a warehouse.
+
+    Args:
+        stock (Stock): A fixture providing an empty stock, with an alert threshold of 1.
+
+    Asserts:
+        - The stocks, the packages, the low stocks and the open alerts of the warehouse are counted.
+        - A warehouse outside the requested ones is not summarized.
+    """
+    record_movement(stock, StockMovement.Types.IN, 1)
+    summaries = warehouse_summaries([stock.warehouse_id])
+
+    assert summaries == [{"id": stock.warehouse_id, "name": stock.warehouse.name, "building": "A1", "stocks": 1,
+                          "packages": 1, "low_stocks": 1, "alerts": 1}]
+    assert warehouse_summaries([stock.warehouse_id + 1]) == []
+
+
+@pytest.mark.django_db
+def test_dashboard_key_follows_movements(stock: Stock, django_assert_num_queries):
+    """
+    Test that the key of a dashboard changes with the movements of its warehouses and the changes of its stocks.
+
+    Args:
+        stock (Stock): The stock fixture.
+        django_assert_num_queries (Callable): Pytest-django fixture counting the queries of a block.
+
+    Asserts:
+        - The key is stable while nothing changes, and read with two queries whatever the number of warehouses.
+        - A movement of the warehouse changes the key of its scope and of the unrestricted scope, not of the other
+          warehouses, without any cache being written.
+        - A stock changed without movement changes every key.
+    """
+    warehouses = [stock.warehouse_id]
+    other = [stock.warehouse_id + 1]
+    keys = [dashboard_key(warehouses), dashboard_key(None), dashboard_key(other)]
+    with django_assert_num_queries(6):
+        assert [dashboard_key(warehouses), dashboard_key(None), dashboard_key(other)] == keys
+
+    movement = record_movement(stock, StockMovement.Types.IN, 5)
+    assert dashboard_key(warehouses).endswith(f":{stock.warehouse_id}={movement.pk}")
+    assert dashboard_key(None) != keys[1]
+    assert dashboard_key(other) == keys[2]
+
+    moved = dashboard_key(warehouses)
+    stock.threshold = 10
+    stock.save()
+    assert dashboard_key(warehouses) != moved
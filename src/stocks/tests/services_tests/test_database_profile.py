@@ -0,0 +1,27 @@
+import pytest
+from django.db import connection
+from django.db.backends.sqlite3.base import DatabaseWrapper
+
+
+@pytest.mark.django_db
+def test_sqlite_pragmas_run_on_connect(tmp_path, settings):
+    """
+    Test that the SQLITE_PRAGMAS setting of the production profile is run on every new connection.
+
+    Args:
+        tmp_path (Path): Pytest fixture providing a temporary directory, holding the database file.
+        settings (SettingsWrapper): Pytest-django fixture overriding the settings.
+
+    Asserts:
+        - A new connection uses the WAL journal, the NORMAL synchronisation and the configured busy timeout.
+    """
+    settings.SQLITE_PRAGMAS = {"journal_mode": "WAL", "synchronous": "NORMAL", "busy_timeout": 1234}
+    wrapper = DatabaseWrapper({**connection.settings_dict, "NAME": str(tmp_path / "db.sqlite3")}, alias="profile")
+    try:
+        with wrapper.cursor() as cursor:
+            values = [cursor.execute(f"PRAGMA {name}").fetchone()[0]
+                      for name in ("journal_mode", "synchronous", "busy_timeout")]
+    finally:
+        wrapper.close()
+    # synchronous is reported as a number, NORMAL being 1
+    assert values == ["wal", 1, 1234]
@@ -0,0 +1,60 @@
+import asyncio
+
+import pytest
+from asgiref.sync import async_to_sync, sync_to_async
+
+from stocks.models import Stock, StockMovement
+from stocks.services.feed import MovementFeed
+from stocks.services.movements import record_movement
+
+
+@pytest.mark.django_db
+def test_feed_returns_recorded_movements(stock: Stock):
+    """
+    Test that a waiting request gets the movements already recorded at once, and times out without any.
+
+    Args:
+        stock (Stock): The stock fixture.
+
+    Asserts:
+        - The movements recorded after the given one are returned, oldest first.
+        - A request for another warehouse waits until its timeout and gets no movement.
+    """
+    first = record_movement(stock, StockMovement.Types.IN, 5)
+    second = record_movement(stock, StockMovement.Types.OUT, 2)
+    feed = MovementFeed(interval=0.01)
+
+    rows = async_to_sync(feed.wait)(first.pk - 1, [stock.warehouse_id], timeout=1)
+    empty = async_to_sync(feed.wait)(first.pk - 1, [stock.warehouse_id + 1], timeout=0.05)
+
+    assert [(row["id"], row["quantity"], row["warehouse"]) for row in rows] == [(first.pk, 5, stock.warehouse_id),
+                                                                               (second.pk, 2, stock.warehouse_id)]
+    assert empty == []
+    assert feed.waiters == 0
+
+
+@pytest.mark.django_db
+def test_feed_wakes_waiting_requests_up(stock: Stock):
+    """
+    Test that the requests waiting for the movements of a warehouse are woken up by a new movement.
+
+    Args:
+        stock (Stock): The stock fixture.
+
+    Asserts:
+        - Every waiting request of the warehouse gets the movement recorded while it waits.
+        - The feed stops reading once no request waits.
+    """
+    feed = MovementFeed(interval=0.01)
+
+    async def scenario():
+        waiting = [asyncio.create_task(feed.wait(0, [stock.warehouse_id], timeout=5)) for _ in range(3)]
+        await asyncio.sleep(0.05)
+        assert feed.waiters == 3
+        movement = await sync_to_async(record_movement)(stock, StockMovement.Types.IN, 4)
+        return movement, await asyncio.gather(*waiting)
+
+    movement, results = async_to_sync(scenario)()
+
+    assert [[row["id"] for row in rows] for rows in results] == [[movement.pk]] * 3
+    assert feed.waiters == 0 and feed.last_id is None
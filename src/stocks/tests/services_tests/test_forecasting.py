@@ -0,0 +1,149 @@
+import datetime
+import io
+
+import pytest
+from django.core.management import call_command
+from django.utils import timezone
+
+from stocks.models import ConsumptionForecast, Stock, StockAlert, StockMovement, Warehouse
+from stocks.services.forecasting import HISTORY_DAYS, WINDOW_DAYS, forecast_series, update_forecasts
+from stocks.services.movements import record_movement
+
+
+def test_forecast_series():
+    """
+    Test the forecasts of daily consumption series bucketed from grouped rows.
+
+    Asserts:
+        - A steady consumption is forecast at its daily rate, without safety stock.
+        - A single spike raises the deviation, and so the safety stock of its reorder point.
+        - The days out of the series are ignored.
+    """
+    start = datetime.date(2025, 1, 1)
+    rows = [(1, 10, start + datetime.timedelta(days=day), 2) for day in range(10)]
+    rows += [(2, 10, start + datetime.timedelta(days=9), 20), (2, 10, start - datetime.timedelta(days=1), 50)]
+
+    forecasts = forecast_series(rows, start, days=10, window=10, lead_days=7)
+
+    assert forecasts["product_id"].tolist() == [1, 2]
+    assert forecasts["warehouse_id"].tolist() == [10, 10]
+    assert forecasts["moving_average"].tolist() == [2, 2]
+    assert forecasts["smoothed"][0] == pytest.approx(2)
+    assert forecasts["deviation"][0] == 0
+    assert forecasts["reorder_point"][0] == 14
+    assert forecasts["deviation"][1] == pytest.approx(6)
+    assert forecasts["reorder_point"][1] > 14 + 1.65 * 6 * 7 ** 0.5
+
+
+@pytest.mark.django_db
+def test_update_forecasts_only_recomputes_changed_series(stock: Stock):
+    """
+    Test that a second forecast only recomputes the series with new OUT movements.
+
+    Args:
+        stock (Stock): The stock fixture.
+
+    Asserts:
+        - The first run forecasts the series of the stock and sets its threshold to the reorder point.
+        - A run without new movement recomputes nothing.
+        - A run after a movement of another warehouse only recomputes the series of that warehouse.
+    """
+    record_movement(stock, StockMovement.Types.IN, 100)
+    record_movement(stock, StockMovement.Types.OUT, 14)
+
+    assert update_forecasts() == 1
+    forecast = ConsumptionForecast.objects.get()
+    stock.refresh_from_db()
+    assert stock.threshold == forecast.reorder_point == 36
+
+    assert update_forecasts() == 0
+
+    kanban = Warehouse.objects.create(building="A1", room="101", warehouse_type=Warehouse.Types.KANBAN)
+    other = Stock.objects.create(unit_quantity=1, pack_quantity=0, shelving="K01", batch="BATCH-001",
+                                 reception_date=datetime.date(2025, 1, 1), product=stock.product, warehouse=kanban)
+    record_movement(other, StockMovement.Types.IN, 10)
+    record_movement(other, StockMovement.Types.OUT, 1)
+
+    assert update_forecasts() == 1
+    assert ConsumptionForecast.objects.get(warehouse=kanban).last_movement_id > forecast.last_movement_id
+    assert ConsumptionForecast.objects.get(pk=forecast.pk).last_movement_id == forecast.last_movement_id
+
+
+@pytest.mark.django_db
+def test_update_forecasts_follows_the_days(stock: Stock):
+    """
+    Test that an incremental forecast recomputes the series whose consumption gets older, without new movement.
+
+    Args:
+        stock (Stock): The stock fixture.
+
+    Asserts:
+        - Once the consumption left the moving average window, the series is recomputed with a lower average.
+        - Once it left the history, the series is reset to no consumption and the threshold to 0.
+    """
+    record_movement(stock, StockMovement.Types.IN, 100)
+    record_movement(stock, StockMovement.Types.OUT, 14)
+    assert update_forecasts() == 1
+    initial = ConsumptionForecast.objects.get()
+
+    later = timezone.now() + datetime.timedelta(days=WINDOW_DAYS + 1)
+    assert update_forecasts(now=later) == 1
+    assert ConsumptionForecast.objects.get().moving_average < initial.moving_average
+
+    later = timezone.now() + datetime.timedelta(days=HISTORY_DAYS + 1)
+    assert update_forecasts(now=later) == 1
+    forecast = ConsumptionForecast.objects.get()
+    assert (forecast.moving_average, forecast.smoothed, forecast.reorder_point) == (0, 0, 0)
+    stock.refresh_from_db()
+    assert stock.threshold == 0
+
+
+@pytest.mark.django_db
+def test_update_forecasts_sets_one_threshold_per_pair(stock: Stock):
+    """
+    Test that the reorder point of a pair held in two batches is the threshold of a single batch.
+
+    Args:
+        stock (Stock): The stock fixture, expiring in 2030.
+
+    Asserts:
+        - The batch picked last takes the reorder point, the batch picked first a threshold of 0.
+        - The batch picked first raises no alert while the pair holds more than its reorder point.
+    """
+    later = Stock.objects.create(unit_quantity=1, pack_quantity=0, shelving="A02", batch="BATCH-002",
+                                 expiration_date=datetime.date(2031, 1, 1), reception_date=datetime.date(2025, 2, 1),
+                                 product=stock.product, warehouse=stock.warehouse)
+    record_movement(stock, StockMovement.Types.IN, 20)
+    record_movement(stock, StockMovement.Types.OUT, 14)
+    record_movement(later, StockMovement.Types.IN, 100)
+
+    assert update_forecasts() == 1
+
+    stock.refresh_from_db()
+    later.refresh_from_db()
+    assert (stock.threshold, later.threshold) == (0, ConsumptionForecast.objects.get().reorder_point)
+    assert stock.pack_quantity < later.threshold
+    assert not StockAlert.objects.filter(kind=StockAlert.Kinds.LOW_STOCK, resolved_at__isnull=True).exists()
+
+
+@pytest.mark.django_db
+def test_forecast_consumption_command_without_thresholds(stock: Stock):
+    """
+    Test the `forecast_consumption` management command when the thresholds are left unchanged.
+
+    Args:
+        stock (Stock): The stock fixture.
+
+    Asserts:
+        - The forecast is saved and reported, the threshold of the stock is unchanged.
+    """
+    record_movement(stock, StockMovement.Types.IN, 10)
+    record_movement(stock, StockMovement.Types.OUT, 5)
+    out = io.StringIO()
+
+    call_command("forecast_consumption", "--full", "--no-thresholds", stdout=out)
+
+    assert "1 consumption series forecast" in out.getvalue()
+    assert ConsumptionForecast.objects.filter(product=stock.product).exists()
+    stock.refresh_from_db()
+    assert stock.threshold == 2
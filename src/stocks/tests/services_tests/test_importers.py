@@ -0,0 +1,137 @@
+import io
+
+import pytest
+from django.core.management import call_command
+
+from stocks.models import Product, Stock, Warehouse
+from stocks.services.importers import import_products, import_stocks, read_rows
+from stocks.services.levels import get_level
+
+PRODUCTS_CSV = (
+    "sku,name,product_type,price,supplier,supplier_ref,manufacturer,manufacturer_ref,critical\n"
+    "P001,Gloves,Consumable,1.50,Sup,S1,Man,M1,yes\n"
+    "P002,Beaker,Glass,3.00,Sup,S2,Man,M2,no\n"
+    "P003,,Glass,3.00,Sup,S3,Man,M3,no\n"
+)
+
+
+@pytest.mark.django_db
+def test_import_products_upserts_on_sku(product: Product):
+    """
+    Test that the product import creates new SKUs and updates existing ones.
+
+    Args:
+        product (Product): A fixture providing an existing product, updated by the import.
+
+    Asserts:
+        - New products are created and the existing one is updated.
+        - Rows with a missing required column are rejected with their line number.
+    """
+    content = PRODUCTS_CSV + f"{product.sku},Renamed,Consumable,2.00,Sup,S4,Man,M4,0\n"
+
+    report = import_products(read_rows(io.BytesIO(content.encode()), "csv"), batch_size=2)
+
+    assert (report.rows, report.created, report.updated, report.failed) == (4, 2, 1, 1)
+    assert report.errors == ["line 4: name is required"]
+    assert Product.objects.get(sku="P001").critical is True
+    product.refresh_from_db()
+    assert product.name == "Renamed"
+
+
+@pytest.mark.django_db
+def test_import_products_streams_batches():
+    """
+    Test that the product import consumes its rows batch by batch instead of reading them all first.
+
+    Asserts:
+        - When the first batch is reported, only the rows of that batch have been read.
+    """
+    read = []
+
+    def rows():
+        for index in range(10):
+            read.append(index)
+            yield {"sku": f"S{index}", "name": "Item", "supplier": "S", "supplier_ref": "S",
+                   "manufacturer": "M", "manufacturer_ref": "M"}
+
+    progress = []
+    import_products(rows(), batch_size=3, progress=lambda report: progress.append((report.rows, len(read))))
+
+    assert progress[0] == (3, 3)
+    assert progress[-1] == (10, 10)
+
+
+@pytest.mark.django_db
+def test_import_stocks_records_quantity_changes(product: Product, warehouse: Warehouse):
+    """
+    Test that the stock import creates then updates stocks and records their quantity as movements.
+
+    Args:
+        product (Product): A fixture providing the imported product.
+        warehouse (Warehouse): A fixture providing the warehouse of the stocks.
+
+    Asserts:
+        - A second import of the same stock updates it instead of duplicating it.
+        - The stock level follows the imported packaging quantity.
+    """
+    header = "sku,warehouse,unit_quantity,pack_quantity,shelving,batch,reception_date\n"
+
+    def import_quantity(quantity):
+        line = f"{product.sku},{warehouse.name},1,{quantity},A01,LOT1,2025-01-01\n"
+        return import_stocks(read_rows(io.BytesIO((header + line).encode()), "csv"))
+
+    assert import_quantity(10).created == 1
+    assert import_quantity(4).updated == 1
+
+    assert Stock.objects.get().pack_quantity == 4
+    assert get_level(product, warehouse) == 4
+
+
+@pytest.mark.django_db
+def test_import_stocks_resolves_warehouses(product: Product, warehouse: Warehouse):
+    """
+    Test that the warehouse of an imported stock is found by its id, or by its name when it is not shared.
+
+    Args:
+        product (Product): A fixture providing the imported product.
+        warehouse (Warehouse): A fixture providing a warehouse, given the same name as another one.
+
+    Asserts:
+        - A row naming a warehouse whose name is shared is rejected.
+        - A row giving the id of the warehouse is imported into that warehouse.
+    """
+    Warehouse.objects.create(building=warehouse.building, room=warehouse.room,
+                             warehouse_type=warehouse.warehouse_type)
+    rows = (f"sku,warehouse,unit_quantity,pack_quantity,shelving,batch,reception_date\n"
+            f"{product.sku},{warehouse.name},1,3,A01,LOT1,2025-01-01\n"
+            f"{product.sku},{warehouse.pk},1,5,A01,LOT2,2025-01-01\n")
+
+    report = import_stocks(read_rows(io.BytesIO(rows.encode()), "csv"))
+
+    assert (report.created, report.failed) == (1, 1)
+    assert "use the id of the warehouse" in report.errors[0]
+    assert Stock.objects.get().warehouse_id == warehouse.pk
+
+
+@pytest.mark.django_db
+def test_import_inventory_command_with_xlsx(tmp_path):
+    """
+    Test the `import_inventory` management command with an XLSX file.
+
+    Args:
+        tmp_path (Path): pytest fixture providing a temporary directory.
+
+    Asserts:
+        - The products of the workbook are imported.
+    """
+    from openpyxl import Workbook
+
+    workbook = Workbook()
+    for line in PRODUCTS_CSV.splitlines():
+        workbook.active.append(line.split(","))
+    path = tmp_path / "catalogue.xlsx"
+    workbook.save(path)
+
+    call_command("import_inventory", "product", str(path), stdout=io.StringIO(), stderr=io.StringIO())
+
+    assert set(Product.objects.values_list("sku", flat=True)) == {"P001", "P002"}
@@ -0,0 +1,216 @@
+import datetime
+import io
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.utils import timezone
+
+from stocks.models import Job, Stock, StockMovement
+from stocks.services import jobs
+from stocks.services.jobs import claim_jobs, enqueue, release_expired_claims, run_job, work
+
+
+@pytest.fixture
+def failing_handler(monkeypatch):
+    """
+    Fixture registering a "fail" job kind whose handler always raises.
+    """
+    def fail(payload):
+        raise RuntimeError("boom")
+
+    monkeypatch.setitem(jobs.JOB_HANDLERS, "fail", fail)
+
+
+@pytest.mark.django_db
+def test_enqueue_is_idempotent():
+    """
+    Test that a job submitted twice with the same key is queued once.
+
+    Asserts:
+        - The second submission returns the first job, as not created.
+        - Unknown job kinds are rejected.
+    """
+    job, created = enqueue("ingest_movements", {"movements": []}, "batch-1")
+    again, created_again = enqueue("ingest_movements", {"movements": []}, "batch-1")
+
+    assert (created, created_again) == (True, False)
+    assert again.pk == job.pk
+    with pytest.raises(ValueError):
+        enqueue("unknown", {})
+
+
+@pytest.mark.django_db
+def test_enqueue_scopes_the_key_to_the_user():
+    """
+    Test that the same idempotency key sent by two users queues a job for each of them.
+
+    Asserts:
+        - Each user gets their own job, created on their first submission.
+        - A user submitting their key again gets their own job back.
+    """
+    first, second = (get_user_model().objects.create_user(username=name, password="password")
+                     for name in ("first", "second"))
+    first_job, first_created = enqueue("ingest_movements", {"movements": []}, "batch-1", first)
+    second_job, second_created = enqueue("ingest_movements", {"movements": [1]}, "batch-1", second)
+    again, created_again = enqueue("ingest_movements", {"movements": [1]}, "batch-1", second)
+
+    assert (first_created, second_created, created_again) == (True, True, False)
+    assert first_job.pk != second_job.pk
+    assert (first_job.user, second_job.user) == (first, second)
+    assert (again.pk, again.payload) == (second_job.pk, {"movements": [1]})
+
+
+@pytest.mark.django_db
+def test_claim_jobs_claims_each_job_once():
+    """
+    Test the claim of pending jobs by workers.
+
+    Asserts:
+        - A claim takes the oldest pending jobs, up to its limit, and marks them as running.
+        - A job is never claimed twice, and a job delayed to a later time is not claimed.
+    """
+    for index in range(3):
+        enqueue("ingest_movements", {"movements": []})
+    Job.objects.filter(pk=Job.objects.order_by("id").last().pk).update(
+        available_at=timezone.now() + datetime.timedelta(hours=1))
+
+    first = claim_jobs(limit=1)
+    second = claim_jobs(limit=5)
+
+    assert len(first) == len(second) == 1
+    assert first[0].pk < second[0].pk
+    assert {job.status for job in first + second} == {Job.Statuses.RUNNING}
+    assert claim_jobs() == []
+
+
+@pytest.mark.django_db
+def test_run_job_records_result(stock: Stock):
+    """
+    Test a queued batch of movements run by a worker.
+
+    Args:
+        stock (Stock): A fixture providing an empty stock.
+
+    Asserts:
+        - The movements are recorded and the job is done with the per-row results.
+    """
+    enqueue("ingest_movements", {"movements": [{"stock": stock.pk, "movement_type": "IN", "quantity": 3}]})
+
+    (job,) = claim_jobs()
+    assert run_job(job)
+
+    job.refresh_from_db()
+    assert job.status == Job.Statuses.DONE
+    assert job.result["created"] == 1
+    assert StockMovement.objects.get().quantity == 3
+
+
+@pytest.mark.django_db
+def test_run_job_retries_then_fails(failing_handler):
+    """
+    Test the retries of a failing job.
+
+    Args:
+        failing_handler: Fixture registering the "fail" job kind.
+
+    Asserts:
+        - A failed job is queued again after a delay, with its error.
+        - It fails for good once it reaches its maximum number of attempts.
+    """
+    job, _ = enqueue("fail", {})
+    Job.objects.filter(pk=job.pk).update(max_attempts=2)
+
+    (job,) = claim_jobs()
+    assert not run_job(job)
+    job.refresh_from_db()
+    assert (job.status, job.attempts) == (Job.Statuses.PENDING, 1)
+    assert job.available_at > timezone.now()
+    assert "boom" in job.error
+
+    Job.objects.filter(pk=job.pk).update(available_at=timezone.now())
+    (job,) = claim_jobs()
+    run_job(job)
+    job.refresh_from_db()
+    assert (job.status, job.attempts) == (Job.Statuses.FAILED, 2)
+
+
+@pytest.mark.django_db
+def test_release_expired_claims():
+    """
+    Test that the jobs of a worker which died are given back to the queue.
+
+    Asserts:
+        - Only the jobs claimed for longer than the claim timeout are released.
+        - A running worker releases them before each batch.
+    """
+    enqueue("ingest_movements", {"movements": []})
+    enqueue("ingest_movements", {"movements": []})
+    stale, recent = claim_jobs()
+    Job.objects.filter(pk=stale.pk).update(claimed_at=timezone.now() - jobs.CLAIM_TIMEOUT * 2)
+
+    assert release_expired_claims() == 1
+    assert Job.objects.get(pk=stale.pk).status == Job.Statuses.PENDING
+    assert Job.objects.get(pk=recent.pk).status == Job.Statuses.RUNNING
+
+    Job.objects.filter(pk=recent.pk).update(claimed_at=timezone.now() - jobs.CLAIM_TIMEOUT * 2)
+    assert work() == 2
+    assert set(Job.objects.values_list("status", flat=True)) == {Job.Statuses.DONE}
+
+
+@pytest.mark.django_db
+def test_run_job_commits_with_its_outcome(stock: Stock, monkeypatch):
+    """
+    Test that the changes of a job are only committed along with its outcome.
+
+    Args:
+        stock (Stock): A fixture providing an empty stock.
+        monkeypatch (MonkeyPatch): Pytest fixture registering a job kind whose claim is taken over while it runs.
+
+    Asserts:
+        - A job given to another worker while it ran is not marked done, and its movements are rolled back.
+        - Run again by the other worker, its movements are recorded once.
+    """
+    def taken_over(payload):
+        result = jobs._ingest_movements(payload)
+        Job.objects.filter(kind="taken_over").update(claimed_by="other worker")
+        return result
+
+    monkeypatch.setitem(jobs.JOB_HANDLERS, "taken_over", taken_over)
+    enqueue("taken_over", {"movements": [{"stock": stock.pk, "movement_type": "IN", "quantity": 3}]})
+
+    (job,) = claim_jobs()
+    assert not run_job(job)
+    assert Job.objects.get(pk=job.pk).status == Job.Statuses.RUNNING
+    assert not StockMovement.objects.exists()
+
+    monkeypatch.setitem(jobs.JOB_HANDLERS, "taken_over", jobs._ingest_movements)
+    Job.objects.filter(pk=job.pk).update(claimed_at=timezone.now() - jobs.CLAIM_TIMEOUT * 2)
+    assert work() == 1
+    assert Job.objects.get(pk=job.pk).status == Job.Statuses.DONE
+    stock.refresh_from_db()
+    assert stock.pack_quantity == 3 and StockMovement.objects.count() == 1
+
+
+@pytest.mark.django_db
+def test_run_worker_command(stock: Stock):
+    """
+    Test the `run_worker` management command draining the queue once.
+
+    Args:
+        stock (Stock): A fixture providing an empty stock.
+
+    Asserts:
+        - Every queued job is run and the command stops once the queue is empty.
+    """
+    for quantity in (1, 2):
+        enqueue("ingest_movements", {"movements": [{"stock": stock.pk, "movement_type": "IN",
+                                                    "quantity": quantity}]})
+    out = io.StringIO()
+
+    call_command("run_worker", "--once", stdout=out)
+
+    assert "2 jobs run" in out.getvalue()
+    assert set(Job.objects.values_list("status", flat=True)) == {Job.Statuses.DONE}
+    stock.refresh_from_db()
+    assert stock.pack_quantity == 3
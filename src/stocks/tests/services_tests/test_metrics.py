@@ -0,0 +1,83 @@
+import logging
+
+import pytest
+from django.http import HttpResponse
+from django.test import RequestFactory
+
+from stocks.middleware import RequestMetricsMiddleware
+from stocks.models import Product
+from stocks.services.metrics import N_PLUS_ONE_THRESHOLD, REGISTRY, UNRESOLVED_VIEW, Histogram, MetricsRegistry
+
+
+@pytest.fixture(autouse=True)
+def registry():
+    """
+    Fixture emptying the metrics of the process around each test.
+    """
+    REGISTRY.clear()
+    yield REGISTRY
+    REGISTRY.clear()
+
+
+def test_registry_renders_prometheus_histograms():
+    """
+    Test the aggregation of the requests and their Prometheus text format.
+
+    Asserts:
+        - A histogram counts each value in the first bucket whose bound is not lower, cumulatively.
+        - The rendered families hold the buckets, sums and counts of each view.
+    """
+    histogram = Histogram((1, 5))
+    for value in (0.5, 1, 3, 7):
+        histogram.observe(value)
+    assert histogram.cumulative()[:2] == [(1, 2), (5, 3)]
+    assert histogram.count == 4
+
+    registry = MetricsRegistry()
+    registry.record("stocks:scan", 200, 0.02, 3, 0.004, False)
+    registry.record("stocks:scan", 404, 0.2, 12, 0.1, True)
+    text = registry.render()
+
+    assert 'stockmaster_request_duration_seconds_bucket{view="stocks:scan",le="0.025"} 1' in text
+    assert 'stockmaster_request_duration_seconds_bucket{view="stocks:scan",le="+Inf"} 2' in text
+    assert 'stockmaster_request_duration_seconds_count{view="stocks:scan"} 2' in text
+    assert 'stockmaster_request_queries_sum{view="stocks:scan"} 15.0' in text
+    assert 'stockmaster_request_n_plus_one_total{view="stocks:scan"} 1' in text
+    assert 'stockmaster_requests_total{view="stocks:scan",status="404"} 1' in text
+    assert "# TYPE stockmaster_request_sql_seconds_total counter" in text
+
+
+@pytest.mark.django_db
+def test_middleware_flags_repeated_queries(product: Product, caplog):
+    """
+    Test that the middleware counts the queries of a request and flags a query repeated in a loop.
+
+    Args:
+        product (Product): The product fixture.
+        caplog (LogCaptureFixture): Pytest fixture capturing the logs.
+
+    Asserts:
+        - The queries and their time are recorded for the request.
+        - A query repeated N_PLUS_ONE_THRESHOLD times is logged and counted as an N+1 pattern, a single
+          query is not.
+    """
+    def single(request):
+        Product.objects.get(pk=product.pk)
+        return HttpResponse()
+
+    def loop(request):
+        for _ in range(N_PLUS_ONE_THRESHOLD):
+            Product.objects.get(pk=product.pk)
+        return HttpResponse()
+
+    request = RequestFactory().get("/unknown/")
+    RequestMetricsMiddleware(single)(request)
+    with caplog.at_level(logging.WARNING, logger="stocks.middleware"):
+        RequestMetricsMiddleware(loop)(request)
+
+    metrics = REGISTRY[UNRESOLVED_VIEW]
+    assert metrics.queries.sum == N_PLUS_ONE_THRESHOLD + 1
+    assert metrics.latency.count == 2
+    assert metrics.sql_time > 0
+    assert metrics.n_plus_one == 1
+    assert f"{N_PLUS_ONE_THRESHOLD} executions of SELECT" in caplog.text
@@ -0,0 +1,112 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from stocks.models import Stock, StockMovement
+from stocks.services.levels import get_level
+from stocks.services.movements import ingest_movements
+
+
+@pytest.mark.django_db
+def test_ingest_movements_records_valid_rows(stock: Stock):
+    """
+    Test that a batch of valid movements is recorded and applied to the stock.
+
+    Args:
+        stock (Stock): A fixture providing an empty stock.
+
+    Asserts:
+        - Every row is reported as created with the id of its movement.
+        - The packaging quantity of the stock and its stock level are updated.
+    """
+    rows = [
+        {"stock": stock.pk, "movement_type": "IN", "quantity": 10},
+        {"stock": stock.pk, "movement_type": "OUT", "quantity": 4, "reason": "picking"},
+    ]
+
+    results = ingest_movements(rows)
+
+    # Verify the per-row results
+    assert [result["status"] for result in results] == ["created", "created"]
+    assert StockMovement.objects.filter(pk__in=[result["id"] for result in results]).count() == 2
+    # Verify the stock quantity and the ledger
+    stock.refresh_from_db()
+    assert stock.pack_quantity == 6
+    assert get_level(stock.product, stock.warehouse) == 6
+
+
+@pytest.mark.django_db
+def test_ingest_movements_reports_invalid_rows(stock: Stock):
+    """
+    Test that the invalid rows of a batch are reported without blocking the valid ones.
+
+    Args:
+        stock (Stock): A fixture providing an empty stock.
+
+    Asserts:
+        - Malformed rows, unknown stocks and outgoing movements exceeding the stock are reported as errors.
+        - The valid row is recorded.
+    """
+    rows = [
+        {"stock": stock.pk, "movement_type": "SIDEWAYS", "quantity": 1},
+        {"stock": 999999, "movement_type": "IN", "quantity": 1},
+        {"stock": stock.pk, "movement_type": "OUT", "quantity": 1},
+        {"stock": stock.pk, "movement_type": "IN", "quantity": 3},
+    ]
+
+    results = ingest_movements(rows)
+
+    # Verify the per-row results
+    assert [result["status"] for result in results] == ["error", "error", "error", "created"]
+    assert "movement_type" in results[0]["errors"]
+    assert "stock" in results[1]["errors"]
+    assert results[2]["errors"]["quantity"][0]["code"] == "insufficient"
+    # Verify that only the valid row was applied
+    stock.refresh_from_db()
+    assert stock.pack_quantity == 3
+
+
+@pytest.mark.django_db
+def test_ingest_movements_query_count_does_not_depend_on_batch_size(stock: Stock):
+    """
+    Test that the number of queries of a batch does not grow with the number of rows.
+
+    Args:
+        stock (Stock): A fixture providing an empty stock.
+
+    Asserts:
+        - A batch of 100 rows on one stock costs as many queries as a batch of 10 rows.
+    """
+    def count_queries(size):
+        rows = [{"stock": stock.pk, "movement_type": "IN", "quantity": 1} for _ in range(size)]
+        with CaptureQueriesContext(connection) as context:
+            ingest_movements(rows)
+        return len(context.captured_queries)
+
+    # The first batch creates the stock level of the pair and brings the stock above its threshold
+    count_queries(5)
+    assert count_queries(100) == count_queries(10)
+
+
+@pytest.mark.django_db
+def test_ingest_movements_skips_recorded_keys(stock: Stock):
+    """
+    Test the idempotency keys of the ingested movements.
+
+    Args:
+        stock (Stock): A fixture providing an empty stock.
+
+    Asserts:
+        - A key repeated within a batch, or sent again in a later batch, is recorded once.
+        - The duplicates are reported with the id of the recorded movement.
+    """
+    row = {"stock": stock.pk, "movement_type": "IN", "quantity": 4, "key": "delivery-1"}
+
+    first = ingest_movements([row, row])
+    second = ingest_movements([row])
+
+    assert first[1] == {"index": 1, "status": "created", "id": first[0]["id"], "duplicate": True}
+    assert second[0] == {"index": 0, "status": "created", "id": first[0]["id"], "duplicate": True}
+    stock.refresh_from_db()
+    assert stock.pack_quantity == 4
+    assert StockMovement.objects.count() == 1
@@ -0,0 +1,102 @@
+import datetime
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from stocks.models import Product, Stock, StockMovement, Warehouse
+from stocks.services.levels import get_level
+from stocks.services.movements import InsufficientStock
+from stocks.services.picking import pick, plan_pick
+
+
+@pytest.fixture
+def shelves(product: Product, warehouse: Warehouse):
+    """
+    Fixture to create stocks of the product expiring at different dates, received through IN movements.
+
+    Args:
+        product (Product): The product fixture.
+        warehouse (Warehouse): The warehouse fixture.
+
+    Returns:
+        dict[str, Stock]: The stocks keyed by batch: LATE, SOON, NEVER (no expiration date) and OLD (same
+        expiration date as SOON but received earlier), each holding 3 packages.
+    """
+    dates = {
+        "LATE": (datetime.date(2031, 1, 1), datetime.date(2025, 1, 1)),
+        "SOON": (datetime.date(2030, 1, 1), datetime.date(2025, 2, 1)),
+        "NEVER": (None, datetime.date(2024, 1, 1)),
+        "OLD": (datetime.date(2030, 1, 1), datetime.date(2025, 1, 1)),
+    }
+    stocks = {}
+    for batch, (expiration, reception) in dates.items():
+        stocks[batch] = Stock.objects.create(unit_quantity=1, pack_quantity=3, shelving="A", batch=batch,
+                                             expiration_date=expiration, reception_date=reception,
+                                             threshold=0, product=product, warehouse=warehouse)
+        StockMovement.objects.create(stock=stocks[batch], movement_type=StockMovement.Types.IN, quantity=3)
+    return stocks
+
+
+@pytest.mark.django_db
+def test_plan_pick_is_first_expired_first_out(shelves: dict, product: Product, warehouse: Warehouse):
+    """
+    Test the order in which the stocks are allocated.
+
+    Asserts:
+        - The earliest expiration goes first, ties broken by the earliest reception.
+        - The stocks without expiration date go last.
+    """
+    plan = plan_pick(product, warehouse, 11)
+
+    assert [(stock.batch, taken) for stock, taken in plan] == [("OLD", 3), ("SOON", 3), ("LATE", 3), ("NEVER", 2)]
+
+
+@pytest.mark.django_db
+def test_pick_records_out_movements(shelves: dict, product: Product, warehouse: Warehouse):
+    """
+    Test that a pick updates the allocated stocks and records one OUT movement per stock.
+
+    Asserts:
+        - The stocks are emptied in picking order.
+        - The stock level of the pair follows the pick.
+    """
+    movements = pick(product, warehouse, 4)
+
+    assert [(movement.stock.batch, movement.quantity) for movement in movements] == [("OLD", 3), ("SOON", 1)]
+    shelves["SOON"].refresh_from_db()
+    assert shelves["SOON"].pack_quantity == 2
+    assert get_level(product, warehouse) == 8
+
+
+@pytest.mark.django_db
+def test_pick_refuses_insufficient_stock(shelves: dict, product: Product, warehouse: Warehouse):
+    """
+    Test that a pick larger than the stock held by the warehouse records nothing.
+
+    Asserts:
+        - InsufficientStock is raised.
+        - No stock is changed.
+    """
+    with pytest.raises(InsufficientStock):
+        pick(product, warehouse, 13)
+
+    assert sum(Stock.objects.values_list("pack_quantity", flat=True)) == 12
+
+
+@pytest.mark.django_db
+def test_pick_query_count_does_not_depend_on_allocated_stocks(shelves: dict, product: Product,
+                                                             warehouse: Warehouse):
+    """
+    Test that a pick spread over several stocks costs as many queries as a pick from a single stock.
+
+    Asserts:
+        - Picking from one stock and from three stocks execute the same number of queries.
+    """
+    # Both picks empty stocks, so both raise low stock alerts
+    with CaptureQueriesContext(connection) as single:
+        pick(product, warehouse, 3)
+    with CaptureQueriesContext(connection) as spread:
+        pick(product, warehouse, 7)
+
+    assert len(spread.captured_queries) == len(single.captured_queries)
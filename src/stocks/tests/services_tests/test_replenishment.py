@@ -0,0 +1,144 @@
+import datetime
+import io
+
+import pytest
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from stocks.models import Product, Stock, StockMovement, Warehouse
+from stocks.services.levels import verify_levels
+from stocks.services.movements import record_movement
+from stocks.services.replenishment import kanban_needs, plan_replenishment, replenish, supply_stocks
+
+
+@pytest.fixture
+def network(product: Product):
+    """
+    Fixture to create the main store, the store and two kanbans of building R1, holding the product.
+
+    The store holds 5 packages with a threshold of 2, the main store 10 packages. Kanban K1 is empty with a
+    threshold of 2 and consumed 14 packages over the last days, kanban K2 holds 1 package with a threshold of 2.
+
+    Args:
+        product (Product): The product fixture.
+
+    Returns:
+        dict[str, Stock]: The stocks keyed by warehouse: MAIN, STORE, K1 and K2.
+    """
+    warehouses = {
+        "MAIN": Warehouse.objects.create(building="M0", room="1", warehouse_type=Warehouse.Types.MAIN),
+        "STORE": Warehouse.objects.create(building="R1", room="1", warehouse_type=Warehouse.Types.STORE),
+        "K1": Warehouse.objects.create(building="R1", room="2", warehouse_type=Warehouse.Types.KANBAN),
+        "K2": Warehouse.objects.create(building="R1", room="3", warehouse_type=Warehouse.Types.KANBAN),
+    }
+    stocks = {}
+    for name, (quantity, threshold, expiration) in {"MAIN": (10, 0, datetime.date(2030, 1, 1)),
+                                                    "STORE": (5, 2, datetime.date(2029, 1, 1)),
+                                                    "K1": (14, 2, None),
+                                                    "K2": (1, 2, None)}.items():
+        stocks[name] = Stock.objects.create(unit_quantity=1, pack_quantity=0, shelving="S1", batch=name,
+                                            expiration_date=expiration, reception_date=datetime.date(2025, 1, 1),
+                                            threshold=threshold, product=product, warehouse=warehouses[name])
+        record_movement(stocks[name], StockMovement.Types.IN, quantity)
+    record_movement(stocks["K1"], StockMovement.Types.OUT, 14)
+    return stocks
+
+
+@pytest.mark.django_db
+def test_kanban_needs(network: dict):
+    """
+    Test the quantities missing in the kanbans of a building.
+
+    Args:
+        network (dict): The stocks of the building.
+
+    Asserts:
+        - K1 needs its threshold plus a week of its consumption of one package a day, K2 its threshold.
+        - The most urgent kanban comes first.
+    """
+    needs = kanban_needs("R1")
+
+    assert [(need.kanban_id, need.quantity) for need in needs] == [(network["K1"].warehouse_id, 9),
+                                                                   (network["K2"].warehouse_id, 1)]
+
+
+@pytest.mark.django_db
+def test_replenish_from_store_then_main_store(network: dict):
+    """
+    Test the transfers recorded by a replenishment.
+
+    Args:
+        network (dict): The stocks of the building.
+
+    Asserts:
+        - The store gives what exceeds its threshold, the main store the rest.
+        - Each transfer is an OUT movement followed by an IN movement of a kanban stock of the same batch.
+        - The quantities and the ledger match, and a second replenishment finds nothing to do.
+    """
+    transfers, _ = plan_replenishment("R1")
+    assert [(transfer.source.batch, transfer.quantity) for transfer in transfers] == [("STORE", 3), ("MAIN", 6),
+                                                                                       ("MAIN", 1)]
+
+    movements = replenish("R1")
+
+    assert [movement.movement_type for movement in movements] == ["OUT", "IN"] * 3
+    assert all(movement.stock.batch == following.stock.batch
+               for movement, following in zip(movements[::2], movements[1::2]))
+    quantities = {(stock.warehouse_id, stock.batch): stock.pack_quantity for stock in Stock.objects.all()}
+    assert quantities[network["STORE"].warehouse_id, "STORE"] == 2
+    assert quantities[network["MAIN"].warehouse_id, "MAIN"] == 3
+    assert quantities[network["K1"].warehouse_id, "STORE"] == 3
+    assert quantities[network["K1"].warehouse_id, "MAIN"] == 6
+    assert quantities[network["K2"].warehouse_id, "MAIN"] == 1
+    assert verify_levels() == []
+    assert replenish("R1") == []
+
+
+@pytest.mark.django_db
+def test_supply_stocks_of_the_needed_products(network: dict, product: Product):
+    """
+    Test that the supply stocks are read for the needed products only, with the fields the transfers use.
+
+    Args:
+        network (dict): The stocks of the building.
+        product (Product): The product fixture, needed by the kanbans.
+
+    Asserts:
+        - A product the kanbans do not need is left out of the supply.
+        - Recording the transfers loads no deferred field of the supply stocks.
+    """
+    other = Product.objects.create(sku="SKU0002", name="Masks", supplier="S", supplier_ref="S-2",
+                                   manufacturer="M", manufacturer_ref="M-2")
+    Stock.objects.create(unit_quantity=1, pack_quantity=20, shelving="S1", batch="OTHER",
+                         reception_date=datetime.date(2025, 1, 1), product=other,
+                         warehouse=network["MAIN"].warehouse)
+
+    supply = supply_stocks("R1", [product.pk])
+    assert list(supply) == [product.pk]
+    assert [(stock.batch, available) for stock, available in supply[product.pk]] == [("STORE", 3), ("MAIN", 10)]
+
+    with CaptureQueriesContext(connection) as context:
+        replenish("R1")
+    assert not any('"stocks_stock"."id" = ' in query["sql"] and query["sql"].startswith("SELECT")
+                   for query in context.captured_queries)
+
+
+@pytest.mark.django_db
+def test_replenish_kanbans_command_dry_run(network: dict):
+    """
+    Test the `replenish_kanbans` management command without recording anything.
+
+    Args:
+        network (dict): The stocks of the building.
+
+    Asserts:
+        - The planned transfers are printed and no movement is recorded.
+    """
+    count = StockMovement.objects.count()
+    out = io.StringIO()
+
+    call_command("replenish_kanbans", "--building", "R1", "--dry-run", stdout=out)
+
+    assert "3 transfers planned, 10 of 10 missing packages served" in out.getvalue()
+    assert StockMovement.objects.count() == count
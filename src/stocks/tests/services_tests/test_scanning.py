@@ -0,0 +1,83 @@
+import datetime
+
+import pytest
+from django.test.utils import CaptureQueriesContext
+from django.db import connection
+
+from stocks.models import Stock
+from stocks.services.scanning import LRUCache, WAREHOUSE_STOCKS, resolve_code
+
+
+def test_lru_cache_drops_the_least_recently_used_entry():
+    """
+    Test the eviction of the scan caches.
+
+    Asserts:
+        - Once full, the cache drops the entry read or written the longest ago.
+    """
+    cache = LRUCache(2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    cache.get("a")
+    cache.put("c", 3)
+
+    assert (cache.get("a"), cache.get("b"), cache.get("c")) == (1, None, 3)
+    assert len(cache) == 2
+
+
+@pytest.mark.django_db
+def test_resolve_code_from_warm_caches(stock: Stock):
+    """
+    Test that a warm scan only reads the generation of the stocks, and that new stocks invalidate the cache.
+
+    Args:
+        stock (Stock): The stock fixture.
+
+    Asserts:
+        - The sku and the batch resolve to the stock, their second resolution reading only the generation.
+        - A stock created in the warehouse is found by the next scan of its batch.
+        - A stock the cache missed, e.g. created by another process, is found after a single refresh.
+    """
+    warehouses = [stock.warehouse_id]
+    resolve_code(stock.product.sku, warehouses)
+    resolve_code(stock.batch, warehouses)
+    with CaptureQueriesContext(connection) as context:
+        by_sku = resolve_code(stock.product.sku, warehouses)
+        by_batch = resolve_code(stock.batch, warehouses)
+    assert len(context.captured_queries) == 2
+    assert all('"stocks_cachegeneration"' in query["sql"] for query in context.captured_queries)
+    assert [(match.stocks, match.batch) for match in by_sku + by_batch] == [((stock.pk,), False),
+                                                                            ((stock.pk,), True)]
+
+    other = Stock.objects.create(unit_quantity=1, pack_quantity=0, shelving="A02", batch="BATCH-002",
+                                 reception_date=datetime.date(2025, 1, 1), product=stock.product,
+                                 warehouse=stock.warehouse)
+    assert [match.stocks for match in resolve_code("BATCH-002", warehouses)] == [(other.pk,)]
+
+    Stock.objects.filter(pk=other.pk).update(batch="BATCH-003")
+    assert WAREHOUSE_STOCKS.get(stock.warehouse_id) is not None
+    assert [match.stocks for match in resolve_code("BATCH-003", warehouses)] == [(other.pk,)]
+
+
+@pytest.mark.django_db
+def test_resolve_code_reads_the_stocks_written_by_another_process(stock: Stock):
+    """
+    Test that a stock created by another process is found by the next scan of a product already cached.
+
+    Args:
+        stock (Stock): The stock fixture, expiring in 2030.
+
+    Asserts:
+        - The stock created elsewhere, which expires first, is offered first.
+    """
+    warehouses = [stock.warehouse_id]
+    resolve_code(stock.product.sku, warehouses)
+    cached = WAREHOUSE_STOCKS.get(stock.warehouse_id)
+    other = Stock.objects.create(unit_quantity=1, pack_quantity=0, shelving="A02", batch="BATCH-002",
+                                 reception_date=datetime.date(2024, 1, 1),
+                                 expiration_date=datetime.date(2024, 6, 1),
+                                 product=stock.product, warehouse=stock.warehouse)
+    # The stock was created by another process: the cache of this one was not dropped
+    WAREHOUSE_STOCKS.put(stock.warehouse_id, cached)
+
+    assert [match.stocks for match in resolve_code(stock.product.sku, warehouses)] == [(other.pk, stock.pk)]
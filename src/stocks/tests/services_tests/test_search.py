@@ -0,0 +1,160 @@
+import pytest
+from django.core.management.sql import emit_post_migrate_signal
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from stocks.models import Product, ProductTrigram
+from stocks.services import search
+from stocks.services.importers import import_products
+from stocks.services.search import rebuild_index, search_products
+
+
+@pytest.fixture
+def catalogue():
+    """
+    Fixture to create a small catalogue of products for the search.
+
+    Returns:
+        dict[str, Product]: The products keyed by sku.
+    """
+    products = {}
+    for sku, name, supplier_ref in [("SCR-001", "Screwdriver flat", "WX-12"),
+                                    ("SCR-002", "Screwdriver cross", "WX-13"),
+                                    ("GLV-001", "Nitrile gloves", "SCR-77"),
+                                    ("ETH-001", "Ethanol absolute", "ET-500")]:
+        products[sku] = Product.objects.create(sku=sku, name=name, supplier="S", supplier_ref=supplier_ref,
+                                               manufacturer="M", manufacturer_ref=f"M-{sku}")
+    return products
+
+
+@pytest.fixture(params=["fts5", "trigram"])
+def backend(request, monkeypatch):
+    """
+    Fixture to run a test with the FTS5 index, then with the ProductTrigram table.
+
+    Returns:
+        str: The name of the index.
+    """
+    if request.param == "trigram":
+        monkeypatch.setattr(search, "fts_enabled", lambda: False)
+    elif not search.fts_enabled():
+        pytest.skip("SQLite FTS5 is not available.")
+    return request.param
+
+
+@pytest.mark.django_db
+def test_search_by_partial_fields(backend: str, catalogue: dict):
+    """
+    Test the products found by partial sku, name and references.
+
+    Args:
+        backend (str): The search index.
+        catalogue (dict): The products.
+
+    Asserts:
+        - A partial sku finds the products of the sku first, then the product with that supplier reference.
+        - Every word of the query must match, whatever the field.
+        - A two-letter query finds the products starting with it.
+    """
+    assert [product.sku for product in search_products("scr").products] == ["SCR-001", "SCR-002", "GLV-001"]
+    assert [product.sku for product in search_products("cross screw").products] == ["SCR-002"]
+    assert [product.sku for product in search_products("wx-13").products] == ["SCR-002"]
+    assert {product.sku for product in search_products("et").products} == {"ETH-001"}
+
+
+@pytest.mark.django_db
+def test_search_index_follows_the_products(backend: str, catalogue: dict):
+    """
+    Test that the index is kept in sync with the changed, deleted and imported products.
+
+    Args:
+        backend (str): The search index.
+        catalogue (dict): The products.
+
+    Asserts:
+        - A renamed product is found by its new name only.
+        - A deleted product is not found anymore.
+        - A product imported in bulk is found, and a rebuild indexes every product again.
+    """
+    product = catalogue["ETH-001"]
+    product.name = "Isopropanol"
+    product.save()
+    assert [found.sku for found in search_products("isoprop").products] == ["ETH-001"]
+    assert not search_products("absolute", fuzzy=False).products
+
+    catalogue["GLV-001"].delete()
+    assert not search_products("nitrile", fuzzy=False).products
+
+    import_products([{"sku": "PIP-001", "name": "Pipette tips", "supplier": "S", "supplier_ref": "PT-1",
+                      "manufacturer": "M", "manufacturer_ref": "PT-1"}])
+    assert [found.sku for found in search_products("pipette").products] == ["PIP-001"]
+    assert rebuild_index() == 4
+
+
+@pytest.mark.django_db
+def test_search_fuzzy_and_pages(backend: str, catalogue: dict):
+    """
+    Test the fuzzy matches of a misspelt query and the pages of the results.
+
+    Args:
+        backend (str): The search index.
+        catalogue (dict): The products.
+
+    Asserts:
+        - A misspelt name finds the closest products as fuzzy matches.
+        - The results are split in pages, the last page having no next page.
+    """
+    page = search_products("screwdrivr")
+    assert page.fuzzy
+    assert {product.sku for product in page.products[:2]} == {"SCR-001", "SCR-002"}
+
+    first = search_products("scr", page_size=2)
+    second = search_products("scr", page=first.next_page, page_size=2)
+    assert (len(first.products), first.next_page) == (2, 2)
+    assert ([product.sku for product in second.products], second.next_page) == (["GLV-001"], None)
+
+
+@pytest.mark.django_db
+def test_trigram_table_is_filled_without_fts(monkeypatch, catalogue: dict):
+    """
+    Test that the ProductTrigram table is only filled when the FTS5 index is not available.
+
+    Args:
+        catalogue (dict): The products.
+
+    Asserts:
+        - The trigrams of the product include the padded first letters of its words.
+    """
+    if search.fts_enabled():
+        assert not ProductTrigram.objects.exists()
+    monkeypatch.setattr(search, "fts_enabled", lambda: False)
+    rebuild_index()
+    trigrams = set(ProductTrigram.objects.filter(product=catalogue["ETH-001"]).values_list("trigram", flat=True))
+    assert {"  e", " et", "eth", "abs", "500"} <= trigrams
+
+
+@pytest.mark.django_db
+def test_fts_index_found_once_migrated(monkeypatch):
+    """
+    Test that the FTS5 index is looked up once, and again once migrations are applied.
+
+    Args:
+        monkeypatch (MonkeyPatch): Pytest fixture hiding the FTS5 index, then showing it.
+
+    Asserts:
+        - The trigram table is used while the index is missing, without looking the tables up on each call.
+        - The index is used once migrations are applied.
+    """
+    monkeypatch.setattr(search, "FTS_DATABASES", {})
+    monkeypatch.setattr(search, "FTS_TABLE", "stocks_product_fts_missing")
+    assert not search.fts_enabled()
+    with CaptureQueriesContext(connection) as context:
+        assert not search.fts_enabled()
+    assert len(context.captured_queries) == 0
+
+    monkeypatch.setattr(search, "FTS_TABLE", "stocks_product_fts")
+    if search.FTS_TABLE not in connection.introspection.table_names():
+        pytest.skip("SQLite FTS5 is not available.")
+    assert not search.fts_enabled()
+    emit_post_migrate_signal(verbosity=0, interactive=False, db=connection.alias)
+    assert search.fts_enabled()
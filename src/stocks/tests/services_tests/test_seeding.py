@@ -0,0 +1,84 @@
+import io
+
+import pytest
+from django.core.management import CommandError, call_command
+from django.db.models import Count, Sum
+
+from stocks.models import Product, Stock, StockMovement, Warehouse
+from stocks.services.levels import verify_levels
+from stocks.services.seeding import seed_inventory
+
+
+def _snapshot():
+    """
+    Read the generated rows which do not depend on their identifiers.
+    """
+    products = list(Product.objects.order_by("sku").values_list("sku", "product_type", "price", "critical"))
+    movements = list(StockMovement.objects.order_by("id").values_list("stock__batch", "movement_type", "quantity"))
+    return products, movements
+
+
+@pytest.mark.django_db
+def test_seed_inventory():
+    """
+    Test that the generated inventory is consistent and only depends on the seed.
+
+    Asserts:
+        - The requested number of rows is created, the warehouses forming a main store, stores and kanbans.
+        - The stock quantities and the stock level ledger match the movements, no stock going below zero.
+        - The same seed generates the same data.
+    """
+    counts = seed_inventory(products=20, warehouses=7, stocks=50, movements=500, seed=3, batch_size=64)
+
+    assert counts == {"products": 20, "warehouses": 7, "stocks": 50, "movements": 500}
+    assert dict(Warehouse.objects.values_list("warehouse_type").annotate(count=Count("id"))) == {
+        Warehouse.Types.MAIN: 1, Warehouse.Types.STORE: 2, Warehouse.Types.KANBAN: 4}
+    assert Warehouse.objects.get(warehouse_type=Warehouse.Types.MAIN).name == "Main store (A0_0)"
+    for stock in Stock.objects.annotate(moved=Sum("stockmovement__quantity")).filter(moved__isnull=False)[:10]:
+        movements = StockMovement.objects.filter(stock=stock)
+        assert stock.pack_quantity == sum(movement.signed_quantity for movement in movements) >= 0
+    assert verify_levels() == []
+
+    first = _snapshot()
+    for model in (StockMovement, Stock, Warehouse, Product):
+        model.objects.all().delete()
+    seed_inventory(products=20, warehouses=7, stocks=50, movements=500, seed=3, batch_size=64)
+    assert _snapshot() == first
+
+
+@pytest.mark.django_db
+def test_seed_inventory_requires_stocks():
+    """
+    Test that movements cannot be generated without stocks.
+
+    Asserts:
+        - A ValueError is raised and nothing is created.
+    """
+    with pytest.raises(ValueError):
+        seed_inventory(products=5, warehouses=1, stocks=0, movements=10)
+    assert not Product.objects.exists()
+
+
+@pytest.mark.django_db
+def test_seed_inventory_command():
+    """
+    Test that the command seeds the configured database, and rejects movements without stocks.
+
+    Asserts:
+        - The requested number of rows is created and reported.
+        - A CommandError is raised for movements without stocks, and for a database already seeded, before
+          anything is written.
+    """
+    stdout = io.StringIO()
+    call_command("seed_inventory", products=5, warehouses=3, stocks=10, movements=200, batch_size=50,
+                 verbosity=2, stdout=stdout)
+
+    assert (Product.objects.count(), Warehouse.objects.count(), Stock.objects.count(),
+            StockMovement.objects.count()) == (5, 3, 10, 200)
+    assert "200/200 movements inserted" in stdout.getvalue()
+    assert "Seeded 5 products, 3 warehouses, 10 stocks, 200 movements." in stdout.getvalue()
+    with pytest.raises(CommandError):
+        call_command("seed_inventory", stocks=0, movements=10, stdout=io.StringIO())
+    with pytest.raises(CommandError, match="already holds a seeded inventory"):
+        call_command("seed_inventory", products=5, warehouses=3, stocks=10, movements=200, stdout=io.StringIO())
+    assert (Product.objects.count(), Warehouse.objects.count(), StockMovement.objects.count()) == (5, 3, 200)
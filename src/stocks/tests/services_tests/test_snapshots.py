@@ -0,0 +1,120 @@
+import datetime
+import io
+
+import pytest
+from django.core.management import call_command
+from django.test import Client
+from django.urls import reverse
+from django.utils import timezone
+
+from stocks.models import Stock, StockCheckpoint, StockMovement
+from stocks.services.snapshots import reconstruct_inventory, reconstruct_product_inventory, take_checkpoint
+
+DAY = datetime.timedelta(days=1)
+
+
+@pytest.fixture
+def history(stock: Stock):
+    """
+    Fixture to record movements of the stock on three consecutive days, starting on 2025-01-01 at noon.
+
+    Args:
+        stock (Stock): The stock fixture.
+
+    Returns:
+        datetime: The time of the first movement.
+    """
+    start = datetime.datetime(2025, 1, 1, 12, tzinfo=datetime.timezone.utc)
+    for day, (movement_type, quantity) in enumerate([("IN", 10), ("OUT", 3), ("IN", 5)]):
+        movement = StockMovement.objects.create(stock=stock, movement_type=movement_type, quantity=quantity)
+        # auto_now_add cannot be overridden on creation
+        StockMovement.objects.filter(pk=movement.pk).update(timestamp=start + day * DAY)
+    return start
+
+
+@pytest.mark.django_db
+def test_reconstruct_inventory_from_history(stock: Stock, history: datetime.datetime):
+    """
+    Test the reconstruction of the inventory without any checkpoint.
+
+    Args:
+        stock (Stock): The stock fixture.
+        history (datetime): The time of the first movement.
+
+    Asserts:
+        - The quantity at a time includes the movements recorded up to that time.
+        - Nothing was in stock before the first movement.
+    """
+    assert reconstruct_inventory(stock.warehouse, history - DAY) == {}
+    assert reconstruct_inventory(stock.warehouse, history) == {stock.pk: (stock.product_id, 10)}
+    assert reconstruct_product_inventory(stock.warehouse, history + DAY) == {stock.product_id: 7}
+
+
+@pytest.mark.django_db
+def test_reconstruct_inventory_replays_after_the_checkpoint(stock: Stock, history: datetime.datetime,
+                                                            django_assert_num_queries):
+    """
+    Test that a reconstruction starts from the nearest checkpoint.
+
+    Args:
+        stock (Stock): The stock fixture.
+        history (datetime): The time of the first movement.
+        django_assert_num_queries: pytest-django fixture counting the executed queries.
+
+    Asserts:
+        - The reconstruction is the same with and without the checkpoint.
+        - The movements before the checkpoint are not replayed: changing them does not change the result.
+        - The reconstruction costs four queries: checkpoint, archiving cutoff, its lines and the movements since.
+    """
+    checkpoint = take_checkpoint(stock.warehouse, history + DAY)
+    assert list(checkpoint.lines.values_list("quantity", flat=True)) == [7]
+    assert take_checkpoint(stock.warehouse, history + DAY) is None
+
+    StockMovement.objects.filter(timestamp__lte=history).delete()
+
+    with django_assert_num_queries(4):
+        assert reconstruct_inventory(stock.warehouse, history + 2 * DAY) == {stock.pk: (stock.product_id, 12)}
+
+
+@pytest.mark.django_db
+def test_take_stock_checkpoints_command_backfills(stock: Stock, history: datetime.datetime):
+    """
+    Test the `take_stock_checkpoints` management command with a backfill.
+
+    Args:
+        stock (Stock): The stock fixture.
+        history (datetime): The time of the first movement.
+
+    Asserts:
+        - A checkpoint is taken at every midnight since the given date, once.
+    """
+    days = (timezone.localdate() - history.date()).days + 1
+
+    call_command("take_stock_checkpoints", "--since", "2025-01-01", stdout=io.StringIO())
+    call_command("take_stock_checkpoints", stdout=io.StringIO())
+
+    assert StockCheckpoint.objects.count() == days
+    checkpoint = StockCheckpoint.objects.get(taken_at=history.replace(hour=0) + 2 * DAY)
+    assert checkpoint.lines.get().quantity == 7
+
+
+@pytest.mark.django_db
+def test_inventory_at_view(operator_client: Client, stock: Stock, history: datetime.datetime):
+    """
+    Test the JSON reconstruction of the inventory of a warehouse.
+
+    Args:
+        operator_client (Client): A test client logged in as an operator of the warehouse.
+        stock (Stock): The stock fixture.
+        history (datetime): The time of the first movement.
+
+    Asserts:
+        - The quantities at the given date are returned.
+        - The date is required.
+    """
+    url = reverse("stocks:inventory-at", args=[stock.warehouse_id])
+
+    response = operator_client.get(url, {"at": "2025-01-02T23:00:00Z"})
+    assert response.json()["results"] == [{"stock": stock.pk, "product": stock.product_id, "quantity": 7}]
+
+    assert operator_client.get(url).status_code == 400
@@ -0,0 +1,79 @@
+import pytest
+from django.core.management import call_command
+from django.core.management.base import CommandError
+
+from stocks.models import Stock, StockLevel, StockMovement
+from stocks.services.levels import apply_movements, get_level, verify_levels
+
+
+@pytest.mark.django_db
+def test_stock_level_follows_created_movements(stock: Stock):
+    """
+    Test that the stock level ledger is updated each time a stock movement is created.
+
+    Args:
+        stock (Stock): A fixture providing an empty stock.
+
+    Asserts:
+        - The level is the net quantity of the IN and OUT movements.
+        - The level remembers the identifier of the last movement.
+    """
+    # Record an incoming then an outgoing movement
+    StockMovement.objects.create(stock=stock, movement_type=StockMovement.Types.IN, quantity=10)
+    last = StockMovement.objects.create(stock=stock, movement_type=StockMovement.Types.OUT, quantity=3)
+
+    # Verify the level of the (product, warehouse) pair
+    level = StockLevel.objects.get(product=stock.product, warehouse=stock.warehouse)
+    assert level.quantity == 7
+    assert level.last_movement_id == last.pk
+    assert get_level(stock.product, stock.warehouse) == 7
+
+
+@pytest.mark.django_db
+def test_apply_movements_writes_each_pair_once(stock: Stock, django_assert_num_queries):
+    """
+    Test that a batch of movements bulk created is folded into the ledger pair by pair.
+
+    Args:
+        stock (Stock): A fixture providing an empty stock.
+        django_assert_num_queries: pytest-django fixture counting the executed queries.
+
+    Asserts:
+        - A batch costs a single upsert (plus its savepoint).
+        - The level is the net quantity of the batch.
+    """
+    # Bulk create movements, which bypasses the post_save signal
+    movements = StockMovement.objects.bulk_create(
+        [StockMovement(stock=stock, movement_type=StockMovement.Types.IN, quantity=5) for _ in range(20)]
+    )
+
+    # Verify that the batch is applied with a constant number of queries
+    with django_assert_num_queries(3):
+        apply_movements(movements)
+    assert get_level(stock.product, stock.warehouse) == 100
+
+
+@pytest.mark.django_db
+def test_rebuild_stock_levels_command(stock: Stock):
+    """
+    Test the `rebuild_stock_levels` management command.
+
+    Args:
+        stock (Stock): A fixture providing an empty stock.
+
+    Asserts:
+        - The verification fails when the ledger has drifted from the movement history.
+        - The rebuild restores the level replayed from the movements.
+    """
+    StockMovement.objects.create(stock=stock, movement_type=StockMovement.Types.IN, quantity=4)
+    # Corrupt the ledger
+    StockLevel.objects.update(quantity=42)
+
+    # Verify that the drift is detected
+    with pytest.raises(CommandError):
+        call_command("rebuild_stock_levels", "--verify")
+
+    # Rebuild the ledger and verify that it matches the history again
+    call_command("rebuild_stock_levels")
+    assert get_level(stock.product, stock.warehouse) == 4
+    assert verify_levels() == []
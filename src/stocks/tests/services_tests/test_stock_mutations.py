@@ -0,0 +1,114 @@
+import pytest
+from django.db.models import QuerySet
+
+from stocks.models import Stock, StockMovement
+from stocks.services.levels import get_level
+from stocks.services.movements import (InsufficientStock, StockConflict, record_movement, retry_on_conflict,
+                                       set_quantities)
+
+
+@pytest.mark.django_db
+def test_stale_stocks_do_not_lose_updates(stock: Stock):
+    """
+    Test movements recorded through two copies of the same stock, as two workers would hold them.
+
+    Args:
+        stock (Stock): A fixture providing an empty stock.
+
+    Asserts:
+        - Both movements are counted, although the second copy was read before the first movement.
+        - Every change increments the version of the stock.
+        - An outgoing movement beyond the real quantity fails, whatever the stale copy holds.
+    """
+    first = Stock.objects.get(pk=stock.pk)
+    second = Stock.objects.get(pk=stock.pk)
+
+    record_movement(first, StockMovement.Types.IN, 10)
+    record_movement(second, StockMovement.Types.IN, 5)
+    record_movement(first, StockMovement.Types.OUT, 12)
+
+    stock.refresh_from_db()
+    assert (stock.pack_quantity, stock.version) == (3, 3)
+    with pytest.raises(InsufficientStock):
+        record_movement(second, StockMovement.Types.OUT, 4)
+    assert second.pack_quantity == 3
+    assert StockMovement.objects.count() == 3
+    assert get_level(stock.product, stock.warehouse) == 3
+
+
+@pytest.mark.django_db
+def test_set_quantities_detects_concurrent_changes(stock: Stock):
+    """
+    Test that a quantity computed from a stale read is not written.
+
+    Args:
+        stock (Stock): A fixture providing an empty stock.
+
+    Asserts:
+        - The write of a stock read before a concurrent movement raises StockConflict.
+        - The write of a fresh stock succeeds and moves its version.
+    """
+    stale = Stock.objects.get(pk=stock.pk)
+    record_movement(stock, StockMovement.Types.IN, 2)
+
+    stale.pack_quantity = 7
+    with pytest.raises(StockConflict):
+        set_quantities([stale])
+
+    stale.refresh_from_db()
+    stale.pack_quantity = 7
+    set_quantities([stale])
+    assert Stock.objects.values_list("pack_quantity", "version").get(pk=stock.pk) == (7, 2)
+
+
+@pytest.mark.django_db
+def test_retry_on_conflict():
+    """
+    Test that a conflicting function is run again, until it succeeds or runs out of attempts.
+
+    Asserts:
+        - A function conflicting once returns the value of its second attempt.
+        - A function always conflicting raises StockConflict after the given number of attempts.
+    """
+    attempts = []
+
+    def conflict_once():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise StockConflict("changed")
+        return len(attempts)
+
+    assert retry_on_conflict(conflict_once) == 2
+
+    def always_conflict():
+        attempts.append(1)
+        raise StockConflict("changed")
+
+    attempts.clear()
+    with pytest.raises(StockConflict):
+        retry_on_conflict(always_conflict, attempts=3)
+    assert len(attempts) == 3
+
+
+@pytest.mark.django_db
+def test_record_movement_with_a_key_recorded_concurrently(stock: Stock, monkeypatch):
+    """
+    Test a retry whose idempotency key is recorded by a concurrent retry after it was checked.
+
+    Args:
+        stock (Stock): A fixture providing an empty stock.
+        monkeypatch (MonkeyPatch): Pytest fixture hiding the concurrent retry from the check of the key.
+
+    Asserts:
+        - The movement of the concurrent retry is returned, and the stock is only moved once.
+    """
+    concurrent = record_movement(Stock.objects.get(pk=stock.pk), StockMovement.Types.IN, 4, key="retry")
+    # The key was checked before the concurrent retry committed
+    monkeypatch.setattr(QuerySet, "first", lambda queryset: None)
+
+    assert record_movement(stock, StockMovement.Types.IN, 4, key="retry") == concurrent
+    monkeypatch.undo()
+    stock.refresh_from_db()
+    assert stock.pack_quantity == 4
+    assert StockMovement.objects.count() == 1
+    assert get_level(stock.product, stock.warehouse) == 4
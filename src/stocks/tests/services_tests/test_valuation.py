@@ -0,0 +1,88 @@
+import datetime
+from decimal import Decimal
+
+import pytest
+
+from stocks.models import Product, Stock, StockMovement, Warehouse
+from stocks.services.movements import record_movement
+from stocks.services.valuation import get_valuation, valuation_report
+
+
+@pytest.fixture
+def valued_stocks(product: Product, warehouse: Warehouse):
+    """
+    Fixture to create priced and unpriced stocks in two buildings.
+
+    The product costs 0.29, a price that floats do not represent exactly. The warehouse holds 3 packages of a
+    batch bought at 0.25 and 7 packages of a batch without cost, a kanban of building B2 holds 2 packages of a
+    product without price.
+
+    Returns:
+        dict[str, Stock]: The stocks keyed by batch.
+    """
+    Product.objects.filter(pk=product.pk).update(price=Decimal("0.29"))
+    other = Product.objects.create(sku="SKU0002", name="Beaker", product_type=Product.Types.GLASS, supplier="S",
+                                   supplier_ref="S", manufacturer="M", manufacturer_ref="M")
+    kanban = Warehouse.objects.create(building="B2", room="1", warehouse_type=Warehouse.Types.KANBAN)
+    stocks = {}
+    for batch, stock_product, stock_warehouse, quantity, cost in [("OLD", product, warehouse, 3, Decimal("0.25")),
+                                                                  ("NEW", product, warehouse, 7, None),
+                                                                  ("GLASS", other, kanban, 2, None)]:
+        stocks[batch] = Stock.objects.create(unit_quantity=1, pack_quantity=0, shelving="S1", batch=batch,
+                                             reception_date=datetime.date(2025, 1, 1), unit_cost=cost,
+                                             product=stock_product, warehouse=stock_warehouse)
+        record_movement(stocks[batch], StockMovement.Types.IN, quantity)
+    return stocks
+
+
+@pytest.mark.django_db
+def test_valuation_rollups(valued_stocks: dict, warehouse: Warehouse):
+    """
+    Test the valuation at the current price and at the cost of each batch.
+
+    Args:
+        valued_stocks (dict): The stocks.
+        warehouse (Warehouse): The warehouse fixture.
+
+    Asserts:
+        - The values are exact decimals, the unpriced packages being counted apart.
+        - The rollups sum the rows per building and product type.
+        - The FIFO valuation uses the cost of the batches which have one.
+        - The report is restricted to the given warehouses.
+    """
+    report = valuation_report("price")
+
+    assert report["total"] == {"packages": 12, "value": Decimal("2.90"), "unpriced": 2}
+    assert [(row["building"], row["value"]) for row in report["buildings"]] == [("A1", Decimal("2.90")),
+                                                                              ("B2", Decimal("0.00"))]
+    assert [(row["product_type"], row["packages"]) for row in report["product_types"]] == [("Consumable", 10),
+                                                                                          ("Glass", 2)]
+    assert valuation_report("fifo")["total"]["value"] == Decimal("2.78")
+    assert valuation_report("price", [warehouse.pk])["total"]["unpriced"] == 0
+
+
+@pytest.mark.django_db
+def test_valuation_cache_follows_movements_and_prices(valued_stocks: dict, product: Product,
+                                                     django_assert_num_queries):
+    """
+    Test that a repeated valuation is served from the cache until a movement or a price change.
+
+    Args:
+        valued_stocks (dict): The stocks.
+        product (Product): The product fixture.
+        django_assert_num_queries: Fixture counting the queries of a block.
+
+    Asserts:
+        - A repeated valuation costs the two queries of its key: the last movement id and the generation.
+        - A movement and a price change are reflected by the next valuation.
+    """
+    get_valuation()
+    with django_assert_num_queries(2):
+        get_valuation()
+
+    record_movement(valued_stocks["NEW"], StockMovement.Types.OUT, 1)
+    assert sum(row["value"] for row in get_valuation()) == Decimal("2.61")
+
+    product.price = Decimal("1.00")
+    product.save()
+    assert sum(row["value"] for row in get_valuation()) == Decimal("9.00")
@@ -0,0 +1,62 @@
+import pytest
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import Client
+from django.urls import reverse
+
+from stocks.models import Product
+from stocks.services import importers
+from stocks.services.movements import StockConflict
+
+User = get_user_model()
+
+
+@pytest.mark.django_db
+def test_admin_product_import(client: Client):
+    """
+    Test the product import page of the admin.
+
+    Args:
+        client (Client): Django test client for making requests.
+
+    Asserts:
+        - The page is displayed to a superuser.
+        - The uploaded CSV file is imported and the user is redirected to the product list.
+    """
+    client.force_login(User.objects.create_superuser(username="admin", password="adminpassword"))
+    url = reverse("admin:stocks_product_import")
+    upload = SimpleUploadedFile("catalogue.csv",
+                                b"sku,name,supplier,supplier_ref,manufacturer,manufacturer_ref\n"
+                                b"P001,Gloves,Sup,S1,Man,M1\n")
+
+    assert client.get(url).status_code == 200
+    response = client.post(url, {"file": upload})
+
+    assert response.status_code == 302
+    assert response.url == reverse("admin:stocks_product_changelist")
+    assert Product.objects.filter(sku="P001").exists()
+
+
+@pytest.mark.django_db
+def test_admin_stock_import_conflict(client: Client, monkeypatch):
+    """
+    Test the stock import page when the stocks keep being moved during the import.
+
+    Args:
+        client (Client): Django test client for making requests.
+        monkeypatch (MonkeyPatch): Pytest fixture making the stock importer conflict.
+
+    Asserts:
+        - The conflict is reported as an error of the form instead of failing the request.
+    """
+    def conflicting(rows):
+        raise StockConflict("stocks of the batch were emptied concurrently")
+
+    monkeypatch.setitem(importers.IMPORTERS, "stock", conflicting)
+    client.force_login(User.objects.create_superuser(username="admin", password="adminpassword"))
+    upload = SimpleUploadedFile("stocks.csv", b"sku,warehouse\nP001,1\n")
+
+    response = client.post(reverse("admin:stocks_stock_import"), {"file": upload})
+
+    assert response.status_code == 200
+    assert "upload the file again" in response.content.decode()
@@ -0,0 +1,83 @@
+import pytest
+from asgiref.sync import async_to_sync
+from django.test import AsyncClient
+from django.urls import reverse
+
+from stocks.models import Stock, StockMovement
+from stocks.services.metrics import REGISTRY
+from stocks.services.movements import record_movement
+
+
+@pytest.fixture
+def operator_async_client(async_client: AsyncClient, operator):
+    """
+    Fixture to return an async test client logged in as the operator.
+
+    Args:
+        async_client (AsyncClient): Django async test client for making requests.
+        operator (User): The operator fixture.
+
+    Returns:
+        AsyncClient: The logged in async test client.
+    """
+    async_client.force_login(operator)
+    return async_client
+
+
+@pytest.mark.django_db
+def test_stock_api_views(operator_async_client: AsyncClient, stock: Stock):
+    """
+    Test the async views of the stocks of a warehouse and of a product.
+
+    Args:
+        operator_async_client (AsyncClient): An async test client logged in as an operator of the warehouse.
+        stock (Stock): The stock fixture, in the operator's warehouse.
+
+    Asserts:
+        - The stocks of the warehouse and of the product are returned with their quantity.
+        - A warehouse outside the operator's scope is not found.
+        - The queries of the async views are recorded by the metrics middleware.
+    """
+    REGISTRY.clear()
+    record_movement(stock, StockMovement.Types.IN, 3)
+    get = async_to_sync(operator_async_client.get)
+
+    response = get(reverse("stocks:warehouse-stocks-api", args=[stock.warehouse_id]))
+    assert response.status_code == 200
+    assert [(row["id"], row["sku"], row["pack_quantity"]) for row in response.json()["results"]] == [
+        (stock.pk, stock.product.sku, 3)]
+
+    response = get(reverse("stocks:product-stocks-api", args=[stock.product_id]))
+    assert [row["warehouse"] for row in response.json()["results"]] == [stock.warehouse_id]
+
+    assert get(reverse("stocks:warehouse-stocks-api", args=[stock.warehouse_id + 1])).status_code == 404
+    assert REGISTRY["stocks:warehouse-stocks-api"].queries.sum > 0
+
+
+@pytest.mark.django_db
+def test_movement_api_views(operator_async_client: AsyncClient, stock: Stock):
+    """
+    Test the async views of the recent movements and of the long polling of the new ones.
+
+    Args:
+        operator_async_client (AsyncClient): An async test client logged in as an operator of the warehouse.
+        stock (Stock): The stock fixture, in the operator's warehouse.
+
+    Asserts:
+        - The recent movements are returned oldest first, with the last one to poll from.
+        - A poll returns the movements recorded after the given one at once.
+        - A poll without `after` is rejected with the status 400.
+    """
+    first = record_movement(stock, StockMovement.Types.IN, 3)
+    get = async_to_sync(operator_async_client.get)
+
+    response = get(reverse("stocks:recent-movements-api"), {"warehouse": stock.warehouse_id})
+    assert response.json()["last"] == first.pk
+    assert [row["id"] for row in response.json()["results"]] == [first.pk]
+
+    second = record_movement(stock, StockMovement.Types.OUT, 1)
+    response = get(reverse("stocks:poll-movements-api"), {"after": first.pk})
+    assert [row["id"] for row in response.json()["results"]] == [second.pk]
+    assert response.json()["last"] == second.pk
+
+    assert get(reverse("stocks:poll-movements-api")).status_code == 400
@@ -0,0 +1,70 @@
+import json
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.test import Client
+from django.urls import reverse
+
+from stocks.models import Stock
+
+User = get_user_model()
+
+
+@pytest.mark.django_db
+def test_bulk_movements_view_records_batch(client: Client, operator: User, stock: Stock):
+    """
+    Test the bulk movements endpoint with a valid JSON batch.
+
+    Args:
+        client (Client): Django test client for making requests.
+        operator (User): A fixture providing a user instance.
+        stock (Stock): A fixture providing an empty stock.
+
+    Asserts:
+        - The response status code is 200 (OK).
+        - The response counts the created and failed rows.
+    """
+    client.force_login(operator)
+    batch = {"movements": [{"stock": stock.pk, "movement_type": "IN", "quantity": 2},
+                           {"stock": stock.pk, "movement_type": "OUT", "quantity": 5}]}
+
+    response = client.post(reverse("stocks:bulk-movements"), data=json.dumps(batch), content_type="application/json")
+
+    assert response.status_code == 200
+    assert response.json()["created"] == 1
+    assert response.json()["failed"] == 1
+
+
+@pytest.mark.django_db
+def test_bulk_movements_view_rejects_malformed_body(client: Client, operator: User):
+    """
+    Test the bulk movements endpoint with a body that is not a batch.
+
+    Args:
+        client (Client): Django test client for making requests.
+        operator (User): A fixture providing a user instance.
+
+    Asserts:
+        - The response status code is 400 (Bad Request).
+    """
+    client.force_login(operator)
+
+    response = client.post(reverse("stocks:bulk-movements"), data="not json", content_type="application/json")
+
+    assert response.status_code == 400
+
+
+@pytest.mark.django_db
+def test_bulk_movements_view_with_unauthenticated_user(client: Client):
+    """
+    Test the bulk movements endpoint without being logged in.
+
+    Args:
+        client (Client): Django test client for making requests.
+
+    Asserts:
+        - The response status code is 302 (Redirect to the login page).
+    """
+    response = client.post(reverse("stocks:bulk-movements"), data="{}", content_type="application/json")
+
+    assert response.status_code == 302
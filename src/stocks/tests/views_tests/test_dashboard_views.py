@@ -0,0 +1,182 @@
+import datetime
+
+import pytest
+from django.test import Client
+from django.urls import reverse
+from pytest_django.asserts import assertTemplateUsed
+
+from stocks.models import Product, Stock, StockMovement, Warehouse
+from stocks.pagination import PAGE_SIZE
+from stocks.services.movements import record_movement
+
+# Session and user lookups of the login, then the single query of the page
+VIEW_QUERY_BUDGET = 2 + 1
+
+
+@pytest.fixture(params=[1, PAGE_SIZE + 5], ids=["one-row", "several-pages"])
+def inventory(request, warehouse: Warehouse):
+    """
+    Fixture to create stocks of different products with one movement each in the warehouse.
+
+    The fixture is parametrized so that each view is measured with one row and with more than a page of rows.
+
+    Args:
+        request (FixtureRequest): Gives the number of stocks to create.
+        warehouse (Warehouse): The warehouse fixture.
+
+    Returns:
+        list[Stock]: The created stocks.
+    """
+    products = Product.objects.bulk_create([
+        Product(sku=f"P{index:04d}", name=f"Product {index}", supplier="S", supplier_ref="S", manufacturer="M",
+                manufacturer_ref="M")
+        for index in range(request.param)
+    ])
+    stocks = Stock.objects.bulk_create([
+        Stock(unit_quantity=1, pack_quantity=1, shelving="A", batch="B", reception_date=datetime.date(2025, 1, 1),
+              product=product, warehouse=warehouse)
+        for product in products
+    ])
+    StockMovement.objects.bulk_create([
+        StockMovement(stock=stock, movement_type=StockMovement.Types.IN, quantity=1) for stock in stocks
+    ])
+    return stocks
+
+
+@pytest.mark.django_db
+@pytest.mark.query_budget(VIEW_QUERY_BUDGET)
+def test_stock_list_view(operator_client: Client, inventory: list):
+    """
+    Test the stock listing within its query budget.
+
+    Args:
+        operator_client (Client): A test client logged in as an operator.
+        inventory (list[Stock]): The stocks to list.
+
+    Asserts:
+        - The response status code is 200 (OK) and the correct template is used.
+        - A page holds at most PAGE_SIZE stocks and links to the next page when there is one.
+    """
+    response = operator_client.get(reverse("stocks:stock-list"))
+
+    assert response.status_code == 200
+    assertTemplateUsed(response, "stocks/stock_list.html")
+    assert len(response.context["stocks"]) == min(len(inventory), PAGE_SIZE)
+    assert (response.context["next_after"] is not None) == (len(inventory) > PAGE_SIZE)
+
+
+@pytest.mark.django_db
+@pytest.mark.query_budget(VIEW_QUERY_BUDGET + 1)
+def test_warehouse_detail_view(operator_client: Client, warehouse: Warehouse, inventory: list):
+    """
+    Test the warehouse page within its query budget, the warehouse itself costing one more query.
+
+    Args:
+        operator_client (Client): A test client logged in as an operator.
+        warehouse (Warehouse): The displayed warehouse.
+        inventory (list[Stock]): The stocks of the warehouse.
+
+    Asserts:
+        - The response status code is 200 (OK).
+        - The SKU of the first stock is displayed.
+    """
+    response = operator_client.get(reverse("stocks:warehouse-detail", args=[warehouse.pk]))
+
+    assert response.status_code == 200
+    assert inventory[0].product.sku.encode() in response.content
+
+
+@pytest.mark.django_db
+@pytest.mark.query_budget(VIEW_QUERY_BUDGET)
+def test_movement_history_view(operator_client: Client, inventory: list):
+    """
+    Test the movement history within its query budget.
+
+    Args:
+        operator_client (Client): A test client logged in as an operator.
+        inventory (list[Stock]): The stocks whose movements are listed.
+
+    Asserts:
+        - The response status code is 200 (OK).
+        - The most recent movement comes first.
+    """
+    response = operator_client.get(reverse("stocks:movement-history"))
+
+    assert response.status_code == 200
+    assert response.context["movements"][0].stock == inventory[-1]
+
+
+@pytest.mark.django_db
+def test_stock_list_view_next_page(operator_client: Client, inventory: list):
+    """
+    Test that following the next page link lists the remaining stocks.
+
+    Args:
+        operator_client (Client): A test client logged in as an operator.
+        inventory (list[Stock]): The stocks to list.
+
+    Asserts:
+        - The pages together list every stock once.
+    """
+    listed = []
+    after = ""
+    while after is not None:
+        response = operator_client.get(reverse("stocks:stock-list"), {"after": after})
+        listed += response.context["stocks"]
+        after = response.context["next_after"]
+
+    assert listed == inventory
+
+
+@pytest.mark.django_db
+def test_views_are_limited_to_the_warehouse_scope(operator_client: Client, stock: Stock):
+    """
+    Test that an operator only sees the warehouses of their profile.
+
+    Args:
+        operator_client (Client): A test client logged in as an operator of the warehouse of the stock.
+        stock (Stock): A fixture providing a stock in the warehouse of the operator.
+
+    Asserts:
+        - The stocks of other warehouses are not listed.
+        - The page of another warehouse is not found.
+    """
+    other = Warehouse.objects.create(building="Z9", room="1")
+    Stock.objects.create(unit_quantity=1, pack_quantity=1, shelving="Z", batch="OTHER",
+                         reception_date=stock.reception_date, product=stock.product, warehouse=other)
+
+    response = operator_client.get(reverse("stocks:stock-list"))
+    assert response.context["stocks"] == [stock]
+
+    response = operator_client.get(reverse("stocks:warehouse-detail", args=[other.pk]))
+    assert response.status_code == 404
+
+
+@pytest.mark.django_db
+def test_welcome_dashboard_is_cached(operator_client: Client, stock: Stock, django_capture_on_commit_callbacks,
+                                     django_assert_num_queries):
+    """
+    Test that the warehouse summaries of the welcome page are rendered from the cache until a movement.
+
+    Args:
+        operator_client (Client): A test client logged in as an operator of the warehouse.
+        stock (Stock): The stock fixture, in the operator's warehouse.
+        django_capture_on_commit_callbacks (Callable): Pytest-django fixture running the on commit callbacks.
+        django_assert_num_queries (Callable): Pytest-django fixture counting the queries of a block.
+
+    Asserts:
+        - The page shows the summary of the operator's warehouse.
+        - A repeated visit only reads the session, the user and the key of the dashboard, not the stock tables.
+        - A movement of the warehouse shows up on the next visit.
+    """
+    url = reverse("welcome-page")
+    assert "<td>0</td>" in operator_client.get(url).content.decode()
+
+    # The session, the user, the latest movement of the warehouse and the generation
+    with django_assert_num_queries(4):
+        response = operator_client.get(url)
+    assert stock.warehouse.name in response.content.decode()
+
+    with django_capture_on_commit_callbacks(execute=True):
+        record_movement(stock, StockMovement.Types.IN, 7)
+    assert "<td>7</td>" in operator_client.get(url).content.decode()
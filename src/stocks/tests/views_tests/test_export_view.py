@@ -0,0 +1,65 @@
+import json
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.test import Client
+from django.urls import reverse
+
+from stocks.models import Stock, StockMovement
+
+User = get_user_model()
+
+
+@pytest.mark.django_db
+def test_export_view_streams_stocks_as_csv(client: Client, operator: User, stock: Stock):
+    """
+    Test the CSV export of the stocks.
+
+    Args:
+        client (Client): Django test client for making requests.
+        operator (User): A fixture providing a user instance.
+        stock (Stock): A fixture providing a stock.
+
+    Asserts:
+        - The response is streamed as an attached CSV file.
+        - The rows contain the product and warehouse names joined in the query.
+    """
+    client.force_login(operator)
+
+    response = client.get(reverse("stocks:export", args=["stocks", "csv"]))
+
+    assert response.status_code == 200
+    assert response.streaming
+    assert response["Content-Disposition"] == 'attachment; filename="stocks.csv"'
+    lines = b"".join(response.streaming_content).decode().splitlines()
+    assert lines[0].startswith("id,sku,product,warehouse")
+    assert f"{stock.pk},{stock.product.sku},{stock.product.name},{stock.warehouse.name}" in lines[1]
+
+
+@pytest.mark.django_db
+def test_export_view_filters_movements(client: Client, operator: User, stock: Stock):
+    """
+    Test the JSON Lines export of the stock movements filtered by warehouse and date range.
+
+    Args:
+        client (Client): Django test client for making requests.
+        operator (User): A fixture providing a user instance.
+        stock (Stock): A fixture providing a stock.
+
+    Asserts:
+        - The movements of the warehouse within the range are exported, one JSON object per line.
+        - A range ending before the movements exports nothing.
+        - An invalid date is rejected with the status 400 (Bad Request).
+    """
+    client.force_login(operator)
+    movement = StockMovement.objects.create(stock=stock, movement_type=StockMovement.Types.IN, quantity=3)
+    url = reverse("stocks:export", args=["movements", "jsonl"])
+
+    response = client.get(url, {"warehouse": stock.warehouse_id, "start": "2000-01-01"})
+    rows = [json.loads(line) for line in b"".join(response.streaming_content).splitlines()]
+    assert [(row["id"], row["quantity"], row["sku"]) for row in rows] == [(movement.pk, 3, stock.product.sku)]
+
+    response = client.get(url, {"end": "2000-01-01"})
+    assert b"".join(response.streaming_content) == b""
+
+    assert client.get(url, {"start": "yesterday"}).status_code == 400
@@ -0,0 +1,37 @@
+import pytest
+from django.contrib.auth import get_user_model
+from django.test import Client
+from django.urls import reverse
+
+from stocks.services.metrics import REGISTRY
+
+
+@pytest.mark.django_db
+def test_metrics_view(client: Client, operator_client: Client, settings):
+    """
+    Test the Prometheus endpoint and the metrics recorded by the middleware.
+
+    Args:
+        client (Client): Django test client for making requests.
+        operator_client (Client): A test client logged in as an operator of the warehouse.
+        settings (SettingsWrapper): Pytest-django fixture overriding the settings.
+
+    Asserts:
+        - The metrics are only shown to the staff, or to the scraper holding the token when one is set.
+        - The requests served are counted per view.
+    """
+    REGISTRY.clear()
+    url = reverse("metrics")
+    operator_client.get(reverse("stocks:stock-list"))
+    assert operator_client.get(url).status_code == 403
+
+    staff = get_user_model().objects.create_user(username="staff", password="staffpassword", is_staff=True)
+    client.force_login(staff)
+    response = client.get(url)
+    assert response.status_code == 200
+    assert response["Content-Type"].startswith("text/plain; version=0.0.4")
+    assert 'stockmaster_requests_total{view="stocks:stock-list",status="200"} 1' in response.content.decode()
+
+    settings.METRICS_TOKEN = "secret"
+    assert client.get(url).status_code == 403
+    assert Client().get(url, headers={"Authorization": "Bearer secret"}).status_code == 200
@@ -0,0 +1,89 @@
+import datetime
+
+import pytest
+from django.test import Client
+from django.urls import reverse
+
+from stocks.models import Stock, StockMovement
+from stocks.pagination import PAGE_SIZE
+
+
+@pytest.fixture
+def history(stock: Stock):
+    """
+    Fixture to create more than two pages of movements, half of them sharing the same timestamp.
+
+    Args:
+        stock (Stock): The stock fixture.
+
+    Returns:
+        list[StockMovement]: The movements, in creation order.
+    """
+    movements = StockMovement.objects.bulk_create([
+        StockMovement(stock=stock, movement_type=StockMovement.Types.IN, quantity=1)
+        for _ in range(2 * PAGE_SIZE + 10)
+    ])
+    # Rows with equal timestamps must still be paginated without gaps nor duplicates
+    StockMovement.objects.filter(pk__in=[movement.pk for movement in movements[::2]]).update(
+        timestamp=datetime.datetime(2025, 1, 1, tzinfo=datetime.timezone.utc))
+    return movements
+
+
+@pytest.mark.django_db
+def test_movements_api_pages_through_history(operator_client: Client, history: list):
+    """
+    Test that following the `next` cursors returns every movement once, the most recent first.
+
+    Args:
+        operator_client (Client): A test client logged in as an operator.
+        history (list[StockMovement]): The movements to page through.
+
+    Asserts:
+        - The pages list every movement once, ordered by timestamp then id, descending.
+        - The last page has no `next` cursor.
+    """
+    listed = []
+    cursor = ""
+    while cursor is not None:
+        response = operator_client.get(reverse("stocks:movements-api"), {"cursor": cursor})
+        assert response.status_code == 200
+        listed += response.json()["results"]
+        cursor = response.json()["next"]
+
+    expected = list(StockMovement.objects.order_by("-timestamp", "-id").values_list("id", flat=True))
+    assert [row["id"] for row in listed] == expected
+    assert len(listed) == len(history)
+
+
+@pytest.mark.django_db
+def test_movements_api_filters_by_stock(operator_client: Client, history: list, stock: Stock):
+    """
+    Test the stock filter of the movements API.
+
+    Args:
+        operator_client (Client): A test client logged in as an operator.
+        history (list[StockMovement]): The movements of the stock.
+        stock (Stock): The stock fixture.
+
+    Asserts:
+        - Another stock has no movement.
+    """
+    response = operator_client.get(reverse("stocks:movements-api"), {"stock": stock.pk + 1})
+
+    assert response.json() == {"results": [], "next": None}
+
+
+@pytest.mark.django_db
+def test_movements_api_rejects_invalid_cursor(operator_client: Client):
+    """
+    Test the movements API with a cursor which was not built by the API.
+
+    Args:
+        operator_client (Client): A test client logged in as an operator.
+
+    Asserts:
+        - The response status code is 400 (Bad Request).
+    """
+    response = operator_client.get(reverse("stocks:movements-api"), {"cursor": "not-a-cursor"})
+
+    assert response.status_code == 400
@@ -0,0 +1,33 @@
+import pytest
+from django.test import Client
+from django.urls import reverse
+
+from stocks.models import Product
+
+
+@pytest.mark.django_db
+def test_product_search_view(operator_client: Client, product: Product):
+    """
+    Test the JSON search of the products.
+
+    Args:
+        operator_client (Client): A test client logged in as an operator.
+        product (Product): The product fixture.
+
+    Asserts:
+        - A partial supplier reference finds the product, on a single page.
+        - A misspelt name finds it as a fuzzy match.
+        - A missing text or an invalid page is rejected with the status 400.
+    """
+    url = reverse("stocks:product-search")
+
+    response = operator_client.get(url, {"q": "sup-00"})
+    assert response.status_code == 200
+    assert [result["sku"] for result in response.json()["results"]] == [product.sku]
+    assert response.json()["next"] is None
+    assert response.json()["fuzzy"] is False
+
+    assert operator_client.get(url, {"q": "nitril glovs"}).json()["fuzzy"] is True
+
+    assert operator_client.get(url).status_code == 400
+    assert operator_client.get(url, {"q": "sup", "page": "0"}).status_code == 400
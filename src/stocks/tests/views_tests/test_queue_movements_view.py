@@ -0,0 +1,68 @@
+import json
+
+import pytest
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from stocks.models import Job, Stock, StockMovement
+from stocks.services.jobs import work
+
+
+@pytest.mark.django_db
+def test_queue_movements_view_only_inserts_the_job(operator_client: Client, stock: Stock):
+    """
+    Test that queuing a batch of movements writes nothing but the job.
+
+    Args:
+        operator_client (Client): A test client logged in as an operator of the warehouse.
+        stock (Stock): A fixture providing an empty stock.
+
+    Asserts:
+        - The response status code is 202 (Accepted) and the request writes a single row.
+        - Once a worker ran the job, its status page returns the per-row results.
+        - The job status is not shown to other users.
+    """
+    batch = {"movements": [{"stock": stock.pk, "movement_type": "IN", "quantity": 2, "key": "scan-1"}]}
+
+    with CaptureQueriesContext(connection) as context:
+        response = operator_client.post(reverse("stocks:queue-movements"), json.dumps(batch),
+                                        content_type="application/json")
+    writes = [query["sql"] for query in context.captured_queries
+              if query["sql"].startswith(("INSERT", "UPDATE", "DELETE"))]
+
+    assert response.status_code == 202
+    assert len(writes) == 1 and writes[0].startswith('INSERT INTO "stocks_job"')
+    assert not StockMovement.objects.exists()
+
+    work()
+    status = operator_client.get(response.json()["url"]).json()
+    assert status["status"] == Job.Statuses.DONE
+    assert status["result"]["created"] == 1
+
+    Job.objects.update(user=None)
+    assert operator_client.get(response.json()["url"]).status_code == 404
+
+
+@pytest.mark.django_db
+def test_queue_movements_view_with_idempotency_key(operator_client: Client, stock: Stock):
+    """
+    Test a batch posted twice with the same Idempotency-Key header.
+
+    Args:
+        operator_client (Client): A test client logged in as an operator of the warehouse.
+        stock (Stock): A fixture providing an empty stock.
+
+    Asserts:
+        - The second post returns the job of the first one with the status 200, and a single job is queued.
+    """
+    batch = json.dumps({"movements": [{"stock": stock.pk, "movement_type": "IN", "quantity": 2}]})
+    url = reverse("stocks:queue-movements")
+
+    first = operator_client.post(url, batch, content_type="application/json", headers={"Idempotency-Key": "k1"})
+    second = operator_client.post(url, batch, content_type="application/json", headers={"Idempotency-Key": "k1"})
+
+    assert (first.status_code, second.status_code) == (202, 200)
+    assert first.json()["job"] == second.json()["job"]
+    assert Job.objects.count() == 1
@@ -0,0 +1,101 @@
+import json
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from stocks.models import Job, Stock, StockMovement
+from stocks.services.movements import record_movement
+
+
+@pytest.mark.django_db
+def test_scan_view_looks_up_the_stocks(operator_client: Client, stock: Stock):
+    """
+    Test a scan without movement.
+
+    Args:
+        operator_client (Client): A test client logged in as an operator of the warehouse.
+        stock (Stock): A fixture providing an empty stock.
+
+    Asserts:
+        - The sku returns the quantity of the stock in the operator's warehouse.
+        - A warm scan only reads the generation of the cached stocks and the quantities.
+        - An unknown code is rejected with the status 404.
+    """
+    record_movement(stock, StockMovement.Types.IN, 5)
+
+    operator_client.get(reverse("stocks:scan"), {"code": stock.product.sku})
+    with CaptureQueriesContext(connection) as context:
+        response = operator_client.get(reverse("stocks:scan"), {"code": stock.product.sku})
+    queries = [query["sql"] for query in context.captured_queries if '"stocks_' in query["sql"]]
+
+    assert response.status_code == 200
+    assert len(queries) == 2 and '"stocks_cachegeneration"' in queries[0]
+    assert response.json()["results"] == [{"product": stock.product_id, "warehouse": stock.warehouse_id,
+                                           "batch": False, "stocks": [{"stock": stock.pk, "quantity": 5}],
+                                           "quantity": 5}]
+    assert operator_client.get(reverse("stocks:scan"), {"code": "UNKNOWN"}).status_code == 404
+
+
+@pytest.mark.django_db
+def test_scan_records_the_movement(operator_client: Client, stock: Stock):
+    """
+    Test that an OUT scan records its movement before responding, once per idempotency key.
+
+    Args:
+        operator_client (Client): A test client logged in as an operator of the warehouse.
+        stock (Stock): A fixture providing an empty stock.
+
+    Asserts:
+        - The scan responds with the status 201, the quantity left and the picked movement, without worker.
+        - The scan sent again with its key returns the recorded job with the status 200, nothing is picked.
+    """
+    record_movement(stock, StockMovement.Types.IN, 5)
+    operator_client.get(reverse("stocks:scan"), {"code": stock.product.sku})
+    scan = json.dumps({"code": stock.product.sku, "quantity": 2})
+
+    response = operator_client.post(reverse("stocks:scan"), scan, content_type="application/json",
+                                    headers={"Idempotency-Key": "scan-1"})
+    stock.refresh_from_db()
+
+    assert response.status_code == 201
+    assert stock.pack_quantity == 3
+    assert response.json()["status"] == Job.Statuses.DONE
+    assert response.json()["stocks"] == [{"stock": stock.pk, "quantity": 3}]
+    assert response.json()["result"]["picked"] == 2
+
+    again = operator_client.post(reverse("stocks:scan"), scan, content_type="application/json",
+                                 headers={"Idempotency-Key": "scan-1"})
+    stock.refresh_from_db()
+    assert again.status_code == 200
+    assert again.json()["job"] == response.json()["job"]
+    assert stock.pack_quantity == 3
+
+
+@pytest.mark.django_db
+def test_scan_view_rejects_invalid_scans(operator_client: Client, client: Client, stock: Stock):
+    """
+    Test the scans which cannot be recorded.
+
+    Args:
+        operator_client (Client): A test client logged in as an operator of the warehouse.
+        client (Client): An anonymous test client.
+        stock (Stock): A fixture providing an empty stock.
+
+    Asserts:
+        - An IN movement needs the batch, a batch scan is recorded.
+        - A user seeing every warehouse must give the warehouse of the scanner.
+    """
+    url = reverse("stocks:scan")
+    scan = {"code": stock.product.sku, "movement_type": "IN"}
+    assert operator_client.post(url, json.dumps(scan), content_type="application/json").status_code == 400
+    scan["code"] = stock.batch
+    assert operator_client.post(url, json.dumps(scan), content_type="application/json").status_code == 201
+
+    admin = get_user_model().objects.create_superuser(username="admin", password="adminpassword")
+    client.force_login(admin)
+    assert client.get(url, {"code": stock.batch}).status_code == 400
+    assert client.get(url, {"code": stock.batch, "warehouse": stock.warehouse_id}).status_code == 200
@@ -0,0 +1,36 @@
+import pytest
+from django.test import Client
+from django.urls import reverse
+
+from stocks.models import Stock, StockMovement
+from stocks.services.movements import record_movement
+
+
+@pytest.mark.django_db
+def test_valuation_report_view(operator_client: Client, stock: Stock):
+    """
+    Test the valuation report as HTML and as CSV.
+
+    Args:
+        operator_client (Client): A test client logged in as an operator of the warehouse.
+        stock (Stock): A fixture providing an empty stock of a product priced 12.50.
+
+    Asserts:
+        - The report shows the total value of the operator's warehouse.
+        - The CSV holds one row per warehouse and product type.
+        - An unknown method is rejected with the status 400.
+    """
+    record_movement(stock, StockMovement.Types.IN, 4)
+    url = reverse("stocks:valuation-report")
+
+    response = operator_client.get(url)
+    assert response.status_code == 200
+    assert "Total: 50.00 for 4 packages" in response.content.decode()
+
+    response = operator_client.get(url, {"method": "fifo", "format": "csv"})
+    lines = response.content.decode().splitlines()
+    assert response["Content-Type"] == "text/csv"
+    assert lines == ["building,warehouse_id,warehouse,product_type,packages,value,unpriced",
+                     f"A1,{stock.warehouse_id},{stock.warehouse.name},Consumable,4,50.00,0"]
+
+    assert operator_client.get(url, {"method": "lifo"}).status_code == 400
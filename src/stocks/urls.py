@@ -0,0 +1,24 @@
+from django.urls import path
+
+from stocks import views
+
+
+app_name = "stocks"
+urlpatterns = [
+    path("", views.stock_list_view, name="stock-list"),
+    path("warehouses/<int:pk>/", views.warehouse_detail_view, name="warehouse-detail"),
+    path("movements/", views.movement_history_view, name="movement-history"),
+    path("reports/valuation/", views.valuation_report_view, name="valuation-report"),
+    path("api/warehouses/<int:pk>/inventory/", views.inventory_at_view, name="inventory-at"),
+    path("api/warehouses/<int:pk>/stocks/", views.warehouse_stocks_api_view, name="warehouse-stocks-api"),
+    path("api/products/<int:pk>/stocks/", views.product_stocks_api_view, name="product-stocks-api"),
+    path("api/movements/", views.movements_api_view, name="movements-api"),
+    path("api/movements/bulk/", views.bulk_movements_view, name="bulk-movements"),
+    path("api/movements/queue/", views.queue_movements_view, name="queue-movements"),
+    path("api/movements/recent/", views.recent_movements_api_view, name="recent-movements-api"),
+    path("api/movements/poll/", views.poll_movements_api_view, name="poll-movements-api"),
+    path("api/jobs/<int:pk>/", views.job_detail_view, name="job-detail"),
+    path("api/products/search/", views.product_search_view, name="product-search"),
+    path("api/scan/", views.scan_view, name="scan"),
+    path("export/<str:dataset>.<str:file_format>", views.export_view, name="export"),
+]
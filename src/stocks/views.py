@@ -1,3 +1,672 @@
-from django.shortcuts import render
+import csv
+import datetime
+import hmac
+import json
 
-# Create your views here.
+from django.conf import settings
+from django.contrib.auth.decorators import login_required
+from django.http import Http404, HttpResponse, HttpResponseBadRequest, JsonResponse, StreamingHttpResponse
+from django.shortcuts import get_object_or_404, render
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from django.views.decorators.http import require_GET, require_http_methods, require_POST
+
+from stocks.models import Job, Product, Stock, StockMovement, Warehouse
+from stocks.pagination import cursor_page, keyset_page
+from stocks.services.exports import EXPORT_COLUMNS, EXPORT_FORMATS, export_rows
+from stocks.services.feed import FEED, last_movement_id, movements_after, recent_movements
+from stocks.services.jobs import enqueue, run_now
+from stocks.services.metrics import REGISTRY
+from stocks.services.movements import MAX_BATCH_SIZE, ingest_movements
+from stocks.services.picking import FEFO_ORDER
+from stocks.services.scanning import resolve_code, stock_quantities
+from stocks.services.search import search_products
+from stocks.services.snapshots import reconstruct_inventory
+from stocks.services.valuation import VALUATION_COLUMNS, VALUATION_METHODS, valuation_report
+
+
+def _parse_moment(value):
+    """
+    Parse a query string date or datetime, a date meaning its midnight in the current time zone.
+
+    Args:
+        value (str | None): The raw value, e.g. "2025-01-31" or "2025-01-31T12:00:00Z".
+    Returns:
+        datetime | None: The aware datetime, or None if no value was given.
+    Raises:
+        ValueError: If the value is not a valid date or datetime.
+    """
+    if not value:
+        return None
+    moment = parse_datetime(value)
+    if moment is None:
+        day = parse_date(value)
+        if day is None:
+            raise ValueError(f"Invalid date: {value}")
+        moment = datetime.datetime.combine(day, datetime.time())
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
+
+
+def _parse_after(request):
+    """
+    Read the key of the last row of the previous page from the `after` query string parameter.
+
+    Args:
+        request (HttpRequest): The request object.
+    Returns:
+        int | None: The key, None for the first page.
+    Raises:
+        Http404: If the key is not an integer.
+    """
+    after = request.GET.get("after")
+    if not after:
+        return None
+    try:
+        return int(after)
+    except ValueError:
+        raise Http404("Invalid page.")
+
+
+@login_required(redirect_field_name=None)
+def stock_list_view(request):
+    """
+    Render a page of the stocks with their product and warehouse.
+
+    The product and warehouse of every stock are joined in the same query, so a page costs a fixed
+    number of queries whatever the number of stocks displayed.
+    Args:
+        request (HttpRequest): The request object, with the optional `after` key of the page.
+    Returns:
+        HttpResponse: The rendered page of stocks.
+    """
+    stocks = request.warehouse_scope.restrict(Stock.objects.select_related("product", "warehouse"))
+    stocks, next_after = keyset_page(stocks, _parse_after(request))
+    return render(request, "stocks/stock_list.html", {"stocks": stocks, "next_after": next_after})
+
+
+@login_required(redirect_field_name=None)
+def warehouse_detail_view(request, pk):
+    """
+    Render a warehouse with a page of its stocks.
+    Args:
+        request (HttpRequest): The request object, with the optional `after` key of the page.
+        pk (int): The identifier of the warehouse.
+    Returns:
+        HttpResponse: The rendered warehouse page, or a 404 error if the warehouse does not exist.
+    """
+    if not request.warehouse_scope.allows(pk):
+        raise Http404("No Warehouse matches the given query.")
+    warehouse = get_object_or_404(Warehouse, pk=pk)
+    stocks, next_after = keyset_page(warehouse.warehouse.select_related("product"), _parse_after(request))
+    return render(request, "stocks/warehouse_detail.html",
+                  {"warehouse": warehouse, "stocks": stocks, "next_after": next_after})
+
+
+def _movement_history(request):
+    """
+    Read a page of the stock movement history, the most recent first.
+
+    Args:
+        request (HttpRequest): The request object, with the optional `cursor` of the page and the optional
+            `stock` and `warehouse` ids filtering the movements.
+    Returns:
+        tuple[list[StockMovement], str | None]: The movements of the page and the cursor of the next page.
+    Raises:
+        ValueError: If the cursor or a filter is invalid.
+    """
+    movements = request.warehouse_scope.restrict(
+        StockMovement.objects.select_related("stock__product", "stock__warehouse"), "stock__warehouse")
+    if request.GET.get("stock"):
+        movements = movements.filter(stock_id=int(request.GET["stock"]))
+    if request.GET.get("warehouse"):
+        movements = movements.filter(stock__warehouse_id=int(request.GET["warehouse"]))
+    return cursor_page(movements, request.GET.get("cursor"))
+
+
+@login_required(redirect_field_name=None)
+def movement_history_view(request):
+    """
+    Render a page of the stock movements, the most recent first.
+    Args:
+        request (HttpRequest): The request object, with the optional `cursor` of the page.
+    Returns:
+        HttpResponse: The rendered page of movements, or a 404 error if the cursor is invalid.
+    """
+    try:
+        movements, next_cursor = _movement_history(request)
+    except ValueError:
+        raise Http404("Invalid page.")
+    return render(request, "stocks/movement_history.html", {"movements": movements, "next_cursor": next_cursor})
+
+
+@login_required(redirect_field_name=None)
+@require_GET
+def movements_api_view(request):
+    """
+    Return a page of the stock movements as JSON, the most recent first.
+
+    The `next` cursor of the response requests the following page, it is null on the last page.
+    Args:
+        request (HttpRequest): The request object, with the optional `cursor`, `stock` and `warehouse` parameters.
+    Returns:
+        JsonResponse: The movements of the page and the cursor of the next page,
+        or an error with the status 400 if the cursor or a filter is invalid.
+    """
+    try:
+        movements, next_cursor = _movement_history(request)
+    except ValueError as exc:
+        return JsonResponse({"error": str(exc)}, status=400)
+    results = [{
+        "id": movement.pk,
+        "timestamp": movement.timestamp,
+        "movement_type": movement.movement_type,
+        "quantity": movement.quantity,
+        "reason": movement.reason,
+        "stock": movement.stock_id,
+        "sku": movement.stock.product.sku,
+        "warehouse": movement.stock.warehouse.name,
+    } for movement in movements]
+    return JsonResponse({"results": results, "next": next_cursor})
+
+
+def _parse_batch(request):
+    """
+    Read the batch of stock movements posted as JSON in a request body.
+
+    Args:
+        request (HttpRequest): The request object containing the JSON batch.
+    Returns:
+        tuple[list | None, JsonResponse | None]: The rows of the batch, or an error with the status 400 if the
+        body is not a valid batch.
+    """
+    try:
+        rows = json.loads(request.body)["movements"]
+    except (ValueError, KeyError, TypeError):
+        return None, JsonResponse({"error": "Expected a JSON object with a 'movements' list."}, status=400)
+    if not isinstance(rows, list):
+        return None, JsonResponse({"error": "'movements' must be a list."}, status=400)
+    if len(rows) > MAX_BATCH_SIZE:
+        return None, JsonResponse({"error": f"A batch is limited to {MAX_BATCH_SIZE} movements."}, status=400)
+    return rows, None
+
+
+@login_required(redirect_field_name=None)
+@require_POST
+def bulk_movements_view(request):
+    """
+    Record a batch of stock movements posted as JSON.
+
+    The request body is an object with a `movements` list, each item having the keys `stock`,
+    `movement_type`, `quantity` and optional `reason`. The whole batch is recorded in a single transaction.
+    Args:
+        request (HttpRequest): The request object containing the JSON batch.
+    Returns:
+        JsonResponse: The per-row results with the number of created and failed rows,
+        or an error with the status 400 if the body is not a valid batch.
+    """
+    rows, error = _parse_batch(request)
+    if error is not None:
+        return error
+
+    results = ingest_movements(rows, warehouses=request.warehouse_scope.warehouses)
+    created = sum(result["status"] == "created" for result in results)
+    return JsonResponse({"created": created, "failed": len(results) - created, "results": results})
+
+
+@login_required(redirect_field_name=None)
+@require_POST
+def queue_movements_view(request):
+    """
+    Queue a batch of stock movements posted as JSON, to be recorded by the `run_worker` command.
+
+    The body is the one of `bulk_movements_view`. The request only inserts the job: the rows are validated and
+    recorded, and the ledger and alerts updated, by a worker. An `Idempotency-Key` header makes a batch posted
+    twice, e.g. on a client retry, queued once.
+    Args:
+        request (HttpRequest): The request object containing the JSON batch.
+    Returns:
+        JsonResponse: The queued job with the status 202, or with the status 200 if the key was already
+        submitted, or an error with the status 400 if the body is not a valid batch.
+    """
+    rows, error = _parse_batch(request)
+    if error is not None:
+        return error
+
+    warehouses = request.warehouse_scope.warehouses
+    payload = {"movements": rows, "warehouses": None if warehouses is None else sorted(warehouses)}
+    job, created = enqueue("ingest_movements", payload, request.headers.get("Idempotency-Key"), request.user)
+    return JsonResponse({"job": job.pk, "status": job.status,
+                         "url": reverse("stocks:job-detail", args=[job.pk])}, status=202 if created else 200)
+
+
+@login_required(redirect_field_name=None)
+@require_GET
+def job_detail_view(request, pk):
+    """
+    Return the status of a queued job, and its result once done.
+
+    Args:
+        request (HttpRequest): The request object.
+        pk (int): The identifier of the job.
+    Returns:
+        JsonResponse: The status, result and error of the job, or a 404 error if the user did not submit it.
+    """
+    jobs = Job.objects.all() if request.user.is_superuser else Job.objects.filter(user=request.user)
+    job = get_object_or_404(jobs.only("id", "kind", "status", "attempts", "result", "error"), pk=pk)
+    return JsonResponse({"job": job.pk, "kind": job.kind, "status": job.status, "attempts": job.attempts,
+                         "result": job.result, "error": job.error.splitlines()[-1] if job.error else ""})
+
+
+@login_required(redirect_field_name=None)
+@require_GET
+def export_view(request, dataset, file_format):
+    """
+    Stream an export of the products, stocks or stock movements as CSV or JSON Lines.
+
+    The rows are fetched from the database chunk by chunk while the response is sent, so the export starts
+    immediately and its memory use does not depend on its size. The query string may contain a `warehouse`
+    id (stocks and movements) and a `start`/`end` date or datetime range (movements). Stocks and movements are
+    limited to the warehouses the user may see.
+    Args:
+        request (HttpRequest): The request object containing the optional filters.
+        dataset (str): "products", "stocks" or "movements".
+        file_format (str): "csv" or "jsonl".
+    Returns:
+        StreamingHttpResponse: The export as an attached file,
+        or an error with the status 400 if a filter is invalid.
+    """
+    if dataset not in EXPORT_COLUMNS or file_format not in EXPORT_FORMATS:
+        raise Http404("Unknown export.")
+    try:
+        warehouse = request.GET.get("warehouse")
+        rows = export_rows(dataset,
+                           warehouse=int(warehouse) if warehouse else None,
+                           start=_parse_moment(request.GET.get("start")),
+                           end=_parse_moment(request.GET.get("end")),
+                           warehouses=request.warehouse_scope.warehouses)
+    except ValueError as exc:
+        return HttpResponseBadRequest(str(exc))
+
+    encode, content_type = EXPORT_FORMATS[file_format]
+    response = StreamingHttpResponse(encode(dataset, rows), content_type=content_type)
+    response["Content-Disposition"] = f'attachment; filename="{dataset}.{file_format}"'
+    return response
+
+
+@login_required(redirect_field_name=None)
+@require_GET
+def inventory_at_view(request, pk):
+    """
+    Return the quantity of every stock of a warehouse at a past time, given by the `at` query string parameter.
+    Args:
+        request (HttpRequest): The request object containing the `at` date or datetime.
+        pk (int): The identifier of the warehouse.
+    Returns:
+        JsonResponse: The non-empty stocks with their product and quantity, an error with the status 400 if the
+        time is missing or invalid, or a 404 error if the user may not see the warehouse.
+    """
+    if not request.warehouse_scope.allows(pk):
+        raise Http404("No Warehouse matches the given query.")
+    try:
+        at = _parse_moment(request.GET.get("at"))
+    except ValueError as exc:
+        return JsonResponse({"error": str(exc)}, status=400)
+    if at is None:
+        return JsonResponse({"error": "The 'at' parameter is required."}, status=400)
+
+    inventory = reconstruct_inventory(pk, at)
+    results = [{"stock": stock_id, "product": product_id, "quantity": quantity}
+               for stock_id, (product_id, quantity) in sorted(inventory.items())]
+    return JsonResponse({"warehouse": pk, "at": at, "results": results})
+
+
+@login_required(redirect_field_name=None)
+@require_GET
+def product_search_view(request):
+    """
+    Return a page of the products matching the `q` query string parameter, best match first, as JSON.
+
+    The products are matched by partial sku, name, supplier reference or manufacturer reference, see
+    `search_products`. The `next` page number of the response requests the following page, it is null on the
+    last page. When nothing matches exactly, fuzzy matches are returned with `fuzzy` set, which the following
+    pages must also be requested with.
+    Args:
+        request (HttpRequest): The request object, with the `q` text and the optional `page` and `fuzzy`.
+    Returns:
+        JsonResponse: The products of the page, or an error with the status 400 if the text or the page is
+        missing or invalid.
+    """
+    query = request.GET.get("q", "").strip()
+    if not query:
+        return JsonResponse({"error": "The 'q' parameter is required."}, status=400)
+    try:
+        page = int(request.GET.get("page", 1))
+    except ValueError:
+        page = 0
+    if page < 1:
+        return JsonResponse({"error": "Invalid page."}, status=400)
+    fuzzy = request.GET.get("fuzzy")
+
+    result = search_products(query, page, fuzzy=None if fuzzy is None else fuzzy in ("1", "true"))
+    results = [{
+        "id": product.pk,
+        "sku": product.sku,
+        "name": product.name,
+        "supplier_ref": product.supplier_ref,
+        "manufacturer_ref": product.manufacturer_ref,
+        "score": round(product.score, 4),
+    } for product in result.products]
+    return JsonResponse({"results": results, "next": result.next_page, "fuzzy": result.fuzzy})
+
+
+def _scan_matches(request, code, warehouse):
+    """
+    Resolve a scanned code in the warehouses of the user, or in the given warehouse.
+
+    Args:
+        request (HttpRequest): The request object.
+        code (str): The scanned sku or batch number.
+        warehouse (int | None): The warehouse of the scanner, required when the user may see every warehouse.
+    Returns:
+        tuple[list[ScanMatch] | None, JsonResponse | None]: The matching stocks, or an error with the status 400
+        if the warehouse is missing or the code is empty, or 404 if the code matches nothing.
+    """
+    if not code:
+        return None, JsonResponse({"error": "The 'code' parameter is required."}, status=400)
+    scope = request.warehouse_scope
+    if warehouse is not None:
+        if not scope.allows(warehouse):
+            return None, JsonResponse({"error": "Unknown warehouse."}, status=404)
+        warehouses = [warehouse]
+    elif scope.warehouses is None:
+        return None, JsonResponse({"error": "The 'warehouse' parameter is required."}, status=400)
+    else:
+        warehouses = scope.warehouses
+    matches = resolve_code(code, warehouses)
+    if not matches:
+        return None, JsonResponse({"error": f"Unknown code: {code}"}, status=404)
+    return matches, None
+
+
+def _scan_results(matches):
+    """
+    Describe the stocks of scan matches with their current quantity, read in a single query.
+
+    Args:
+        matches (list[ScanMatch]): The stocks matching the scanned code.
+    Returns:
+        list[dict]: The product, warehouse, stocks and total quantity of each match.
+    """
+    quantities = stock_quantities(matches)
+    return [{
+        "product": match.product_id,
+        "warehouse": match.warehouse_id,
+        "batch": match.batch,
+        "stocks": [{"stock": pk, "quantity": quantities.get(pk, 0)} for pk in match.stocks],
+        "quantity": sum(quantities.get(pk, 0) for pk in match.stocks),
+    } for match in matches]
+
+
+@login_required(redirect_field_name=None)
+@require_http_methods(["GET", "POST"])
+def scan_view(request):
+    """
+    Look up, or move, the stocks of a product sku or stock batch scanned by a handheld scanner.
+
+    A GET with the `code` returns the matching stocks of the user's warehouses with their quantity. A POST of
+    a JSON object with the `code` and the optional `quantity` (1), `movement_type` ("OUT") and `warehouse`
+    records the movement before responding: an OUT of a sku takes the quantity first expired first out, see
+    `pick`, a batch moves its own stock. The movement is recorded as a job run at once, see `run_now`, so that
+    an `Idempotency-Key` header makes a scan sent twice recorded once. The code is resolved from in-process
+    caches, see `resolve_code`: a warm scan reads the generation of the cached stocks, and the quantities which
+    change with every movement.
+    Args:
+        request (HttpRequest): The request object, with the code in the query string (GET) or the body (POST).
+    Returns:
+        JsonResponse: The stocks and their total quantity, with the job of the movement and its result for a
+        POST, with the status 201 (200 if the key was already submitted, 202 if the movement failed and is left
+        to the workers to retry), or an error with the status 400 if the scan is invalid or ambiguous, or 404 if
+        the code or the warehouse is unknown.
+    """
+    if request.method == "GET":
+        try:
+            warehouse = int(request.GET["warehouse"]) if request.GET.get("warehouse") else None
+        except ValueError:
+            return JsonResponse({"error": "Invalid warehouse."}, status=400)
+        matches, error = _scan_matches(request, request.GET.get("code", "").strip(), warehouse)
+        if error is not None:
+            return error
+        return JsonResponse({"code": request.GET["code"].strip(), "results": _scan_results(matches)})
+
+    try:
+        scan = json.loads(request.body)
+        code = str(scan["code"]).strip()
+        quantity = int(scan.get("quantity", 1))
+        movement_type = scan.get("movement_type", StockMovement.Types.OUT)
+        warehouse = int(scan["warehouse"]) if scan.get("warehouse") is not None else None
+    except (ValueError, KeyError, TypeError, AttributeError):
+        return JsonResponse({"error": "Expected a JSON object with a 'code'."}, status=400)
+    if quantity <= 0 or movement_type not in StockMovement.Types.values:
+        return JsonResponse({"error": "Invalid quantity or movement type."}, status=400)
+    matches, error = _scan_matches(request, code, warehouse)
+    if error is not None:
+        return error
+    if len(matches) > 1:
+        return JsonResponse({"error": "The code matches several stocks, give the warehouse or scan the batch.",
+                             "warehouses": sorted({match.warehouse_id for match in matches})}, status=400)
+
+    match = matches[0]
+    if match.batch:
+        payload = {"movements": [{"stock": match.stocks[0], "movement_type": movement_type, "quantity": quantity,
+                                  "reason": "scan"}],
+                   "warehouses": [match.warehouse_id]}
+        kind = "ingest_movements"
+    elif movement_type == StockMovement.Types.OUT:
+        payload = {"product": match.product_id, "warehouse": match.warehouse_id, "quantity": quantity,
+                   "reason": "scan"}
+        kind = "pick"
+    else:
+        return JsonResponse({"error": "Scan the batch to record an IN movement."}, status=400)
+    job, created = run_now(kind, payload, request.headers.get("Idempotency-Key"), request.user)
+    if not created:
+        status = 200
+    else:
+        status = 201 if job.status == Job.Statuses.DONE else 202
+    return JsonResponse({"job": job.pk, "status": job.status, "url": reverse("stocks:job-detail", args=[job.pk]),
+                         "result": job.result, **_scan_results([match])[0]}, status=status)
+
+
+@login_required(redirect_field_name=None)
+@require_GET
+def valuation_report_view(request):
+    """
+    Render the value of the stocks of the user's warehouses per building, warehouse and product type.
+
+    The valuation is computed by a single grouped query and cached until the next movement, see
+    `get_valuation`. With `format=csv`, the rows per warehouse and product type are downloaded instead.
+    Args:
+        request (HttpRequest): The request object, with the optional `method` ("price" or "fifo") and `format`.
+    Returns:
+        HttpResponse: The rendered report or the CSV file, or an error with the status 400 if the method or the
+        format is unknown.
+    """
+    method = request.GET.get("method", "price")
+    file_format = request.GET.get("format", "html")
+    if method not in VALUATION_METHODS or file_format not in ("html", "csv"):
+        return HttpResponseBadRequest("Unknown valuation method or format.")
+    report = valuation_report(method, request.warehouse_scope.warehouses)
+
+    if file_format == "html":
+        return render(request, "stocks/valuation_report.html",
+                      {"report": report, "method": method, "methods": VALUATION_METHODS})
+    response = HttpResponse(content_type="text/csv")
+    response["Content-Disposition"] = f'attachment; filename="valuation-{method}.csv"'
+    writer = csv.writer(response)
+    writer.writerow(VALUATION_COLUMNS)
+    for row in report["rows"]:
+        writer.writerow([row[column] for column in VALUATION_COLUMNS])
+    return response
+
+
+@require_GET
+def metrics_view(request):
+    """
+    Return the request metrics of the current process in the Prometheus text format, see `REGISTRY`.
+
+    When METRICS_TOKEN is set, the scraper authenticates with an `Authorization: Bearer <token>` header,
+    otherwise only the logged in staff may read the metrics.
+    Args:
+        request (HttpRequest): The request object.
+    Returns:
+        HttpResponse: The metrics, or an empty response with the status 403 if the request is not allowed.
+    """
+    token = settings.METRICS_TOKEN
+    if token:
+        allowed = hmac.compare_digest(request.headers.get("Authorization", ""), f"Bearer {token}")
+    else:
+        allowed = request.user.is_staff
+    if not allowed:
+        return HttpResponse(status=403)
+    return HttpResponse(REGISTRY.render(), content_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+# Fields of the stocks returned by the async API, product and warehouse being identifiers
+STOCK_API_FIELDS = ("id", "product_id", "product__sku", "product__name", "warehouse_id", "batch", "shelving",
+                    "pack_quantity", "threshold", "expiration_date")
+
+
+async def _stock_rows(stocks):
+    """
+    Read stocks with the async ORM as JSON-serializable rows, first expired first out.
+    """
+    # Named rows: the plain tuples of `values_list` run their query when `aiterator` is called, out of a thread
+    rows = stocks.order_by(*FEFO_ORDER).values_list(*STOCK_API_FIELDS, named=True)
+    return [{"id": pk, "product": product, "sku": sku, "name": name, "warehouse": warehouse, "batch": batch,
+             "shelving": shelving, "pack_quantity": quantity, "threshold": threshold, "expiration_date": expiration}
+            async for pk, product, sku, name, warehouse, batch, shelving, quantity, threshold, expiration
+            in rows.aiterator()]
+
+
+async def _movement_filters(request):
+    """
+    Read the `after` movement and the `warehouse` filter of the movements API, restricted to the user's scope.
+
+    Returns:
+        tuple[int | None, frozenset[int] | None]: The last movement the client read, None if not given, and the
+        warehouses whose movements are returned, None for all of them.
+    Raises:
+        ValueError: If a parameter is not an integer.
+        Http404: If the user may not see the warehouse.
+    """
+    after = request.GET.get("after")
+    warehouse = request.GET.get("warehouse")
+    try:
+        after = int(after) if after else None
+        warehouse = int(warehouse) if warehouse else None
+    except ValueError:
+        raise ValueError("Invalid 'after' or 'warehouse' parameter.")
+    scope = await request.awarehouse_scope()
+    if warehouse is None:
+        return after, scope.warehouses
+    if not scope.allows(warehouse):
+        raise Http404("No Warehouse matches the given query.")
+    return after, frozenset([warehouse])
+
+
+@login_required(redirect_field_name=None)
+@require_GET
+async def warehouse_stocks_api_view(request, pk):
+    """
+    Return the stocks of a warehouse with their quantity as JSON, e.g. for the kiosk of a kanban.
+
+    The view is async: under ASGI, the event loop serves other requests while its queries run.
+    Args:
+        request (HttpRequest): The request object.
+        pk (int): The identifier of the warehouse.
+    Returns:
+        JsonResponse: The stocks first expired first out, or a 404 error if the user may not see the warehouse.
+    """
+    scope = await request.awarehouse_scope()
+    if not scope.allows(pk):
+        raise Http404("No Warehouse matches the given query.")
+    try:
+        warehouse = await Warehouse.objects.aget(pk=pk)
+    except Warehouse.DoesNotExist:
+        raise Http404("No Warehouse matches the given query.")
+    return JsonResponse({"warehouse": warehouse.pk, "name": warehouse.name,
+                         "results": await _stock_rows(Stock.objects.filter(warehouse=warehouse))})
+
+
+@login_required(redirect_field_name=None)
+@require_GET
+async def product_stocks_api_view(request, pk):
+    """
+    Return the stocks of a product in the user's warehouses with their quantity as JSON.
+    Args:
+        request (HttpRequest): The request object.
+        pk (int): The identifier of the product.
+    Returns:
+        JsonResponse: The stocks first expired first out, or a 404 error if the product does not exist.
+    """
+    try:
+        product = await Product.objects.aget(pk=pk)
+    except Product.DoesNotExist:
+        raise Http404("No Product matches the given query.")
+    scope = await request.awarehouse_scope()
+    stocks = scope.restrict(Stock.objects.filter(product=product))
+    return JsonResponse({"product": product.pk, "sku": product.sku, "results": await _stock_rows(stocks)})
+
+
+@login_required(redirect_field_name=None)
+@require_GET
+async def recent_movements_api_view(request):
+    """
+    Return the movements recorded after the `after` one as JSON, oldest first, or the most recent ones.
+
+    The `last` movement of the response is the `after` of the next request, e.g. of `poll_movements_api_view`.
+    Args:
+        request (HttpRequest): The request object, with the optional `after` and `warehouse` identifiers.
+    Returns:
+        JsonResponse: At most READ_LIMIT movements of the user's warehouses, an error with the status 400 if a
+        parameter is invalid, or a 404 error if the user may not see the warehouse.
+    """
+    try:
+        after, warehouses = await _movement_filters(request)
+    except ValueError as exc:
+        return JsonResponse({"error": str(exc)}, status=400)
+    if after is None:
+        results = await recent_movements(warehouses)
+        last = results[-1]["id"] if results else await last_movement_id()
+    else:
+        results = await movements_after(after, warehouses)
+        last = results[-1]["id"] if results else after
+    return JsonResponse({"results": results, "last": last})
+
+
+@login_required(redirect_field_name=None)
+@require_GET
+async def poll_movements_api_view(request):
+    """
+    Wait for the movements recorded after the `after` one and return them as JSON, oldest first (long polling).
+
+    The request returns as soon as movements of the user's warehouses are recorded, or with no movement after
+    LONG_POLL_TIMEOUT seconds: the client then polls again from the `last` movement of the response. The waiting
+    requests share the movement feed of the process, see `MovementFeed`, and a thread, see `StockMaster.asgi`, so
+    that an idle kiosk costs neither a thread nor a query.
+    Args:
+        request (HttpRequest): The request object, with the required `after` and the optional `warehouse`.
+    Returns:
+        JsonResponse: At most READ_LIMIT movements, an error with the status 400 if a parameter is missing or
+        invalid, or a 404 error if the user may not see the warehouse.
+    """
+    try:
+        after, warehouses = await _movement_filters(request)
+    except ValueError as exc:
+        return JsonResponse({"error": str(exc)}, status=400)
+    if after is None:
+        return JsonResponse({"error": "The 'after' parameter is required."}, status=400)
+    results = await FEED.wait(after, warehouses)
+    return JsonResponse({"results": results, "last": results[-1]["id"] if results else after})
@@ -0,0 +1,54 @@
+from functools import partial
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.utils.functional import SimpleLazyObject
+
+from users.scope import WarehouseScope, aget_warehouse_scope, get_warehouse_scope
+
+
+class WarehouseScopeMiddleware:
+    """
+    Attach to each request the warehouses its user may see, as `request.warehouse_scope`.
+
+    The scope is only read when a view uses it, from the scope cache once it is warm, so authorization does not
+    cost any query. Anonymous users see no warehouse. The async views await `request.awarehouse_scope()`
+    instead, as `request.auser()` replaces `request.user`. Must be placed after the AuthenticationMiddleware.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        request.warehouse_scope = SimpleLazyObject(lambda: self.get_scope(request))
+        request.awarehouse_scope = partial(self.aget_scope, request)
+        return self.get_response(request)
+
+    async def __acall__(self, request):
+        request.warehouse_scope = SimpleLazyObject(lambda: self.get_scope(request))
+        request.awarehouse_scope = partial(self.aget_scope, request)
+        return await self.get_response(request)
+
+    @staticmethod
+    def get_scope(request):
+        """
+        Read the scope of the user of a request.
+        """
+        if not request.user.is_authenticated:
+            return WarehouseScope(frozenset())
+        return WarehouseScope(get_warehouse_scope(request.user))
+
+    @staticmethod
+    async def aget_scope(request):
+        """
+        Async version of `get_scope`, for the async views.
+        """
+        user = await request.auser()
+        if not user.is_authenticated:
+            return WarehouseScope(frozenset())
+        return WarehouseScope(await aget_warehouse_scope(user))
@@ -0,0 +1,167 @@
+from django.core.cache import caches
+
+from users.models import UserProfile
+
+# Name of the cache holding the warehouse scopes, see CACHES in the settings
+SCOPE_CACHE = "scopes"
+# Key of the generation invalidating every scope at once
+GENERATION_KEY = "warehouse-scope:generation"
+# Lifetime of a cached scope in seconds. The versions make it stale as soon as the access rights change in the
+# processes sharing the scope cache; a process with its own cache, e.g. a second development server, may serve a
+# revoked warehouse until then
+SCOPE_TIMEOUT = 5 * 60
+
+
+def _version_key(user_id):
+    """
+    Build the key of the version counter of a user's scope.
+    """
+    return f"warehouse-scope:version:{user_id}"
+
+
+def _scope_rows(user):
+    """
+    Build the query of the profiles of a user and of their warehouses, see `compute_warehouse_scope`.
+    """
+    return UserProfile.objects.filter(user=user).values_list("profile", "warehouses")
+
+
+def _scope_from_rows(rows):
+    """
+    Build the scope of a user who is not a superuser from the rows of `_scope_rows`.
+    """
+    if any(profile == UserProfile.Profiles.ADMIN for profile, _ in rows):
+        return None
+    return frozenset(warehouse for _, warehouse in rows if warehouse is not None)
+
+
+def _scope_key(user_id, versions):
+    """
+    Build the key of the cached scope of a user under the versions read from the scope cache.
+    """
+    return f"warehouse-scope:{user_id}:{versions.get(GENERATION_KEY, 0)}:{versions.get(_version_key(user_id), 0)}"
+
+
+def compute_warehouse_scope(user):
+    """
+    Read from the database the warehouses a user may see.
+
+    Args:
+        user (User): The authenticated user.
+    Returns:
+        frozenset[int] | None: The identifiers of the allowed warehouses, None when every warehouse is allowed
+        (superusers and admin profiles).
+    """
+    if user.is_superuser:
+        return None
+    return _scope_from_rows(list(_scope_rows(user)))
+
+
+def get_warehouse_scope(user):
+    """
+    Return the warehouses a user may see, from the cache when it is warm.
+
+    The cached scope is stored under the current generation and user version, so that a scope computed while
+    the access rights were changing is never read once they are invalidated.
+
+    Args:
+        user (User): The authenticated user.
+    Returns:
+        frozenset[int] | None: The identifiers of the allowed warehouses, None when every warehouse is allowed.
+    """
+    cache = caches[SCOPE_CACHE]
+    key = _scope_key(user.pk, cache.get_many([GENERATION_KEY, _version_key(user.pk)]))
+    cached = cache.get(key)
+    if cached is not None:
+        return cached["warehouses"]
+    warehouses = compute_warehouse_scope(user)
+    # The scope is wrapped so that an unrestricted scope (None) can be told apart from a cache miss
+    cache.set(key, {"warehouses": warehouses}, SCOPE_TIMEOUT)
+    return warehouses
+
+
+async def aget_warehouse_scope(user):
+    """
+    Async version of `get_warehouse_scope`, for the async views.
+    """
+    cache = caches[SCOPE_CACHE]
+    key = _scope_key(user.pk, await cache.aget_many([GENERATION_KEY, _version_key(user.pk)]))
+    cached = await cache.aget(key)
+    if cached is not None:
+        return cached["warehouses"]
+    warehouses = None if user.is_superuser else _scope_from_rows([row async for row in _scope_rows(user)])
+    await cache.aset(key, {"warehouses": warehouses}, SCOPE_TIMEOUT)
+    return warehouses
+
+
+def _bump(key):
+    """
+    Increment a version counter of the scope cache, creating it if needed.
+    """
+    cache = caches[SCOPE_CACHE]
+    if not cache.add(key, 1, timeout=None):
+        try:
+            cache.incr(key)
+        except ValueError:
+            # The counter expired between add and incr
+            cache.set(key, 1, timeout=None)
+
+
+def invalidate_user_scope(user_id):
+    """
+    Make the cached scope of a user stale.
+
+    Args:
+        user_id (int): The identifier of the user.
+    """
+    _bump(_version_key(user_id))
+
+
+def invalidate_all_scopes():
+    """
+    Make every cached scope stale, e.g. when a warehouse is deleted.
+    """
+    _bump(GENERATION_KEY)
+
+
+def restrict_to_scope(queryset, scope, field="warehouse"):
+    """
+    Keep the rows of a queryset which belong to the warehouses of a scope.
+
+    Args:
+        queryset (QuerySet): The rows to restrict, e.g. stocks or stock movements.
+        scope (frozenset[int] | None): The allowed warehouses, None for all of them.
+        field (str): Lookup from the rows to their warehouse, e.g. "stock__warehouse" for stock movements.
+    Returns:
+        QuerySet: The rows of the allowed warehouses.
+    """
+    if scope is None:
+        return queryset
+    return queryset.filter(**{f"{field}__in": scope})
+
+
+class WarehouseScope:
+    """
+    The warehouses a user may see, as attached to the requests by the WarehouseScopeMiddleware.
+    """
+
+    def __init__(self, warehouses):
+        # Identifiers of the allowed warehouses, None when every warehouse is allowed
+        self.warehouses = warehouses
+
+    def allows(self, warehouse_id):
+        """
+        Tell whether a warehouse belongs to the scope.
+
+        Args:
+            warehouse_id (int): The identifier of the warehouse.
+        Returns:
+            bool: True if the warehouse may be seen.
+        """
+        return self.warehouses is None or warehouse_id in self.warehouses
+
+    def restrict(self, queryset, field="warehouse"):
+        """
+        Keep the rows of a queryset which belong to the warehouses of the scope, see `restrict_to_scope`.
+        """
+        return restrict_to_scope(queryset, self.warehouses, field)
@@ -0,0 +1,39 @@
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from stocks.models import Warehouse
+from users.models import UserProfile
+from users.scope import invalidate_all_scopes, invalidate_user_scope
+
+
+@receiver(m2m_changed, sender=UserProfile.warehouses.through)
+def invalidate_scope_on_warehouses_change(sender, instance, action, reverse, **kwargs):
+    """
+    Make the cached scopes stale when warehouses are added to or removed from a profile.
+
+    A change made from the profile side only concerns its user, a change made from the warehouse side may
+    concern any user.
+    """
+    if action not in ("post_add", "post_remove", "post_clear"):
+        return
+    if reverse:
+        invalidate_all_scopes()
+    else:
+        invalidate_user_scope(instance.user_id)
+
+
+@receiver(post_save, sender=UserProfile)
+@receiver(post_delete, sender=UserProfile)
+def invalidate_scope_on_profile_change(sender, instance, **kwargs):
+    """
+    Make the cached scope of a user stale when their profile changes, e.g. when they become an admin.
+    """
+    invalidate_user_scope(instance.user_id)
+
+
+@receiver(post_delete, sender=Warehouse)
+def invalidate_scopes_on_warehouse_delete(sender, instance, **kwargs):
+    """
+    Make every cached scope stale when a warehouse is deleted, its profile links being deleted without signal.
+    """
+    invalidate_all_scopes()
@@ -0,0 +1,107 @@
+import pytest
+from django.contrib.auth import get_user_model
+
+from stocks.models import Warehouse
+from users.models import UserProfile
+from users.scope import get_warehouse_scope
+
+User = get_user_model()
+
+
+@pytest.fixture
+def warehouses():
+    """
+    Fixture to create and return two warehouses for testing.
+
+    Returns:
+        list[Warehouse]: A store and a kanban.
+    """
+    return [Warehouse.objects.create(building="A1", room="1", warehouse_type=Warehouse.Types.STORE),
+            Warehouse.objects.create(building="A1", room="2", warehouse_type=Warehouse.Types.KANBAN)]
+
+
+@pytest.fixture
+def profile(valid_user: User, warehouses: list):
+    """
+    Fixture to create and return the operator profile of the valid user, allowed in the first warehouse.
+
+    Args:
+        valid_user (User): A fixture providing a valid user instance.
+        warehouses (list[Warehouse]): The warehouses fixture.
+
+    Returns:
+        UserProfile: The profile of the valid user.
+    """
+    profile = UserProfile.objects.create(user=valid_user, profile=UserProfile.Profiles.OPERATOR)
+    profile.warehouses.add(warehouses[0])
+    return profile
+
+
+@pytest.mark.django_db
+def test_warehouse_scope_is_cached(profile: UserProfile, warehouses: list, django_assert_num_queries):
+    """
+    Test that the warehouse scope of a user is only read from the database once.
+
+    Args:
+        profile (UserProfile): A fixture providing the profile of the user.
+        warehouses (list[Warehouse]): The warehouses fixture.
+        django_assert_num_queries: pytest-django fixture counting the executed queries.
+
+    Asserts:
+        - The first read costs one query, the next ones none.
+    """
+    with django_assert_num_queries(1):
+        assert get_warehouse_scope(profile.user) == {warehouses[0].pk}
+    with django_assert_num_queries(0):
+        assert get_warehouse_scope(profile.user) == {warehouses[0].pk}
+
+
+@pytest.mark.django_db
+def test_warehouse_scope_follows_profile_changes(profile: UserProfile, warehouses: list):
+    """
+    Test that the cached scope is invalidated when the access rights of the user change.
+
+    Args:
+        profile (UserProfile): A fixture providing the profile of the user.
+        warehouses (list[Warehouse]): The warehouses fixture.
+
+    Asserts:
+        - Adding a warehouse from the profile or from the warehouse side is seen at once.
+        - Removing a warehouse is seen at once.
+        - An admin profile may see every warehouse.
+    """
+    user = profile.user
+    get_warehouse_scope(user)
+
+    # Change the warehouses from the profile side
+    profile.warehouses.add(warehouses[1])
+    assert get_warehouse_scope(user) == {warehouses[0].pk, warehouses[1].pk}
+    profile.warehouses.remove(warehouses[0])
+    assert get_warehouse_scope(user) == {warehouses[1].pk}
+
+    # Change the profiles from the warehouse side
+    warehouses[0].warehouses.add(profile)
+    assert get_warehouse_scope(user) == {warehouses[0].pk, warehouses[1].pk}
+
+    # Make the user an admin
+    profile.profile = UserProfile.Profiles.ADMIN
+    profile.save()
+    assert get_warehouse_scope(user) is None
+
+
+@pytest.mark.django_db
+def test_warehouse_scope_without_profile(valid_user: User):
+    """
+    Test the scope of a user without profile and of a superuser.
+
+    Args:
+        valid_user (User): A fixture providing a valid user instance without profile.
+
+    Asserts:
+        - A user without profile may not see any warehouse.
+        - A superuser may see every warehouse.
+    """
+    assert get_warehouse_scope(valid_user) == frozenset()
+
+    admin = User.objects.create_superuser(username="admin", password="adminpassword")
+    assert get_warehouse_scope(admin) is None
@@ -1,16 +1,28 @@
 from django.contrib.auth.decorators import login_required
 from django.shortcuts import render
 
+from stocks.services.dashboard import DASHBOARD_TIMEOUT, dashboard_key, warehouse_summaries
+
 
 @login_required(redirect_field_name=None)
 def welcome_view(request):
     """
-    Render the welcome page for authenticated users.
+    Render the welcome page for authenticated users, with the summaries of the warehouses they may see.
     This view is decorated with the `login_required` decorator, which ensures that only authenticated
     users can access it. If the user is not authenticated, they will be redirected to the login page.
+    The summaries are a fragment cached per warehouse scope, keyed on the latest movement of the warehouses
+    shown, see `dashboard_key`: they are only computed when the fragment is missing from the cache, so a
+    repeated visit does not read the stock tables.
     Args:
         request (HttpRequest): The request object containing metadata about the request.
     Returns:
         HttpResponse: A rendered welcome page for authenticated users.
     """
-    return render(request, template_name="users/index.html")
+    warehouses = request.warehouse_scope.warehouses
+    context = {
+        "dashboard_key": dashboard_key(warehouses),
+        "dashboard_timeout": DASHBOARD_TIMEOUT,
+        # Called by the template within the cached fragment only
+        "summaries": lambda: warehouse_summaries(warehouses),
+    }
+    return render(request, template_name="users/index.html", context=context)